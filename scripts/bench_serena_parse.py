@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import pickle
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+from datetime import datetime, timezone
+
+import parse_serena_pkl as parser_module
+
+SHAPES = ('dict', 'attr', 'tuple')
+STAGES = ('find_pkl', 'unpickle', 'extract', 'build_tree', 'json_encode')
+FAKE_MODULE = 'cctoolbox_bench_lsp'
+PARSER_TIMEOUT_MS = 20000
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark parse_serena_pkl.py against synthetic Serena caches')
+    parser.add_argument('--files', type=int, nargs='+', default=[100, 1000, 5000], help='File counts to generate')
+    parser.add_argument('--depth', type=int, nargs='+', default=[1, 3], help='Nesting depths of child symbols')
+    parser.add_argument('--shapes', nargs='+', choices=SHAPES, default=list(SHAPES),
+                        help='dict: dict symbols; attr: pickled class instances; tuple: (hash, container) entries')
+    parser.add_argument('--symbols-per-file', type=int, default=10, help='Top-level symbols per file')
+    parser.add_argument('--children', type=int, default=3, help='Children per symbol at each nesting level')
+    parser.add_argument('--body-size', type=int, default=0, help='Characters of source body stored on each symbol')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per case (median is reported)')
+    parser.add_argument('--lean', action='store_true', help='Unpickle with the lean loader')
+    parser.add_argument('--no-end-to-end', action='store_true',
+                        help='Skip running the parser script in a subprocess for each case')
+    parser.add_argument('--output', help='Write JSON results to this file instead of stdout')
+    parser.add_argument('--compare', help='Previous results file to compare against')
+    parser.add_argument('--keep', action='store_true', help='Keep the generated projects')
+    return parser.parse_args()
+
+
+def install_fake_module():
+    """Register picklable stand-ins for the solidlsp classes under a module the parser cannot import later."""
+    module = types.ModuleType(FAKE_MODULE)
+
+    class Position:
+        def __init__(self, line, character):
+            self.line = line
+            self.character = character
+
+    class Range:
+        def __init__(self, start, end):
+            self.start = start
+            self.end = end
+
+    class Symbol:
+        def __init__(self, name, kind, symbol_range, selection_range, children, body):
+            self.name = name
+            self.kind = kind
+            self.range = symbol_range
+            self.selection_range = selection_range
+            self.children = children
+            self.body = body
+
+    class DocumentSymbols:
+        def __init__(self, root_symbols):
+            self.root_symbols = root_symbols
+
+    for cls in (Position, Range, Symbol, DocumentSymbols):
+        cls.__module__ = FAKE_MODULE
+        cls.__qualname__ = cls.__name__
+        setattr(module, cls.__name__, cls)
+    sys.modules[FAKE_MODULE] = module
+    return module
+
+
+def remove_fake_module():
+    sys.modules.pop(FAKE_MODULE, None)
+    parser_module.SafeUnpickler.resolved_classes.clear()
+
+
+def make_symbol(shape, module, name, kind, line, depth, options):
+    children = []
+    if depth > 0:
+        for index in range(options.children):
+            children.append(make_symbol(shape, module, f'{name}_{index}', 6, line + index + 1, depth - 1, options))
+    body = 'x' * options.body_size if options.body_size else None
+    if shape == 'attr':
+        start = module.Position(line, 0)
+        end = module.Position(line + len(children) + 1, 0)
+        selection = module.Range(module.Position(line, 4), module.Position(line, 4 + len(name)))
+        return module.Symbol(name, kind, module.Range(start, end), selection, children, body)
+    symbol = {
+        'name': name,
+        'kind': kind,
+        'range': {'start': {'line': line, 'character': 0}, 'end': {'line': line + len(children) + 1, 'character': 0}},
+        'selectionRange': {'start': {'line': line, 'character': 4}, 'end': {'line': line, 'character': 4 + len(name)}},
+        'children': children
+    }
+    if body is not None:
+        symbol['body'] = body
+    return symbol
+
+
+def generate_project(root, shape, file_count, depth, options):
+    module = install_fake_module()
+    data = {'__cache_version': 1}
+    symbol_count = 0
+    per_symbol = sum(options.children ** level for level in range(depth + 1))
+    for file_index in range(file_count):
+        file_path = os.path.join(root, 'src', f'pkg{file_index % 50}', f'module_{file_index}.py')
+        symbols = [
+            make_symbol(shape, module, f'Symbol{file_index}_{index}', 5, index * 100, depth, options)
+            for index in range(options.symbols_per_file)
+        ]
+        symbol_count += per_symbol * options.symbols_per_file
+        if shape == 'dict':
+            value = {'root_symbols': symbols}
+        elif shape == 'attr':
+            value = module.DocumentSymbols(symbols)
+        else:
+            value = (f'{file_index:040x}', {'root_symbols': symbols})
+        data[file_path] = value
+    pkl_path = os.path.join(root, '.serena', 'cache', 'python', 'document_symbols.pkl')
+    os.makedirs(os.path.dirname(pkl_path), exist_ok=True)
+    with open(pkl_path, 'wb') as handle:
+        pickle.dump({'obj': data}, handle, protocol=pickle.HIGHEST_PROTOCOL)
+    remove_fake_module()
+    return pkl_path, symbol_count
+
+
+def run_stages(project_path, lean):
+    """Split the parser pipeline into ``(stage, callable)`` pairs that share intermediate state."""
+    state = {}
+
+    def find():
+        state['pkl'] = parser_module.find_pkl(project_path)
+
+    def unpickle():
+        parser_module.SafeUnpickler.resolved_classes.clear()
+        state['data'] = parser_module.load_pkl(state['pkl'], lean)
+
+    def extract():
+        state['symbols'] = {
+            rel_path: parser_module.extract_symbols(value)
+            for rel_path, value in parser_module.iter_entries(state['data'], project_path)
+        }
+        state['data'] = None
+
+    def tree():
+        state['files'] = parser_module.build_tree(list(state['symbols'].keys()))
+
+    def encode():
+        result = {'files': state['files'], 'symbols': state['symbols'], 'fileCount': len(state['symbols'])}
+        state['json'] = json.dumps(result, ensure_ascii=False)
+
+    return list(zip(STAGES, (find, unpickle, extract, tree, encode)))
+
+
+def time_case(project_path, lean, repeat):
+    wall = {stage: [] for stage in STAGES}
+    cpu = {stage: [] for stage in STAGES}
+    for _ in range(max(1, repeat)):
+        for stage, run in run_stages(project_path, lean):
+            wall_start = time.perf_counter()
+            cpu_start = time.process_time()
+            run()
+            cpu[stage].append((time.process_time() - cpu_start) * 1000)
+            wall[stage].append((time.perf_counter() - wall_start) * 1000)
+    return wall, cpu
+
+
+def trace_case(project_path, lean):
+    peaks = {}
+    tracemalloc.start()
+    try:
+        for stage, run in run_stages(project_path, lean):
+            tracemalloc.reset_peak()
+            run()
+            peaks[stage] = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+
+def end_to_end(project_path, lean):
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'parse_serena_pkl.py')
+    command = [sys.executable, script, '--project', project_path, '--no-index']
+    if lean:
+        command.append('--lean')
+    started = time.perf_counter()
+    subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+def summarize(samples):
+    return {
+        'medianMs': round(statistics.median(samples), 2),
+        'minMs': round(min(samples), 2),
+        'maxMs': round(max(samples), 2)
+    }
+
+
+def run_case(shape, file_count, depth, options):
+    root = tempfile.mkdtemp(prefix=f'serena-bench-{shape}-{file_count}-{depth}-')
+    try:
+        pkl_path, symbol_count = generate_project(root, shape, file_count, depth, options)
+        wall, cpu = time_case(root, options.lean, options.repeat)
+        peaks = trace_case(root, options.lean)
+        stages = {}
+        for stage in STAGES:
+            stages[stage] = summarize(wall[stage])
+            stages[stage]['cpuMs'] = round(statistics.median(cpu[stage]), 2)
+            stages[stage]['peakTracedBytes'] = peaks[stage]
+        total = round(sum(stages[stage]['medianMs'] for stage in STAGES), 2)
+        result = {
+            'key': f'{shape}/{file_count}/{depth}',
+            'shape': shape,
+            'files': file_count,
+            'depth': depth,
+            'symbols': symbol_count,
+            'pklBytes': os.path.getsize(pkl_path),
+            'stages': stages,
+            'totalMs': total,
+            'timeoutRatio': round(total / PARSER_TIMEOUT_MS, 3)
+        }
+        if not options.no_end_to_end:
+            result['endToEndMs'] = end_to_end(root, options.lean)
+            result['timeoutRatio'] = round(result['endToEndMs'] / PARSER_TIMEOUT_MS, 3)
+        if options.keep:
+            result['project'] = root
+        return result
+    finally:
+        if not options.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+def report_options(options):
+    return {
+        'symbolsPerFile': options.symbols_per_file,
+        'children': options.children,
+        'bodySize': options.body_size,
+        'repeat': options.repeat,
+        'lean': options.lean
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, options, baseline_path):
+    with open(baseline_path, 'r', encoding='utf-8') as handle:
+        previous_report = json.load(handle)
+    baseline = {item['key']: item for item in previous_report.get('results', [])}
+    lines = []
+    previous_options = previous_report.get('meta', {}).get('options', {})
+    current_options = report_options(options)
+    differing = sorted(key for key in current_options if previous_options.get(key) != current_options[key])
+    if differing:
+        lines.append(f"note: options differ from baseline ({', '.join(differing)})")
+    for item in results:
+        previous = baseline.get(item['key'])
+        if not previous:
+            continue
+        metric = 'endToEndMs' if 'endToEndMs' in item and 'endToEndMs' in previous else 'totalMs'
+        ratio = item[metric] / previous[metric] if previous[metric] else 0
+        lines.append(f"{item['key']:<24} {metric:<11} {previous[metric]:>10.1f} -> {item[metric]:>10.1f}  x{ratio:.2f}")
+    return lines
+
+
+def main():
+    options = parse_args()
+    results = []
+    for shape in options.shapes:
+        for file_count in options.files:
+            for depth in options.depth:
+                result = run_case(shape, file_count, depth, options)
+                results.append(result)
+                print(
+                    f"[bench] {result['key']}: {result['symbols']} symbols, "
+                    f"{result['pklBytes'] / 1024 / 1024:.1f} MB, total {result['totalMs']:.0f} ms",
+                    file=sys.stderr
+                )
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timeoutMs': PARSER_TIMEOUT_MS,
+            'options': report_options(options)
+        },
+        'results': results
+    }
+    payload = json.dumps(report, ensure_ascii=False, indent=2)
+    if options.output:
+        with open(options.output, 'w', encoding='utf-8') as handle:
+            handle.write(payload + '\n')
+    else:
+        print(payload)
+    if options.compare:
+        for line in compare(results, options, options.compare):
+            print(line, file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+DB_NAME = 'session-index.sqlite'
+SCHEMA_VERSION = 1
+CLI_TYPES = ('claude', 'codex', 'gemini')
+READ_BLOCK_SIZE = 1024 * 1024
+# Only this much of each end of a JSONL line is kept; longer lines (tool output, images) are matched on
+# those two ends, so metadata keys written before or after a huge message are both found.
+LINE_PREFIX_BYTES = 64 * 1024
+LINE_SUFFIX_BYTES = 16 * 1024
+# Joins the two ends of a long line; never part of JSON text, so no pattern matches across it.
+LINE_GAP = b'\0'
+HEAD_BYTES = 256 * 1024
+TAIL_BYTES = 256 * 1024
+HEAD_DIGEST_BYTES = 4096
+DEFAULT_LARGE_FILE_BYTES = 16 * 1024 * 1024
+FIRST_MESSAGE_CHARS = 500
+DEFAULT_LIMIT = 50
+POOL_MIN_FILES = 64
+TIMESTAMP_PATTERN = re.compile(rb'"timestamp"\s*:\s*"([^"]+)"')
+STRING_FIELD_PATTERN = rb'"%s"\s*:\s*"((?:[^"\\]|\\.)*)'
+MESSAGE_PATTERNS = {
+    'claude': re.compile(rb'"type"\s*:\s*"(?:user|assistant)"'),
+    # Same rule as parseSessionMeta in codex-parser.js: every response_item line counts.
+    'codex': re.compile(rb'"type"\s*:\s*"response_item"')
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='SQLite index of Claude, Codex and Gemini sessions')
+    parser.add_argument('--home', default=os.path.expanduser('~'), help='Home directory holding .claude, .codex and .gemini')
+    parser.add_argument('--db', default=None, help='Index path (default: ~/.cctoolbox/session-index.sqlite)')
+    parser.add_argument('--cli', default=','.join(CLI_TYPES), help='Comma-separated session stores to index')
+    parser.add_argument('--workers', type=int, default=None, help='Parser processes (default: CPU count)')
+    parser.add_argument('--large-file-bytes', type=int, default=DEFAULT_LARGE_FILE_BYTES,
+                        help='JSONL files above this size are sampled from head and tail; message counts are estimated '
+                             f'(minimum {HEAD_BYTES + TAIL_BYTES})')
+    parser.add_argument('--rebuild', action='store_true', help='Drop the index and rebuild it from scratch')
+    parser.add_argument('--list', action='store_true', help='Print indexed sessions, newest first, after refreshing')
+    parser.add_argument('--project', default='', help='With --list: only sessions of this project')
+    parser.add_argument('--offset', type=int, default=0, help='With --list: number of sessions to skip')
+    parser.add_argument('--limit', type=int, default=DEFAULT_LIMIT, help='With --list: maximum number of sessions')
+    args = parser.parse_args()
+    if args.large_file_bytes < HEAD_BYTES + TAIL_BYTES:
+        parser.error(f'--large-file-bytes must be at least {HEAD_BYTES + TAIL_BYTES} (head plus tail sample)')
+    return args
+
+
+def get_default_db_path():
+    base = os.environ.get('CCTOOLBOX_HOME') or os.path.expanduser('~')
+    return os.path.join(base, '.cctoolbox', DB_NAME)
+
+
+def connect(db_path):
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    if version != SCHEMA_VERSION:
+        conn.executescript('DROP TABLE IF EXISTS sessions;')
+    conn.executescript('''
+        CREATE TABLE IF NOT EXISTS sessions (
+            path TEXT PRIMARY KEY,
+            cli TEXT NOT NULL,
+            id TEXT NOT NULL,
+            project TEXT NOT NULL,
+            cwd TEXT,
+            first_message TEXT,
+            message_count INTEGER NOT NULL,
+            count_exact INTEGER NOT NULL,
+            first_timestamp TEXT,
+            last_timestamp TEXT,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            scanned_bytes INTEGER NOT NULL,
+            head_digest TEXT
+        );
+        CREATE INDEX IF NOT EXISTS sessions_recent ON sessions (cli, mtime_ns DESC);
+        CREATE INDEX IF NOT EXISTS sessions_project ON sessions (cli, project, mtime_ns DESC);
+        CREATE INDEX IF NOT EXISTS sessions_id ON sessions (cli, id);
+    ''')
+    conn.execute(f'PRAGMA user_version={SCHEMA_VERSION}')
+    return conn
+
+
+def scan_dir(path, predicate):
+    try:
+        entries = list(os.scandir(path))
+    except OSError:
+        return []
+    return [entry for entry in entries if predicate(entry)]
+
+
+def walk_sessions(home, clis):
+    """Return ``{path: (cli, unit, mtime_ns, size)}``. A unit is one project (or Codex day directory)
+    and is the grain at which files are handed to the process pool."""
+    found = {}
+
+    def add(cli, unit, entry):
+        try:
+            stat = entry.stat()
+        except OSError:
+            return
+        found[entry.path] = (cli, unit, stat.st_mtime_ns, stat.st_size)
+
+    if 'claude' in clis:
+        for project in scan_dir(os.path.join(home, '.claude', 'projects'), lambda entry: entry.is_dir()):
+            for entry in scan_dir(project.path, lambda item: item.is_file() and item.name.endswith('.jsonl')):
+                add('claude', project.name, entry)
+    if 'codex' in clis:
+        stack = [os.path.join(home, '.codex', 'sessions')]
+        while stack:
+            current = stack.pop()
+            for entry in scan_dir(current, lambda item: True):
+                if entry.is_dir():
+                    stack.append(entry.path)
+                elif entry.name.startswith('rollout-') and entry.name.endswith('.jsonl'):
+                    add('codex', current, entry)
+    if 'gemini' in clis:
+        for project in scan_dir(os.path.join(home, '.gemini', 'tmp'), lambda entry: entry.is_dir()):
+            chats = os.path.join(project.path, 'chats')
+            for entry in scan_dir(chats, lambda item: item.is_file() and re.match(r'^session-.*\.json$', item.name)):
+                add('gemini', project.name, entry)
+    return found
+
+
+def iter_lines(handle, start, end):
+    """Yield ``(line, line_end_offset)`` for complete lines in [start, end) with bounded memory. A line
+    longer than LINE_PREFIX_BYTES comes back as its prefix and its last LINE_SUFFIX_BYTES joined by
+    LINE_GAP. A trailing line without a newline is not yielded, so an append-in-progress is picked up
+    next run."""
+    handle.seek(start)
+    offset = start
+    pending = b''
+    pending_len = 0
+    suffix = b''
+
+    def add(piece):
+        nonlocal pending, pending_len, suffix
+        if pending_len < LINE_PREFIX_BYTES:
+            pending += piece[:LINE_PREFIX_BYTES - pending_len]
+        rest = piece[max(LINE_PREFIX_BYTES - pending_len, 0):]
+        if rest:
+            suffix = (suffix + rest[-LINE_SUFFIX_BYTES:])[-LINE_SUFFIX_BYTES:]
+        pending_len += len(piece)
+
+    while offset < end:
+        block = handle.read(min(READ_BLOCK_SIZE, end - offset))
+        if not block:
+            break
+        position = 0
+        while True:
+            newline = block.find(b'\n', position)
+            if newline < 0:
+                add(block[position:])
+                break
+            add(block[position:newline])
+            yield (pending + LINE_GAP + suffix if suffix else pending), offset + newline + 1
+            pending = suffix = b''
+            pending_len = 0
+            position = newline + 1
+        offset += len(block)
+
+
+def count_lines(handle):
+    """Newline count of the whole file; block-wise ``bytes.count`` is far cheaper than splitting lines."""
+    handle.seek(0)
+    total = 0
+    while True:
+        block = handle.read(READ_BLOCK_SIZE)
+        if not block:
+            return total
+        total += block.count(b'\n')
+
+
+def decode_record(line):
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    return record if isinstance(record, dict) else None
+
+
+def salvage_string(line, key):
+    """First ``"key": "..."`` string in a truncated line, decoded up to where its end of the line was cut."""
+    match = re.search(STRING_FIELD_PATTERN % key.encode('ascii'), line)
+    if not match:
+        return None
+    raw = match.group(1).split(LINE_GAP, 1)[0]
+    # The prefix may end inside an escape sequence such as \u00e9; drop at most its six bytes.
+    for cut in range(0, 7):
+        try:
+            return json.loads(b'"' + raw[:len(raw) - cut] + b'"')
+        except ValueError:
+            continue
+    return None
+
+
+def salvage_record(cli, line):
+    """Rebuild the fields SessionScan.inspect needs from a line too long to keep whole. Key order is not
+    assumed: nested content blocks carry their own ``type``, so record types are matched by value."""
+    if cli == 'claude':
+        content = salvage_string(line, 'content') or salvage_string(line, 'text')
+        role = re.search(rb'"type"\s*:\s*"(user|assistant)"', line)
+        return {'type': role.group(1).decode('ascii') if role else None, 'cwd': salvage_string(line, 'cwd'),
+                'sessionId': salvage_string(line, 'sessionId'), 'message': {'content': content}}
+    if re.search(rb'"type"\s*:\s*"session_meta"', line):
+        return {'type': 'session_meta', 'payload': {'id': salvage_string(line, 'id'), 'cwd': salvage_string(line, 'cwd')}}
+    if not MESSAGE_PATTERNS['codex'].search(line):
+        return {}
+    return {'type': 'response_item', 'payload': {
+        'type': 'message' if re.search(rb'"type"\s*:\s*"message"', line) else None,
+        'role': salvage_string(line, 'role'),
+        'content': [{'text': salvage_string(line, 'text') or ''}]
+    }}
+
+
+def text_of(content):
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return '\n'.join(str(part.get('text') or part.get('input_text') or '') for part in content if isinstance(part, dict))
+    return json.dumps(content, ensure_ascii=False) if content is not None else ''
+
+
+class SessionScan:
+    """Accumulates one session's fields from JSONL lines (the rules mirror src/utils/session.js and codex-parser.js)."""
+
+    def __init__(self, cli, row=None):
+        self.cli = cli
+        self.pattern = MESSAGE_PATTERNS[cli]
+        self.row = dict(row or {'id': '', 'cwd': None, 'first_message': None, 'message_count': 0, 'count_exact': 1,
+                                'first_timestamp': None, 'last_timestamp': None})
+
+    def feed(self, line):
+        if not line.strip():
+            return
+        is_message = self.pattern.search(line) is not None
+        if is_message:
+            self.row['message_count'] += 1
+        timestamp = TIMESTAMP_PATTERN.search(line)
+        if timestamp:
+            value = timestamp.group(1).decode('utf-8', errors='replace')
+            self.row['first_timestamp'] = self.row['first_timestamp'] or value
+            self.row['last_timestamp'] = value
+        if self.row['first_message'] and self.row['id'] and self.row['cwd']:
+            return
+        record = salvage_record(self.cli, line) if len(line) >= LINE_PREFIX_BYTES else decode_record(line)
+        if record is not None:
+            self.inspect(record)
+
+    def inspect(self, record):
+        row = self.row
+        if self.cli == 'claude':
+            row['cwd'] = row['cwd'] or record.get('cwd')
+            row['id'] = row['id'] or record.get('sessionId') or ''
+            message = record.get('message') or {}
+            if record.get('type') == 'user' and not row['first_message'] and isinstance(message, dict):
+                text = text_of(message.get('content'))
+                if text and text != 'Warmup':
+                    row['first_message'] = text[:FIRST_MESSAGE_CHARS]
+            return
+        payload = record.get('payload') or {}
+        if record.get('type') == 'session_meta':
+            row['id'] = row['id'] or payload.get('id') or ''
+            row['cwd'] = row['cwd'] or payload.get('cwd')
+        elif (record.get('type') == 'response_item' and payload.get('type') == 'message'
+              and payload.get('role') == 'user' and not row['first_message']):
+            text = text_of(payload.get('content')).strip()
+            if text and text != 'Warmup' and not text.startswith('<environment_context>'):
+                row['first_message'] = text[:FIRST_MESSAGE_CHARS]
+
+
+def head_digest(handle, size):
+    handle.seek(0)
+    return hashlib.sha1(handle.read(min(size, HEAD_DIGEST_BYTES))).hexdigest()
+
+
+def scan_jsonl(path, cli, size, previous, large_file_bytes):
+    """Index a Claude/Codex transcript. Appends are resumed from the last scanned offset; files above
+    ``large_file_bytes`` are sampled from head and tail with an estimated message count."""
+    with open(path, 'rb') as handle:
+        digest = head_digest(handle, size)
+        resumable = (previous and previous['count_exact'] and previous['head_digest'] == digest
+                     and previous['size'] <= size and previous['scanned_bytes'] <= size)
+        if resumable:
+            scan = SessionScan(cli, previous)
+            start = previous['scanned_bytes']
+        else:
+            scan = SessionScan(cli)
+            start = 0
+        scanned = start
+        if not resumable and size > max(large_file_bytes, HEAD_BYTES + TAIL_BYTES):
+            # Metadata comes from the head and tail only. The message count is exact for both windows;
+            # the lines between them (counted cheaply) are assumed to hold messages at the tail's rate,
+            # since the head carries the session preamble and lines can be megabytes each.
+            # The head runs to the end of the line that crosses HEAD_BYTES, so a huge first line still
+            # yields the keys written after its message; the tail never starts before the head ended.
+            head_lines = 0
+            head_end = 0
+            for line, head_end in iter_lines(handle, 0, size):
+                scan.feed(line)
+                head_lines += 1
+                if head_end >= HEAD_BYTES:
+                    break
+            head_messages = scan.row['message_count']
+            tail_lines = 0
+            scanned = head_end
+            tail_start = max(size - TAIL_BYTES, head_end, 1)
+            for index, (line, end) in enumerate(iter_lines(handle, tail_start - 1, size)):
+                if index == 0:
+                    continue  # the line the tail window starts in, unless it starts right after a newline
+                scan.feed(line)
+                tail_lines += 1
+                scanned = end
+            tail_messages = scan.row['message_count'] - head_messages
+            # A tail inside one huge line gives no rate; past the preamble such files are all messages.
+            rate = tail_messages / tail_lines if tail_lines else float(head_messages > 0)
+            middle_lines = max(count_lines(handle) - head_lines - tail_lines, 0)
+            scan.row['message_count'] += round(middle_lines * rate)
+            scan.row['count_exact'] = 0
+        else:
+            for line, end in iter_lines(handle, start, size):
+                scan.feed(line)
+                scanned = end
+    row = scan.row
+    if not row['id']:
+        name = os.path.basename(path)[:-len('.jsonl')]
+        row['id'] = name[len('rollout-') + 20:] if cli == 'codex' else name
+    row.update({'scanned_bytes': scanned, 'head_digest': digest})
+    return row, resumable
+
+
+def scan_gemini(path):
+    """Gemini chats are single JSON documents rewritten on every turn, so they are always parsed whole."""
+    with open(path, 'rb') as handle:
+        data = json.load(handle)
+    messages = data.get('messages') or []
+    first_user = next((text_of(item.get('content')) for item in messages
+                       if isinstance(item, dict) and item.get('type') == 'user' and text_of(item.get('content'))), None)
+    return {
+        'id': data.get('sessionId') or os.path.basename(path)[:-len('.json')],
+        'cwd': None,
+        'first_message': first_user[:FIRST_MESSAGE_CHARS] if first_user else None,
+        'message_count': len(messages),
+        'count_exact': 1,
+        'first_timestamp': data.get('startTime'),
+        'last_timestamp': data.get('lastUpdated'),
+        'scanned_bytes': os.path.getsize(path),
+        'head_digest': None
+    }, False
+
+
+def index_file(task):
+    """Return ``(path, row, resumed)`` or ``(path, None, False)`` when the file cannot be read."""
+    path, cli, unit, mtime_ns, size, previous, large_file_bytes = task
+    try:
+        if cli == 'gemini':
+            row, resumed = scan_gemini(path)
+            project = unit
+        else:
+            row, resumed = scan_jsonl(path, cli, size, previous, large_file_bytes)
+            project = unit if cli == 'claude' else os.path.basename((row['cwd'] or '').rstrip('/\\')) or 'unknown'
+    except (OSError, ValueError):
+        return path, None, False
+    row.update({'path': path, 'cli': cli, 'project': project, 'size': size, 'mtime_ns': mtime_ns})
+    return path, row, resumed
+
+
+def index_unit(tasks):
+    return [index_file(task) for task in tasks]
+
+
+def iter_indexed(tasks, workers=None):
+    if len(tasks) < POOL_MIN_FILES or workers == 1:
+        for task in tasks:
+            yield index_file(task)
+        return
+    units = {}
+    for task in tasks:
+        units.setdefault((task[1], task[2]), []).append(task)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for results in pool.map(index_unit, units.values()):
+            yield from results
+
+
+COLUMNS = ('path', 'cli', 'id', 'project', 'cwd', 'first_message', 'message_count', 'count_exact',
+           'first_timestamp', 'last_timestamp', 'size', 'mtime_ns', 'scanned_bytes', 'head_digest')
+
+
+def refresh_index(conn, home, clis, workers=None, large_file_bytes=DEFAULT_LARGE_FILE_BYTES):
+    """Re-index new and modified session files (by mtime and size) and drop rows for deleted ones."""
+    started = time.monotonic()
+    on_disk = walk_sessions(home, clis)
+    placeholders = ','.join('?' * len(clis))
+    known = {
+        row[0]: dict(zip(COLUMNS, row))
+        for row in conn.execute(f'SELECT {", ".join(COLUMNS)} FROM sessions WHERE cli IN ({placeholders})', clis)
+    }
+    tasks = [
+        (path, cli, unit, mtime_ns, size, known.get(path), large_file_bytes)
+        for path, (cli, unit, mtime_ns, size) in on_disk.items()
+        if path not in known or (known[path]['mtime_ns'], known[path]['size']) != (mtime_ns, size)
+    ]
+    removed = [path for path in known if path not in on_disk]
+    updated = appended = failed = 0
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        conn.executemany('DELETE FROM sessions WHERE path = ?', ((path,) for path in removed))
+        for path, row, resumed in iter_indexed(tasks, workers):
+            if row is None:
+                failed += 1
+                continue
+            conn.execute(
+                f'INSERT OR REPLACE INTO sessions ({", ".join(COLUMNS)}) VALUES ({", ".join("?" * len(COLUMNS))})',
+                tuple(row[column] for column in COLUMNS)
+            )
+            updated += 1
+            appended += 1 if resumed else 0
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    return {
+        'files': len(on_disk),
+        'updated': updated,
+        'appended': appended,
+        'removed': len(removed),
+        'failed': failed,
+        'ms': round((time.monotonic() - started) * 1000, 1)
+    }
+
+
+def list_sessions(conn, clis, project='', offset=0, limit=DEFAULT_LIMIT):
+    """Newest sessions first; served by the sessions_recent / sessions_project indexes."""
+    placeholders = ','.join('?' * len(clis))
+    where = f'cli IN ({placeholders})'
+    params = list(clis)
+    if project:
+        where += ' AND project = ?'
+        params.append(project)
+    total = conn.execute(f'SELECT COUNT(*) FROM sessions WHERE {where}', params).fetchone()[0]
+    rows = conn.execute(
+        f'''SELECT cli, id, project, cwd, first_message, message_count, count_exact, first_timestamp,
+                   last_timestamp, size, mtime_ns, path
+            FROM sessions WHERE {where} ORDER BY mtime_ns DESC LIMIT ? OFFSET ?''',
+        params + [max(0, limit), max(0, offset)]
+    ).fetchall()
+    items = [{
+        'cli': cli,
+        'sessionId': session_id,
+        'project': project_name,
+        'cwd': cwd,
+        'firstMessage': first_message,
+        'messageCount': message_count,
+        'messageCountExact': bool(count_exact),
+        'firstTimestamp': first_timestamp,
+        'lastTimestamp': last_timestamp,
+        'size': size,
+        'mtime': mtime_ns // 1_000_000,
+        'filePath': path
+    } for (cli, session_id, project_name, cwd, first_message, message_count, count_exact, first_timestamp,
+           last_timestamp, size, mtime_ns, path) in rows]
+    return {'items': items, 'total': total, 'offset': offset, 'limit': limit}
+
+
+def main():
+    args = parse_args()
+    clis = [cli for cli in args.cli.split(',') if cli in CLI_TYPES]
+    db_path = args.db or get_default_db_path()
+    if args.rebuild:
+        for suffix in ('', '-wal', '-shm'):
+            try:
+                os.remove(db_path + suffix)
+            except OSError:
+                pass
+    try:
+        conn = connect(db_path)
+        try:
+            result = {'db': db_path, 'index': refresh_index(conn, args.home, clis, args.workers, args.large_file_bytes)}
+            if args.list:
+                result.update(list_sessions(conn, clis, args.project, args.offset, args.limit))
+        finally:
+            conn.close()
+    except (OSError, sqlite3.Error) as exc:
+        result = {'db': db_path, 'error': str(exc)}
+    sys.stdout.write(json.dumps(result, ensure_ascii=False) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,43 +1,190 @@
 #!/usr/bin/env python3
 import argparse
+import bisect
+import ctypes
+import ctypes.util
+import hashlib
+import heapq
 import json
+import mmap
+import multiprocessing
 import os
 import pickle
+import select
+import struct
 import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime, timezone
 from pathlib import Path
 
+try:
+    import resource
+except ImportError:
+    resource = None
+
+import serena_reference_index
+
+DEFAULT_SERVER_WORKERS = 4
+DEFAULT_SERVER_MAX_PROJECTS = 8
+# How long a ``references`` request waits for a running index build before answering ``building``.
+REFERENCE_WAIT_SECONDS = 5.0
+INDEX_DIR_NAME = 'cctoolbox-index'
+INDEX_DIR_NAME_BYTES = INDEX_DIR_NAME.encode('ascii')
+INDEX_VERSION = 4
+INDEX_ROOT_SHARD = '_root'
+INDEX_MAX_OPEN_SHARDS = 32
+DEFAULT_SEARCH_LIMIT = 100
+SEARCH_BOUNDARY_CHARS = set('_-.$:/ ')
+WATCH_STATUS_NAME = 'watch.json'
+WATCH_DEBOUNCE_SECONDS = 1.5
+WATCH_POLL_SECONDS = 2.0
+WATCH_RESCAN_SECONDS = 60.0
+WATCH_STOP_POLL_SECONDS = 1.0
+COMPACT_FORMAT = 'cctoolbox-compact'
+COMPACT_FORMAT_VERSION = 1
+
 
 def parse_args():
     parser = argparse.ArgumentParser(description='Parse Serena document_symbols.pkl')
-    parser.add_argument('--project', required=True, help='Project root path')
-    return parser.parse_args()
+    parser.add_argument('--project', help='Project root path')
+    parser.add_argument('--stream', action='store_true',
+                        help='Write NDJSON records (one per file, then tree and summary) instead of one JSON document')
+    parser.add_argument('--no-index', action='store_true',
+                        help='Do not read or write the derived symbol index under .serena/cache')
+    parser.add_argument('--since', default='',
+                        help='Version from a previous run; output an added/changed/removed patch against it when possible')
+    parser.add_argument('--files-only', action='store_true',
+                        help='Only output the file tree, without normalizing any symbols')
+    parser.add_argument('--paths', nargs='+', default=None,
+                        help='Only normalize symbols for these project-relative file paths')
+    parser.add_argument('--max-depth', type=int, default=None,
+                        help='Limit nested children depth (0 keeps only top-level symbols)')
+    parser.add_argument('--query', default='',
+                        help='Search symbol names (nested symbols included); combine with --paths to search given files')
+    parser.add_argument('--limit', type=int, default=DEFAULT_SEARCH_LIMIT,
+                        help='Maximum number of --query results')
+    parser.add_argument('--lean', action='store_true',
+                        help='Drop symbol fields the output never uses (bodies, locations, raw LSP data) while unpickling')
+    parser.add_argument('--profile', action='store_true',
+                        help='Add a stats block with per-stage wall/CPU time, peak RSS, pkl size and symbol counts')
+    parser.add_argument('--compact', action='store_true',
+                        help='Write the full result in the columnar compact format (string table, flat ranges, parent indices)')
+    parser.add_argument('--watch', nargs='+', default=None, metavar='PROJECT',
+                        help='Keep the derived index of these projects rebuilt whenever Serena rewrites their caches')
+    parser.add_argument('--debounce', type=float, default=WATCH_DEBOUNCE_SECONDS,
+                        help='Watch mode: seconds without cache writes before rebuilding')
+    parser.add_argument('--server', action='store_true',
+                        help='Run as a long-lived JSON-lines server on stdin/stdout')
+    parser.add_argument('--workers', type=int, default=DEFAULT_SERVER_WORKERS,
+                        help='Server mode: number of request worker threads')
+    parser.add_argument('--max-projects', type=int, default=DEFAULT_SERVER_MAX_PROJECTS,
+                        help='Server mode: number of parsed projects kept in memory')
+    args = parser.parse_args()
+    if not args.server and not args.watch and not args.project:
+        parser.error('--project is required unless --server or --watch is given')
+    return args
+
+
+# Fields read by normalize_symbol/extract_symbols; lean loading drops everything else.
+LEAN_SYMBOL_FIELDS = frozenset([
+    'name', 'symbol_name', 'identifier', 'kind', 'symbol_kind', 'detail', 'signature',
+    'children', 'child_symbols', 'range', 'selection_range', 'selectionRange'
+])
+LEAN_CONTAINER_FIELDS = frozenset(['root_symbols', 'symbols', 'items', 'data'])
+LEAN_POSITION_FIELDS = frozenset(['start', 'end', 'line', 'character', 'lineno', 'col_offset', 'row', 'col', 'column'])
+LEAN_FIELDS = LEAN_SYMBOL_FIELDS | LEAN_CONTAINER_FIELDS | LEAN_POSITION_FIELDS
+LEAN_NESTED_FIELDS = frozenset(['children', 'child_symbols']) | LEAN_CONTAINER_FIELDS
 
 
 class PlaceholderObject:
+    """Stand-in for classes that cannot be imported; attributes live in one state dict."""
+
+    __slots__ = ('_state',)
+
     def __init__(self, *args, **kwargs):
-        pass
+        self._state = {}
 
     def __setstate__(self, state):
         if isinstance(state, dict):
-            self.__dict__.update(state)
+            self._state = state
         else:
-            self.state = state
+            self._state = {'state': state}
+
+    def __getstate__(self):
+        return self._state
+
+    def __getattr__(self, name):
+        try:
+            return object.__getattribute__(self, '_state')[name]
+        except (AttributeError, KeyError):
+            raise AttributeError(name) from None
+
+
+class LeanPlaceholderObject(PlaceholderObject):
+    """Placeholder that discards fields the normalizer never reads as soon as its state is restored."""
+
+    __slots__ = ()
+
+    def __setstate__(self, state):
+        if isinstance(state, dict) and (not LEAN_FIELDS.issuperset(state) or LEAN_NESTED_FIELDS.intersection(state)):
+            state = prune_fields(state)
+        super().__setstate__(state)
+
+
+def prune_fields(state, seen=None):
+    seen = set() if seen is None else seen
+    if id(state) in seen:
+        return state
+    seen.add(id(state))
+    for key in state.keys() - LEAN_FIELDS:
+        del state[key]
+    for key in LEAN_NESTED_FIELDS.intersection(state):
+        prune_nested(state[key], seen)
+    return state
+
+
+def prune_nested(value, seen):
+    if isinstance(value, dict):
+        prune_fields(value, seen)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            if isinstance(item, dict):
+                prune_fields(item, seen)
 
 
 class SafeUnpickler(pickle.Unpickler):
+    # (module, name) -> resolved class, or None when it cannot be imported.
+    resolved_classes = {}
+
+    def __init__(self, file, lean=False):
+        super().__init__(file)
+        self.placeholder = LeanPlaceholderObject if lean else PlaceholderObject
+
     def find_class(self, module, name):
+        key = (module, name)
         try:
-            return super().find_class(module, name)
-        except Exception:
-            return PlaceholderObject
+            resolved = self.resolved_classes[key]
+        except KeyError:
+            try:
+                resolved = super().find_class(module, name)
+            except Exception:
+                resolved = None
+            self.resolved_classes[key] = resolved
+        return self.placeholder if resolved is None else resolved
 
 
-def find_pkl(project_path):
+def find_pkls(project_path):
+    """Return every document_symbols.pkl under .serena/cache (Serena keeps one per language server), newest first."""
     cache_dir = os.path.join(project_path, '.serena', 'cache')
     if not os.path.isdir(cache_dir):
-        return None
+        return []
     candidates = []
-    for root, _dirs, files in os.walk(cache_dir):
+    for root, dirs, files in os.walk(cache_dir):
+        dirs[:] = [name for name in dirs if name != INDEX_DIR_NAME]
         if 'document_symbols.pkl' in files:
             file_path = os.path.join(root, 'document_symbols.pkl')
             try:
@@ -45,10 +192,22 @@ def find_pkl(project_path):
             except OSError:
                 mtime = 0
             candidates.append((mtime, file_path))
-    if not candidates:
-        return None
-    candidates.sort(key=lambda item: item[0], reverse=True)
-    return candidates[0][1]
+    candidates.sort(key=lambda item: (-item[0], item[1]))
+    return [file_path for _mtime, file_path in candidates]
+
+
+def find_pkl(project_path):
+    paths = find_pkls(project_path)
+    return paths[0] if paths else None
+
+
+def cache_language(pkl_path, project_path):
+    cache_dir = os.path.join(project_path, '.serena', 'cache')
+    try:
+        language = os.path.relpath(os.path.dirname(pkl_path), cache_dir)
+    except ValueError:
+        return ''
+    return '' if language == '.' else language.replace('\\', '/')
 
 
 def safe_str(value):
@@ -90,7 +249,7 @@ def normalize_range(rng):
     return None
 
 
-def normalize_symbol(symbol):
+def normalize_symbol(symbol, max_depth=None):
     if symbol is None:
         return None
 
@@ -126,28 +285,49 @@ def normalize_symbol(symbol):
     }
 
     if children:
+        if max_depth is not None and max_depth <= 0:
+            normalized['truncated'] = True
+            return normalized
+        child_depth = max_depth - 1 if max_depth is not None else None
         for child in children:
-            child_normalized = normalize_symbol(child)
+            child_normalized = normalize_symbol(child, child_depth)
             if child_normalized:
                 normalized['children'].append(child_normalized)
 
     return normalized
 
 
-def normalize_symbols(value):
+def normalize_symbols(value, max_depth=None):
     if value is None:
         return []
     if isinstance(value, list):
         result = []
         for item in value:
-            normalized = normalize_symbol(item)
+            normalized = normalize_symbol(item, max_depth)
             if normalized:
                 result.append(normalized)
         return result
-    single = normalize_symbol(value)
+    single = normalize_symbol(value, max_depth)
     return [single] if single else []
 
 
+def limit_depth(symbols, max_depth):
+    """Apply ``max_depth`` to symbols that were already normalized without a limit."""
+    if max_depth is None:
+        return symbols
+    result = []
+    for symbol in symbols:
+        children = symbol.get('children') or []
+        limited = dict(symbol, children=[])
+        if children:
+            if max_depth <= 0:
+                limited['truncated'] = True
+            else:
+                limited['children'] = limit_depth(children, max_depth - 1)
+        result.append(limited)
+    return result
+
+
 def extract_symbol_container(value):
     if value is None:
         return None
@@ -162,23 +342,24 @@ def extract_symbol_container(value):
     return value
 
 
-def extract_symbols(value):
+def extract_symbols(value, max_depth=None):
     container = extract_symbol_container(value)
     if container is None:
         return []
     if isinstance(container, dict):
         for key in ['root_symbols', 'symbols', 'items', 'data']:
             if key in container:
-                return normalize_symbols(container[key])
-        return normalize_symbols(container)
+                return normalize_symbols(container[key], max_depth)
+        return normalize_symbols(container, max_depth)
     for attr in ['root_symbols', 'symbols', 'items', 'data']:
         if hasattr(container, attr):
-            return normalize_symbols(getattr(container, attr))
-    return normalize_symbols(container)
+            return normalize_symbols(getattr(container, attr), max_depth)
+    return normalize_symbols(container, max_depth)
 
 
-def build_tree(paths):
+def build_tree(paths, languages=None):
     root = {}
+    languages = languages or {}
 
     for file_path in paths:
         segments = [segment for segment in file_path.split('/') if segment]
@@ -206,60 +387,1785 @@ def build_tree(paths):
                     'children': children
                 })
             else:
-                nodes.append({
+                file_node = {
                     'name': node['name'],
                     'path': node['path'],
                     'type': 'file'
-                })
+                }
+                if languages.get(node['path']):
+                    file_node['language'] = languages[node['path']]
+                nodes.append(file_node)
         nodes.sort(key=lambda item: (0 if item['type'] == 'directory' else 1, item['name']))
         return nodes
 
     return to_list(root)
 
 
-def main():
-    args = parse_args()
-    project_path = os.path.abspath(args.project)
+def peak_rss_kb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere.
+    return peak // 1024 if sys.platform == 'darwin' else peak
 
-    pkl_path = find_pkl(project_path)
-    if not pkl_path:
-        output = {'files': [], 'symbols': {}, 'fileCount': 0}
-        print(json.dumps(output, ensure_ascii=False))
+
+def count_symbols(symbols):
+    total = 0
+    stack = list(symbols)
+    while stack:
+        symbol = stack.pop()
+        total += 1
+        stack.extend(symbol.get('children') or [])
+    return total
+
+
+class ParseProfiler:
+    """Accumulate wall/CPU time per pipeline stage plus size counters for the ``stats`` output block."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.counters = {'pklBytes': 0, 'fileCount': 0, 'symbolCount': 0}
+
+    @contextmanager
+    def stage(self, name):
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            entry = self.stages.setdefault(name, {'wallMs': 0.0, 'cpuMs': 0.0, 'calls': 0})
+            entry['wallMs'] += (time.perf_counter() - wall_start) * 1000
+            entry['cpuMs'] += (time.thread_time() - cpu_start) * 1000
+            entry['calls'] += 1
+            entry['peakRssKb'] = peak_rss_kb()
+
+    def add(self, key, value):
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, key, value):
+        self.counters[key] = value
+
+    def snapshot(self):
+        stages = {
+            name: dict(entry, wallMs=round(entry['wallMs'], 2), cpuMs=round(entry['cpuMs'], 2))
+            for name, entry in self.stages.items()
+        }
+        return dict(
+            self.counters,
+            stages=stages,
+            wallMs=round((time.perf_counter() - self.started) * 1000, 2),
+            cpuMs=round(sum(entry['cpuMs'] for entry in self.stages.values()), 2),
+            peakRssKb=peak_rss_kb()
+        )
+
+
+def encode_with_stats(result, profiler):
+    """JSON for ``result`` with a trailing ``stats`` key whose json_encode stage covers the encoding.
+
+    ``stats`` is added to the dict as the profiler itself, which the encoder
+    cannot serialize; ``default`` resolves it to the snapshot when the
+    encoder reaches it, after every other key has been written.
+    """
+    stage = profiler.stage('json_encode')
+    stage.__enter__()
+
+    def resolve(value):
+        if value is not profiler:
+            raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+        stage.__exit__(None, None, None)
+        return profiler.snapshot()
+
+    payload = dict(result)
+    payload.pop('stats', None)
+    payload['stats'] = profiler
+    return json.dumps(payload, ensure_ascii=False, default=resolve)
+
+
+class NullProfiler:
+    def stage(self, name):
+        return nullcontext()
+
+    def add(self, key, value):
+        pass
+
+    def set(self, key, value):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+
+def empty_result(error=None):
+    output = {'files': [], 'symbols': {}, 'fileCount': 0}
+    if error is not None:
+        output['error'] = error
+    return output
+
+
+def get_cache_signature(project_path, pkl_paths):
+    """Stat every cache; ``caches`` keeps the newest-first merge order, the top-level fields describe the newest one."""
+    caches = []
+    for pkl_path in pkl_paths or []:
+        try:
+            stat = os.stat(pkl_path)
+        except OSError:
+            continue
+        caches.append({
+            'path': pkl_path,
+            'language': cache_language(pkl_path, project_path),
+            'mtime': stat.st_mtime,
+            'mtimeNs': stat.st_mtime_ns,
+            'size': stat.st_size
+        })
+    if not caches:
+        return None
+    newest = max(caches, key=lambda cache: cache['mtimeNs'])
+    return {
+        'path': newest['path'],
+        'mtime': newest['mtime'],
+        'mtimeNs': newest['mtimeNs'],
+        'size': sum(cache['size'] for cache in caches),
+        'caches': caches
+    }
+
+
+def load_pkl(pkl_path, lean=False):
+    with open(pkl_path, 'rb') as handle:
+        data = SafeUnpickler(handle, lean).load()
+    if isinstance(data, dict) and 'obj' in data and isinstance(data.get('obj'), dict):
+        data = data.get('obj')
+    return data
+
+
+def to_relative_path(file_path, project_path):
+    try:
+        rel_path = os.path.relpath(file_path, project_path)
+    except ValueError:
+        rel_path = file_path
+    rel_path = rel_path.replace('\\', '/')
+    if rel_path.startswith('..'):
+        rel_path = file_path.replace('\\', '/')
+    return rel_path
+
+
+def iter_entries(data, project_path):
+    if not isinstance(data, dict):
         return
+    for key, value in data.items():
+        if key == '__cache_version':
+            continue
+        yield to_relative_path(safe_str(key), project_path), value
+
+
+def iter_cache_file(project_path, cache, lean=False, known=None, profiler=None):
+    """Yield ``(rel_path, symbols, hash)`` for one cache.
 
+    ``symbols`` is None for entries whose ``(hash, language)`` already
+    matches ``known``; those are not normalized at all.
+    """
+    profiler = profiler or NULL_PROFILER
+    with profiler.stage('unpickle'):
+        data = load_pkl(cache['path'], lean)
+    for rel_path, value in iter_entries(data, project_path):
+        with profiler.stage('extract'):
+            file_hash = entry_hash(value)
+            if known is not None and file_hash and known.get(rel_path) == (file_hash, cache['language']):
+                symbols = None
+            else:
+                symbols = extract_symbols(value)
+        yield rel_path, symbols, file_hash
+
+
+def load_cache_file(project_path, cache, lean=False, known=None):
+    """Process-pool worker: unpickle and normalize one cache, returning ``(entries, error, stages)``."""
+    profiler = ParseProfiler()
     try:
-        with open(pkl_path, 'rb') as handle:
-            data = SafeUnpickler(handle).load()
+        entries = list(iter_cache_file(project_path, cache, lean, known, profiler))
+        error = None
     except Exception as exc:
-        output = {'files': [], 'symbols': {}, 'fileCount': 0, 'error': safe_str(exc)}
-        print(json.dumps(output, ensure_ascii=False))
+        entries, error = [], safe_str(exc)
+    return entries, error, profiler.snapshot()['stages']
+
+
+class SharedCachePool:
+    """One spawn-context process pool for multi-cache merges, for modes that parse on worker threads.
+
+    The server and the watcher parse from threads, and forking a process
+    while other threads hold locks (stdout, the import lock, allocator
+    locks) can deadlock the child. Spawned workers start clean; the pool
+    is created on first use and then kept, so their start-up cost is paid
+    once rather than on every request.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pool = None
+
+    def get(self):
+        with self.lock:
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1,
+                                                mp_context=multiprocessing.get_context('spawn'))
+            return self.pool
+
+    def close(self):
+        with self.lock:
+            pool, self.pool = self.pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+
+# A SharedCachePool while a threaded mode runs; see shared_cache_pool().
+CACHE_POOL = None
+
+
+@contextmanager
+def shared_cache_pool():
+    global CACHE_POOL
+    CACHE_POOL = SharedCachePool()
+    try:
+        yield CACHE_POOL
+    finally:
+        pool, CACHE_POOL = CACHE_POOL, None
+        pool.close()
+
+
+def iter_cache_entries(project_path, signature, lean=False, known=None, profiler=None, provenance=None):
+    """Yield ``(rel_path, language, symbols, hash)`` merged across every cache in ``signature``.
+
+    A path present in several caches is taken from the newest one. A single
+    cache is streamed in-process; several caches are unpickled and
+    normalized in parallel worker processes, so the latency is close to that
+    of the largest cache; the one-shot CLI forks a pool per parse, the
+    threaded modes use :data:`CACHE_POOL`. ``provenance`` receives one ``language``/``path``/
+    ``fileCount`` (and ``error``) dict per cache.
+    """
+    profiler = profiler or NULL_PROFILER
+    provenance = provenance if provenance is not None else []
+    caches = signature['caches']
+    workers = min(len(caches), os.cpu_count() or 1)
+    seen = set()
+
+    def merge(cache, entries):
+        info = {'language': cache['language'], 'path': to_relative_path(cache['path'], project_path), 'fileCount': 0}
+        provenance.append(info)
+        for rel_path, symbols, file_hash in entries:
+            if rel_path in seen:
+                continue
+            seen.add(rel_path)
+            info['fileCount'] += 1
+            yield rel_path, cache['language'], symbols, file_hash
+        return info
+
+    if workers <= 1:
+        for cache in caches:
+            try:
+                yield from merge(cache, iter_cache_file(project_path, cache, lean, known, profiler))
+            except Exception as exc:
+                provenance[-1]['error'] = safe_str(exc)
         return
 
-    symbols_map = {}
-    if isinstance(data, dict) and 'obj' in data and isinstance(data.get('obj'), dict):
-        data = data.get('obj')
+    pool_context = nullcontext(CACHE_POOL.get()) if CACHE_POOL is not None else ProcessPoolExecutor(max_workers=workers)
+    with profiler.stage('load_caches'):
+        with pool_context as pool:
+            futures = [pool.submit(load_cache_file, project_path, cache, lean, known) for cache in caches]
+            results = [future.result() for future in futures]
+    for cache, (entries, error, stages) in zip(caches, results):
+        info = yield from merge(cache, entries)
+        if error is not None:
+            info['error'] = error
+        if profiler is not NULL_PROFILER:
+            profiler.counters.setdefault('cacheStages', {})[cache['language'] or '.'] = stages
+
+
+def cache_errors(provenance):
+    errors = [f"{info['language'] or '.'}: {info['error']}" for info in provenance if 'error' in info]
+    return '; '.join(errors) if errors else None
+
+
+def get_index_dir(project_path):
+    return os.path.join(project_path, '.serena', 'cache', INDEX_DIR_NAME)
+
+
+def get_shard_name(rel_path):
+    segments = [segment for segment in rel_path.split('/') if segment]
+    return segments[0] if len(segments) > 1 else INDEX_ROOT_SHARD
+
+
+def entry_hash(value):
+    """Hash one raw cache entry, preferring Serena's own per-file content hash."""
+    if isinstance(value, (tuple, list)) and len(value) > 1 and isinstance(value[0], (str, bytes)):
+        raw = value[0] if isinstance(value[0], bytes) else value[0].encode('utf-8', 'surrogatepass')
+        return 's:' + hashlib.sha1(raw).hexdigest()
+    try:
+        return 'p:' + hashlib.sha1(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)).hexdigest()
+    except Exception:
+        return None
+
+
+def encode_symbols(symbols):
+    return json.dumps(symbols, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def content_digest(payload):
+    """Digest of encoded output; equal symbols give equal digests whatever the pkl mtime."""
+    return hashlib.sha1(payload).hexdigest()[:20]
+
+
+def combine_digests(tree_digest, digests):
+    """Hash of the whole result from the tree digest and the per-file ``{rel_path: digest}`` map."""
+    hasher = hashlib.sha1(tree_digest.encode('utf-8'))
+    for rel_path in sorted(digests):
+        hasher.update(f'\0{rel_path}\0{digests[rel_path]}'.encode('utf-8'))
+    return hasher.hexdigest()[:20]
+
+
+def manifest_hashes(manifest):
+    return {'contentHash': manifest.get('contentHash', ''), 'treeHash': manifest.get('treeHash', '')}
 
-    if isinstance(data, dict):
-        for key, value in data.items():
-            if key == '__cache_version':
+
+def source_version(project_path, signature):
+    source = index_source(project_path, signature)
+    key = '|'.join(f"{path}:{mtime_ns}:{size}" for path, mtime_ns, size in source['caches'])
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+
+def index_source(project_path, signature):
+    return {
+        'caches': [
+            [to_relative_path(cache['path'], project_path), cache['mtimeNs'], cache['size']]
+            for cache in signature['caches']
+        ]
+    }
+
+
+def write_json_atomic(file_path, payload):
+    tmp_path = f'{file_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as handle:
+        json.dump(payload, handle, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, file_path)
+
+
+def load_index_manifest(project_path, signature=None):
+    """Load the index manifest; with ``signature`` it must also match the current pkl."""
+    manifest_path = os.path.join(get_index_dir(project_path), 'manifest.json')
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as handle:
+            manifest = json.load(handle)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or manifest.get('version') != INDEX_VERSION:
+        return None
+    if signature is not None and manifest.get('source') != index_source(project_path, signature):
+        return None
+    index_dir = get_index_dir(project_path)
+    for shard in manifest.get('shards', {}).values():
+        if not os.path.isfile(os.path.join(index_dir, shard['file'])):
+            return None
+    return manifest
+
+
+def read_index_tree(project_path, manifest):
+    with open(os.path.join(get_index_dir(project_path), manifest['tree']), 'r', encoding='utf-8') as handle:
+        return json.load(handle)
+
+
+def read_index_patch(project_path, manifest):
+    with open(os.path.join(get_index_dir(project_path), manifest['patch']), 'r', encoding='utf-8') as handle:
+        return json.load(handle)
+
+
+def iter_index_entries(project_path, manifest, paths=None):
+    """Yield ``(rel_path, encoded_symbols, hash, language, digest)``, opening only the shards that hold ``paths``."""
+    index_dir = get_index_dir(project_path)
+    wanted = set(paths) if paths is not None else None
+    for shard in manifest['shards'].values():
+        entries = shard['files']
+        if wanted is not None:
+            entries = {key: value for key, value in entries.items() if key in wanted}
+        if not entries:
+            continue
+        with open(os.path.join(index_dir, shard['file']), 'rb') as handle:
+            if os.fstat(handle.fileno()).st_size == 0:
                 continue
-            file_path = safe_str(key)
+            with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                for rel_path, (offset, length, file_hash, language, digest) in entries.items():
+                    yield rel_path, view[offset:offset + length], file_hash, language, digest
+
+
+def iter_index_symbols(project_path, manifest, paths=None):
+    for rel_path, encoded, file_hash, language, digest in iter_index_entries(project_path, manifest, paths):
+        yield rel_path, json.loads(encoded), file_hash, language, digest
+
+
+class IndexWriter:
+    """Write the derived symbol index: one shard per top-level directory plus a manifest.
+
+    Each shard is a flat file of JSON documents; the manifest records the
+    byte offset, length, entry hash and content digest of every file's
+    symbols so readers can slice them straight out of an mmap. An index built by a delta run
+    also keeps the patch from its ``base`` version. Nothing is visible to readers until
+    :meth:`commit` atomically replaces ``manifest.json``.
+    """
+
+    def __init__(self, project_path, signature):
+        self.project_path = project_path
+        self.signature = signature
+        self.index_dir = get_index_dir(project_path)
+        self.build_id = hashlib.sha1(
+            f"{signature['path']}:{signature['mtimeNs']}:{signature['size']}:{os.getpid()}".encode('utf-8')
+        ).hexdigest()[:12]
+        self.shards = {}
+        self.handles = OrderedDict()
+        self.created = []
+        self.failed = False
+        try:
+            os.makedirs(self.index_dir, exist_ok=True)
+        except OSError:
+            self.failed = True
+
+    def _handle(self, shard_name):
+        handle = self.handles.get(shard_name)
+        if handle is not None:
+            self.handles.move_to_end(shard_name)
+            return handle
+        shard = self.shards.get(shard_name)
+        if shard is None:
+            shard = {'file': f'{self.build_id}-{len(self.shards):04d}.jsonl', 'files': {}, 'size': 0}
+            self.shards[shard_name] = shard
+            self.created.append(shard['file'])
+        handle = open(os.path.join(self.index_dir, shard['file']), 'ab')
+        self.handles[shard_name] = handle
+        while len(self.handles) > INDEX_MAX_OPEN_SHARDS:
+            _name, oldest = self.handles.popitem(last=False)
+            oldest.close()
+        return handle
+
+    def add(self, rel_path, symbols, file_hash=None, language=''):
+        if self.failed:
+            return
+        self.add_encoded(rel_path, encode_symbols(symbols), file_hash, language)
+
+    def add_encoded(self, rel_path, payload, file_hash=None, language='', digest=None):
+        if self.failed:
+            return
+        digest = digest or content_digest(payload)
+        shard_name = get_shard_name(rel_path)
+        try:
+            handle = self._handle(shard_name)
+            shard = self.shards[shard_name]
+            handle.write(payload + b'\n')
+        except OSError:
+            self.abort()
+            return
+        shard['files'][rel_path] = [shard['size'], len(payload), file_hash, language, digest]
+        shard['size'] += len(payload) + 1
+
+    def _close_handles(self):
+        for handle in self.handles.values():
             try:
-                rel_path = os.path.relpath(file_path, project_path)
-            except ValueError:
-                rel_path = file_path
-            rel_path = rel_path.replace('\\', '/')
-            if rel_path.startswith('..'):
-                rel_path = file_path.replace('\\', '/')
-            symbols_map[rel_path] = extract_symbols(value)
-
-    files = build_tree(list(symbols_map.keys()))
-    output = {
-        'files': files,
-        'symbols': symbols_map,
-        'fileCount': len(symbols_map)
+                handle.close()
+            except OSError:
+                pass
+        self.handles.clear()
+
+    def digests(self):
+        return {rel_path: entry[4] for shard in self.shards.values() for rel_path, entry in shard['files'].items()}
+
+    def commit(self, tree, file_count, patch=None, base=None, caches=None, tree_digest=None):
+        if self.failed:
+            return False
+        self._close_handles()
+        tree_file = f'{self.build_id}-tree.json'
+        patch_file = f'{self.build_id}-patch.json' if patch is not None else None
+        tree_digest = tree_digest or content_digest(encode_symbols(tree))
+        manifest = {
+            'version': INDEX_VERSION,
+            'source': index_source(self.project_path, self.signature),
+            'sourceVersion': source_version(self.project_path, self.signature),
+            'fileCount': file_count,
+            'caches': caches or [],
+            'treeHash': tree_digest,
+            'contentHash': combine_digests(tree_digest, self.digests()),
+            'tree': tree_file,
+            'shards': {
+                name: {'file': shard['file'], 'files': shard['files']}
+                for name, shard in self.shards.items()
+            }
+        }
+        if patch_file:
+            manifest.update(base=base, patch=patch_file)
+        try:
+            self.created.append(tree_file)
+            write_json_atomic(os.path.join(self.index_dir, tree_file), tree)
+            if patch_file:
+                self.created.append(patch_file)
+                write_json_atomic(os.path.join(self.index_dir, patch_file), patch)
+            write_json_atomic(os.path.join(self.index_dir, 'manifest.json'), manifest)
+        except OSError:
+            self.abort()
+            return False
+        self._remove_stale(set(self.created))
+        return True
+
+    def abort(self):
+        self.failed = True
+        self._close_handles()
+        for name in self.created:
+            try:
+                os.remove(os.path.join(self.index_dir, name))
+            except OSError:
+                pass
+        self.created = []
+
+    def _remove_stale(self, keep):
+        try:
+            names = os.listdir(self.index_dir)
+        except OSError:
+            return
+        for name in names:
+            if name == 'manifest.json' or name in keep or name.endswith('.tmp'):
+                continue
+            if name.endswith('.jsonl') or name.endswith('-tree.json') or name.endswith('-patch.json'):
+                try:
+                    os.remove(os.path.join(self.index_dir, name))
+                except OSError:
+                    pass
+
+
+def iter_parse_records(project_path, pkl_paths=None, use_index=True, since='', lean=False, profiler=None):
+    """Yield streaming records: one ``file`` per entry, then ``tree`` and ``summary``.
+
+    Every language cache is merged (see :func:`iter_cache_entries`); each
+    ``file`` record names the ``language`` it came from and the summary lists
+    the caches. When ``use_index`` is set and the derived index matches the
+    current caches, the records are read from the index instead of unpickling.
+    When ``since`` names the version the index was last built from, a single
+    ``patch`` record replaces the ``file`` records (see :func:`iter_delta_records`).
+    ``profiler`` (a :class:`ParseProfiler`) collects per-stage timings if given.
+    """
+    profiler = profiler or NULL_PROFILER
+    with profiler.stage('find_pkl'):
+        pkl_paths = pkl_paths or find_pkls(project_path)
+        signature = get_cache_signature(project_path, pkl_paths)
+    version = source_version(project_path, signature) if signature else ''
+    if signature:
+        profiler.set('pklBytes', signature['size'])
+
+    if use_index and signature:
+        with profiler.stage('index_lookup'):
+            manifest = load_index_manifest(project_path, signature)
+        if manifest and since and since == version:
+            yield {'type': 'patch', 'added': {}, 'changed': {}, 'removed': [], 'digests': {}}
+            yield dict({'type': 'summary', 'fileCount': manifest.get('fileCount', 0), 'version': version, 'base': since,
+                        'caches': manifest.get('caches', [])}, **manifest_hashes(manifest))
+            return
+        if manifest:
+            try:
+                with profiler.stage('index_lookup'):
+                    tree = read_index_tree(project_path, manifest)
+                    patch = read_index_patch(project_path, manifest) if since and manifest.get('base') == since else None
+            except (OSError, ValueError):
+                manifest = None
+        if manifest and patch is not None:
+            yield dict(patch, type='patch')
+            if patch['added'] or patch['removed'] or patch.get('relabeled'):
+                yield {'type': 'tree', 'files': tree}
+            yield dict({'type': 'summary', 'fileCount': manifest.get('fileCount', 0), 'version': version, 'base': since,
+                        'caches': manifest.get('caches', [])}, **manifest_hashes(manifest))
+            return
+        if manifest:
+            yield from iter_index_records(project_path, manifest, tree, version, profiler)
+            return
+        if since:
+            previous = load_index_manifest(project_path)
+            if previous and previous.get('sourceVersion') == since:
+                try:
+                    records = list(iter_delta_records(project_path, signature, previous, lean, profiler))
+                except Exception:
+                    records = None
+                if records:
+                    yield from records
+                    return
+
+    paths = []
+    languages = {}
+    digests = {}
+    provenance = []
+    writer = IndexWriter(project_path, signature) if use_index and signature else None
+    try:
+        if signature:
+            for rel_path, language, symbols, file_hash in iter_cache_entries(
+                project_path, signature, lean, None, profiler, provenance
+            ):
+                paths.append(rel_path)
+                languages[rel_path] = language
+                if profiler is not NULL_PROFILER:
+                    profiler.add('symbolCount', count_symbols(symbols))
+                with profiler.stage('digest'):
+                    encoded = encode_symbols(symbols)
+                    digests[rel_path] = content_digest(encoded)
+                if writer:
+                    with profiler.stage('index_write'):
+                        writer.add_encoded(rel_path, encoded, file_hash, language, digests[rel_path])
+                yield {'type': 'file', 'file': rel_path, 'symbols': symbols, 'hash': file_hash, 'language': language,
+                       'digest': digests[rel_path]}
+        error = cache_errors(provenance)
+
+        with profiler.stage('build_tree'):
+            tree = build_tree(paths, languages)
+        with profiler.stage('digest'):
+            tree_digest = content_digest(encode_symbols(tree))
+        profiler.set('fileCount', len(paths))
+        if writer and error is None:
+            with profiler.stage('index_write'):
+                writer.commit(tree, len(paths), caches=provenance, tree_digest=tree_digest)
+        yield {'type': 'tree', 'files': tree}
+        summary = {'type': 'summary', 'fileCount': len(paths), 'version': version, 'caches': provenance,
+                   'contentHash': combine_digests(tree_digest, digests), 'treeHash': tree_digest}
+        if error is not None:
+            summary['error'] = error
+        yield summary
+    finally:
+        if writer and not writer.failed and writer.handles:
+            writer.abort()
+
+
+def iter_index_records(project_path, manifest, tree, version, profiler=None):
+    profiler = profiler or NULL_PROFILER
+    records = iter_index_symbols(project_path, manifest)
+    while True:
+        with profiler.stage('index_read'):
+            item = next(records, None)
+        if item is None:
+            break
+        rel_path, symbols, file_hash, language, digest = item
+        if profiler is not NULL_PROFILER:
+            profiler.add('symbolCount', count_symbols(symbols))
+        yield {'type': 'file', 'file': rel_path, 'symbols': symbols, 'hash': file_hash, 'language': language,
+               'digest': digest}
+    profiler.set('fileCount', manifest.get('fileCount', 0))
+    yield {'type': 'tree', 'files': tree}
+    yield dict({
+        'type': 'summary',
+        'fileCount': manifest.get('fileCount', 0),
+        'version': version,
+        'index': 'hit',
+        'caches': manifest.get('caches', [])
+    }, **manifest_hashes(manifest))
+
+
+def iter_delta_records(project_path, signature, previous, lean=False, profiler=None):
+    """Re-normalize only entries whose hash differs from the ``previous`` index manifest.
+
+    Yields one ``patch`` record (``added``/``changed`` symbol maps and the
+    ``removed`` paths), a ``tree`` record only when the set of files or
+    their languages changed, and a ``summary`` whose ``base`` is the
+    previous version. Unchanged entries are copied into the new index as
+    already-encoded bytes.
+    """
+    profiler = profiler or NULL_PROFILER
+    index_dir = get_index_dir(project_path)
+    old_entries = {}
+    for shard in previous['shards'].values():
+        for rel_path, (offset, length, file_hash, language, digest) in shard['files'].items():
+            old_entries[rel_path] = (shard['file'], offset, length, file_hash, language, digest)
+    known = {rel_path: (entry[3], entry[4]) for rel_path, entry in old_entries.items()}
+
+    added, changed, digests = {}, {}, {}
+    relabeled = False
+    paths = []
+    languages = {}
+    provenance = []
+    views = {}
+    writer = IndexWriter(project_path, signature)
+    try:
+        for rel_path, language, symbols, file_hash in iter_cache_entries(
+            project_path, signature, lean, known, profiler, provenance
+        ):
+            paths.append(rel_path)
+            languages[rel_path] = language
+            old = old_entries.get(rel_path)
+            if symbols is None:
+                shard_file, offset, length = old[:3]
+                view = views.get(shard_file)
+                if view is None:
+                    with open(os.path.join(index_dir, shard_file), 'rb') as handle:
+                        view = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+                    views[shard_file] = view
+                with profiler.stage('index_write'):
+                    writer.add_encoded(rel_path, view[offset:offset + length], file_hash, language, old[5])
+                continue
+            if profiler is not NULL_PROFILER:
+                profiler.add('symbolCount', count_symbols(symbols))
+            with profiler.stage('digest'):
+                encoded = encode_symbols(symbols)
+                digests[rel_path] = content_digest(encoded)
+            with profiler.stage('index_write'):
+                writer.add_encoded(rel_path, encoded, file_hash, language, digests[rel_path])
+            (changed if old else added)[rel_path] = symbols
+            relabeled = relabeled or bool(old and old[4] != language)
+        error = cache_errors(provenance)
+        if error is not None:
+            raise RuntimeError(error)
+        removed = [rel_path for rel_path in old_entries if rel_path not in languages]
+
+        with profiler.stage('build_tree'):
+            tree = build_tree(paths, languages)
+        profiler.set('fileCount', len(paths))
+        patch = {'added': added, 'changed': changed, 'removed': removed, 'digests': digests}
+        if relabeled:
+            patch['relabeled'] = True
+        with profiler.stage('digest'):
+            tree_digest = content_digest(encode_symbols(tree))
+            content_hash = combine_digests(tree_digest, writer.digests())
+        with profiler.stage('index_write'):
+            writer.commit(tree, len(paths), patch, previous['sourceVersion'], provenance, tree_digest)
+    finally:
+        for view in views.values():
+            view.close()
+        if not writer.failed and writer.handles:
+            writer.abort()
+
+    yield dict(patch, type='patch')
+    if added or removed or relabeled:
+        yield {'type': 'tree', 'files': tree}
+    yield {
+        'type': 'summary',
+        'fileCount': len(paths),
+        'version': source_version(project_path, signature),
+        'base': previous['sourceVersion'],
+        'caches': provenance,
+        'contentHash': content_hash,
+        'treeHash': tree_digest
+    }
+
+
+def collect_records(records):
+    """Fold streaming records into the JSON document written by the one-shot mode."""
+    output = empty_result()
+    hashes = {}
+    for record in records:
+        kind = record['type']
+        if kind == 'file':
+            output['symbols'][record['file']] = record['symbols']
+            hashes[record['file']] = record.get('hash')
+            if record.get('digest'):
+                output.setdefault('digests', {})[record['file']] = record['digest']
+        elif kind == 'patch':
+            output['patch'] = {
+                key: record[key] for key in ('added', 'changed', 'removed', 'relabeled', 'digests') if key in record
+            }
+            output.pop('files', None)
+        elif kind == 'tree':
+            output['files'] = record['files']
+        else:
+            for key in ('fileCount', 'version', 'base', 'error', 'caches', 'contentHash', 'treeHash'):
+                if key in record:
+                    output[key] = record[key]
+    if 'patch' in output:
+        output.pop('symbols', None)
+        output.pop('digests', None)
+    return output, hashes
+
+
+class StringTable:
+    def __init__(self):
+        self.strings = []
+        self.index = {}
+
+    def add(self, value):
+        position = self.index.get(value)
+        if position is None:
+            position = self.index[value] = len(self.strings)
+            self.strings.append(value)
+        return position
+
+
+def encode_compact(result):
+    """Encode a full parse result in the columnar compact format.
+
+    Names, details, path segments and languages are interned in ``strings``.
+    Directories are ``[parent, name]`` pairs in ``dirs`` and files are
+    described by the parallel ``file*`` arrays, both in tree order, so the
+    tree can be rebuilt without repeating any path. Symbols of all files are
+    flattened in pre-order into parallel columns: ``parent`` holds the index
+    of the enclosing symbol (-1 for top-level ones), ``ranges`` holds eight
+    integers per symbol (range and selectionRange start/end line and
+    character, -1 when missing) and ``fileSymbols[i]:fileSymbols[i + 1]`` is
+    the slice belonging to file ``i`` and ``fileDigests[i]`` its content
+    digest. ``filePaths`` maps a file index to its
+    ``symbols`` key when that differs from the tree path.
+    """
+    strings = StringTable()
+    strings.add('')
+    dirs = []
+    file_dir, file_name, file_language, file_symbols, file_digests, file_paths = [], [], [], [], [], {}
+    names, kinds, details, parents, ranges, truncated = [], [], [], [], [], []
+    symbols_map = result.get('symbols') or {}
+    digests = result.get('digests') or {}
+    keys = {'/'.join(segment for segment in key.split('/') if segment): key for key in symbols_map}
+
+    def add_range(rng):
+        for key in ('start', 'end'):
+            position = rng.get(key) if rng else None
+            if position:
+                ranges.append(position['line'])
+                ranges.append(position['character'])
+            else:
+                ranges.append(-1)
+                ranges.append(-1)
+
+    def add_symbols(symbols):
+        stack = [(symbol, -1) for symbol in reversed(symbols)]
+        while stack:
+            symbol, parent = stack.pop()
+            index = len(names)
+            names.append(strings.add(symbol.get('name') or ''))
+            kinds.append(symbol.get('kind'))
+            details.append(strings.add(symbol.get('detail') or ''))
+            parents.append(parent)
+            add_range(symbol.get('range'))
+            add_range(symbol.get('selectionRange'))
+            if symbol.get('truncated'):
+                truncated.append(index)
+            stack.extend((child, index) for child in reversed(symbol.get('children') or []))
+
+    def walk(nodes, dir_index):
+        for node in nodes:
+            if node['type'] == 'directory':
+                dirs.append(dir_index)
+                dirs.append(strings.add(node['name']))
+                walk(node.get('children') or [], len(dirs) // 2 - 1)
+                continue
+            key = keys.get(node['path'], node['path'])
+            if key != node['path']:
+                file_paths[str(len(file_dir))] = key
+            file_dir.append(dir_index)
+            file_name.append(strings.add(node['name']))
+            file_language.append(strings.add(node.get('language') or ''))
+            file_symbols.append(len(names))
+            file_digests.append(digests.get(key, ''))
+            add_symbols(symbols_map.get(key) or [])
+
+    walk(result.get('files') or [], -1)
+    file_symbols.append(len(names))
+    compact = {
+        'format': COMPACT_FORMAT,
+        'formatVersion': COMPACT_FORMAT_VERSION,
+        'strings': strings.strings,
+        'dirs': dirs,
+        'fileDir': file_dir,
+        'fileName': file_name,
+        'fileLanguage': file_language,
+        'fileSymbols': file_symbols,
+        'fileDigests': file_digests,
+        'filePaths': file_paths,
+        'symbols': {
+            'name': names,
+            'kind': kinds,
+            'detail': details,
+            'parent': parents,
+            'ranges': ranges,
+            'truncated': truncated
+        },
+        'fileCount': result.get('fileCount', len(file_dir)),
+        'version': result.get('version', ''),
+        'caches': result.get('caches', []),
+        'contentHash': result.get('contentHash', ''),
+        'treeHash': result.get('treeHash', '')
+    }
+    if 'error' in result:
+        compact['error'] = result['error']
+    return compact
+
+
+def parse_project(project_path, pkl_paths=None, use_index=True, since='', lean=False, profiler=None):
+    records = iter_parse_records(project_path, pkl_paths, use_index, since, lean, profiler)
+    output, _hashes = collect_records(records)
+    return output
+
+
+def write_stream(project_path, output=None, use_index=True, since='', lean=False, profiler=None):
+    """Write NDJSON records; with a ``profiler`` the final summary record carries its ``stats``."""
+    output = output or sys.stdout
+    profiler_or_null = profiler or NULL_PROFILER
+    for record in iter_parse_records(project_path, use_index=use_index, since=since, lean=lean, profiler=profiler):
+        if profiler and record['type'] == 'summary':
+            record = dict(record, stats=profiler.snapshot())
+        with profiler_or_null.stage('json_encode'):
+            line = json.dumps(record, ensure_ascii=False)
+        output.write(line + '\n')
+    output.flush()
+
+
+class LazyProject:
+    """File list and tree up front; symbols normalized per file on demand.
+
+    Uses the derived index when it matches the caches (only the shards
+    holding the requested files are read); otherwise keeps the unpickled
+    entries of every cache, merged newest first, and normalizes a file the
+    first time it is requested.
+    """
+
+    def __init__(self, project_path, pkl_paths=None, use_index=True, lean=False):
+        self.project_path = project_path
+        pkl_paths = pkl_paths or find_pkls(project_path)
+        self.signature = get_cache_signature(project_path, pkl_paths)
+        self.version = source_version(project_path, self.signature) if self.signature else ''
+        self.manifest = None
+        self.raw = {}
+        self.memo = {}
+        self.lock = threading.Lock()
+        self.error = None
+
+        if not self.signature:
+            self.paths = []
+            self.tree = []
+            return
+        if use_index:
+            manifest = load_index_manifest(project_path, self.signature)
+            if manifest:
+                try:
+                    self.tree = read_index_tree(project_path, manifest)
+                    self.paths = [path for shard in manifest['shards'].values() for path in shard['files']]
+                    self.manifest = manifest
+                    return
+                except (OSError, ValueError):
+                    pass
+        languages = {}
+        errors = []
+        for cache in self.signature['caches']:
+            try:
+                data = load_pkl(cache['path'], lean)
+            except Exception as exc:
+                errors.append(f"{cache['language'] or '.'}: {safe_str(exc)}")
+                continue
+            for rel_path, value in iter_entries(data, project_path):
+                if rel_path not in self.raw:
+                    self.raw[rel_path] = value
+                    languages[rel_path] = cache['language']
+        if errors:
+            self.error = '; '.join(errors)
+        self.paths = list(self.raw.keys())
+        self.tree = build_tree(self.paths, languages)
+
+    def files(self):
+        output = {'files': self.tree, 'fileCount': len(self.paths), 'version': self.version}
+        if self.manifest:
+            output.update(manifest_hashes(self.manifest))
+        else:
+            output['treeHash'] = content_digest(encode_symbols(self.tree))
+        if self.error is not None:
+            output['error'] = self.error
+        return output
+
+    def symbols(self, paths, max_depth=None):
+        result = {}
+        missing = []
+        with self.lock:
+            for rel_path in paths:
+                key = (rel_path, max_depth)
+                if key in self.memo:
+                    result[rel_path] = self.memo[key]
+                else:
+                    missing.append(rel_path)
+        if not missing:
+            return result
+
+        loaded = {}
+        if self.manifest:
+            for rel_path, symbols, _hash, _language, _digest in iter_index_symbols(
+                self.project_path, self.manifest, missing
+            ):
+                loaded[rel_path] = limit_depth(symbols, max_depth)
+        else:
+            for rel_path in missing:
+                if rel_path in self.raw:
+                    loaded[rel_path] = extract_symbols(self.raw[rel_path], max_depth)
+        with self.lock:
+            for rel_path, symbols in loaded.items():
+                self.memo[(rel_path, max_depth)] = symbols
+        result.update(loaded)
+        return result
+
+
+def iter_trigrams(text):
+    for index in range(len(text) - 2):
+        yield text[index:index + 3]
+
+
+class SymbolSearchIndex:
+    """Ranked symbol-name search over every symbol, nested children included.
+
+    Distinct lowercased names are kept in a sorted table (exact and prefix
+    matches via bisect) with a trigram index over the same table for
+    substring matches; each name posts to the ``(symbol, file, container)``
+    entries that carry it. Results rank exact, then prefix (in table order),
+    then word-boundary, then other substring matches.
+    """
+
+    def __init__(self, symbols_map):
+        self.entries = []
+        postings = {}
+        originals = {}
+        for file_path, items in symbols_map.items():
+            stack = [(item, '', 0) for item in reversed(items or [])]
+            while stack:
+                symbol, container, depth = stack.pop()
+                name = str(symbol.get('name') or '')
+                lower = name.lower()
+                postings.setdefault(lower, []).append(len(self.entries))
+                originals.setdefault(lower, name)
+                self.entries.append((symbol, file_path, container, depth))
+                child_container = f'{container}.{name}' if container else name
+                for child in reversed(symbol.get('children') or []):
+                    stack.append((child, child_container, depth + 1))
+
+        self.names = sorted(postings)
+        self.originals = [originals[name] for name in self.names]
+        self.postings = [postings[name] for name in self.names]
+        self.trigrams = {}
+        self.bigrams = {}
+        for name_id, name in enumerate(self.names):
+            for trigram in set(iter_trigrams(name)):
+                self.trigrams.setdefault(trigram, []).append(name_id)
+            for bigram in {name[index:index + 2] for index in range(len(name) - 1)}:
+                self.bigrams.setdefault(bigram, []).append(name_id)
+
+    def candidates(self, needle):
+        if len(needle) == 1:
+            return (name_id for name_id, name in enumerate(self.names) if needle in name)
+        if len(needle) == 2:
+            return iter(self.bigrams.get(needle, ()))
+        lists = []
+        for trigram in set(iter_trigrams(needle)):
+            posting = self.trigrams.get(trigram)
+            if not posting:
+                return iter(())
+            lists.append(posting)
+        lists.sort(key=len)
+        matched = set(lists[0])
+        for posting in lists[1:]:
+            matched.intersection_update(posting)
+            if not matched:
+                break
+        return (name_id for name_id in matched if needle in self.names[name_id])
+
+    def rank(self, name_id, needle):
+        name = self.names[name_id]
+        if name == needle:
+            return 0
+        if name.startswith(needle):
+            return 1
+        original = self.originals[name_id]
+        position = name.find(needle)
+        while position > 0:
+            previous = original[position - 1]
+            if previous in SEARCH_BOUNDARY_CHARS or (original[position].isupper() and previous.islower()):
+                return 2
+            position = name.find(needle, position + 1)
+        return 3
+
+    def search(self, query, limit=DEFAULT_SEARCH_LIMIT, file_path=''):
+        needle = str(query or '').lower()
+        if not needle:
+            return []
+        names = self.names
+        start = bisect.bisect_left(names, needle)
+        end = bisect.bisect_left(names, needle + '\uffff', start)
+        prefixed = range(start, end)
+        if limit and not file_path and len(prefixed) >= limit:
+            # Prefix matches always outrank substring matches.
+            others = ()
+        else:
+            others = (name_id for name_id in self.candidates(needle) if not start <= name_id < end)
+
+        def ranked(name_ids, prefix):
+            for name_id in name_ids:
+                if prefix:
+                    # Bisect order already puts shorter extensions first.
+                    yield (0 if names[name_id] == needle else 1), 0, names[name_id], name_id
+                else:
+                    yield self.rank(name_id, needle), len(names[name_id]), names[name_id], name_id
+
+        if limit and not file_path and len(prefixed) >= limit:
+            ordered = list(ranked(prefixed[:limit], True))
+        else:
+            ordered = [*ranked(prefixed, True), *ranked(others, False)]
+        if limit and not file_path:
+            # Every name posts at least one entry, so ``limit`` names suffice.
+            ordered = heapq.nsmallest(limit, ordered)
+        else:
+            ordered.sort()
+
+        results = []
+        for _rank, _length, _name, name_id in ordered:
+            entries = [self.entries[entry_id] for entry_id in self.postings[name_id]]
+            entries.sort(key=lambda entry: (entry[3], entry[1]))
+            for symbol, entry_file, container, _depth in entries:
+                if file_path and entry_file != file_path:
+                    continue
+                results.append(dict(symbol, file=entry_file, container=container))
+                if limit and len(results) >= limit:
+                    return results
+        return results
+
+
+def apply_patch(result, delta):
+    symbols = dict(result['symbols'])
+    digests = dict(result.get('digests') or {})
+    patch = delta['patch']
+    for rel_path in patch['removed']:
+        symbols.pop(rel_path, None)
+        digests.pop(rel_path, None)
+    symbols.update(patch['added'])
+    symbols.update(patch['changed'])
+    digests.update(patch.get('digests') or {})
+    return {
+        'files': delta['files'] if 'files' in delta else result['files'],
+        'symbols': symbols,
+        'digests': digests,
+        'fileCount': delta.get('fileCount', len(symbols)),
+        'version': delta.get('version', ''),
+        'caches': delta.get('caches', result.get('caches', [])),
+        'contentHash': delta.get('contentHash', ''),
+        'treeHash': delta.get('treeHash', '')
     }
-    print(json.dumps(output, ensure_ascii=False))
+
+
+class InotifyBackend:
+    """Wake-up source backed by Linux inotify (through ctypes) on each project's ``.serena/cache`` tree."""
+
+    MASK = 0x8 | 0x40 | 0x80 | 0x100 | 0x200 | 0x400 | 0x800
+    IN_IGNORED = 0x8000
+    EVENT_HEADER = struct.Struct('iIII')
+
+    def __init__(self):
+        library = ctypes.util.find_library('c')
+        if not sys.platform.startswith('linux') or not library:
+            raise OSError('inotify 不可用')
+        self.libc = ctypes.CDLL(library, use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 失败')
+        self.watches = {}
+
+    def add(self, project_path):
+        """Watch the cache tree (minus the derived index), or the nearest existing parent until it appears."""
+        serena_dir = os.path.join(project_path, '.serena')
+        cache_dir = os.path.join(serena_dir, 'cache')
+        directories = [path for path in (project_path, serena_dir) if os.path.isdir(path)][-1:]
+        if os.path.isdir(cache_dir):
+            directories = [cache_dir]
+            for root, dirs, _files in os.walk(cache_dir):
+                dirs[:] = [name for name in dirs if name != INDEX_DIR_NAME]
+                directories.extend(os.path.join(root, name) for name in dirs)
+        for directory in directories:
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), self.MASK)
+            if wd >= 0:
+                self.watches[wd] = project_path
+
+    def remove(self, project_path):
+        for wd in [wd for wd, owner in self.watches.items() if owner == project_path]:
+            self.libc.inotify_rm_watch(self.fd, wd)
+            self.watches.pop(wd, None)
+
+    def wait(self, timeout):
+        """Block up to ``timeout`` seconds; return the projects that saw filesystem events."""
+        ready, _, _ = select.select([self.fd], [], [], max(0.0, timeout))
+        touched = set()
+        if not ready:
+            return touched
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset + self.EVENT_HEADER.size <= len(data):
+                wd, mask, _cookie, length = self.EVENT_HEADER.unpack_from(data, offset)
+                start = offset + self.EVENT_HEADER.size
+                name = data[start:start + length].rstrip(b'\0')
+                offset = start + length
+                project_path = self.watches.get(wd)
+                if mask & self.IN_IGNORED:
+                    self.watches.pop(wd, None)
+                if project_path and name != INDEX_DIR_NAME_BYTES:
+                    touched.add(project_path)
+        return touched
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingBackend:
+    """Fallback wake-up source: re-stat the caches every ``interval`` seconds and report projects whose signature moved."""
+
+    def __init__(self, interval=WATCH_POLL_SECONDS):
+        self.interval = interval
+        self.signatures = {}
+
+    def add(self, project_path):
+        if project_path not in self.signatures:
+            self.signatures[project_path] = get_cache_signature(project_path, find_pkls(project_path))
+
+    def remove(self, project_path):
+        self.signatures.pop(project_path, None)
+
+    def wait(self, timeout):
+        time.sleep(max(0.0, min(timeout, self.interval)))
+        touched = set()
+        for project_path, previous in list(self.signatures.items()):
+            signature = get_cache_signature(project_path, find_pkls(project_path))
+            if signature != previous:
+                self.signatures[project_path] = signature
+                touched.add(project_path)
+        return touched
+
+    def close(self):
+        pass
+
+
+def create_watch_backend():
+    try:
+        return InotifyBackend()
+    except (OSError, AttributeError):
+        return PollingBackend()
+
+
+def get_watch_status_path(project_path):
+    return os.path.join(get_index_dir(project_path), WATCH_STATUS_NAME)
+
+
+class CacheWatcher:
+    """Rebuild a project's symbols in the background whenever Serena rewrites its caches.
+
+    Filesystem events mark a project ``stale``; once no event has arrived
+    for ``debounce`` seconds the cache signature is compared with the one
+    last built and ``rebuild(project_path)`` runs if it changed. Projects
+    are also re-checked every ``WATCH_RESCAN_SECONDS`` in case an event was
+    missed. Each project's state (``stale``, ``rebuilding``, ``ready`` or
+    ``error``) is available from :meth:`status` and is also written to
+    ``watch.json`` in its index directory.
+    """
+
+    def __init__(self, rebuild, debounce=WATCH_DEBOUNCE_SECONDS, on_change=None, backend=None):
+        self.rebuild = rebuild
+        self.debounce = debounce
+        self.on_change = on_change
+        self.backend = backend or create_watch_backend()
+        self.projects = {}
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def add(self, project_path):
+        with self.lock:
+            if project_path in self.projects:
+                return False
+            self.projects[project_path] = {
+                'project': project_path,
+                'state': 'stale',
+                'builtAt': None,
+                'buildMs': None,
+                'error': None,
+                'dirty': True,
+                'dirtyAt': 0.0,
+                'signature': False
+            }
+            self.backend.add(project_path)
+        self.start()
+        return True
+
+    def remove(self, project_path):
+        with self.lock:
+            self.backend.remove(project_path)
+            return self.projects.pop(project_path, None) is not None
+
+    @staticmethod
+    def public(state):
+        return {key: value for key, value in state.items() if key not in ('dirty', 'dirtyAt', 'signature')}
+
+    def status(self):
+        with self.lock:
+            return [self.public(state) for state in self.projects.values()]
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name='serena-cache-watcher', daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.backend.close()
+
+    def set_state(self, state, value, **fields):
+        with self.lock:
+            state.update(fields, state=value)
+            payload = self.public(state)
+        try:
+            os.makedirs(get_index_dir(payload['project']), exist_ok=True)
+            write_json_atomic(get_watch_status_path(payload['project']), payload)
+        except OSError:
+            pass
+        if self.on_change:
+            self.on_change(payload)
+
+    def mark_dirty(self, project_paths, changed):
+        now = time.monotonic()
+        stale = []
+        with self.lock:
+            for project_path in project_paths:
+                state = self.projects.get(project_path)
+                if state is None:
+                    continue
+                state.update(dirty=True, dirtyAt=now)
+                if changed:
+                    self.backend.add(project_path)
+                    if state['state'] == 'ready':
+                        stale.append(state)
+        for state in stale:
+            self.set_state(state, 'stale')
+
+    def run(self):
+        last_rescan = time.monotonic()
+        while not self.stopped.is_set():
+            now = time.monotonic()
+            with self.lock:
+                dirty = [state for state in self.projects.values() if state['dirty']]
+            due = [state for state in dirty if now - state['dirtyAt'] >= self.debounce]
+            for state in due:
+                self.check(state)
+            delays = [state['dirtyAt'] + self.debounce - now for state in dirty if now - state['dirtyAt'] < self.debounce]
+            timeout = min([WATCH_RESCAN_SECONDS] + [max(delay, 0.05) for delay in delays])
+            touched = self.backend.wait(min(timeout, WATCH_STOP_POLL_SECONDS))
+            if touched:
+                self.mark_dirty(touched, True)
+            if time.monotonic() - last_rescan >= WATCH_RESCAN_SECONDS:
+                last_rescan = time.monotonic()
+                with self.lock:
+                    projects = list(self.projects)
+                self.mark_dirty(projects, False)
+
+    def check(self, state):
+        with self.lock:
+            state['dirty'] = False
+        project_path = state['project']
+        signature = get_cache_signature(project_path, find_pkls(project_path))
+        if signature == state['signature']:
+            if state['state'] == 'stale':
+                self.set_state(state, 'ready')
+            return
+        self.set_state(state, 'rebuilding', error=None)
+        started = time.monotonic()
+        try:
+            self.rebuild(project_path)
+        except Exception as exc:
+            self.set_state(state, 'error', signature=signature, error=safe_str(exc))
+            return
+        self.set_state(
+            state, 'ready',
+            signature=signature,
+            builtAt=datetime.now(timezone.utc).isoformat(),
+            buildMs=round((time.monotonic() - started) * 1000, 1)
+        )
+
+
+class SymbolServer:
+    """JSON-lines server that keeps parsed projects in memory.
+
+    Each stdin line is a request such as
+    ``{"id": 1, "op": "files", "project": "/abs/path"}``; each response is
+    written as one line ``{"id": 1, "ok": true, "result": ...}``. A ``parse``
+    request with ``"stream": true`` is answered with one ``{"id", "record"}``
+    line per file before the final response, which then only carries the
+    tree and file count; with ``"compact": true`` the full result is sent in
+    the :func:`encode_compact` format instead. A ``parse`` request with
+    ``"since"`` set to the version the client holds is answered with a
+    ``patch`` when the server can derive one. ``files`` and per-file ``symbols`` requests (``filePath``
+    or ``paths``, optional ``maxDepth``) are served from a :class:`LazyProject`
+    unless the full parse is already in memory. Requests for the same
+    project that arrive while it is being parsed share that single parse.
+    ``watch``/``unwatch`` add a project to (or drop it from) a
+    :class:`CacheWatcher` that re-parses it in the background whenever its
+    caches change, and ``watchStatus`` reports the state of every watched
+    project. ``watch`` also starts building the project's reference index in
+    the background; a ``references`` request waits up to
+    :data:`REFERENCE_WAIT_SECONDS` for that build and otherwise answers with
+    ``"building": true`` and no items, so a first build on a large project
+    never runs into the client's request timeout.
+    """
+
+    def __init__(self, workers=DEFAULT_SERVER_WORKERS, max_projects=DEFAULT_SERVER_MAX_PROJECTS, output=None,
+                 use_index=True, lean=False):
+        self.output = output or sys.stdout
+        self.use_index = use_index
+        self.lean = lean
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers))
+        self.reference_executor = ThreadPoolExecutor(max_workers=1)
+        self.reference_builds = {}
+        self.max_projects = max(1, max_projects)
+        self.projects = OrderedDict()
+        self.lazy = OrderedDict()
+        self.inflight = {}
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.watcher = None
+
+    def get_watcher(self):
+        with self.lock:
+            if self.watcher is None:
+                self.watcher = CacheWatcher(self.get_project)
+            return self.watcher
+
+    def write(self, payload):
+        line = json.dumps(payload, ensure_ascii=False)
+        with self.write_lock:
+            self.output.write(line + '\n')
+            self.output.flush()
+
+    def single_flight(self, key, build):
+        with self.lock:
+            future = self.inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self.inflight[key] = future
+        if not owner:
+            return future.result()
+        try:
+            value = build()
+            future.set_result(value)
+            return value
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+
+    def refresh_references(self, project_path, prewarm=False):
+        """The running reference index build for ``project_path``, started now if there is none.
+
+        A ``prewarm`` build pays the tokenizing cost up front but leaves the rescan throttle alone,
+        so the first lookup afterwards still sees files changed in the meantime.
+        """
+        with self.lock:
+            future = self.reference_builds.get(project_path)
+            if future is None or future.done():
+                get_pool = CACHE_POOL.get if CACHE_POOL else None
+                future = self.reference_executor.submit(serena_reference_index.update, project_path,
+                                                        get_pool=get_pool, record_scan=not prewarm)
+                self.reference_builds[project_path] = future
+            return future
+
+    def remember(self, cache, project_path, value):
+        with self.lock:
+            cache[project_path] = value
+            cache.move_to_end(project_path)
+            while len(cache) > self.max_projects:
+                cache.popitem(last=False)
+
+    def fresh_entry(self, project_path, signature):
+        with self.lock:
+            entry = self.projects.get(project_path)
+            if entry and entry['signature'] == signature:
+                self.projects.move_to_end(project_path)
+                return entry
+        return None
+
+    def get_project(self, project_path):
+        pkl_paths = find_pkls(project_path)
+        signature = get_cache_signature(project_path, pkl_paths)
+        entry = self.fresh_entry(project_path, signature)
+        if entry:
+            return entry
+        with self.lock:
+            previous = self.projects.get(project_path)
+
+        def build():
+            profiler = ParseProfiler()
+            entry = {'signature': signature, 'result': None, 'patch': None, 'base': None}
+            if signature and previous and self.use_index and previous['result'].get('version'):
+                delta = parse_project(project_path, pkl_paths, True, previous['result']['version'], self.lean, profiler)
+                if 'patch' in delta:
+                    with profiler.stage('apply_patch'):
+                        result = apply_patch(previous['result'], delta)
+                    entry.update(result=result, patch=delta['patch'], base=delta['base'])
+                else:
+                    entry['result'] = delta
+            if entry['result'] is None:
+                if signature:
+                    entry['result'] = parse_project(project_path, pkl_paths, self.use_index, lean=self.lean,
+                                                    profiler=profiler)
+                else:
+                    entry['result'] = empty_result()
+            entry['stats'] = profiler.snapshot()
+            if 'error' not in entry['result']:
+                self.remember(self.projects, project_path, entry)
+            return entry
+
+        return self.single_flight(('full', project_path, json.dumps(signature, sort_keys=True)), build)
+
+    def get_search_index(self, project_path, entry):
+        search = entry.get('search')
+        if search is not None:
+            return search
+
+        def build():
+            if entry.get('search') is None:
+                entry['search'] = SymbolSearchIndex(entry['result']['symbols'])
+            return entry['search']
+
+        return self.single_flight(('search', project_path, json.dumps(entry['signature'], sort_keys=True)), build)
+
+    def get_lazy_project(self, project_path, pkl_paths, signature):
+        with self.lock:
+            lazy = self.lazy.get(project_path)
+            if lazy and lazy.signature == signature:
+                self.lazy.move_to_end(project_path)
+                return lazy
+
+        def build():
+            lazy = LazyProject(project_path, pkl_paths, self.use_index, self.lean)
+            if lazy.error is None:
+                self.remember(self.lazy, project_path, lazy)
+            return lazy
+
+        return self.single_flight(('lazy', project_path, json.dumps(signature, sort_keys=True)), build)
+
+    def handle(self, request):
+        op = request.get('op')
+        if op == 'ping':
+            return {'pid': os.getpid()}
+        if op == 'watchStatus':
+            return {'projects': self.watcher.status() if self.watcher else []}
+
+        project = request.get('project')
+        if not project:
+            raise ValueError('缺少 project 参数')
+        project_path = os.path.abspath(project)
+
+        if op == 'watch':
+            self.refresh_references(project_path, prewarm=True)
+            return {'added': self.get_watcher().add(project_path)}
+        if op == 'unwatch':
+            return {'removed': self.get_watcher().remove(project_path)}
+
+        if op == 'invalidate':
+            with self.lock:
+                removed = self.projects.pop(project_path, None) is not None
+                removed = self.lazy.pop(project_path, None) is not None or removed
+            return {'removed': removed}
+
+        if op == 'references':
+            offset = request.get('offset') or 0
+            limit = request.get('limit') if request.get('limit') is not None else serena_reference_index.DEFAULT_LIMIT
+            build = self.refresh_references(project_path)
+            try:
+                stats = build.result(timeout=REFERENCE_WAIT_SECONDS)
+            except FutureTimeoutError:
+                return {'items': [], 'total': 0, 'offset': offset, 'limit': limit, 'building': True}
+            result = self.single_flight(
+                ('references', project_path, request.get('symbol'), offset, limit),
+                lambda: serena_reference_index.lookup(project_path, request.get('symbol') or '', offset, limit,
+                                                      refresh=False)
+            )
+            return dict(result, index=stats)
+
+        if op in ('files', 'symbols') and not request.get('query'):
+            paths = list(request.get('paths') or [])
+            if request.get('filePath'):
+                paths.append(request['filePath'])
+            if op == 'files' or paths:
+                pkl_paths = find_pkls(project_path)
+                signature = get_cache_signature(project_path, pkl_paths)
+                return self.handle_lazy(request, project_path, pkl_paths, signature, paths)
+
+        entry = self.get_project(project_path)
+        result = entry['result']
+        if op == 'parse':
+            since = request.get('since') or ''
+            version = result.get('version', '')
+            hashes = {'contentHash': result.get('contentHash', ''), 'treeHash': result.get('treeHash', '')}
+            if since and since == version:
+                patch = {'added': {}, 'changed': {}, 'removed': [], 'digests': {}}
+                return dict({'patch': patch, 'fileCount': result['fileCount'], 'version': version, 'base': since,
+                             'caches': result.get('caches', []), 'stats': entry['stats']}, **hashes)
+            if since and since == entry['base'] and entry['patch'] is not None:
+                patch = entry['patch']
+                response = dict({'patch': patch, 'fileCount': result['fileCount'], 'version': version, 'base': since,
+                                 'caches': result.get('caches', []), 'stats': entry['stats']}, **hashes)
+                if patch['added'] or patch['removed'] or patch.get('relabeled'):
+                    response['files'] = result['files']
+                return response
+            if request.get('stream'):
+                digests = result.get('digests') or {}
+                for file_path, symbols in result['symbols'].items():
+                    record = {'type': 'file', 'file': file_path, 'symbols': symbols, 'digest': digests.get(file_path)}
+                    self.write({'id': request.get('id'), 'record': record})
+                summary = dict({'files': result['files'], 'fileCount': result['fileCount'], 'version': version,
+                                'caches': result.get('caches', []), 'stats': entry['stats']}, **hashes)
+                if 'error' in result:
+                    summary['error'] = result['error']
+                return summary
+            if request.get('compact'):
+                compact = entry.get('compact')
+                if compact is None:
+                    compact = entry['compact'] = encode_compact(result)
+                return dict(compact, stats=entry['stats'])
+            return dict(result, stats=entry['stats'])
+        if op == 'status':
+            return {'signature': entry['signature'], 'fileCount': result.get('fileCount', 0), 'stats': entry['stats']}
+        if op == 'symbols' and not request.get('query'):
+            return result['symbols']
+        if op in ('symbols', 'query'):
+            limit = request.get('limit')
+            limit = int(limit) if limit is not None else DEFAULT_SEARCH_LIMIT
+            return self.get_search_index(project_path, entry).search(
+                request.get('query') or '', limit, request.get('filePath') or ''
+            )
+        raise ValueError(f'未知操作: {op}')
+
+    def handle_lazy(self, request, project_path, pkl_paths, signature, paths):
+        max_depth = request.get('maxDepth')
+        max_depth = int(max_depth) if max_depth is not None else None
+        entry = self.fresh_entry(project_path, signature)
+        if entry:
+            result = entry['result']
+            if request['op'] == 'files':
+                return {'files': result['files'], 'fileCount': result['fileCount'], 'version': result.get('version', ''),
+                        'contentHash': result.get('contentHash', ''), 'treeHash': result.get('treeHash', '')}
+            symbols = {path: limit_depth(result['symbols'][path], max_depth) for path in paths if path in result['symbols']}
+            version = result.get('version', '')
+        else:
+            lazy = self.get_lazy_project(project_path, pkl_paths, signature)
+            if request['op'] == 'files':
+                return lazy.files()
+            symbols = lazy.symbols(paths, max_depth)
+            version = lazy.version
+        if request.get('filePath') and not request.get('paths'):
+            return symbols.get(request['filePath']) or []
+        return {'symbols': symbols, 'version': version}
+
+    def dispatch(self, request):
+        request_id = request.get('id')
+        try:
+            result = self.handle(request)
+            self.write({'id': request_id, 'ok': True, 'result': result})
+        except Exception as exc:
+            self.write({'id': request_id, 'ok': False, 'error': safe_str(exc)})
+
+    def serve(self, stream=None):
+        stream = stream or sys.stdin
+        with shared_cache_pool():
+            try:
+                self.serve_requests(stream)
+            finally:
+                # Requests and index builds still running may need the shared pool, so let them finish before it closes.
+                self.executor.shutdown(wait=True)
+                self.reference_executor.shutdown(wait=True)
+                if self.watcher is not None:
+                    self.watcher.stop()
+
+    def serve_requests(self, stream):
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as exc:
+                self.write({'id': None, 'ok': False, 'error': f'无效请求: {safe_str(exc)}'})
+                continue
+            if not isinstance(request, dict):
+                self.write({'id': None, 'ok': False, 'error': '无效请求'})
+                continue
+            if request.get('op') == 'shutdown':
+                self.write({'id': request.get('id'), 'ok': True, 'result': None})
+                break
+            self.executor.submit(self.dispatch, request)
+
+
+def rebuild_index(project_path, lean=False):
+    """Bring the derived index up to date, as a delta from the previous build when there is one."""
+    previous = load_index_manifest(project_path)
+    since = previous.get('sourceVersion', '') if previous else ''
+    for record in iter_parse_records(project_path, use_index=True, since=since, lean=lean):
+        if record['type'] == 'summary' and record.get('error'):
+            raise RuntimeError(record['error'])
+
+
+def watch_projects(project_paths, debounce=WATCH_DEBOUNCE_SECONDS, lean=False, output=None):
+    """Run the cache watcher in the foreground, writing one JSON line per project state change."""
+    output = output or sys.stdout
+    lock = threading.Lock()
+
+    def report(payload):
+        with lock:
+            output.write(json.dumps(payload, ensure_ascii=False) + '\n')
+            output.flush()
+
+    with shared_cache_pool():
+        watcher = CacheWatcher(lambda project_path: rebuild_index(project_path, lean), debounce, report)
+        for project_path in project_paths:
+            watcher.add(os.path.abspath(project_path))
+        try:
+            while not watcher.stopped.wait(WATCH_STOP_POLL_SECONDS):
+                pass
+        except KeyboardInterrupt:
+            pass
+        finally:
+            watcher.stop()
+
+
+def main():
+    args = parse_args()
+
+    if args.watch:
+        watch_projects(args.watch, args.debounce, args.lean)
+        return
+
+    if args.server:
+        SymbolServer(workers=args.workers, max_projects=args.max_projects, use_index=not args.no_index,
+                     lean=args.lean).serve()
+        return
+
+    project_path = os.path.abspath(args.project)
+    use_index = not args.no_index
+    if args.query:
+        result = parse_project(project_path, use_index=use_index, lean=args.lean)
+        file_path = args.paths[0].replace('\\', '/') if args.paths else ''
+        results = SymbolSearchIndex(result['symbols']).search(args.query, args.limit, file_path)
+        print(json.dumps(results, ensure_ascii=False))
+        return
+    if args.files_only or args.paths:
+        project = LazyProject(project_path, use_index=use_index, lean=args.lean)
+        if args.files_only:
+            output = project.files()
+        else:
+            paths = [path.replace('\\', '/') for path in args.paths]
+            output = {'symbols': project.symbols(paths, args.max_depth), 'version': project.version}
+            if project.error is not None:
+                output['error'] = project.error
+        print(json.dumps(output, ensure_ascii=False))
+        return
+    profiler = ParseProfiler() if args.profile else None
+    if args.stream:
+        write_stream(project_path, use_index=use_index, since=args.since, lean=args.lean, profiler=profiler)
+        return
+    result = parse_project(project_path, use_index=use_index, since=args.since, lean=args.lean, profiler=profiler)
+    if args.compact and 'patch' not in result:
+        with (profiler or NULL_PROFILER).stage('compact_encode'):
+            result = encode_compact(result)
+    if profiler is None:
+        print(json.dumps(result, ensure_ascii=False))
+        return
+    print(encode_with_stats(result, profiler))
 
 
 if __name__ == '__main__':
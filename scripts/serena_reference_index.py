@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+INDEX_DIR_NAME = 'cctoolbox-index'
+DB_NAME = 'references.sqlite'
+SCHEMA_VERSION = 1
+IGNORE_DIRS = {'node_modules', '.git', 'dist', 'build', '.cache', '.serena'}
+MAX_FILE_SIZE = 1024 * 1024
+BINARY_SNIFF_BYTES = 8192
+DEFAULT_LIMIT = 200
+DEFAULT_REFRESH_INTERVAL = 5.0
+POOL_MIN_FILES = 64
+POOL_CHUNK_SIZE = 32
+TOKEN_PATTERN = re.compile(r'[A-Za-z_$][A-Za-z0-9_$]*')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Identifier reference index for Serena projects')
+    parser.add_argument('--project', required=True, help='Project root path')
+    parser.add_argument('--symbol', default='', help='Symbol name to look up')
+    parser.add_argument('--offset', type=int, default=0, help='Number of references to skip')
+    parser.add_argument('--limit', type=int, default=DEFAULT_LIMIT, help='Maximum number of references to return')
+    parser.add_argument('--workers', type=int, default=None, help='Tokenizer processes (default: CPU count)')
+    parser.add_argument('--refresh-interval', type=float, default=DEFAULT_REFRESH_INTERVAL,
+                        help='Skip the mtime rescan if the index was refreshed within this many seconds')
+    parser.add_argument('--rebuild', action='store_true', help='Drop the index and rebuild it from scratch')
+    return parser.parse_args()
+
+
+def get_db_path(project_path):
+    return os.path.join(project_path, '.serena', 'cache', INDEX_DIR_NAME, DB_NAME)
+
+
+def connect(project_path):
+    db_path = get_db_path(project_path)
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    if version != SCHEMA_VERSION:
+        conn.executescript('''
+            DROP TABLE IF EXISTS refs;
+            DROP TABLE IF EXISTS files;
+            DROP TABLE IF EXISTS meta;
+        ''')
+    conn.executescript('''
+        CREATE TABLE IF NOT EXISTS files (
+            id INTEGER PRIMARY KEY,
+            path TEXT NOT NULL UNIQUE,
+            mtime_ns INTEGER NOT NULL,
+            size INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS refs (
+            token TEXT NOT NULL,
+            file_id INTEGER NOT NULL,
+            line INTEGER NOT NULL,
+            col INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS refs_token ON refs (token, file_id, line, col);
+        CREATE INDEX IF NOT EXISTS refs_file ON refs (file_id);
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+    ''')
+    conn.execute(f'PRAGMA user_version={SCHEMA_VERSION}')
+    return conn
+
+
+def walk_project(project_path):
+    """Return ``{rel_path: (mtime_ns, size)}`` for every indexable file."""
+    results = {}
+    stack = [project_path]
+    while stack:
+        current = stack.pop()
+        try:
+            entries = list(os.scandir(current))
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.name in IGNORE_DIRS:
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                    continue
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                stat = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            if stat.st_size > MAX_FILE_SIZE:
+                continue
+            rel_path = os.path.relpath(entry.path, project_path).replace('\\', '/')
+            results[rel_path] = (stat.st_mtime_ns, stat.st_size)
+    return results
+
+
+def read_text(file_path):
+    with open(file_path, 'rb') as handle:
+        raw = handle.read(MAX_FILE_SIZE + 1)
+    if b'\0' in raw[:BINARY_SNIFF_BYTES]:
+        return None
+    return raw.decode('utf-8', errors='replace')
+
+
+def tokenize_file(project_path, rel_path):
+    """Return ``(rel_path, [(token, line, col), ...])`` with 1-based positions, or None if unreadable."""
+    try:
+        text = read_text(os.path.join(project_path, rel_path))
+    except OSError:
+        return rel_path, None
+    if text is None:
+        return rel_path, []
+    refs = []
+    for line_number, line in enumerate(text.splitlines(), start=1):
+        for match in TOKEN_PATTERN.finditer(line):
+            refs.append((match.group(0), line_number, match.start() + 1))
+    return rel_path, refs
+
+
+def tokenize_chunk(project_path, rel_paths):
+    return [tokenize_file(project_path, rel_path) for rel_path in rel_paths]
+
+
+def iter_tokenized(project_path, rel_paths, workers=None, get_pool=None):
+    """Tokenize ``rel_paths``; large batches go to the pool ``get_pool()`` returns, else to a pool of our own.
+
+    The pool uses the spawn start method: the parser server refreshes the
+    index from worker threads, and forking a threaded process can deadlock
+    the child.
+    """
+    if len(rel_paths) < POOL_MIN_FILES or (workers == 1 and get_pool is None):
+        for rel_path in rel_paths:
+            yield tokenize_file(project_path, rel_path)
+        return
+    chunks = [rel_paths[index:index + POOL_CHUNK_SIZE] for index in range(0, len(rel_paths), POOL_CHUNK_SIZE)]
+    if get_pool is not None:
+        for results in get_pool().map(tokenize_chunk, [project_path] * len(chunks), chunks):
+            yield from results
+        return
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as own_pool:
+        for results in own_pool.map(tokenize_chunk, [project_path] * len(chunks), chunks):
+            yield from results
+
+
+def get_meta(conn, key, default=None):
+    row = conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+    return row[0] if row else default
+
+
+def refresh_index(conn, project_path, workers=None, refresh_interval=DEFAULT_REFRESH_INTERVAL, force=False,
+                  get_pool=None, record_scan=True):
+    """Bring the index in line with the files on disk, re-tokenizing only new or modified files.
+
+    With ``record_scan`` false the scan does not count towards ``refresh_interval``, so the next
+    lookup still picks up files changed since.
+    """
+    started = time.monotonic()
+
+    def is_recent():
+        last_scan = float(get_meta(conn, 'last_scan', 0) or 0)
+        return not force and refresh_interval > 0 and time.time() - last_scan < refresh_interval
+
+    if is_recent():
+        return {'scanned': False, 'updated': 0, 'removed': 0, 'ms': 0}
+
+    on_disk = walk_project(project_path)
+    # Take the write lock before diffing so a concurrent refresh cannot insert the same files twice.
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        if is_recent():
+            conn.execute('ROLLBACK')
+            return {'scanned': False, 'updated': 0, 'removed': 0, 'ms': 0}
+        known = {row[0]: (row[1], row[2], row[3]) for row in conn.execute('SELECT path, id, mtime_ns, size FROM files')}
+        changed = [path for path, stat in on_disk.items() if path not in known or known[path][1:] != stat]
+        removed = [known[path][0] for path in known if path not in on_disk]
+
+        for file_id in removed:
+            conn.execute('DELETE FROM refs WHERE file_id = ?', (file_id,))
+            conn.execute('DELETE FROM files WHERE id = ?', (file_id,))
+        for rel_path, refs in iter_tokenized(project_path, changed, workers, get_pool):
+            mtime_ns, size = on_disk[rel_path]
+            if rel_path in known:
+                file_id = known[rel_path][0]
+                conn.execute('DELETE FROM refs WHERE file_id = ?', (file_id,))
+                conn.execute('UPDATE files SET mtime_ns = ?, size = ? WHERE id = ?', (mtime_ns, size, file_id))
+            else:
+                file_id = conn.execute(
+                    'INSERT INTO files (path, mtime_ns, size) VALUES (?, ?, ?)', (rel_path, mtime_ns, size)
+                ).lastrowid
+            if refs:
+                conn.executemany(
+                    'INSERT INTO refs (token, file_id, line, col) VALUES (?, ?, ?, ?)',
+                    ((token, file_id, line, col) for token, line, col in refs)
+                )
+        if record_scan:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_scan', ?)", (str(time.time()),))
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+
+    return {
+        'scanned': True,
+        'updated': len(changed),
+        'removed': len(removed),
+        'ms': round((time.monotonic() - started) * 1000, 1)
+    }
+
+
+class LineReader:
+    def __init__(self, project_path):
+        self.project_path = project_path
+        self.lines = {}
+
+    def get(self, rel_path, line_number):
+        lines = self.lines.get(rel_path)
+        if lines is None:
+            try:
+                text = read_text(os.path.join(self.project_path, rel_path)) or ''
+            except OSError:
+                text = ''
+            lines = text.splitlines()
+            self.lines[rel_path] = lines
+        if 0 < line_number <= len(lines):
+            return lines[line_number - 1]
+        return ''
+
+
+def find_references(conn, project_path, symbol, offset=0, limit=DEFAULT_LIMIT):
+    """Look up ``symbol`` in the index and return one page of references.
+
+    A single identifier is answered straight from the token index. Any
+    other name is narrowed to lines containing its rarest identifier and
+    then checked as a substring of the line text.
+    """
+    symbol = str(symbol or '')
+    offset = max(0, int(offset or 0))
+    limit = max(0, int(limit or 0))
+    tokens = TOKEN_PATTERN.findall(symbol)
+    reader = LineReader(project_path)
+    if not tokens:
+        return {'items': [], 'total': 0, 'offset': offset, 'limit': limit}
+
+    def to_item(path, line, col):
+        return {'file': path, 'line': line, 'column': col, 'preview': reader.get(path, line).strip()}
+
+    if len(tokens) == 1 and tokens[0] == symbol:
+        total = conn.execute('SELECT COUNT(*) FROM refs WHERE token = ?', (symbol,)).fetchone()[0]
+        rows = conn.execute(
+            '''SELECT files.path, refs.line, refs.col FROM refs JOIN files ON files.id = refs.file_id
+               WHERE refs.token = ? ORDER BY files.path, refs.line, refs.col LIMIT ? OFFSET ?''',
+            (symbol, limit, offset)
+        ).fetchall()
+        items = [to_item(path, line, col) for path, line, col in rows]
+        return {'items': items, 'total': total, 'offset': offset, 'limit': limit}
+
+    counts = {
+        token: conn.execute('SELECT COUNT(*) FROM refs WHERE token = ?', (token,)).fetchone()[0]
+        for token in set(tokens)
+    }
+    rarest = min(counts, key=counts.get)
+    rows = conn.execute(
+        '''SELECT DISTINCT files.path, refs.line FROM refs JOIN files ON files.id = refs.file_id
+           WHERE refs.token = ? ORDER BY files.path, refs.line''',
+        (rarest,)
+    )
+    matches = []
+    for path, line in rows:
+        text = reader.get(path, line)
+        column = text.find(symbol)
+        while column >= 0:
+            matches.append((path, line, column + 1))
+            column = text.find(symbol, column + 1)
+    items = [to_item(path, line, col) for path, line, col in matches[offset:offset + limit]]
+    return {'items': items, 'total': len(matches), 'offset': offset, 'limit': limit}
+
+
+def update(project_path, workers=None, refresh_interval=DEFAULT_REFRESH_INTERVAL, get_pool=None, record_scan=True):
+    """Refresh the index without querying it; returns the refresh stats."""
+    project_path = os.path.abspath(project_path)
+    conn = connect(project_path)
+    try:
+        return refresh_index(conn, project_path, workers, refresh_interval, get_pool=get_pool,
+                             record_scan=record_scan)
+    finally:
+        conn.close()
+
+
+def lookup(project_path, symbol, offset=0, limit=DEFAULT_LIMIT, workers=None,
+           refresh_interval=DEFAULT_REFRESH_INTERVAL, rebuild=False, refresh=True):
+    project_path = os.path.abspath(project_path)
+    if rebuild:
+        try:
+            os.remove(get_db_path(project_path))
+        except OSError:
+            pass
+    conn = connect(project_path)
+    try:
+        stats = refresh_index(conn, project_path, workers, refresh_interval, force=rebuild) if refresh else None
+        result = find_references(conn, project_path, symbol, offset, limit)
+        result['index'] = stats
+        return result
+    finally:
+        conn.close()
+
+
+def main():
+    args = parse_args()
+    try:
+        result = lookup(args.project, args.symbol, args.offset, args.limit, args.workers,
+                        args.refresh_interval, args.rebuild)
+    except (OSError, sqlite3.Error) as exc:
+        result = {'items': [], 'total': 0, 'offset': args.offset, 'limit': args.limit, 'error': str(exc)}
+    sys.stdout.write(json.dumps(result, ensure_ascii=False) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -13,10 +13,12 @@ const {
   getSettings,
   saveSettings,
   getCacheStatus,
-  getFiles,
-  getSymbols,
-  getSymbolReferences
+  getFilesEntry,
+  getSymbolsEntry,
+  getSymbolReferences,
+  getSymbolWatchStatus
 } = require('../services/serena.service');
+const { sendPrecompressedJson } = require('../utils/precompressed');
 
 function resolveProjectPath(req) {
   return req.query.projectPath || req.body?.projectPath || '';
@@ -145,8 +147,8 @@ router.get('/files', async (req, res) => {
   if (!projectPath) return;
 
   try {
-    const data = await getFiles(projectPath);
-    res.json({ success: true, data: { tree: data } });
+    const { tree, hash } = await getFilesEntry(projectPath);
+    sendPrecompressedJson(req, res, { success: true, data: { tree } }, hash && `tree-${hash}`);
   } catch (err) {
     handleError(res, err);
   }
@@ -165,17 +167,33 @@ router.get('/cache/status', (req, res) => {
   }
 });
 
+// GET /api/serena/cache/watch
+router.get('/cache/watch', async (req, res) => {
+  try {
+    const data = await getSymbolWatchStatus();
+    res.json({ success: true, data });
+  } catch (err) {
+    handleError(res, err);
+  }
+});
+
 // GET /api/serena/symbols
 router.get('/symbols', async (req, res) => {
   const projectPath = requireProjectPath(req, res);
   if (!projectPath) return;
 
   try {
-    const data = await getSymbols(projectPath, {
+    const maxDepth = req.query.maxDepth !== undefined && req.query.maxDepth !== ''
+      ? parseInt(req.query.maxDepth, 10)
+      : undefined;
+    const limit = parseInt(req.query.limit, 10);
+    const { data, hash } = await getSymbolsEntry(projectPath, {
       filePath: req.query.filePath || '',
-      query: req.query.query || ''
+      query: req.query.query || '',
+      maxDepth: Number.isNaN(maxDepth) ? undefined : maxDepth,
+      limit: Number.isNaN(limit) ? undefined : limit
     });
-    res.json({ success: true, data });
+    sendPrecompressedJson(req, res, { success: true, data }, hash && `symbols-${hash}`);
   } catch (err) {
     handleError(res, err);
   }
@@ -187,8 +205,13 @@ router.get('/symbols/references', async (req, res) => {
   if (!projectPath) return;
 
   try {
-    const data = await getSymbolReferences(projectPath, req.query.symbol || '');
-    res.json({ success: true, data: { items: data } });
+    const offset = parseInt(req.query.offset, 10);
+    const limit = parseInt(req.query.limit, 10);
+    const data = await getSymbolReferences(projectPath, req.query.symbol || '', {
+      offset: Number.isNaN(offset) ? undefined : offset,
+      limit: Number.isNaN(limit) ? undefined : limit
+    });
+    res.json({ success: true, data });
   } catch (err) {
     handleError(res, err);
   }
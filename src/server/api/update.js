@@ -17,6 +17,9 @@ const UPDATE_STEPS = [
   '健康检查'
 ];
 
+// 只保留最近的输出行，失败时取末尾作为错误信息；更新日志本身由 update.py 分块限流
+const MAX_OUTPUT_LINES = 200;
+
 let currentProcess = null;
 
 function buildSteps() {
@@ -93,40 +96,110 @@ router.post('/execute', async (_req, res) => {
 
   emitProgress(state);
 
-  const child = spawn('python3', ['update.py'], {
+  const child = spawn('python3', ['update.py', '--json-events'], {
     cwd: projectRoot,
     shell: false
   });
   currentProcess = child;
 
   let buffer = '';
-  let outputLines = [];
+  const outputLines = [];
   const stepPattern = /^\[(\d+)\/(\d+)\]\s*(.+)$/;
+  const markerPattern = /^\[(skip|parallel|done)\]\s*/;
+  const statuses = steps.map(() => 'pending');
+  const parallelSteps = new Set();
+
+  // update.py 的步骤行可带标记：[skip] 输入未变化已跳过，[parallel] 与其他步骤并行开始，[done] 并行步骤完成
+  function applyStepStatus(stepIndex, marker) {
+    if (marker === 'done') {
+      statuses[stepIndex] = 'completed';
+      return;
+    }
+    if (marker === 'parallel') {
+      parallelSteps.add(stepIndex);
+    }
+    const keepParallel = marker === 'parallel' || marker === 'skip';
+    statuses.forEach((status, index) => {
+      if (index >= stepIndex || status === 'completed' || status === 'skipped') return;
+      if (status === 'in_progress' && keepParallel && parallelSteps.has(index)) return;
+      statuses[index] = 'completed';
+    });
+    statuses[stepIndex] = marker === 'skip' ? 'skipped' : 'in_progress';
+  }
+
+  function stepsWithStatus(mapStatus = (status) => status) {
+    return steps.map((step, index) => ({ ...step, status: mapStatus(statuses[index]) }));
+  }
+
+  function pushOutput(line) {
+    outputLines.push(line);
+    if (outputLines.length > MAX_OUTPUT_LINES) {
+      outputLines.splice(0, outputLines.length - MAX_OUTPUT_LINES);
+    }
+  }
+
+  function updateStep(stepIndex, marker, message) {
+    applyStepStatus(stepIndex, marker);
+    state.step = Math.max(state.step, stepIndex + 1);
+    state.message = message;
+    state.steps = stepsWithStatus();
+    state.progress = Math.min(Math.round((state.step / state.total) * 100), 100);
+    state.output = '';
+    emitProgress(state);
+  }
+
+  // --json-events 模式：每行一个事件（step/log/command/readiness/end）
+  function handleEvent(event) {
+    if (event.event === 'step') {
+      const stepIndex = Math.min(Math.max((event.step || 1) - 1, 0), steps.length - 1);
+      if (event.phase === 'end') {
+        steps[stepIndex].durationMs = event.durationMs;
+        if (event.status === 'completed' && parallelSteps.has(stepIndex)) {
+          applyStepStatus(stepIndex, 'done');
+          state.steps = stepsWithStatus();
+          emitProgress(state);
+        }
+        return;
+      }
+      state.total = Math.max(event.total || 0, steps.length);
+      updateStep(stepIndex, event.skipped ? 'skip' : event.parallel ? 'parallel' : '', event.message || '');
+      return;
+    }
+    if (event.event === 'log') {
+      const lines = (event.lines || []).map(item => (item.source ? `[${item.source}] ${item.text}` : item.text));
+      if (event.dropped) {
+        lines.unshift(`... 省略 ${event.dropped} 行输出`);
+      }
+      lines.forEach(pushOutput);
+      if (lines.length > 0) {
+        state.output = lines[lines.length - 1];
+        emitProgress(state);
+      }
+      return;
+    }
+    if (event.event === 'command' && event.exitCode !== 0) {
+      pushOutput(`命令执行失败 (退出码 ${event.exitCode}): ${event.command}`);
+    }
+  }
 
   function handleLine(line) {
     if (!line) return;
-    outputLines.push(line);
+    if (line.startsWith('{')) {
+      try {
+        handleEvent(JSON.parse(line));
+        return;
+      } catch (error) {
+        // 非事件行，按文本协议处理
+      }
+    }
+    pushOutput(line);
 
     const match = line.match(stepPattern);
     if (match) {
-      const stepIndex = Math.max(parseInt(match[1], 10) - 1, 0);
-      state.step = stepIndex + 1;
+      const stepIndex = Math.min(Math.max(parseInt(match[1], 10) - 1, 0), steps.length - 1);
+      const marker = match[3].match(markerPattern)?.[1] || '';
       state.total = Math.max(parseInt(match[2], 10), steps.length);
-      state.message = match[3];
-
-      state.steps = steps.map((step, index) => {
-        if (index < stepIndex) {
-          return { ...step, status: 'completed' };
-        }
-        if (index === stepIndex) {
-          return { ...step, status: 'in_progress' };
-        }
-        return { ...step, status: 'pending' };
-      });
-
-      state.progress = Math.min(Math.round((state.step / state.total) * 100), 100);
-      state.output = '';
-      emitProgress(state);
+      updateStep(stepIndex, marker, match[3].replace(markerPattern, ''));
       return;
     }
 
@@ -142,7 +215,7 @@ router.post('/execute', async (_req, res) => {
   });
 
   child.stderr.on('data', (data) => {
-    outputLines.push(data.toString());
+    data.toString().split(/\r?\n/).filter(Boolean).forEach(pushOutput);
   });
 
   child.on('error', (error) => {
@@ -162,10 +235,7 @@ router.post('/execute', async (_req, res) => {
 
     if (code === 0) {
       const latestVersion = getCurrentVersion();
-      const finalSteps = steps.map((step) => ({
-        ...step,
-        status: 'completed'
-      }));
+      const finalSteps = stepsWithStatus((status) => (status === 'skipped' ? 'skipped' : 'completed'));
       emitProgress({
         ...state,
         step: steps.length,
@@ -185,15 +255,7 @@ router.post('/execute', async (_req, res) => {
     }
 
     const errorMessage = outputLines.slice(-10).join('\n') || `更新失败，退出码 ${code}`;
-    const failedSteps = steps.map((step, index) => {
-      if (index < state.step - 1) {
-        return { ...step, status: 'completed' };
-      }
-      if (index === state.step - 1) {
-        return { ...step, status: 'failed' };
-      }
-      return { ...step, status: 'pending' };
-    });
+    const failedSteps = stepsWithStatus((status) => (status === 'in_progress' ? 'failed' : status));
 
     emitProgress({
       ...state,
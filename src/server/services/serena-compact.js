@@ -0,0 +1,141 @@
+const COMPACT_FORMAT = 'cctoolbox-compact';
+const COMPACT_FORMAT_VERSION = 1;
+const RANGE_WIDTH = 8;
+
+function isCompactResult(result) {
+  return Boolean(result) && result.format === COMPACT_FORMAT;
+}
+
+function decodePosition(ranges, offset) {
+  const line = ranges[offset];
+  const character = ranges[offset + 1];
+  if (line < 0 && character < 0) return null;
+  return { line, character };
+}
+
+function decodeRange(ranges, offset) {
+  const start = decodePosition(ranges, offset);
+  const end = decodePosition(ranges, offset + 2);
+  if (!start && !end) return null;
+  return { start, end };
+}
+
+function decodeFileSymbols(payload, fileIndex, truncated) {
+  const { strings, fileSymbols } = payload;
+  const columns = payload.symbols;
+  const first = fileSymbols[fileIndex];
+  const last = fileSymbols[fileIndex + 1];
+  const nodes = new Array(last - first);
+  const roots = [];
+  for (let index = first; index < last; index += 1) {
+    const offset = index * RANGE_WIDTH;
+    const symbol = {
+      name: strings[columns.name[index]],
+      kind: columns.kind[index],
+      detail: strings[columns.detail[index]],
+      range: decodeRange(columns.ranges, offset),
+      selectionRange: decodeRange(columns.ranges, offset + 4),
+      children: []
+    };
+    if (truncated.has(index)) {
+      symbol.truncated = true;
+    }
+    nodes[index - first] = symbol;
+    const parent = columns.parent[index];
+    if (parent < 0) {
+      roots.push(symbol);
+    } else {
+      nodes[parent - first].children.push(symbol);
+    }
+  }
+  return roots;
+}
+
+function buildCompactTree(payload) {
+  const { strings, dirs } = payload;
+  const roots = [];
+  const dirNodes = [];
+  const childrenOf = (parent) => (parent < 0 ? roots : dirNodes[parent].children);
+  const joinPath = (parent, name) => (parent < 0 ? name : `${dirNodes[parent].path}/${name}`);
+  for (let index = 0; index < dirs.length; index += 2) {
+    const parent = dirs[index];
+    const name = strings[dirs[index + 1]];
+    const node = { name, path: joinPath(parent, name), type: 'directory', children: [] };
+    dirNodes.push(node);
+    childrenOf(parent).push(node);
+  }
+  const paths = new Array(payload.fileDir.length);
+  payload.fileDir.forEach((parent, index) => {
+    const name = strings[payload.fileName[index]];
+    const node = { name, path: joinPath(parent, name), type: 'file' };
+    const language = strings[payload.fileLanguage[index]];
+    if (language) {
+      node.language = language;
+    }
+    paths[index] = node.path;
+    childrenOf(parent).push(node);
+  });
+  return { files: roots, paths };
+}
+
+/**
+ * 将 compact 格式的解析结果还原为 { files, symbols, ... }。
+ * symbols 按文件惰性解码：首次访问某个文件时才构建其符号树。
+ */
+function decodeCompactResult(payload) {
+  if (payload.formatVersion !== COMPACT_FORMAT_VERSION) {
+    throw new Error(`不支持的 Serena compact 格式版本: ${payload.formatVersion}`);
+  }
+  const { files, paths } = buildCompactTree(payload);
+  const truncated = new Set(payload.symbols.truncated || []);
+  const filePaths = payload.filePaths || {};
+  const fileDigests = payload.fileDigests || [];
+  const symbols = {};
+  const digests = {};
+  const decoded = new Map();
+  paths.forEach((treePath, index) => {
+    const key = filePaths[index] || treePath;
+    if (fileDigests[index]) {
+      digests[key] = fileDigests[index];
+    }
+    Object.defineProperty(symbols, key, {
+      configurable: true,
+      enumerable: true,
+      get() {
+        let value = decoded.get(key);
+        if (value === undefined) {
+          value = decodeFileSymbols(payload, index, truncated);
+          decoded.set(key, value);
+        }
+        return value;
+      },
+      set(value) {
+        decoded.set(key, value);
+      }
+    });
+  });
+
+  const data = {
+    files,
+    symbols,
+    digests,
+    fileCount: payload.fileCount || paths.length,
+    version: payload.version || '',
+    caches: Array.isArray(payload.caches) ? payload.caches : [],
+    contentHash: payload.contentHash || '',
+    treeHash: payload.treeHash || ''
+  };
+  if (payload.error) {
+    data.error = payload.error;
+  }
+  if (payload.stats) {
+    data.stats = payload.stats;
+  }
+  return data;
+}
+
+module.exports = {
+  COMPACT_FORMAT,
+  isCompactResult,
+  decodeCompactResult
+};
@@ -0,0 +1,461 @@
+const path = require('path');
+const readline = require('readline');
+const { spawn } = require('child_process');
+const { isCompactResult, decodeCompactResult } = require('./serena-compact');
+
+const SCRIPT_PATH = path.resolve(__dirname, '../../../scripts/parse_serena_pkl.py');
+const REFERENCE_SCRIPT_PATH = path.resolve(__dirname, '../../../scripts/serena_reference_index.py');
+const PYTHON_COMMANDS = ['python3', 'python'];
+const REQUEST_TIMEOUT_MS = 20000;
+const DAEMON_IDLE_MS = 10 * 60 * 1000;
+const STDERR_LIMIT = 64 * 1024;
+const SLOW_PARSE_RATIO = 0.75;
+
+let daemon = null;
+let daemonDisabled = false;
+// 监听器运行在常驻进程里，随进程退出而消失；这里记下监听过的项目，新进程启动后重新登记
+const watchedProjects = new Set();
+
+function createStreamCollector(onRecord) {
+  const data = {
+    files: null,
+    symbols: {},
+    digests: {},
+    fileCount: 0
+  };
+  return {
+    data,
+    push(record) {
+      if (!record || typeof record !== 'object') return;
+      if (record.type === 'file') {
+        data.symbols[record.file] = Array.isArray(record.symbols) ? record.symbols : [];
+        if (record.digest) {
+          data.digests[record.file] = record.digest;
+        }
+      } else if (record.type === 'patch') {
+        data.patch = {
+          added: record.added || {},
+          changed: record.changed || {},
+          removed: Array.isArray(record.removed) ? record.removed : [],
+          digests: record.digests || {}
+        };
+      } else if (record.type === 'tree') {
+        data.files = Array.isArray(record.files) ? record.files : [];
+      } else if (record.type === 'summary') {
+        data.fileCount = record.fileCount || 0;
+        data.version = record.version || '';
+        if (record.base) {
+          data.base = record.base;
+        }
+        if (record.error) {
+          data.error = record.error;
+        }
+        if (record.stats) {
+          data.stats = record.stats;
+        }
+        if (Array.isArray(record.caches)) {
+          data.caches = record.caches;
+        }
+        data.contentHash = record.contentHash || '';
+        data.treeHash = record.treeHash || '';
+      }
+      if (onRecord) {
+        onRecord(record);
+      }
+    }
+  };
+}
+
+function runScript(args, handleLine, scriptPath = SCRIPT_PATH) {
+  const spawnWith = (command) => new Promise((resolve, reject) => {
+    const child = spawn(command, [scriptPath, ...args], { stdio: ['ignore', 'pipe', 'pipe'], shell: false });
+    let stderr = '';
+    let settled = false;
+    let lineError = null;
+
+    const finish = (error) => {
+      if (settled) return;
+      settled = true;
+      clearTimeout(timer);
+      if (error) {
+        error.stderr = stderr;
+        reject(error);
+      } else {
+        resolve();
+      }
+    };
+
+    const timer = setTimeout(() => {
+      child.kill();
+      const error = new Error(`Serena 解析超时 (${REQUEST_TIMEOUT_MS}ms)`);
+      error.code = 'SERENA_PARSE_TIMEOUT';
+      finish(error);
+    }, REQUEST_TIMEOUT_MS);
+
+    readline.createInterface({ input: child.stdout }).on('line', (line) => {
+      if (!line || lineError) return;
+      try {
+        handleLine(line);
+      } catch (error) {
+        lineError = error;
+        lineError.message = `解析 Serena 缓存失败: ${error.message}`;
+        child.kill();
+      }
+    });
+    child.stderr.on('data', (chunk) => {
+      if (stderr.length < STDERR_LIMIT) {
+        stderr += chunk.toString();
+      }
+    });
+    child.on('error', (error) => finish(error));
+    child.on('close', (code) => {
+      if (lineError) return finish(lineError);
+      if (code !== 0) {
+        return finish(new Error(`Serena 解析进程退出码 ${code}: ${stderr.trim()}`));
+      }
+      finish(null);
+    });
+  });
+
+  return spawnWith(PYTHON_COMMANDS[0]).catch((error) => {
+    if (error.code === 'ENOENT') {
+      return spawnWith(PYTHON_COMMANDS[1]);
+    }
+    throw error;
+  });
+}
+
+async function runOneShot(projectPath, options = {}) {
+  const args = ['--project', projectPath, options.compact ? '--compact' : '--stream', '--profile'];
+  if (options.since) {
+    args.push('--since', options.since);
+  }
+  const collector = createStreamCollector(options.onRecord);
+  if (options.compact) {
+    const result = await runOneShotJson(args);
+    return isCompactResult(result) ? decodeCompactResult(result) : collectResult(collector, result);
+  }
+  await runScript(args, (line) => collector.push(JSON.parse(line)));
+  return collector.data;
+}
+
+async function runOneShotJson(args, scriptPath = SCRIPT_PATH) {
+  const lines = [];
+  await runScript(args, (line) => lines.push(line), scriptPath);
+  return JSON.parse(lines.join('\n') || '{}');
+}
+
+class SerenaParserDaemon {
+  constructor(command) {
+    this.command = command;
+    this.nextId = 1;
+    this.pending = new Map();
+    this.idleTimer = null;
+    this.child = spawn(command, [SCRIPT_PATH, '--server', '--lean'], {
+      stdio: ['pipe', 'pipe', 'pipe'],
+      shell: false
+    });
+    this.ready = new Promise((resolve, reject) => {
+      this.child.once('spawn', resolve);
+      this.child.once('error', reject);
+    });
+
+    readline.createInterface({ input: this.child.stdout }).on('line', (line) => this.handleLine(line));
+    this.child.stderr.on('data', (data) => {
+      console.warn('[SerenaParser]', data.toString().trim());
+    });
+    this.child.on('error', (error) => {
+      this.rejectAll(error);
+    });
+    this.child.on('exit', (code, signal) => {
+      this.rejectAll(new Error(`Serena 解析进程已退出 (${signal || code})`));
+      if (daemon === this) {
+        daemon = null;
+      }
+    });
+    this.child.stdin.on('error', (error) => {
+      this.rejectAll(error);
+    });
+  }
+
+  handleLine(line) {
+    if (!line) return;
+    let message;
+    try {
+      message = JSON.parse(line);
+    } catch (error) {
+      console.warn('[SerenaParser] Invalid response:', line.slice(0, 200));
+      return;
+    }
+    const entry = this.pending.get(message.id);
+    if (!entry) return;
+    if (message.record) {
+      if (entry.onRecord) {
+        entry.onRecord(message.record);
+      }
+      return;
+    }
+    this.pending.delete(message.id);
+    clearTimeout(entry.timer);
+    if (message.ok) {
+      entry.resolve(message.result);
+    } else {
+      entry.reject(new Error(`解析 Serena 缓存失败: ${message.error}`));
+    }
+    this.scheduleIdle();
+  }
+
+  rejectAll(error) {
+    this.pending.forEach((entry) => {
+      clearTimeout(entry.timer);
+      entry.reject(error);
+    });
+    this.pending.clear();
+  }
+
+  scheduleIdle() {
+    if (this.idleTimer) {
+      clearTimeout(this.idleTimer);
+    }
+    // 有项目在监听时不空闲退出，否则后台预解析会随进程一起停掉
+    if (this.pending.size > 0 || watchedProjects.size > 0) return;
+    this.idleTimer = setTimeout(() => this.stop(), DAEMON_IDLE_MS);
+    this.idleTimer.unref();
+  }
+
+  async request(op, params = {}, options = {}) {
+    await this.ready;
+    const id = this.nextId++;
+    return new Promise((resolve, reject) => {
+      const timer = setTimeout(() => {
+        this.pending.delete(id);
+        const error = new Error(`Serena 解析超时 (${REQUEST_TIMEOUT_MS}ms)`);
+        error.code = 'SERENA_PARSE_TIMEOUT';
+        reject(error);
+      }, REQUEST_TIMEOUT_MS);
+      this.pending.set(id, { resolve, reject, timer, onRecord: options.onRecord });
+      if (this.idleTimer) {
+        clearTimeout(this.idleTimer);
+        this.idleTimer = null;
+      }
+      this.child.stdin.write(`${JSON.stringify({ id, op, ...params })}\n`);
+    });
+  }
+
+  async rewatch() {
+    const results = await Promise.allSettled(
+      Array.from(watchedProjects, (projectPath) => this.request('watch', { project: projectPath }))
+    );
+    results.forEach((result) => {
+      if (result.status === 'rejected') {
+        console.warn('[SerenaParser] 重新监听项目失败:', result.reason.message);
+      }
+    });
+  }
+
+  stop() {
+    if (daemon === this) {
+      daemon = null;
+    }
+    this.rejectAll(new Error('Serena 解析进程已停止'));
+    if (this.child.exitCode === null) {
+      this.child.stdin.end();
+      this.child.kill();
+    }
+  }
+}
+
+async function getDaemon() {
+  if (daemon) {
+    await daemon.started;
+    return daemon;
+  }
+  for (const command of PYTHON_COMMANDS) {
+    const candidate = new SerenaParserDaemon(command);
+    candidate.started = candidate.ready.then(() => candidate.rewatch());
+    daemon = candidate;
+    try {
+      await candidate.started;
+      return candidate;
+    } catch (error) {
+      if (daemon === candidate) {
+        daemon = null;
+      }
+      if (error.code !== 'ENOENT') throw error;
+    }
+  }
+  const error = new Error('未找到 python3/python');
+  error.code = 'ENOENT';
+  throw error;
+}
+
+async function requestDaemon(op, params = {}, options = {}) {
+  if (daemonDisabled) {
+    return null;
+  }
+  try {
+    const instance = await getDaemon();
+    return await instance.request(op, params, options);
+  } catch (error) {
+    if (error.code === 'ENOENT') {
+      daemonDisabled = true;
+      return null;
+    }
+    throw error;
+  }
+}
+
+function attachTiming(data, projectPath, startedAt) {
+  const elapsedMs = Date.now() - startedAt;
+  const nearTimeout = elapsedMs >= REQUEST_TIMEOUT_MS * SLOW_PARSE_RATIO;
+  data.timing = { elapsedMs, timeoutMs: REQUEST_TIMEOUT_MS, nearTimeout };
+  if (nearTimeout) {
+    console.warn(`[SerenaParser] 解析 ${projectPath} 耗时 ${elapsedMs}ms，接近超时上限 ${REQUEST_TIMEOUT_MS}ms`, data.stats || '');
+  }
+  return data;
+}
+
+function collectResult(collector, result) {
+  if (result.patch) {
+    collector.push({ type: 'patch', ...result.patch });
+  }
+  if (result.symbols) {
+    const digests = result.digests || {};
+    Object.entries(result.symbols).forEach(([file, symbols]) => {
+      collector.push({ type: 'file', file, symbols, digest: digests[file] });
+    });
+  }
+  if (result.files) {
+    collector.push({ type: 'tree', files: result.files });
+  }
+  collector.push({ type: 'summary', ...result });
+  return collector.data;
+}
+
+async function parseSerenaCache(projectPath, options = {}) {
+  const startedAt = Date.now();
+  if (!daemonDisabled) {
+    const collector = createStreamCollector(options.onRecord);
+    try {
+      const params = { project: projectPath };
+      if (options.compact) {
+        params.compact = true;
+      } else {
+        params.stream = true;
+      }
+      if (options.since) {
+        params.since = options.since;
+      }
+      const result = await requestDaemon('parse', params, {
+        onRecord: (record) => collector.push(record)
+      });
+      if (result) {
+        const data = isCompactResult(result) ? decodeCompactResult(result) : collectResult(collector, result);
+        return attachTiming(data, projectPath, startedAt);
+      }
+    } catch (error) {
+      if (error.code === 'SERENA_PARSE_TIMEOUT') throw error;
+      console.warn('[SerenaParser] Daemon request failed, falling back to one-shot parse:', error.message);
+    }
+  }
+  return attachTiming(await runOneShot(projectPath, options), projectPath, startedAt);
+}
+
+async function requestWithFallback(op, params, oneShotArgs, scriptPath = SCRIPT_PATH) {
+  if (!daemonDisabled) {
+    try {
+      const result = await requestDaemon(op, params);
+      if (result) return result;
+    } catch (error) {
+      if (error.code === 'SERENA_PARSE_TIMEOUT') throw error;
+      console.warn(`[SerenaParser] Daemon ${op} request failed, falling back to one-shot parse:`, error.message);
+    }
+  }
+  return runOneShotJson(oneShotArgs, scriptPath);
+}
+
+function parseSerenaFiles(projectPath) {
+  return requestWithFallback('files', { project: projectPath }, ['--project', projectPath, '--files-only']);
+}
+
+async function parseSerenaSymbols(projectPath, paths, options = {}) {
+  const params = { project: projectPath, paths };
+  const args = ['--project', projectPath, '--paths', ...paths];
+  if (Number.isInteger(options.maxDepth)) {
+    params.maxDepth = options.maxDepth;
+    args.push('--max-depth', String(options.maxDepth));
+  }
+  const result = await requestWithFallback('symbols', params, args);
+  return result.symbols || {};
+}
+
+async function searchSerenaSymbols(projectPath, query, options = {}) {
+  const params = { project: projectPath, query };
+  const args = ['--project', projectPath, '--query', query];
+  if (options.filePath) {
+    params.filePath = options.filePath;
+    args.push('--paths', options.filePath);
+  }
+  if (Number.isInteger(options.limit)) {
+    params.limit = options.limit;
+    args.push('--limit', String(options.limit));
+  }
+  const result = await requestWithFallback('query', params, args);
+  return Array.isArray(result) ? result : [];
+}
+
+async function findSerenaReferences(projectPath, symbol, options = {}) {
+  const params = { project: projectPath, symbol };
+  const args = ['--project', projectPath, '--symbol', symbol];
+  if (Number.isInteger(options.offset)) {
+    params.offset = options.offset;
+    args.push('--offset', String(options.offset));
+  }
+  if (Number.isInteger(options.limit)) {
+    params.limit = options.limit;
+    args.push('--limit', String(options.limit));
+  }
+  const result = await requestWithFallback('references', params, args, REFERENCE_SCRIPT_PATH);
+  if (result.error) {
+    throw new Error(`查询 Serena 引用失败: ${result.error}`);
+  }
+  return result;
+}
+
+// 让常驻解析进程监听项目的 Serena 缓存并在其变化后后台重建；没有 Python 时返回 null
+async function watchSerenaProject(projectPath) {
+  watchedProjects.add(projectPath);
+  try {
+    const result = await requestDaemon('watch', { project: projectPath });
+    if (!result) {
+      watchedProjects.delete(projectPath);
+    }
+    return result;
+  } catch (error) {
+    watchedProjects.delete(projectPath);
+    throw error;
+  }
+}
+
+async function getSerenaWatchStatus() {
+  const result = await requestDaemon('watchStatus');
+  return Array.isArray(result?.projects) ? result.projects : [];
+}
+
+function stopSerenaParser() {
+  if (daemon) {
+    daemon.stop();
+  }
+}
+
+module.exports = {
+  parseSerenaCache,
+  parseSerenaFiles,
+  parseSerenaSymbols,
+  searchSerenaSymbols,
+  findSerenaReferences,
+  watchSerenaProject,
+  getSerenaWatchStatus,
+  requestDaemon,
+  stopSerenaParser
+};
@@ -1,11 +1,24 @@
 const fs = require('fs');
 const path = require('path');
-const { execFile } = require('child_process');
+const {
+  parseSerenaCache,
+  parseSerenaFiles,
+  parseSerenaSymbols,
+  searchSerenaSymbols,
+  findSerenaReferences,
+  watchSerenaProject,
+  getSerenaWatchStatus
+} = require('./serena-parser');
 
 const DEFAULT_IGNORE_DIRS = new Set(['node_modules', '.git', 'dist', 'build', '.cache']);
 const MAX_REFERENCE_RESULTS = 200;
 const MAX_REFERENCE_FILE_SIZE = 1024 * 1024;
+const SYMBOL_INDEX_DIR = 'cctoolbox-index';
 const symbolCache = new Map();
+const pendingParses = new Map();
+const lazySymbolCache = new Map();
+const parseStats = new Map();
+const watchedProjects = new Set();
 
 function createSerenaError(code, message, statusCode = 400) {
   const error = new Error(message);
@@ -371,13 +384,13 @@ function saveSettings(projectPath, config = {}) {
   };
 }
 
-function findLatestPkl(projectPath) {
+// Serena 为每种语言服务器单独保存一份缓存，按修改时间从新到旧返回全部缓存
+function findSymbolCaches(projectPath) {
   const cacheDir = path.join(getSerenaBase(projectPath), 'cache');
   if (!fs.existsSync(cacheDir)) {
-    return { path: '', mtime: null };
+    return [];
   }
-  let latestPath = '';
-  let latestMtime = 0;
+  const caches = [];
   const stack = [cacheDir];
   while (stack.length) {
     const current = stack.pop();
@@ -386,69 +399,132 @@ function findLatestPkl(projectPath) {
     entries.forEach(entry => {
       const fullPath = path.join(current, entry.name);
       if (entry.isDirectory()) {
-        stack.push(fullPath);
+        if (entry.name !== SYMBOL_INDEX_DIR) {
+          stack.push(fullPath);
+        }
         return;
       }
       if (entry.isFile() && entry.name === 'document_symbols.pkl') {
         const stat = fs.statSync(fullPath);
-        if (stat.mtimeMs > latestMtime) {
-          latestMtime = stat.mtimeMs;
-          latestPath = fullPath;
-        }
+        caches.push({
+          language: path.relative(cacheDir, current).split(path.sep).join('/'),
+          path: fullPath,
+          mtime: stat.mtimeMs,
+          size: stat.size
+        });
       }
     });
   }
-  if (!latestPath) {
-    return { path: '', mtime: null };
-  }
-  return { path: latestPath, mtime: latestMtime };
+  return caches.sort((a, b) => (b.mtime - a.mtime) || a.path.localeCompare(b.path));
 }
 
 function getCacheStatus(projectPath) {
   ensureSerenaDir(projectPath);
-  const { path: cachePath, mtime } = findLatestPkl(projectPath);
-  if (!cachePath) {
-    return { exists: false, path: '', mtime: null };
+  const caches = findSymbolCaches(projectPath).map(cache => ({
+    ...cache,
+    path: path.relative(projectPath, cache.path).split(path.sep).join('/')
+  }));
+  if (!caches.length) {
+    return { exists: false, path: '', mtime: null, caches: [] };
   }
-  return {
+  const status = {
     exists: true,
-    path: path.relative(projectPath, cachePath).split(path.sep).join('/'),
-    mtime
+    path: caches[0].path,
+    mtime: caches[0].mtime,
+    caches,
+    signature: caches.map(cache => `${cache.path}:${cache.mtime}:${cache.size}`).join('|')
   };
+  const lastParse = parseStats.get(projectPath);
+  if (lastParse) {
+    status.lastParse = lastParse;
+  }
+  return status;
 }
 
-function parseSerenaCache(projectPath) {
-  const scriptPath = path.resolve(__dirname, '../../../scripts/parse_serena_pkl.py');
-  const args = [scriptPath, '--project', projectPath];
+function recordParseStats(projectPath, data, mode) {
+  parseStats.set(projectPath, {
+    at: new Date().toISOString(),
+    mode,
+    ...(data.timing || {}),
+    caches: data.caches || [],
+    stats: data.stats || null
+  });
+}
 
-  const execWith = (command) => new Promise((resolve, reject) => {
-    execFile(command, args, { encoding: 'utf8', timeout: 20000, maxBuffer: 10 * 1024 * 1024 }, (err, stdout, stderr) => {
-      if (err) {
-        err.stderr = stderr;
-        return reject(err);
-      }
-      try {
-        const data = JSON.parse(stdout || '{}');
-        resolve(data);
-      } catch (parseError) {
-        parseError.message = `解析 Serena 缓存失败: ${parseError.message}`;
-        reject(parseError);
-      }
-    });
+function applySymbolPatch(target, data) {
+  const patch = data.patch || {};
+  target.digests = target.digests || {};
+  (patch.removed || []).forEach((file) => {
+    delete target.symbols[file];
+    delete target.digests[file];
   });
+  Object.assign(target.symbols, patch.added || {}, patch.changed || {});
+  Object.assign(target.digests, patch.digests || {});
+  if (Array.isArray(data.files)) {
+    target.files = data.files;
+  }
+  if (Array.isArray(data.caches)) {
+    target.caches = data.caches;
+  }
+  target.fileCount = data.fileCount || Object.keys(target.symbols).length;
+  target.version = data.version || '';
+  target.contentHash = data.contentHash || '';
+  target.treeHash = data.treeHash || '';
+  return target;
+}
 
-  return execWith('python3').catch((error) => {
-    if (error.code === 'ENOENT') {
-      return execWith('python');
+async function refreshSymbolCache(projectPath, status, cached) {
+  const since = cached?.data.version || '';
+  let data = await parseSerenaCache(projectPath, { since, compact: true });
+  let normalized;
+  if (data.patch && cached && data.base === cached.data.version) {
+    normalized = applySymbolPatch(cached.data, data);
+    recordParseStats(projectPath, data, 'patch');
+  } else {
+    if (data.patch) {
+      data = await parseSerenaCache(projectPath, { compact: true });
     }
-    throw error;
+    recordParseStats(projectPath, data, 'full');
+    normalized = {
+      files: Array.isArray(data.files) ? data.files : [],
+      symbols: data.symbols || {},
+      digests: data.digests || {},
+      fileCount: data.fileCount || 0,
+      version: data.version || '',
+      caches: data.caches || [],
+      contentHash: data.contentHash || '',
+      treeHash: data.treeHash || ''
+    };
+  }
+  symbolCache.set(projectPath, {
+    signature: status.signature,
+    data: normalized
   });
+  lazySymbolCache.delete(projectPath);
+  return normalized;
+}
+
+// 首次访问项目时交给解析进程监听，之后 Serena 重写缓存会在后台预先解析
+function ensureWatched(projectPath) {
+  if (watchedProjects.has(projectPath)) return;
+  watchedProjects.add(projectPath);
+  watchSerenaProject(projectPath).catch((error) => {
+    watchedProjects.delete(projectPath);
+    console.warn('[Serena] 监听符号缓存失败:', error.message);
+  });
+}
+
+async function getSymbolWatchStatus() {
+  const projects = await getSerenaWatchStatus();
+  return { projects };
 }
 
 async function loadSymbolCache(projectPath) {
+  ensureWatched(projectPath);
   const status = getCacheStatus(projectPath);
   if (!status.exists) {
     symbolCache.delete(projectPath);
+    lazySymbolCache.delete(projectPath);
     return {
       status,
       data: {
@@ -459,22 +535,20 @@ async function loadSymbolCache(projectPath) {
     };
   }
   const cached = symbolCache.get(projectPath);
-  if (cached && cached.mtime === status.mtime && cached.path === status.path) {
+  if (getFreshCache(symbolCache, projectPath, status)) {
     return { status, data: cached.data };
   }
-  try {
-    const data = await parseSerenaCache(projectPath);
-    const normalized = {
-      files: Array.isArray(data.files) ? data.files : [],
-      symbols: data.symbols || {},
-      fileCount: data.fileCount || 0
-    };
-    symbolCache.set(projectPath, {
-      path: status.path,
-      mtime: status.mtime,
-      data: normalized
+  const key = `${projectPath}\0${status.signature}`;
+  let pending = pendingParses.get(key);
+  if (!pending) {
+    pending = refreshSymbolCache(projectPath, status, cached).finally(() => {
+      pendingParses.delete(key);
     });
-    return { status, data: normalized };
+    pendingParses.set(key, pending);
+  }
+  try {
+    const data = await pending;
+    return { status, data };
   } catch (error) {
     if (cached) {
       return { status: { ...status, error: error.message }, data: cached.data };
@@ -483,53 +557,154 @@ async function loadSymbolCache(projectPath) {
   }
 }
 
-async function getFiles(projectPath) {
+function getFreshCache(cache, projectPath, status) {
+  const cached = cache.get(projectPath);
+  if (cached && cached.signature === status.signature) {
+    return cached;
+  }
+  return null;
+}
+
+async function loadLazyEntry(projectPath, status) {
+  const entry = getFreshCache(lazySymbolCache, projectPath, status);
+  if (entry) return entry;
+  const key = `files\0${projectPath}\0${status.signature}`;
+  let pending = pendingParses.get(key);
+  if (!pending) {
+    pending = parseSerenaFiles(projectPath).then((data) => {
+      const created = {
+        signature: status.signature,
+        files: Array.isArray(data.files) ? data.files : [],
+        treeHash: data.treeHash || '',
+        symbols: new Map()
+      };
+      lazySymbolCache.set(projectPath, created);
+      return created;
+    }).finally(() => {
+      pendingParses.delete(key);
+    });
+    pendingParses.set(key, pending);
+  }
+  return pending;
+}
+
+function limitSymbolDepth(list, maxDepth) {
+  if (!Number.isInteger(maxDepth)) return list;
+  return list.map((item) => {
+    const children = Array.isArray(item.children) ? item.children : [];
+    if (children.length === 0) return item;
+    if (maxDepth <= 0) return { ...item, children: [], truncated: true };
+    return { ...item, children: limitSymbolDepth(children, maxDepth - 1) };
+  });
+}
+
+// hash 为解析器给出的内容摘要，内容不变时保持稳定，可直接用作 ETag；为空表示无法提供
+async function getFilesEntry(projectPath) {
   ensureSerenaDir(projectPath);
-  const { data } = await loadSymbolCache(projectPath);
-  const files = Array.isArray(data.files) ? data.files : [];
-  return files;
+  ensureWatched(projectPath);
+  const status = getCacheStatus(projectPath);
+  if (!status.exists) {
+    lazySymbolCache.delete(projectPath);
+    return { tree: [], hash: '' };
+  }
+  const full = getFreshCache(symbolCache, projectPath, status);
+  if (full) {
+    return { tree: Array.isArray(full.data.files) ? full.data.files : [], hash: full.data.treeHash || '' };
+  }
+  const entry = await loadLazyEntry(projectPath, status);
+  return { tree: entry.files, hash: entry.treeHash };
 }
 
-async function getSymbols(projectPath, options = {}) {
+async function getFiles(projectPath) {
+  const { tree } = await getFilesEntry(projectPath);
+  return tree;
+}
+
+async function getFileSymbolsEntry(projectPath, filePath, maxDepth) {
+  const status = getCacheStatus(projectPath);
+  if (!status.exists) {
+    lazySymbolCache.delete(projectPath);
+    return { data: [], hash: '' };
+  }
+  const full = getFreshCache(symbolCache, projectPath, status);
+  if (full) {
+    const list = full.data.symbols[filePath];
+    const digest = full.data.digests?.[filePath];
+    return {
+      data: limitSymbolDepth(Array.isArray(list) ? list : [], maxDepth),
+      hash: digest ? `${digest}-${Number.isInteger(maxDepth) ? maxDepth : 'all'}` : ''
+    };
+  }
+  const entry = await loadLazyEntry(projectPath, status);
+  const key = `${Number.isInteger(maxDepth) ? maxDepth : ''}\0${filePath}`;
+  if (!entry.symbols.has(key)) {
+    const symbols = await parseSerenaSymbols(projectPath, [filePath], { maxDepth });
+    entry.symbols.set(key, Array.isArray(symbols[filePath]) ? symbols[filePath] : []);
+  }
+  return { data: entry.symbols.get(key), hash: '' };
+}
+
+async function getSymbolsEntry(projectPath, options = {}) {
   ensureSerenaDir(projectPath);
-  const { data } = await loadSymbolCache(projectPath);
-  const symbols = data.symbols || {};
   const filePath = options.filePath || '';
   const query = options.query || '';
+  const maxDepth = Number.isInteger(options.maxDepth) ? options.maxDepth : undefined;
 
-  if (filePath) {
-    const list = Array.isArray(symbols[filePath]) ? symbols[filePath] : [];
-    if (query) {
-      return list.filter(item => String(item.name || '').toLowerCase().includes(query.toLowerCase()));
-    }
-    return list;
+  if (filePath && !query) {
+    return getFileSymbolsEntry(projectPath, filePath, maxDepth);
   }
 
-  if (!query) return symbols;
-  const results = [];
-  Object.keys(symbols).forEach((file) => {
-    const list = Array.isArray(symbols[file]) ? symbols[file] : [];
-    list.forEach((item) => {
-      if (String(item.name || '').toLowerCase().includes(query.toLowerCase())) {
-        results.push({ ...item, file });
-      }
-    });
-  });
-  return results;
+  if (query) {
+    const limit = Number.isInteger(options.limit) ? options.limit : undefined;
+    return { data: await searchSerenaSymbols(projectPath, query, { filePath, limit }), hash: '' };
+  }
+
+  const { data } = await loadSymbolCache(projectPath);
+  return { data: data.symbols || {}, hash: data.contentHash || '' };
 }
 
-async function getSymbolReferences(projectPath, symbolName) {
+async function getSymbols(projectPath, options = {}) {
+  const { data } = await getSymbolsEntry(projectPath, options);
+  return data;
+}
+
+async function getSymbolReferences(projectPath, symbolName, options = {}) {
   ensureSerenaDir(projectPath);
+  const offset = Number.isInteger(options.offset) && options.offset > 0 ? options.offset : 0;
+  const limit = Number.isInteger(options.limit) && options.limit >= 0
+    ? Math.min(options.limit, MAX_REFERENCE_RESULTS)
+    : MAX_REFERENCE_RESULTS;
   if (!symbolName) {
-    return [];
+    return { items: [], total: 0, offset, limit };
   }
+  try {
+    const result = await findSerenaReferences(projectPath, String(symbolName), { offset, limit });
+    const data = {
+      items: Array.isArray(result.items) ? result.items : [],
+      total: result.total || 0,
+      offset,
+      limit
+    };
+    // 首次建立引用索引耗时较长，解析进程在后台构建，调用方稍后重试
+    if (result.building) {
+      data.building = true;
+    }
+    return data;
+  } catch (error) {
+    if (error.code !== 'ENOENT') throw error;
+    return scanSymbolReferences(projectPath, String(symbolName), offset, limit);
+  }
+}
+
+// 未安装 Python 时的兜底：逐文件扫描，只保留请求页所需的结果
+function scanSymbolReferences(projectPath, keyword, offset, limit) {
   const baseDir = path.resolve(projectPath);
   const files = collectFiles(baseDir);
-  const keyword = String(symbolName);
   const results = [];
+  let total = 0;
 
   for (const filePath of files) {
-    if (results.length >= MAX_REFERENCE_RESULTS) break;
+    if (total >= offset + limit) break;
     const stat = fs.statSync(filePath);
     if (stat.size > MAX_REFERENCE_FILE_SIZE) continue;
     let content = '';
@@ -540,20 +715,23 @@ async function getSymbolReferences(projectPath, symbolName) {
     }
     const lines = content.split(/\r?\n/);
     lines.forEach((line, index) => {
-      if (results.length >= MAX_REFERENCE_RESULTS) return;
+      if (total >= offset + limit) return;
       const column = line.indexOf(keyword);
       if (column >= 0) {
-        results.push({
-          file: path.relative(baseDir, filePath).split(path.sep).join('/'),
-          line: index + 1,
-          column: column + 1,
-          preview: line.trim()
-        });
+        if (total >= offset) {
+          results.push({
+            file: path.relative(baseDir, filePath).split(path.sep).join('/'),
+            line: index + 1,
+            column: column + 1,
+            preview: line.trim()
+          });
+        }
+        total += 1;
       }
     });
   }
 
-  return results;
+  return { items: results, total, offset, limit };
 }
 
 function collectFiles(baseDir) {
@@ -587,6 +765,10 @@ module.exports = {
   getSettings,
   saveSettings,
   getFiles,
+  getFilesEntry,
   getSymbols,
-  getSymbolReferences
+  getSymbolsEntry,
+  getSymbolReferences,
+  getSymbolWatchStatus,
+  applySymbolPatch
 };
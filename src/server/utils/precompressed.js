@@ -0,0 +1,78 @@
+const zlib = require('zlib');
+
+const MAX_CACHE_BYTES = 32 * 1024 * 1024;
+const ENCODINGS = ['br', 'gzip', 'identity'];
+const bodies = new Map();
+let cachedBytes = 0;
+
+function encodeBody(body, encoding) {
+  const raw = Buffer.from(JSON.stringify(body), 'utf8');
+  if (encoding === 'br') {
+    return zlib.brotliCompressSync(raw, {
+      params: {
+        [zlib.constants.BROTLI_PARAM_QUALITY]: 5,
+        [zlib.constants.BROTLI_PARAM_SIZE_HINT]: raw.length
+      }
+    });
+  }
+  if (encoding === 'gzip') {
+    return zlib.gzipSync(raw);
+  }
+  return raw;
+}
+
+function getEncodedBody(key, body, encoding) {
+  const cacheKey = `${key}\0${encoding}`;
+  let buffer = bodies.get(cacheKey);
+  if (buffer) {
+    bodies.delete(cacheKey);
+    bodies.set(cacheKey, buffer);
+    return buffer;
+  }
+  buffer = encodeBody(body, encoding);
+  if (buffer.length > MAX_CACHE_BYTES) {
+    return buffer;
+  }
+  bodies.set(cacheKey, buffer);
+  cachedBytes += buffer.length;
+  for (const [oldKey, oldBuffer] of bodies) {
+    if (cachedBytes <= MAX_CACHE_BYTES) break;
+    bodies.delete(oldKey);
+    cachedBytes -= oldBuffer.length;
+  }
+  return buffer;
+}
+
+/**
+ * 以内容摘要 key 作为 ETag 发送 JSON：客户端缓存未变化时返回 304，
+ * 否则按 Accept-Encoding 发送 br/gzip 压缩后的字节。同一 key 只序列化、压缩一次。
+ * key 为空时退回 res.json。
+ */
+function sendPrecompressedJson(req, res, body, key) {
+  if (!key) {
+    return res.json(body);
+  }
+  res.set('ETag', `"${key}"`);
+  res.set('Cache-Control', 'no-cache');
+  res.vary('Accept-Encoding');
+  if (req.fresh) {
+    return res.status(304).end();
+  }
+  const encoding = req.acceptsEncodings(...ENCODINGS) || 'identity';
+  const buffer = getEncodedBody(key, body, encoding);
+  if (encoding !== 'identity') {
+    res.set('Content-Encoding', encoding);
+  }
+  res.type('json');
+  return res.end(buffer);
+}
+
+function clearPrecompressedCache() {
+  bodies.clear();
+  cachedBytes = 0;
+}
+
+module.exports = {
+  sendPrecompressedJson,
+  clearPrecompressedCache
+};
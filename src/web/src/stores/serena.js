@@ -17,6 +17,7 @@ import {
 } from '../api/serena'
 
 const DEFAULT_TAB = 'overview'
+const REFERENCE_RETRY_MS = 1000
 
 export const useSerenaStore = defineStore('serena', () => {
   const drawerOpen = ref(false)
@@ -104,7 +105,9 @@ export const useSerenaStore = defineStore('serena', () => {
     cacheStatus.value = {
       exists: !!data.exists,
       path: data.path || '',
-      mtime: data.mtime || null
+      mtime: data.mtime || null,
+      caches: Array.isArray(data.caches) ? data.caches : [],
+      lastParse: data.lastParse || null
     }
     return cacheStatus.value
   }
@@ -275,9 +278,16 @@ export const useSerenaStore = defineStore('serena', () => {
 
   async function fetchReferences(symbol) {
     if (!projectPath.value || !symbol) return null
+    const requestedPath = projectPath.value
     loading.references = true
     try {
-      const result = await getSymbolReferences(projectPath.value, symbol)
+      let result = await getSymbolReferences(requestedPath, symbol)
+      // 引用索引仍在后台构建时稍后重试，切换项目后不再继续
+      while (result?.data?.building && projectPath.value === requestedPath) {
+        await new Promise(resolve => setTimeout(resolve, REFERENCE_RETRY_MS))
+        result = await getSymbolReferences(requestedPath, symbol)
+      }
+      if (projectPath.value !== requestedPath) return null
       references.value = result?.data?.items || []
       return references.value
     } finally {
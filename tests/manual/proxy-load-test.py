@@ -0,0 +1,562 @@
+"""Offline load test for the Claude, Codex and Gemini proxy servers.
+
+Starts stub upstreams that stream Anthropic, OpenAI Responses and Gemini SSE with configurable latency,
+token rate and error rate, launches the three proxies against them in an isolated CCTOOLBOX_HOME, then
+drives them with asyncio at a fixed concurrency:
+
+    python3 tests/manual/proxy-load-test.py --concurrency 50 --requests 2000 --channels 3 --weights 1,2,3
+
+Each run reports requests/s, time-to-first-byte and total-time percentiles, the share of requests each
+channel received, and the RSS growth of the proxy process. The same load is replayed directly against the
+stub (``baseline``) so the latency the proxy adds can be read off as a difference.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+CLI_TYPES = ('claude', 'codex', 'gemini')
+PERCENTILES = (50, 90, 99)
+READY_TIMEOUT_SECONDS = 30
+RSS_SAMPLE_SECONDS = 0.25
+TAIL_BYTES = 2048
+
+# Upstream flavour, request path, client-side channel base URL suffix and the marker of a finished stream.
+TARGETS = {
+    'claude': {
+        'upstream': 'anthropic',
+        'port_key': 'proxy',
+        'path': '/v1/messages',
+        'base_suffix': '',
+        'done': b'message_stop'
+    },
+    'codex': {
+        'upstream': 'openai',
+        'port_key': 'codexProxy',
+        'path': '/v1/responses',
+        'base_suffix': '/v1',
+        'done': b'response.completed'
+    },
+    'gemini': {
+        'upstream': 'gemini',
+        'port_key': 'geminiProxy',
+        'path': '/v1beta/models/gemini-2.5-pro:streamGenerateContent?alt=sse',
+        'base_suffix': '',
+        'done': b'usageMetadata'
+    }
+}
+
+PROXY_LAUNCHER = """
+const root = process.argv[1];
+const clis = process.argv[2].split(',');
+const starters = {
+  claude: () => require(root + '/src/server/proxy-server').startProxyServer(),
+  codex: () => require(root + '/src/server/codex-proxy-server').startCodexProxyServer(),
+  gemini: () => require(root + '/src/server/gemini-proxy-server').startGeminiProxyServer()
+};
+Promise.all(clis.map(cli => starters[cli]()))
+  .then(() => console.log('proxies ready'))
+  .catch((err) => { console.error(err); process.exit(1); });
+"""
+
+
+# ---------------------------------------------------------------------------
+# Stub upstreams
+# ---------------------------------------------------------------------------
+
+def sse_events(kind, model, tokens):
+    """The SSE frames one streamed completion consists of, in the shape each proxy parses for usage."""
+    if kind == 'anthropic':
+        yield 'message_start', {
+            'type': 'message_start',
+            'message': {'id': 'msg_load', 'model': model, 'role': 'assistant',
+                        'usage': {'input_tokens': 120, 'output_tokens': 1}}
+        }
+        yield 'content_block_start', {'type': 'content_block_start', 'index': 0,
+                                      'content_block': {'type': 'text', 'text': ''}}
+        for index in range(tokens):
+            yield 'content_block_delta', {'type': 'content_block_delta', 'index': 0,
+                                          'delta': {'type': 'text_delta', 'text': f' tok{index}'}}
+        yield 'content_block_stop', {'type': 'content_block_stop', 'index': 0}
+        yield 'message_delta', {'type': 'message_delta', 'delta': {'stop_reason': 'end_turn'},
+                                'usage': {'output_tokens': tokens}}
+        yield 'message_stop', {'type': 'message_stop'}
+    elif kind == 'openai':
+        yield None, {'type': 'response.created', 'response': {'id': 'resp_load', 'model': model}}
+        for index in range(tokens):
+            yield None, {'type': 'response.output_text.delta', 'delta': f' tok{index}'}
+        yield None, {'type': 'response.completed', 'response': {
+            'id': 'resp_load', 'model': model,
+            'usage': {'input_tokens': 120, 'output_tokens': tokens, 'total_tokens': 120 + tokens}
+        }}
+    else:
+        for index in range(tokens):
+            yield None, {'candidates': [{'content': {'role': 'model', 'parts': [{'text': f' tok{index}'}]}}],
+                         'modelVersion': model}
+        yield None, {'candidates': [{'content': {'role': 'model', 'parts': [{'text': ''}]}, 'finishReason': 'STOP'}],
+                     'modelVersion': model,
+                     'usageMetadata': {'promptTokenCount': 120, 'candidatesTokenCount': tokens,
+                                       'totalTokenCount': 120 + tokens}}
+
+
+def encode_chunk(data):
+    return b'%x\r\n%s\r\n' % (len(data), data)
+
+
+async def read_request(reader):
+    """One HTTP/1.1 request with a Content-Length body; IncompleteReadError once the peer has closed."""
+    head = await reader.readuntil(b'\r\n\r\n')
+    request_line, *header_lines = head.decode('latin-1').split('\r\n')
+    headers = {}
+    for line in header_lines:
+        name, _, value = line.partition(':')
+        if name:
+            headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get('content-length') or 0))
+    method, path, _ = request_line.split(' ', 2)
+    return {'method': method, 'path': path, 'headers': headers, 'body': body}
+
+
+class StubUpstream:
+    """Streams canned completions and counts requests per API key, i.e. per proxy channel."""
+
+    def __init__(self, kind, options):
+        self.kind = kind
+        self.options = options
+        self.rng = random.Random(f'{options["seed"]}:{kind}')
+        self.hits = {}
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except asyncio.IncompleteReadError:
+                    break
+                keep_alive = request['headers'].get('connection', '').lower() != 'close'
+                await self.respond(request, writer, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, request, writer, keep_alive):
+        if request['path'].startswith('/__stats'):
+            hits = self.hits
+            if request['path'].startswith('/__stats/reset'):
+                self.hits = {}
+            await self.write_json(writer, 200, hits, keep_alive)
+            return
+        headers = request['headers']
+        key = headers.get('x-api-key') or headers.get('authorization', '').replace('Bearer ', '') or 'unknown'
+        self.hits[key] = self.hits.get(key, 0) + 1
+        options = self.options
+        await asyncio.sleep(options['latency'] * self.rng.uniform(1 - options['jitter'], 1 + options['jitter']))
+        if self.rng.random() < options['error_rate']:
+            status = 529 if self.kind == 'anthropic' else 500
+            await self.write_json(writer, status, {'error': {'type': 'overloaded_error', 'message': 'stub error'}},
+                                  keep_alive)
+            return
+        writer.write(
+            b'HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n'
+            b'Transfer-Encoding: chunked\r\nConnection: ' + (b'keep-alive' if keep_alive else b'close') + b'\r\n\r\n'
+        )
+        interval = 1 / options['token_rate'] if options['token_rate'] > 0 else 0
+        for event, payload in sse_events(self.kind, options['model'][self.kind], options['tokens']):
+            frame = f'event: {event}\n' if event else ''
+            frame += f'data: {json.dumps(payload)}\n\n'
+            writer.write(encode_chunk(frame.encode('utf-8')))
+            if interval:
+                await writer.drain()
+                await asyncio.sleep(interval)
+        writer.write(b'0\r\n\r\n')
+        await writer.drain()
+
+    @staticmethod
+    async def write_json(writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode('utf-8')
+        writer.write(
+            b'HTTP/1.1 %d Stub\r\nContent-Type: application/json\r\nContent-Length: %d\r\nConnection: %s\r\n\r\n'
+            % (status, len(body), b'keep-alive' if keep_alive else b'close') + body
+        )
+        await writer.drain()
+
+
+def run_stubs(options, ports):
+    """Entry point of the stub process: one server per upstream flavour, ports reported through ``ports``."""
+    async def serve():
+        servers = {}
+        for kind in ('anthropic', 'openai', 'gemini'):
+            stub = StubUpstream(kind, options)
+            servers[kind] = await asyncio.start_server(stub.handle, '127.0.0.1', 0, backlog=1024)
+        ports.put({kind: server.sockets[0].getsockname()[1] for kind, server in servers.items()})
+        await asyncio.gather(*(server.serve_forever() for server in servers.values()))
+
+    asyncio.run(serve())
+
+
+# ---------------------------------------------------------------------------
+# Proxy process
+# ---------------------------------------------------------------------------
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def write_json_file(path, payload):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(payload, indent=2), encoding='utf-8')
+
+
+def channel_key(cli, index):
+    return f'load-{cli}-{index}'
+
+
+def seed_app_dir(home, clis, stub_ports, weights, max_concurrency):
+    """Write config.json and the channel files for an isolated CCTOOLBOX_HOME; returns the proxy ports."""
+    app_dir = home / '.cctoolbox'
+    ports = {'webUI': free_port(), 'proxy': free_port(), 'codexProxy': free_port(), 'geminiProxy': free_port()}
+    write_json_file(app_dir / 'config.json', {'ports': ports})
+    files = {'claude': 'channels.json', 'codex': 'codex-channels.json', 'gemini': 'gemini-channels.json'}
+    for cli in clis:
+        target = TARGETS[cli]
+        base_url = f'http://127.0.0.1:{stub_ports[target["upstream"]]}{target["base_suffix"]}'
+        channels = []
+        for index, weight in enumerate(weights):
+            channels.append({
+                'id': f'{cli}-channel-{index}',
+                'name': f'stub-{index}',
+                'providerKey': f'stub{index}',
+                'baseUrl': base_url,
+                'apiKey': channel_key(cli, index),
+                'enabled': True,
+                'weight': weight,
+                'maxConcurrency': max_concurrency
+            })
+        write_json_file(app_dir / files[cli], {'channels': channels})
+    return ports
+
+
+def log_tail(home, lines=20):
+    text = (home / 'proxy.log').read_text(encoding='utf-8', errors='replace')
+    return '\n'.join(text.splitlines()[-lines:])
+
+
+def start_proxies(home, clis, ports):
+    env = dict(os.environ, HOME=str(home), CCTOOLBOX_HOME=str(home))
+    log = open(home / 'proxy.log', 'wb')
+    process = subprocess.Popen(['node', '-e', PROXY_LAUNCHER, str(REPO_ROOT), ','.join(clis)],
+                               cwd=str(REPO_ROOT), env=env, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.time() + READY_TIMEOUT_SECONDS
+    pending = [ports[TARGETS[cli]['port_key']] for cli in clis]
+    while pending:
+        if process.poll() is not None:
+            raise RuntimeError(f'proxy process exited with {process.returncode}:\n{log_tail(home)}')
+        if time.time() > deadline:
+            process.terminate()
+            raise RuntimeError(f'proxies not listening after {READY_TIMEOUT_SECONDS}s:\n{log_tail(home)}')
+        try:
+            socket.create_connection(('127.0.0.1', pending[0]), timeout=0.5).close()
+            pending.pop(0)
+        except OSError:
+            time.sleep(0.1)
+    return process
+
+
+def read_rss_kb(pid):
+    try:
+        with open(f'/proc/{pid}/status', encoding='utf-8') as handle:
+            for line in handle:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    try:
+        return int(subprocess.run(['ps', '-o', 'rss=', '-p', str(pid)], capture_output=True, text=True).stdout.strip())
+    except (OSError, ValueError):
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Load driver
+# ---------------------------------------------------------------------------
+
+def request_body(cli, tokens, session_id):
+    if cli == 'claude':
+        body = {'model': 'claude-sonnet-4-5-20250929', 'max_tokens': tokens, 'stream': True,
+                'messages': [{'role': 'user', 'content': 'load test'}]}
+        if session_id:
+            body['metadata'] = {'session_id': session_id}
+        return body
+    if cli == 'codex':
+        return {'model': 'gpt-5.5', 'stream': True, 'input': [{'role': 'user', 'content': 'load test'}]}
+    return {'contents': [{'role': 'user', 'parts': [{'text': 'load test'}]}]}
+
+
+async def send_request(port, path, body, api_key, done_marker):
+    """POST one streaming request and read the response to the end; times are in milliseconds."""
+    payload = json.dumps(body).encode('utf-8')
+    started = time.perf_counter()
+    result = {'status': 0, 'ttfb': None, 'total': None, 'bytes': 0, 'complete': False}
+    try:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    except OSError:
+        result['status'] = -1
+        return result
+    try:
+        writer.write(
+            f'POST {path} HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\nContent-Type: application/json\r\n'
+            f'Content-Length: {len(payload)}\r\nx-api-key: {api_key}\r\nAuthorization: Bearer {api_key}\r\n'
+            f'Connection: close\r\n\r\n'.encode('latin-1') + payload
+        )
+        await writer.drain()
+        tail = b''
+        while True:
+            chunk = await reader.read(65536)
+            if not chunk:
+                break
+            if result['ttfb'] is None:
+                result['ttfb'] = (time.perf_counter() - started) * 1000
+                status_line = chunk.split(b'\r\n', 1)[0].split()
+                result['status'] = int(status_line[1]) if len(status_line) > 1 else 0
+            result['bytes'] += len(chunk)
+            tail = (tail + chunk)[-TAIL_BYTES:]
+        result['complete'] = done_marker in tail
+    except (ConnectionError, ValueError):
+        result['status'] = result['status'] or -1
+    finally:
+        writer.close()
+    result['total'] = (time.perf_counter() - started) * 1000
+    return result
+
+
+def percentile(ordered, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    return ordered[max(-(-pct * len(ordered) // 100) - 1, 0)]
+
+
+def latency_summary(samples):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    summary = {f'p{pct}': round(percentile(ordered, pct), 1) for pct in PERCENTILES}
+    summary['max'] = round(ordered[-1], 1)
+    return summary
+
+
+async def drive(port, cli, args, api_key, rss_pid=None):
+    """Keep ``args.concurrency`` requests in flight until ``args.requests`` have finished."""
+    target = TARGETS[cli]
+    remaining = args.requests
+    results = []
+    rss = []
+
+    async def worker(index):
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            session_id = f'load-session-{len(results) % args.session_ids}' if args.session_ids else None
+            body = request_body(cli, args.tokens, session_id)
+            results.append(await send_request(port, target['path'], body, api_key, target['done']))
+
+    async def sample_rss():
+        while True:
+            value = read_rss_kb(rss_pid)
+            if value is not None:
+                rss.append(value)
+            await asyncio.sleep(RSS_SAMPLE_SECONDS)
+
+    sampler = asyncio.ensure_future(sample_rss()) if rss_pid else None
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(index) for index in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    if sampler:
+        sampler.cancel()
+    ok = [item for item in results if item['status'] == 200 and item['complete']]
+    statuses = {}
+    for item in results:
+        key = str(item['status']) if item['status'] != 200 or item['complete'] else 'truncated'
+        statuses[key] = statuses.get(key, 0) + 1
+    return {
+        'requests': len(results),
+        'ok': len(ok),
+        'statuses': statuses,
+        'elapsedSeconds': round(elapsed, 3),
+        'requestsPerSecond': round(len(results) / elapsed, 1) if elapsed else None,
+        'ttfbMs': latency_summary([item['ttfb'] for item in ok]),
+        'totalMs': latency_summary([item['total'] for item in ok]),
+        'bytes': sum(item['bytes'] for item in results),
+        'rssKb': rss
+    }
+
+
+async def fetch_stub_stats(port, reset=False):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f'GET /__stats{"/reset" if reset else ""} HTTP/1.1\r\nHost: stub\r\nConnection: close\r\n\r\n'.encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return json.loads(response.split(b'\r\n\r\n', 1)[1] or b'{}')
+
+
+def channel_distribution(cli, hits, weights):
+    total_hits = sum(hits.values()) or 1
+    total_weight = sum(weights)
+    return {
+        f'stub-{index}': {
+            'requests': hits.get(channel_key(cli, index), 0),
+            'share': round(hits.get(channel_key(cli, index), 0) / total_hits, 3),
+            'expected': round(weight / total_weight, 3)
+        }
+        for index, weight in enumerate(weights)
+    }
+
+
+def memory_summary(before_kb, samples, after_kb):
+    if before_kb is None:
+        return None
+    return {
+        'beforeKb': before_kb,
+        'peakKb': max(samples + [before_kb]),
+        'afterKb': after_kb,
+        'growthKb': (after_kb - before_kb) if after_kb is not None else None
+    }
+
+
+async def run_cli(cli, args, proxy_ports, stub_ports, proxy_pid):
+    target = TARGETS[cli]
+    proxy_port = proxy_ports[target['port_key']]
+    stub_port = stub_ports[target['upstream']]
+    warmup = argparse.Namespace(**{**vars(args), 'requests': min(args.warmup, args.requests)})
+    if warmup.requests:
+        await drive(proxy_port, cli, warmup, 'client-key')
+    await fetch_stub_stats(stub_port, reset=True)
+    before_kb = read_rss_kb(proxy_pid)
+    proxied = await drive(proxy_port, cli, args, 'client-key', rss_pid=proxy_pid)
+    await asyncio.sleep(args.settle)
+    after_kb = read_rss_kb(proxy_pid)
+    hits = await fetch_stub_stats(stub_port, reset=True)
+    report = {
+        'proxy': {key: value for key, value in proxied.items() if key != 'rssKb'},
+        'channels': channel_distribution(cli, hits, args.weights),
+        'memory': memory_summary(before_kb, proxied['rssKb'], after_kb)
+    }
+    if args.baseline:
+        baseline = await drive(stub_port, cli, args, channel_key(cli, 0))
+        await fetch_stub_stats(stub_port, reset=True)
+        baseline.pop('rssKb')
+        report['baseline'] = baseline
+        if proxied['ttfbMs'] and baseline['ttfbMs']:
+            report['addedMs'] = {
+                metric: {pct: round(proxied[metric][pct] - baseline[metric][pct], 1) for pct in ('p50', 'p99')}
+                for metric in ('ttfbMs', 'totalMs')
+            }
+    return report
+
+
+def print_summary(cli, report):
+    proxy = report['proxy']
+    ttfb = proxy['ttfbMs'] or {}
+    print(f'[{cli}] {proxy["ok"]}/{proxy["requests"]} ok, {proxy["requestsPerSecond"]} req/s, '
+          f'ttfb p50 {ttfb.get("p50")} ms p99 {ttfb.get("p99")} ms, statuses {proxy["statuses"]}', file=sys.stderr)
+    if 'addedMs' in report:
+        added = report['addedMs']['ttfbMs']
+        print(f'[{cli}] proxy adds ttfb p50 {added["p50"]} ms p99 {added["p99"]} ms over the direct stub', file=sys.stderr)
+    shares = ', '.join(f'{name} {item["share"]:.0%} (expected {item["expected"]:.0%})'
+                       for name, item in report['channels'].items())
+    print(f'[{cli}] channels: {shares}', file=sys.stderr)
+    if report['memory']:
+        memory = report['memory']
+        print(f'[{cli}] proxy rss {memory["beforeKb"]} -> peak {memory["peakKb"]} -> {memory["afterKb"]} KB',
+              file=sys.stderr)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Offline load test for the Claude/Codex/Gemini proxy servers')
+    parser.add_argument('--cli', default=','.join(CLI_TYPES), help='Proxies to load, comma-separated')
+    parser.add_argument('--concurrency', type=int, default=20, help='Requests kept in flight')
+    parser.add_argument('--requests', type=int, default=500, help='Measured requests per proxy')
+    parser.add_argument('--warmup', type=int, default=20, help='Unmeasured requests sent first')
+    parser.add_argument('--channels', type=int, default=3, help='Channels configured per proxy')
+    parser.add_argument('--weights', default='', help='Comma-separated channel weights (default: all 1)')
+    parser.add_argument('--max-concurrency', type=int, default=None, help='Per-channel maxConcurrency')
+    parser.add_argument('--session-ids', type=int, default=0,
+                        help='Spread Claude requests over this many session ids to exercise session binding')
+    parser.add_argument('--latency', type=float, default=50, help='Stub time to first byte in ms')
+    parser.add_argument('--jitter', type=float, default=0.2, help='Relative +/- jitter on the stub latency')
+    parser.add_argument('--tokens', type=int, default=50, help='Tokens streamed per response')
+    parser.add_argument('--token-rate', type=float, default=200, help='Tokens per second per stream, 0 for a burst')
+    parser.add_argument('--error-rate', type=float, default=0, help='Fraction of stub responses that are 5xx')
+    parser.add_argument('--settle', type=float, default=1, help='Seconds to wait before the final RSS sample')
+    parser.add_argument('--no-baseline', dest='baseline', action='store_false',
+                        help='Skip the direct-to-stub run used to compute the added latency')
+    parser.add_argument('--report', help='Write the JSON report to this path as well as stdout')
+    parser.add_argument('--keep-home', action='store_true', help='Keep the temporary CCTOOLBOX_HOME for inspection')
+    parser.add_argument('--seed', default='cctoolbox', help='Random seed for the stub latency and errors')
+    args = parser.parse_args()
+    args.cli = [cli for cli in args.cli.split(',') if cli]
+    unknown = [cli for cli in args.cli if cli not in CLI_TYPES]
+    if unknown:
+        parser.error(f'unknown --cli value: {", ".join(unknown)}')
+    args.weights = [int(weight) for weight in args.weights.split(',') if weight] or [1] * args.channels
+    return args
+
+
+def main():
+    args = parse_args()
+    options = {
+        'latency': args.latency / 1000,
+        'jitter': min(max(args.jitter, 0), 1),
+        'tokens': args.tokens,
+        'token_rate': args.token_rate,
+        'error_rate': args.error_rate,
+        'seed': args.seed,
+        'model': {'anthropic': 'claude-sonnet-4-5-20250929', 'openai': 'gpt-5.5', 'gemini': 'gemini-2.5-pro'}
+    }
+    home = Path(tempfile.mkdtemp(prefix='cctoolbox-load-'))
+    port_queue = multiprocessing.Queue()
+    stubs = multiprocessing.Process(target=run_stubs, args=(options, port_queue), daemon=True)
+    stubs.start()
+    proxy = None
+    try:
+        stub_ports = port_queue.get(timeout=READY_TIMEOUT_SECONDS)
+        proxy_ports = seed_app_dir(home, args.cli, stub_ports, args.weights, args.max_concurrency)
+        proxy = start_proxies(home, args.cli, proxy_ports)
+        report = {
+            'config': {key: value for key, value in vars(args).items() if key not in ('report', 'keep_home')},
+            'results': {}
+        }
+        for cli in args.cli:
+            report['results'][cli] = asyncio.run(run_cli(cli, args, proxy_ports, stub_ports, proxy.pid))
+            print_summary(cli, report['results'][cli])
+        output = json.dumps(report, indent=2)
+        print(output)
+        if args.report:
+            Path(args.report).write_text(output + '\n', encoding='utf-8')
+    finally:
+        if proxy:
+            proxy.terminate()
+            proxy.wait(timeout=10)
+        stubs.terminate()
+        if args.keep_home:
+            print(f'CCTOOLBOX_HOME kept at {home}', file=sys.stderr)
+        else:
+            shutil.rmtree(home, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
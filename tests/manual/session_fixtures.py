@@ -0,0 +1,264 @@
+"""Writers for the Claude, Codex and Gemini on-disk session formats, plus a generator that seeds a
+HOME directory at production scale.
+
+    python3 tests/manual/session_fixtures.py --home /tmp/cct-seed --projects 300 --sessions 20000 \\
+        --messages 2:400 --message-bytes 40:8000 --large-ratio 0.005 --mtime-days 180
+
+Every batch of sessions gets its own random seed derived from ``--seed``, so a run is reproducible
+regardless of how the batches land on the process pool.
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+CLI_TYPES = ('claude', 'codex', 'gemini')
+BATCH_SIZE = 200
+FILLER_WORDS = (
+    'session', 'project', 'channel', 'proxy', 'render', 'symbol', 'trash', 'restore', 'search', 'token',
+    'request', 'response', 'config', 'cache', 'update', 'release', 'build', 'deploy', 'latency', 'index',
+    'function', 'module', 'import', 'return', 'error', 'retry', 'stream', 'buffer', 'commit', 'branch'
+)
+
+
+def write_jsonl(file_path, records):
+    # Compact like the CLIs' own transcripts; codex-parser.js counts messages by the literal '"type":"response_item"'.
+    content = '\n'.join(json.dumps(record, ensure_ascii=False, separators=(',', ':')) for record in records) + '\n'
+    file_path.write_text(content, encoding='utf-8')
+
+
+def iso_time(timestamp):
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+def write_claude_session(project_dir, session_id, user_text, assistant_text, mtime=None, messages=None, cwd=None):
+    """``messages`` is an optional list of (role, text) pairs that replaces the single user/assistant turn."""
+    timestamp = mtime if mtime is not None else time.time()
+    turns = messages or [('user', user_text), ('assistant', assistant_text)]
+    records = []
+    parent_uuid = None
+    for index, (role, text) in enumerate(turns):
+        record_uuid = str(uuid.uuid5(uuid.NAMESPACE_OID, f'{session_id}:{index}'))
+        record = {
+            'type': role,
+            'timestamp': iso_time(timestamp - (len(turns) - index)),
+            'sessionId': session_id,
+            'uuid': record_uuid,
+            'parentUuid': parent_uuid,
+            'message': {'role': role, 'content': text}
+        }
+        if cwd:
+            record['cwd'] = cwd
+        records.append(record)
+        parent_uuid = record_uuid
+    session_path = project_dir / f'{session_id}.jsonl'
+    write_jsonl(session_path, records)
+    if mtime is not None:
+        os.utime(session_path, (mtime, mtime))
+    return session_path
+
+
+def write_codex_session(codex_dir, session_id, cwd, user_text, mtime=None, messages=None):
+    codex_dir.mkdir(parents=True, exist_ok=True)
+    started = mtime - 60 if mtime is not None else datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp()
+    turns = messages or [('user', user_text)]
+    records = [{
+        'type': 'session_meta',
+        'timestamp': iso_time(started),
+        'payload': {
+            'id': session_id,
+            'timestamp': iso_time(started),
+            'cwd': cwd
+        }
+    }]
+    for index, (role, text) in enumerate(turns):
+        records.append({
+            'type': 'response_item',
+            'timestamp': iso_time(started + index + 1),
+            'payload': {
+                'type': 'message',
+                'role': role,
+                'content': [{'type': 'input_text' if role == 'user' else 'output_text', 'text': text}]
+            }
+        })
+    stamp = datetime.fromtimestamp(started, tz=timezone.utc).strftime('%Y-%m-%dT%H-%M-%S')
+    path = codex_dir / f'rollout-{stamp}-{session_id}.jsonl'
+    write_jsonl(path, records)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+def write_gemini_session(gemini_dir, project_hash, session_id, user_text, mtime=None, messages=None, file_name=None):
+    gemini_dir.mkdir(parents=True, exist_ok=True)
+    timestamp = mtime if mtime is not None else time.time()
+    turns = messages or [('user', user_text), ('model', 'hello from gemini')]
+    payload = {
+        'sessionId': session_id,
+        'projectHash': project_hash,
+        'startTime': iso_time(timestamp - len(turns)),
+        'lastUpdated': iso_time(timestamp),
+        'messages': [{'type': role, 'content': text} for role, text in turns]
+    }
+    path = gemini_dir / (file_name or 'session-2025-01-01T00-00-00-abcd.json')
+    path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding='utf-8')
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+def parse_range(value):
+    """``"2:400"`` -> (2, 400); a single number means a fixed value."""
+    low, _, high = value.partition(':')
+    low = int(float(low))
+    high = int(float(high)) if high else low
+    if low < 1 or high < low:
+        raise argparse.ArgumentTypeError(f'invalid range: {value}')
+    return low, high
+
+
+def log_uniform(rng, low, high):
+    """Heavy-tailed draw: most values sit near ``low``, a few reach ``high``, like real transcripts."""
+    if low == high:
+        return low
+    return int(math.exp(rng.uniform(math.log(low), math.log(high + 1)))) or 1
+
+
+def project_weights(count, skew):
+    return [1 / ((rank + 1) ** skew) for rank in range(count)]
+
+
+def project_names(cli, count, prefix='seed'):
+    if cli == 'claude':
+        return [f'-{prefix}-project-{index:04d}' for index in range(count)]
+    if cli == 'codex':
+        return [f'codex-{prefix}-{index:04d}' for index in range(count)]
+    return [hashlib.sha256(f'gemini-{prefix}-{index}'.encode('utf-8')).hexdigest() for index in range(count)]
+
+
+def make_text(rng, filler, size, marker=''):
+    start = rng.randrange(len(filler) - 1)
+    text = (filler * (size // len(filler) + 2))[start:start + size]
+    return f'{marker} {text}' if marker else text
+
+
+def write_batch(task):
+    """Write one batch of sessions; runs in a worker process. Returns (cli, sessions, bytes)."""
+    home = Path(task['home'])
+    rng = random.Random(task['seed'])
+    filler = ' '.join(rng.choice(FILLER_WORDS) for _ in range(8192))
+    written = 0
+    for project_index in task['projects']:
+        project = task['names'][project_index]
+        session_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+        large = rng.random() < task['large_ratio']
+        message_count = log_uniform(rng, *task['messages'])
+        turns = []
+        for index in range(message_count):
+            role = 'user' if index % 2 == 0 else ('model' if task['cli'] == 'gemini' else 'assistant')
+            size = task['large_bytes'] // message_count if large else log_uniform(rng, *task['message_bytes'])
+            turns.append((role, make_text(rng, filler, size, f'seed {session_id}' if index == 0 else '')))
+        mtime = task['now'] - task['mtime_days'] * 86400 * rng.random() ** 2
+        if task['cli'] == 'claude':
+            project_dir = home / '.claude' / 'projects' / project
+            project_dir.mkdir(parents=True, exist_ok=True)
+            path = write_claude_session(project_dir, session_id, '', '', mtime=mtime, messages=turns,
+                                        cwd='/' + project.lstrip('-').replace('-', '/', 1))
+        elif task['cli'] == 'codex':
+            day = datetime.fromtimestamp(mtime - 60, tz=timezone.utc)
+            codex_dir = home / '.codex' / 'sessions' / f'{day:%Y}' / f'{day:%m}' / f'{day:%d}'
+            path = write_codex_session(codex_dir, session_id, f'/tmp/{project}', '', mtime=mtime, messages=turns)
+        else:
+            gemini_dir = home / '.gemini' / 'tmp' / project / 'chats'
+            stamp = datetime.fromtimestamp(mtime, tz=timezone.utc).strftime('%Y-%m-%dT%H-%M')
+            path = write_gemini_session(gemini_dir, project, session_id, '', mtime=mtime, messages=turns,
+                                        file_name=f'session-{stamp}-{session_id[:8]}.json')
+        written += path.stat().st_size
+    return task['cli'], len(task['projects']), written
+
+
+def plan_batches(args):
+    """Assign every session to a project (Zipf-skewed) and cut the assignments into pool-sized batches."""
+    rng = random.Random(args.seed)
+    now = time.time()
+    tasks = []
+    for cli in args.cli:
+        names = project_names(cli, args.projects, args.prefix)
+        assignments = rng.choices(range(args.projects), weights=project_weights(args.projects, args.project_skew),
+                                  k=args.sessions)
+        for offset in range(0, len(assignments), BATCH_SIZE):
+            tasks.append({
+                'home': str(args.home),
+                'cli': cli,
+                'names': names,
+                'projects': assignments[offset:offset + BATCH_SIZE],
+                'seed': f'{args.seed}:{args.prefix}:{cli}:{offset}',
+                'now': now,
+                'messages': args.messages,
+                'message_bytes': args.message_bytes,
+                'large_ratio': args.large_ratio,
+                'large_bytes': args.large_bytes,
+                'mtime_days': args.mtime_days
+            })
+    return tasks
+
+
+def generate(args):
+    """Seed ``args.home`` and return a summary with per-CLI counts and the busiest project names."""
+    started = time.time()
+    tasks = plan_batches(args)
+    summary = {cli: {'sessions': 0, 'bytes': 0} for cli in args.cli}
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for cli, sessions, written in pool.map(write_batch, tasks):
+            summary[cli]['sessions'] += sessions
+            summary[cli]['bytes'] += written
+    for cli in args.cli:
+        names = project_names(cli, args.projects, args.prefix)
+        summary[cli]['projects'] = len({project for task in tasks if task['cli'] == cli for project in task['projects']})
+        # Rank 0 has the highest Zipf weight, so it is the largest project for list/search tests.
+        summary[cli]['largestProject'] = names[0]
+    summary['home'] = str(args.home)
+    summary['elapsedSeconds'] = round(time.time() - started, 2)
+    return summary
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Generate Claude/Codex/Gemini session fixtures at scale')
+    parser.add_argument('--home', type=Path, required=True, help='HOME to seed (.claude, .codex and .gemini are created inside)')
+    parser.add_argument('--cli', type=lambda value: [item for item in value.split(',') if item], default=list(CLI_TYPES),
+                        help='Comma-separated formats to generate (default: claude,codex,gemini)')
+    parser.add_argument('--projects', type=int, default=50, help='Projects per CLI')
+    parser.add_argument('--sessions', type=int, default=2000, help='Sessions per CLI')
+    parser.add_argument('--project-skew', type=float, default=1.1,
+                        help='Zipf exponent for sessions per project; 0 spreads them evenly')
+    parser.add_argument('--messages', type=parse_range, default=(2, 200), help='Messages per session, MIN:MAX (log-uniform)')
+    parser.add_argument('--message-bytes', type=parse_range, default=(40, 4000),
+                        help='Bytes per message, MIN:MAX (log-uniform)')
+    parser.add_argument('--large-ratio', type=float, default=0.002, help='Fraction of sessions written as large transcripts')
+    parser.add_argument('--large-bytes', type=int, default=4 * 1024 * 1024, help='Size of a large transcript')
+    parser.add_argument('--mtime-days', type=float, default=90, help='Spread of file mtimes into the past, skewed to recent')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes')
+    parser.add_argument('--prefix', default='seed', help='Project name prefix, to seed several independent sets into one HOME')
+    parser.add_argument('--seed', default='cctoolbox', help='Random seed')
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    unknown = [cli for cli in args.cli if cli not in CLI_TYPES]
+    if unknown:
+        print(f'unknown --cli value: {", ".join(unknown)}', file=sys.stderr)
+        sys.exit(2)
+    print(json.dumps(generate(args), ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
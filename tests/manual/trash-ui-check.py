@@ -1,81 +1,32 @@
+import argparse
+import hashlib
+import inspect
 import json
 import os
+import shutil
+import socket
+import subprocess
+import tempfile
 import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from pathlib import Path
 
 from playwright.sync_api import sync_playwright, expect
 
+import session_fixtures
+from session_fixtures import build_parser as build_fixture_parser
+from session_fixtures import generate, write_claude_session, write_codex_session, write_gemini_session
 
-def write_jsonl(file_path, records):
-    content = '\n'.join(json.dumps(record, ensure_ascii=False) for record in records) + '\n'
-    file_path.write_text(content, encoding='utf-8')
-
-
-def write_claude_session(project_dir, session_id, user_text, assistant_text, mtime=None):
-    now = datetime.utcnow().isoformat() + 'Z'
-    records = [
-        {
-            'type': 'user',
-            'timestamp': now,
-            'message': {'content': user_text}
-        },
-        {
-            'type': 'assistant',
-            'timestamp': now,
-            'message': {'content': assistant_text}
-        }
-    ]
-    session_path = project_dir / f'{session_id}.jsonl'
-    write_jsonl(session_path, records)
-    if mtime is not None:
-        os.utime(session_path, (mtime, mtime))
-
-
-def write_codex_session(codex_dir, session_id, cwd, user_text):
-    codex_dir.mkdir(parents=True, exist_ok=True)
-    meta = {
-        'type': 'session_meta',
-        'payload': {
-            'id': session_id,
-            'timestamp': '2025-01-01T00:00:00Z',
-            'cwd': cwd
-        }
-    }
-    msg = {
-        'type': 'response_item',
-        'timestamp': '2025-01-01T00:00:10Z',
-        'payload': {
-            'type': 'message',
-            'role': 'user',
-            'content': [{'text': user_text}]
-        }
-    }
-    path = codex_dir / f'rollout-2025-01-01T00-00-00-{session_id}.jsonl'
-    write_jsonl(path, [meta, msg])
-
-
-def write_gemini_session(gemini_dir, project_hash, session_id, user_text):
-    gemini_dir.mkdir(parents=True, exist_ok=True)
-    payload = {
-        'sessionId': session_id,
-        'projectHash': project_hash,
-        'startTime': datetime.utcnow().isoformat() + 'Z',
-        'lastUpdated': datetime.utcnow().isoformat() + 'Z',
-        'messages': [
-            {'type': 'user', 'content': user_text},
-            {'type': 'model', 'content': 'hello from gemini'}
-        ]
-    }
-    path = gemini_dir / 'session-2025-01-01T00-00-00-abcd.json'
-    path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding='utf-8')
-
+REPO_ROOT = Path(__file__).resolve().parents[2]
+SNAPSHOT_ROOT = Path(tempfile.gettempdir()) / 'cctoolbox-ui-fixtures'
+BACKEND_READY_SECONDS = 60
+BACKEND_LAUNCHER = "require(process.argv[1] + '/src/server/index').startServer(Number(process.argv[2]))"
 
-def seed_data():
-    home = Path(os.environ.get('HOME', ''))
-    if not home:
-        raise RuntimeError('HOME is not set')
 
+def seed_data(home):
     claude_project = 'demo-project'
     claude_dir = home / '.claude' / 'projects' / claude_project
     claude_dir.mkdir(parents=True, exist_ok=True)
@@ -110,6 +61,113 @@ def seed_data():
     return claude_project, codex_project, gemini_project, old_session_id
 
 
+def snapshot_key():
+    """Changes whenever the seed data or the session writers change, so stale snapshots are never reused."""
+    digest = hashlib.sha256(inspect.getsource(seed_data).encode('utf-8'))
+    digest.update(Path(session_fixtures.__file__).read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def build_snapshot(rebuild=False):
+    """Seed the fixtures once into a shared snapshot directory and return it.
+
+    The snapshot is built in a private directory and renamed into place, so concurrent runs on one
+    machine either reuse a complete snapshot or race harmlessly to create the same one.
+    """
+    snapshot = SNAPSHOT_ROOT / snapshot_key()
+    if rebuild:
+        shutil.rmtree(snapshot, ignore_errors=True)
+    if (snapshot / 'manifest.json').exists():
+        return snapshot
+    SNAPSHOT_ROOT.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(prefix='building-', dir=SNAPSHOT_ROOT))
+    claude_project, codex_project, gemini_project, old_session_id = seed_data(staging / 'home')
+    manifest = {
+        'builtAt': time.time(),
+        'claude': claude_project,
+        'codex': codex_project,
+        'gemini': gemini_project,
+        'oldSessionId': old_session_id
+    }
+    (staging / 'manifest.json').write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+    try:
+        os.rename(staging, snapshot)
+    except OSError:
+        shutil.rmtree(staging, ignore_errors=True)
+        if not (snapshot / 'manifest.json').exists():
+            raise
+    return snapshot
+
+
+def load_manifest(snapshot):
+    return json.loads((snapshot / 'manifest.json').read_text(encoding='utf-8'))
+
+
+def restore_snapshot(snapshot, home):
+    """Copy the snapshot into ``home`` and shift every mtime by the snapshot's age, keeping relative ages
+    intact (the 30-day cleanup check depends on them)."""
+    shutil.copytree(snapshot / 'home', home, dirs_exist_ok=True)
+    shift = time.time() - load_manifest(snapshot)['builtAt']
+    for root, _, files in os.walk(home):
+        for name in files:
+            path = os.path.join(root, name)
+            stat = os.stat(path)
+            os.utime(path, (stat.st_atime + shift, stat.st_mtime + shift))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_backend(process, base_url, log_path):
+    deadline = time.time() + BACKEND_READY_SECONDS
+    delay = 0.05
+    while True:
+        if process.poll() is not None:
+            raise RuntimeError(f'backend exited with {process.returncode}:\n{log_path.read_text(errors="replace")[-2000:]}')
+        try:
+            with urllib.request.urlopen(f'{base_url}/health', timeout=2) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            pass
+        if time.time() > deadline:
+            raise RuntimeError(f'backend not ready after {BACKEND_READY_SECONDS}s:\n{log_path.read_text(errors="replace")[-2000:]}')
+        time.sleep(delay)
+        delay = min(delay * 2, 1)
+
+
+@contextmanager
+def isolated_backend(name, prepare):
+    """A backend on a free port whose HOME is a private temp dir filled by ``prepare(home)``; yields its base URL.
+    The real HOME is never read or written, and the temp HOME is removed afterwards."""
+    if not (REPO_ROOT / 'dist' / 'web' / 'index.html').exists():
+        raise RuntimeError('dist/web 不存在，请先运行: npm run build:web')
+    home = Path(tempfile.mkdtemp(prefix=f'cctoolbox-ui-{name}-'))
+    log_path = home / 'backend.log'
+    process = None
+    try:
+        prepare(home)
+        port = free_port()
+        env = dict(os.environ, HOME=str(home), CCTOOLBOX_HOME=str(home))
+        with open(log_path, 'wb') as log:
+            process = subprocess.Popen(['node', '-e', BACKEND_LAUNCHER, str(REPO_ROOT), str(port)], cwd=str(REPO_ROOT),
+                                       env=env, stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT)
+        base_url = f'http://127.0.0.1:{port}'
+        wait_for_backend(process, base_url, log_path)
+        yield base_url
+    finally:
+        if process and process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        shutil.rmtree(home, ignore_errors=True)
+
+
 def open_clear_menu(page):
     page.get_by_role('button', name='清除历史').click()
 
@@ -150,8 +208,11 @@ def assert_sticky(page):
     if abs(info['barTop'] - expected_top) > 2:
         raise AssertionError('selection-bar 顶部偏移异常')
 
-    page.evaluate("document.querySelector('.content').scrollTop = 800")
-    time.sleep(0.3)
+    # Wait for the scroll to be laid out and painted instead of sleeping.
+    page.evaluate("""async () => {
+        document.querySelector('.content').scrollTop = 800;
+        await new Promise(resolve => requestAnimationFrame(() => requestAnimationFrame(resolve)));
+    }""")
     info_after = get_sticky_info(page)
     expected_top_after = info_after['contentTop'] + 8
     if abs(info_after['barTop'] - expected_top_after) > 2:
@@ -180,9 +241,8 @@ def open_trash(page):
     page.locator('.n-dropdown-option').filter(has_text='回收站').first.click()
 
 
-def test_claude(page, project_name, old_session_id):
-    page.goto(f'http://localhost:5000/#/claude/sessions/{project_name}')
-    page.wait_for_load_state('networkidle')
+def test_claude(page, base_url, project_name, old_session_id):
+    page.goto(f'{base_url}/#/claude/sessions/{project_name}')
     wait_for_sessions(page)
 
     select_clear_menu(page, '选择模式')
@@ -218,9 +278,8 @@ def test_claude(page, project_name, old_session_id):
     page.keyboard.press('Escape')
 
 
-def test_codex(page, project_name):
-    page.goto(f'http://localhost:5000/#/codex/sessions/{project_name}')
-    page.wait_for_load_state('networkidle')
+def test_codex(page, base_url, project_name):
+    page.goto(f'{base_url}/#/codex/sessions/{project_name}')
     wait_for_sessions(page)
     select_clear_menu(page, '选择模式')
     page.wait_for_selector('.selection-bar')
@@ -232,9 +291,8 @@ def test_codex(page, project_name):
     page.keyboard.press('Escape')
 
 
-def test_gemini(page, project_hash):
-    page.goto(f'http://localhost:5000/#/gemini/sessions/{project_hash}')
-    page.wait_for_load_state('networkidle')
+def test_gemini(page, base_url, project_hash):
+    page.goto(f'{base_url}/#/gemini/sessions/{project_hash}')
     wait_for_sessions(page)
     select_clear_menu(page, '选择模式')
     page.wait_for_selector('.selection-bar')
@@ -246,22 +304,230 @@ def test_gemini(page, project_hash):
     page.keyboard.press('Escape')
 
 
-def main():
-    claude_project, codex_project, gemini_project, old_session_id = seed_data()
+PERF_OBSERVER_SCRIPT = """
+window.__cctPerf = { firstItemAt: null, lastItemAt: null, count: 0 };
+const items = document.getElementsByClassName('session-item');
+new MutationObserver(() => {
+    const perf = window.__cctPerf;
+    if (items.length === perf.count) return;
+    const now = performance.now();
+    if (perf.firstItemAt === null && items.length > 0) perf.firstItemAt = now;
+    perf.count = items.length;
+    perf.lastItemAt = now;
+}).observe(document, { childList: true, subtree: true });
+"""
+
+SCROLL_FRAMES_SCRIPT = """async (steps) => {
+    const content = document.querySelector('.content');
+    const max = content.scrollHeight - content.clientHeight;
+    const frames = [];
+    let last = performance.now();
+    for (let i = 1; i <= steps; i += 1) {
+        content.scrollTop = (max * i) / steps;
+        await new Promise(resolve => requestAnimationFrame(resolve));
+        const now = performance.now();
+        frames.push(now - last);
+        last = now;
+    }
+    return frames;
+}"""
+
+PERCENTILES = (50, 90, 95, 99)
+SCROLL_STEPS = 60
+LIST_SETTLE_MS = 500
+
+
+def percentile_summary(samples):
+    """Nearest-rank percentiles of a list of millisecond samples."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    summary = {'count': len(ordered), 'min': round(ordered[0], 1), 'max': round(ordered[-1], 1)}
+    for pct in PERCENTILES:
+        rank = max(-(-pct * len(ordered) // 100) - 1, 0)
+        summary[f'p{pct}'] = round(ordered[rank], 1)
+    return summary
+
+
+def api_route(url, params):
+    """``/api/sessions/<project>/<id>?x`` -> ``/api/sessions/:param/:param`` so calls group across sizes."""
+    path = url.split('://', 1)[-1].split('/', 1)[-1].split('?', 1)[0]
+    segments = [
+        ':param' if segment in params or (len(segment) >= 8 and any(char.isdigit() for char in segment)) else segment
+        for segment in path.split('/')
+    ]
+    return '/' + '/'.join(segments)
+
+
+def seed_perf_project(home, cli, size):
+    """Seed one project with ``size`` sessions for ``cli`` into ``home`` and return its route name."""
+    args = build_fixture_parser().parse_args([
+        '--home', str(home), '--cli', cli, '--projects', '1', '--sessions', str(size),
+        '--prefix', f'perf{size}', '--large-ratio', '0'
+    ])
+    return generate(args)[cli]['largestProject']
+
+
+@contextmanager
+def perf_backend(cli, size):
+    """An isolated backend whose HOME holds only the ``size``-session project for ``cli``; yields (base_url, project)."""
+    seeded = []
+    with isolated_backend(f'perf-{cli}-{size}', lambda home: seeded.append(seed_perf_project(home, cli, size))) as base_url:
+        yield base_url, seeded[0]
+
+
+def measure_flow(context, base_url, cli, project):
+    """One pass over the list, scroll, trash and detail views; every timing is in milliseconds."""
+    page = context.new_page()
+    api_calls = []
+    page.on('requestfinished', lambda request: api_calls.append(request) if '/api/' in request.url else None)
+    page.add_init_script(PERF_OBSERVER_SCRIPT)
+    page.goto(f'{base_url}/#/{cli}/sessions/{project}')
+    page.wait_for_load_state('networkidle')
+    wait_for_sessions(page)
+    page.wait_for_function(
+        f'() => window.__cctPerf.lastItemAt !== null && performance.now() - window.__cctPerf.lastItemAt > {LIST_SETTLE_MS}'
+    )
+    list_timing = page.evaluate('() => window.__cctPerf')
+    scroll_frames = page.evaluate(SCROLL_FRAMES_SCRIPT, SCROLL_STEPS)
+
+    select_clear_menu(page, '选择模式')
+    page.wait_for_selector('.selection-bar')
+    page.locator('.session-item').first.locator('.n-checkbox').click()
+    delete_selected(page)
+
+    started = time.perf_counter()
+    open_trash(page)
+    expect(page.get_by_text('回收站', exact=True)).to_be_visible()
+    trash_open = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    page.get_by_text('查看详情', exact=True).first.click()
+    expect(page.locator('.chat-message').first).to_be_visible()
+    detail_open = (time.perf_counter() - started) * 1000
+    page.locator('.close-btn').click()
+    page.get_by_text('恢复', exact=True).first.click()
+    page.keyboard.press('Escape')
+    page.wait_for_load_state('networkidle')
+
+    api = {}
+    for request in api_calls:
+        duration = request.timing.get('responseEnd', -1)
+        if duration >= 0:
+            api.setdefault(f'{request.method} {api_route(request.url, {project})}', []).append(duration)
+    page.close()
+    return {
+        'timeToFirstItemMs': list_timing['firstItemAt'],
+        'listRenderMs': list_timing['lastItemAt'],
+        'renderedItems': list_timing['count'],
+        'scrollFrameMs': scroll_frames,
+        'trashOpenMs': trash_open,
+        'detailOpenMs': detail_open,
+        'api': api
+    }
 
+
+def run_perf(sizes, repeat, clis, report_path):
+    runs = []
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
-        page.set_viewport_size({'width': 1400, 'height': 900})
-        page.set_default_timeout(15000)
+        for size in sizes:
+            for cli in clis:
+                # A fresh backend per run, like the behavior flows: no caches or trash carried over between sizes.
+                with perf_backend(cli, size) as (base_url, project):
+                    context = browser.new_context(viewport={'width': 1400, 'height': 900})
+                    context.set_default_timeout(60000)
+                    samples = [measure_flow(context, base_url, cli, project) for _ in range(repeat)]
+                    context.close()
+                api = {}
+                for sample in samples:
+                    for route, durations in sample['api'].items():
+                        api.setdefault(route, []).extend(durations)
+                runs.append({
+                    'cli': cli,
+                    'size': size,
+                    'project': project,
+                    'repeat': repeat,
+                    'renderedItems': samples[-1]['renderedItems'],
+                    'timeToFirstItemMs': percentile_summary([s['timeToFirstItemMs'] for s in samples]),
+                    'listRenderMs': percentile_summary([s['listRenderMs'] for s in samples]),
+                    'scrollFrameMs': percentile_summary([ms for s in samples for ms in s['scrollFrameMs']]),
+                    'trashOpenMs': percentile_summary([s['trashOpenMs'] for s in samples]),
+                    'detailOpenMs': percentile_summary([s['detailOpenMs'] for s in samples]),
+                    'api': {route: percentile_summary(durations) for route, durations in sorted(api.items())}
+                })
+                print(f"{cli} x {size}: first item p50 {runs[-1]['timeToFirstItemMs']['p50']}ms, "
+                      f"list p50 {runs[-1]['listRenderMs']['p50']}ms, trash p50 {runs[-1]['trashOpenMs']['p50']}ms")
+        browser.close()
 
-        test_claude(page, claude_project, old_session_id)
-        test_codex(page, codex_project)
-        test_gemini(page, gemini_project)
+    report = {
+        'generatedAt': datetime.utcnow().isoformat() + 'Z',
+        'sizes': sizes,
+        'runs': runs
+    }
+    Path(report_path).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+    print(f'Performance report written to {report_path}')
+
+
+def run_flow(snapshot, cli, timeout_ms):
+    """One UI flow in its own backend and browser; returns the flow's wall time in seconds."""
+    manifest = load_manifest(snapshot)
+    started = time.perf_counter()
+    with isolated_backend(cli, lambda home: restore_snapshot(snapshot, home)) as base_url:
+        # The sync API is bound to the thread that started it, so every flow drives its own browser.
+        with sync_playwright() as p:
+            browser = p.chromium.launch(headless=True)
+            context = browser.new_context(viewport={'width': 1400, 'height': 900})
+            context.set_default_timeout(timeout_ms)
+            page = context.new_page()
+            if cli == 'claude':
+                test_claude(page, base_url, manifest['claude'], manifest['oldSessionId'])
+            elif cli == 'codex':
+                test_codex(page, base_url, manifest['codex'])
+            else:
+                test_gemini(page, base_url, manifest['gemini'])
+            browser.close()
+    return time.perf_counter() - started
+
+
+def run_checks(clis, timeout_ms, rebuild):
+    started = time.perf_counter()
+    snapshot = build_snapshot(rebuild)
+    print(f'Fixture snapshot: {snapshot}')
+    with ThreadPoolExecutor(max_workers=len(clis)) as pool:
+        futures = {cli: pool.submit(run_flow, snapshot, cli, timeout_ms) for cli in clis}
+    failures = []
+    for cli, future in futures.items():
+        try:
+            print(f'{cli}: passed in {future.result():.1f}s')
+        except Exception as error:  # report every flow before failing
+            failures.append(cli)
+            print(f'{cli}: FAILED - {error}')
+    if failures:
+        raise SystemExit(f'UI verification failed: {", ".join(failures)}')
+    print(f'UI verification completed in {time.perf_counter() - started:.1f}s')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Trash UI checks for the session views')
+    parser.add_argument('--perf', action='store_true', help='Measure the session, trash and detail views instead of asserting behavior')
+    parser.add_argument('--sizes', default='100,1000,5000', help='Sessions seeded per project, one perf run per size')
+    parser.add_argument('--repeat', type=int, default=3, help='Measured passes per CLI and size')
+    parser.add_argument('--cli', default='claude,codex,gemini', help='CLI session views to check or measure')
+    parser.add_argument('--report', default='trash-ui-perf.json', help='Where to write the JSON report')
+    parser.add_argument('--timeout', type=int, default=15000, help='Playwright timeout per action in ms')
+    parser.add_argument('--rebuild-snapshot', action='store_true', help='Re-seed the shared fixture snapshot')
+    return parser.parse_args()
 
-        browser.close()
 
-    print('UI verification completed')
+def main():
+    args = parse_args()
+    clis = [cli for cli in args.cli.split(',') if cli]
+    if args.perf:
+        sizes = [int(size) for size in args.sizes.split(',') if size]
+        run_perf(sizes, args.repeat, clis, args.report)
+        return
+    run_checks(clis, args.timeout, args.rebuild_snapshot)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,185 @@
+const assert = require('assert');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const { execFileSync, spawnSync } = require('child_process');
+
+const LOAD_SCRIPT = path.join(__dirname, 'manual', 'proxy-load-test.py');
+const REQUESTS = 24;
+
+function hasPython() {
+  try {
+    execFileSync('python3', ['--version'], { stdio: 'ignore' });
+    return true;
+  } catch (error) {
+    return false;
+  }
+}
+
+function hasProxyDependencies() {
+  try {
+    require.resolve('express');
+    return true;
+  } catch (error) {
+    return false;
+  }
+}
+
+// Imports the load test as a module and reports on its pieces that do not need a proxy.
+const UNIT_SCRIPT = `
+import argparse, asyncio, importlib.util, json, sys, threading
+from pathlib import Path
+
+spec = importlib.util.spec_from_file_location('proxy_load_test', sys.argv[1])
+load = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(load)
+home = Path(sys.argv[2])
+
+def frames(kind):
+    return [[event, payload] for event, payload in load.sse_events(kind, 'model-x', 3)]
+
+report = {
+    'events': {kind: frames(kind) for kind in ('anthropic', 'openai', 'gemini')},
+    'latency': load.latency_summary([float(value) for value in range(1, 201)]),
+    'latencyEmpty': load.latency_summary([]),
+    'distribution': load.channel_distribution('codex', {'load-codex-0': 10, 'load-codex-1': 30, 'stray': 0}, [1, 3, 4]),
+    'ports': load.seed_app_dir(home, ['claude', 'codex'], {'anthropic': 1001, 'openai': 1002, 'gemini': 1003}, [2, 1], 4)
+}
+
+# The stubs and the driver run directly against each other, as in the baseline run.
+options = {'latency': 0.002, 'jitter': 0.5, 'tokens': 5, 'token_rate': 0, 'error_rate': 0, 'seed': 'test',
+           'model': {'anthropic': 'claude-x', 'openai': 'gpt-x', 'gemini': 'gemini-x'}}
+
+def start_stubs(options):
+    class Ports:
+        def put(self, value):
+            self.value = value
+            ready.set()
+    ready = threading.Event()
+    ports = Ports()
+    threading.Thread(target=load.run_stubs, args=(options, ports), daemon=True).start()
+    ready.wait(10)
+    return ports.value
+
+args = argparse.Namespace(requests=${REQUESTS}, concurrency=6, session_ids=4, tokens=5)
+ok_ports = start_stubs(options)
+failing_ports = start_stubs(dict(options, error_rate=1))
+
+async def drive_all():
+    direct = {}
+    for cli, target in load.TARGETS.items():
+        port = ok_ports[target['upstream']]
+        result = await load.drive(port, cli, args, load.channel_key(cli, 1))
+        direct[cli] = {'result': result, 'hits': await load.fetch_stub_stats(port, reset=True),
+                       'afterReset': await load.fetch_stub_stats(port)}
+    failing = {cli: (await load.drive(failing_ports[target['upstream']], cli, args, 'client-key'))['statuses']
+               for cli, target in load.TARGETS.items()}
+    return direct, failing
+
+report['direct'], report['failing'] = asyncio.run(drive_all())
+print(json.dumps(report))
+`;
+
+function runUnitTests(root) {
+  const home = path.join(root, 'home');
+  const report = JSON.parse(execFileSync('python3', ['-c', UNIT_SCRIPT, LOAD_SCRIPT, home], { encoding: 'utf8' }));
+
+  // Each stream carries the tokens and ends with the marker the driver looks for.
+  const anthropic = report.events.anthropic;
+  assert.deepStrictEqual(anthropic.map(([event]) => event), [
+    'message_start', 'content_block_start', 'content_block_delta', 'content_block_delta', 'content_block_delta',
+    'content_block_stop', 'message_delta', 'message_stop'
+  ]);
+  assert.strictEqual(anthropic[6][1].usage.output_tokens, 3);
+  const openai = report.events.openai;
+  assert.strictEqual(openai.length, 5);
+  assert.strictEqual(openai[4][1].type, 'response.completed');
+  assert.strictEqual(openai[4][1].response.usage.total_tokens, 123);
+  const gemini = report.events.gemini;
+  assert.strictEqual(gemini.length, 4);
+  assert.deepStrictEqual(gemini[3][1].usageMetadata, { promptTokenCount: 120, candidatesTokenCount: 3, totalTokenCount: 123 });
+
+  assert.deepStrictEqual(report.latency, { p50: 100, p90: 180, p99: 198, max: 200 });
+  assert.strictEqual(report.latencyEmpty, null);
+  assert.deepStrictEqual(report.distribution, {
+    'stub-0': { requests: 10, share: 0.25, expected: 0.125 },
+    'stub-1': { requests: 30, share: 0.75, expected: 0.375 },
+    'stub-2': { requests: 0, share: 0, expected: 0.5 }
+  });
+
+  // The isolated home gets config.json with distinct ports and one channel file per proxied CLI.
+  const appDir = path.join(home, '.cctoolbox');
+  const ports = report.ports;
+  assert.strictEqual(new Set(Object.values(ports)).size, 4);
+  assert.deepStrictEqual(JSON.parse(fs.readFileSync(path.join(appDir, 'config.json'), 'utf8')), { ports });
+  assert.deepStrictEqual(fs.readdirSync(appDir).sort(), ['channels.json', 'codex-channels.json', 'config.json']);
+  const claude = JSON.parse(fs.readFileSync(path.join(appDir, 'channels.json'), 'utf8')).channels;
+  assert.deepStrictEqual(claude.map(channel => [channel.baseUrl, channel.apiKey, channel.weight, channel.maxConcurrency]), [
+    ['http://127.0.0.1:1001', 'load-claude-0', 2, 4],
+    ['http://127.0.0.1:1001', 'load-claude-1', 1, 4]
+  ]);
+  const codex = JSON.parse(fs.readFileSync(path.join(appDir, 'codex-channels.json'), 'utf8')).channels;
+  assert.ok(codex.every(channel => channel.baseUrl === 'http://127.0.0.1:1002/v1' && channel.enabled));
+
+  // Driven directly, every request completes and the stub counts it under the key it was sent with.
+  for (const [cli, direct] of Object.entries(report.direct)) {
+    const { result } = direct;
+    assert.strictEqual(result.requests, REQUESTS, cli);
+    assert.strictEqual(result.ok, REQUESTS, cli);
+    assert.deepStrictEqual(result.statuses, { 200: REQUESTS }, cli);
+    assert.ok(result.ttfbMs.p50 <= result.totalMs.p50 && result.totalMs.p99 <= result.totalMs.max, cli);
+    assert.ok(result.bytes > 0 && result.requestsPerSecond > 0, cli);
+    assert.deepStrictEqual(result.rssKb, [], cli);
+    assert.deepStrictEqual(direct.hits, { [`load-${cli}-1`]: REQUESTS }, cli);
+    assert.deepStrictEqual(direct.afterReset, {}, cli);
+  }
+
+  // Error responses are counted by status, with no latency samples.
+  assert.deepStrictEqual(report.failing, { claude: { 529: REQUESTS }, codex: { 500: REQUESTS }, gemini: { 500: REQUESTS } });
+}
+
+function runProxyTests(root) {
+  const reportPath = path.join(root, 'report.json');
+  const result = spawnSync('python3', [
+    LOAD_SCRIPT, '--requests', String(REQUESTS), '--concurrency', '4', '--warmup', '2', '--channels', '2',
+    '--weights', '1,3', '--latency', '2', '--tokens', '5', '--token-rate', '0', '--settle', '0', '--report', reportPath
+  ], { env: { ...process.env, TMPDIR: root }, encoding: 'utf8', timeout: 120000 });
+  assert.strictEqual(result.status, 0, result.stderr);
+  const report = JSON.parse(result.stdout);
+  assert.deepStrictEqual(JSON.parse(fs.readFileSync(reportPath, 'utf8')), report);
+  assert.deepStrictEqual(report.config.cli, ['claude', 'codex', 'gemini']);
+  for (const [cli, entry] of Object.entries(report.results)) {
+    // Every request reaches a stub channel through the proxy, and the baseline gives the added latency.
+    assert.strictEqual(entry.proxy.ok, REQUESTS, cli);
+    const routed = Object.values(entry.channels).reduce((total, channel) => total + channel.requests, 0);
+    assert.strictEqual(routed, REQUESTS, cli);
+    assert.deepStrictEqual(Object.values(entry.channels).map(channel => channel.expected), [0.25, 0.75], cli);
+    assert.strictEqual(entry.baseline.ok, REQUESTS, cli);
+    assert.ok(entry.addedMs.ttfbMs, cli);
+    assert.ok(result.stderr.includes(`[${cli}] channels:`), result.stderr);
+  }
+  // The temporary CCTOOLBOX_HOME is removed.
+  assert.deepStrictEqual(fs.readdirSync(root).filter(name => name.startsWith('cctoolbox-load-')), []);
+}
+
+function runProxyLoadTests() {
+  if (!hasPython()) {
+    console.log('proxy load test tests skipped (python3 not available)');
+    return;
+  }
+
+  const root = fs.mkdtempSync(path.join(os.tmpdir(), 'cctoolbox-proxy-load-'));
+  try {
+    runUnitTests(root);
+    if (hasProxyDependencies()) {
+      runProxyTests(root);
+    } else {
+      console.log('proxy load test proxy run skipped (dependencies not installed)');
+    }
+  } finally {
+    fs.rmSync(root, { recursive: true, force: true });
+  }
+  console.log('proxy load test tests passed');
+}
+
+runProxyLoadTests();
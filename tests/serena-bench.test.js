@@ -0,0 +1,92 @@
+const assert = require('assert');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const { execFileSync, spawnSync } = require('child_process');
+
+const SCRIPTS_DIR = path.join(__dirname, '..', 'scripts');
+const BENCH_SCRIPT = path.join(SCRIPTS_DIR, 'bench_serena_parse.py');
+const PARSE_SCRIPT = path.join(SCRIPTS_DIR, 'parse_serena_pkl.py');
+const STAGES = ['find_pkl', 'unpickle', 'extract', 'build_tree', 'json_encode'];
+
+function hasPython() {
+  try {
+    execFileSync('python3', ['--version'], { stdio: 'ignore' });
+    return true;
+  } catch (error) {
+    return false;
+  }
+}
+
+function bench(tmpDir, args) {
+  const result = spawnSync('python3', [
+    BENCH_SCRIPT, '--files', '12', '--depth', '0', '2', '--symbols-per-file', '2', '--children', '2', '--repeat', '1', ...args
+  ], { env: { ...process.env, TMPDIR: tmpDir }, encoding: 'utf8' });
+  assert.strictEqual(result.status, 0, result.stderr);
+  return result;
+}
+
+function parse(projectPath) {
+  return JSON.parse(execFileSync('python3', [PARSE_SCRIPT, '--project', projectPath, '--no-index'], { encoding: 'utf8' }));
+}
+
+function runBenchTests() {
+  if (!hasPython()) {
+    console.log('serena bench tests skipped (python3 not available)');
+    return;
+  }
+
+  const root = fs.mkdtempSync(path.join(os.tmpdir(), 'serena-bench-test-'));
+  const tmpDir = path.join(root, 'tmp');
+  fs.mkdirSync(tmpDir);
+  try {
+    const baselinePath = path.join(root, 'baseline.json');
+    bench(tmpDir, ['--output', baselinePath]);
+    const baseline = JSON.parse(fs.readFileSync(baselinePath, 'utf8'));
+    assert.strictEqual(baseline.meta.timeoutMs, 20000);
+    assert.deepStrictEqual(baseline.meta.options, { symbolsPerFile: 2, children: 2, bodySize: 0, repeat: 1, lean: false });
+    assert.deepStrictEqual(baseline.results.map(item => item.key), [
+      'dict/12/0', 'dict/12/2', 'attr/12/0', 'attr/12/2', 'tuple/12/0', 'tuple/12/2'
+    ]);
+    for (const item of baseline.results) {
+      // 2 top-level symbols per file, each with 2 children per level.
+      assert.strictEqual(item.symbols, 12 * 2 * (item.depth === 0 ? 1 : 7), item.key);
+      assert.ok(item.pklBytes > 0);
+      assert.deepStrictEqual(Object.keys(item.stages), STAGES);
+      for (const stage of STAGES) {
+        const timing = item.stages[stage];
+        assert.ok(timing.minMs <= timing.medianMs && timing.medianMs <= timing.maxMs, `${item.key} ${stage}`);
+        assert.ok(timing.cpuMs >= 0 && timing.peakTracedBytes >= 0);
+      }
+      assert.ok(item.endToEndMs > 0);
+      assert.ok(Math.abs(item.timeoutRatio - item.endToEndMs / 20000) <= 0.001, item.key);
+    }
+    // Generated projects are removed unless --keep is given.
+    assert.deepStrictEqual(fs.readdirSync(tmpDir), []);
+
+    // --compare reports each case against the baseline and flags differing options.
+    const compared = bench(tmpDir, ['--no-end-to-end', '--lean', '--shapes', 'dict', '--keep', '--compare', baselinePath]);
+    const report = JSON.parse(compared.stdout);
+    assert.strictEqual(report.results[0].endToEndMs, undefined);
+    assert.ok(compared.stderr.includes('note: options differ from baseline (lean)'), compared.stderr);
+    assert.ok(/dict\/12\/0\s+totalMs/.test(compared.stderr), compared.stderr);
+    assert.ok(/dict\/12\/2\s+totalMs/.test(compared.stderr), compared.stderr);
+
+    // The three cache shapes describe the same symbols.
+    const kept = bench(tmpDir, ['--no-end-to-end', '--depth', '2', '--keep']);
+    const projects = JSON.parse(kept.stdout).results.map(item => item.project);
+    assert.strictEqual(projects.length, 3);
+    const parsed = projects.map(parse);
+    for (const result of parsed) {
+      assert.strictEqual(result.error, undefined, result.error);
+      assert.strictEqual(result.fileCount, 12);
+    }
+    assert.deepStrictEqual(parsed[1].symbols, parsed[0].symbols);
+    assert.deepStrictEqual(parsed[2].symbols, parsed[0].symbols);
+  } finally {
+    fs.rmSync(root, { recursive: true, force: true });
+  }
+  console.log('serena bench tests passed');
+}
+
+runBenchTests();
@@ -0,0 +1,112 @@
+const assert = require('assert');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const { execFileSync } = require('child_process');
+
+const SCRIPTS_DIR = path.join(__dirname, '..', 'scripts');
+const SCRIPT_PATH = path.join(SCRIPTS_DIR, 'parse_serena_pkl.py');
+
+function hasPython() {
+  try {
+    execFileSync('python3', ['--version'], { stdio: 'ignore' });
+    return true;
+  } catch (error) {
+    return false;
+  }
+}
+
+function writeSymbolPkl(projectPath, entries, mtimeSeconds, language) {
+  const pklPath = path.join(projectPath, '.serena', 'cache', language, 'document_symbols.pkl');
+  fs.mkdirSync(path.dirname(pklPath), { recursive: true });
+  const script = [
+    'import json, pickle, sys',
+    'entries = json.loads(sys.argv[2])',
+    'data = {key: (value["hash"], {"root_symbols": value["symbols"]}) for key, value in entries.items()}',
+    'pickle.dump({"obj": data}, open(sys.argv[1], "wb"))'
+  ].join('\n');
+  execFileSync('python3', ['-c', script, pklPath, JSON.stringify(entries)]);
+  fs.utimesSync(pklPath, mtimeSeconds, mtimeSeconds);
+}
+
+function entry(projectPath, file, name, hash) {
+  return { [path.join(projectPath, file)]: { hash, symbols: [{ name, kind: 5 }] } };
+}
+
+// Runs the server in-process with several CPUs reported, so the multi-cache merge goes through a process
+// pool, and records the start method of every pool that gets created.
+const SERVER_SCRIPT = `
+import io, json, sys
+sys.path.insert(0, sys.argv[1])
+import parse_serena_pkl as parser
+
+started = []
+BasePool = parser.ProcessPoolExecutor
+
+class RecordingPool(BasePool):
+    def __init__(self, *args, mp_context=None, **kwargs):
+        started.append(mp_context.get_start_method() if mp_context else 'default')
+        super().__init__(*args, mp_context=mp_context, **kwargs)
+
+parser.ProcessPoolExecutor = RecordingPool
+parser.os.cpu_count = lambda: 4
+project = sys.argv[2]
+requests = [
+    {'id': 1, 'op': 'parse', 'project': project},
+    {'id': 2, 'op': 'invalidate', 'project': project},
+    {'id': 3, 'op': 'parse', 'project': project},
+]
+output = io.StringIO()
+server = parser.SymbolServer(workers=1, output=output, use_index=False)
+server.serve(io.StringIO('\\n'.join(json.dumps(request) for request in requests) + '\\n'))
+responses = [json.loads(line) for line in output.getvalue().splitlines()]
+print(json.dumps({'pools': started, 'responses': responses}))
+`;
+
+function assertMerged(result) {
+  const byLanguage = Object.fromEntries(result.caches.map(cache => [cache.language, cache.fileCount]));
+  assert.deepStrictEqual(byLanguage, { typescript: 2, python: 1 });
+  assert.strictEqual(result.fileCount, 3);
+  assert.strictEqual(result.symbols['src/shared.py'][0].name, 'SharedFromTypescript');
+  assert.strictEqual(result.symbols['src/a.py'][0].name, 'A');
+  assert.strictEqual(result.symbols['src/b.ts'][0].name, 'B');
+}
+
+function runCacheMergeTests() {
+  if (!hasPython()) {
+    console.log('serena cache merge tests skipped (python3 not available)');
+    return;
+  }
+
+  const projectPath = fs.mkdtempSync(path.join(os.tmpdir(), 'serena-cache-merge-'));
+  try {
+    const now = Math.floor(Date.now() / 1000);
+    writeSymbolPkl(projectPath, {
+      ...entry(projectPath, 'src/a.py', 'A', 'a1'),
+      ...entry(projectPath, 'src/shared.py', 'SharedFromPython', 's1')
+    }, now - 60, 'python');
+    writeSymbolPkl(projectPath, {
+      ...entry(projectPath, 'src/b.ts', 'B', 'b1'),
+      ...entry(projectPath, 'src/shared.py', 'SharedFromTypescript', 's2')
+    }, now, 'typescript');
+
+    // One-shot parse: a path present in several caches comes from the newest one.
+    const oneShot = JSON.parse(execFileSync('python3', [SCRIPT_PATH, '--project', projectPath, '--no-index'], { encoding: 'utf8' }));
+    assertMerged(oneShot);
+
+    // Server mode parses on worker threads: the merge must use one spawn pool created at start, never a fork.
+    const server = JSON.parse(execFileSync('python3', ['-c', SERVER_SCRIPT, SCRIPTS_DIR, projectPath], { encoding: 'utf8' }));
+    assert.deepStrictEqual(server.pools, ['spawn']);
+    const parses = server.responses.filter(response => response.id === 1 || response.id === 3);
+    assert.strictEqual(parses.length, 2);
+    for (const response of parses) {
+      assert.strictEqual(response.ok, true, response.error);
+      assertMerged(response.result);
+    }
+  } finally {
+    fs.rmSync(projectPath, { recursive: true, force: true });
+  }
+  console.log('serena cache merge tests passed');
+}
+
+runCacheMergeTests();
@@ -0,0 +1,138 @@
+const assert = require('assert');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const { execFileSync } = require('child_process');
+
+const SCRIPT_PATH = path.join(__dirname, '..', 'scripts', 'parse_serena_pkl.py');
+
+function hasPython() {
+  try {
+    execFileSync('python3', ['--version'], { stdio: 'ignore' });
+    return true;
+  } catch (error) {
+    return false;
+  }
+}
+
+function writeSymbolPkl(projectPath, entries, mtimeSeconds) {
+  const pklPath = path.join(projectPath, '.serena', 'cache', 'python', 'document_symbols.pkl');
+  fs.mkdirSync(path.dirname(pklPath), { recursive: true });
+  const script = [
+    'import json, pickle, sys',
+    'entries = json.loads(sys.argv[2])',
+    'data = {key: (value["hash"], {"root_symbols": value["symbols"]}) for key, value in entries.items()}',
+    'pickle.dump({"obj": data}, open(sys.argv[1], "wb"))'
+  ].join('\n');
+  execFileSync('python3', ['-c', script, pklPath, JSON.stringify(entries)]);
+  fs.utimesSync(pklPath, mtimeSeconds, mtimeSeconds);
+}
+
+function parse(projectPath, args = []) {
+  return JSON.parse(execFileSync('python3', [SCRIPT_PATH, '--project', projectPath, '--profile', ...args], { encoding: 'utf8' }));
+}
+
+function indexDir(projectPath) {
+  return path.join(projectPath, '.serena', 'cache', 'cctoolbox-index');
+}
+
+function readManifest(projectPath) {
+  return JSON.parse(fs.readFileSync(path.join(indexDir(projectPath), 'manifest.json'), 'utf8'));
+}
+
+function assertSameResult(actual, expected) {
+  assert.deepStrictEqual(actual.symbols, expected.symbols);
+  assert.deepStrictEqual(actual.files, expected.files);
+  assert.strictEqual(actual.fileCount, expected.fileCount);
+  assert.strictEqual(actual.contentHash, expected.contentHash);
+  assert.strictEqual(actual.treeHash, expected.treeHash);
+}
+
+function entries(projectPath, suffix) {
+  return {
+    [path.join(projectPath, 'main.py')]: { hash: `m${suffix}`, symbols: [{ name: `Main${suffix}`, kind: 12 }] },
+    [path.join(projectPath, 'src', 'a.py')]: { hash: `a${suffix}`, symbols: [{ name: 'A', kind: 5, children: [{ name: 'run', kind: 6 }] }] },
+    [path.join(projectPath, 'src', 'deep', 'b.py')]: { hash: `b${suffix}`, symbols: [{ name: 'B', kind: 5 }] },
+    [path.join(projectPath, 'tests', 'test_a.py')]: { hash: `t${suffix}`, symbols: [{ name: 'test_a', kind: 12 }] }
+  };
+}
+
+function runIndexTests(projectPath) {
+  const now = Math.floor(Date.now() / 1000);
+  writeSymbolPkl(projectPath, entries(projectPath, '1'), now - 60);
+
+  // --no-index neither reads nor writes the index.
+  const plain = parse(projectPath, ['--no-index']);
+  assert.strictEqual(plain.fileCount, 4);
+  assert.ok(!fs.existsSync(indexDir(projectPath)));
+
+  // The first indexed run writes one shard per top-level directory; offsets slice out each file's symbols.
+  const built = parse(projectPath);
+  assertSameResult(built, plain);
+  assert.ok(built.stats.stages.unpickle);
+  const manifest = readManifest(projectPath);
+  assert.strictEqual(manifest.fileCount, 4);
+  assert.deepStrictEqual(Object.keys(manifest.shards).sort(), ['_root', 'src', 'tests']);
+  assert.deepStrictEqual(Object.keys(manifest.shards.src.files).sort(), ['src/a.py', 'src/deep/b.py']);
+  for (const shard of Object.values(manifest.shards)) {
+    const content = fs.readFileSync(path.join(indexDir(projectPath), shard.file));
+    for (const [relPath, [offset, length]] of Object.entries(shard.files)) {
+      assert.deepStrictEqual(JSON.parse(content.subarray(offset, offset + length).toString('utf8')), plain.symbols[relPath]);
+    }
+  }
+
+  // A later run reads the index instead of unpickling, in both output modes.
+  const reread = parse(projectPath);
+  assertSameResult(reread, plain);
+  assert.ok(reread.stats.stages.index_read);
+  assert.strictEqual(reread.stats.stages.unpickle, undefined);
+  const records = execFileSync('python3', [SCRIPT_PATH, '--project', projectPath, '--stream'], { encoding: 'utf8' })
+    .trim().split('\n').map(line => JSON.parse(line));
+  assert.strictEqual(records[records.length - 1].index, 'hit');
+
+  // A missing shard invalidates the manifest; the parse falls back to the pkl and rebuilds the index.
+  fs.rmSync(path.join(indexDir(projectPath), manifest.shards.tests.file));
+  const repaired = parse(projectPath);
+  assertSameResult(repaired, plain);
+  assert.ok(repaired.stats.stages.unpickle);
+  assert.ok(parse(projectPath).stats.stages.index_read);
+
+  // A rewritten pkl no longer matches the manifest source: it is reparsed and the old shards are removed.
+  const oldFiles = Object.values(readManifest(projectPath).shards).map(shard => shard.file);
+  writeSymbolPkl(projectPath, entries(projectPath, '2'), now);
+  const changed = parse(projectPath);
+  assert.ok(changed.stats.stages.unpickle);
+  assert.strictEqual(changed.symbols['main.py'][0].name, 'Main2');
+  assert.notStrictEqual(changed.contentHash, plain.contentHash);
+  const remaining = fs.readdirSync(indexDir(projectPath));
+  assert.ok(oldFiles.every(file => !remaining.includes(file)), remaining.join(', '));
+  assert.ok(remaining.every(file => !file.endsWith('.tmp')));
+  assertSameResult(parse(projectPath), changed);
+}
+
+function runBrokenCacheTests(projectPath) {
+  const pklPath = path.join(projectPath, '.serena', 'cache', 'python', 'document_symbols.pkl');
+  fs.mkdirSync(path.dirname(pklPath), { recursive: true });
+  fs.writeFileSync(pklPath, 'not a pickle');
+  // A parse that failed is not committed as an index.
+  assert.ok(parse(projectPath).error);
+  assert.ok(!fs.existsSync(path.join(indexDir(projectPath), 'manifest.json')));
+}
+
+function runSerenaIndexTests() {
+  if (!hasPython()) {
+    console.log('serena index tests skipped (python3 not available)');
+    return;
+  }
+
+  const root = fs.mkdtempSync(path.join(os.tmpdir(), 'serena-index-'));
+  try {
+    runIndexTests(path.join(root, 'project'));
+    runBrokenCacheTests(path.join(root, 'broken'));
+  } finally {
+    fs.rmSync(root, { recursive: true, force: true });
+  }
+  console.log('serena index tests passed');
+}
+
+runSerenaIndexTests();
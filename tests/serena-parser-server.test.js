@@ -0,0 +1,171 @@
+const assert = require('assert');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const { execFileSync } = require('child_process');
+
+const SCRIPTS_DIR = path.join(__dirname, '..', 'scripts');
+
+function hasPython() {
+  try {
+    execFileSync('python3', ['--version'], { stdio: 'ignore' });
+    return true;
+  } catch (error) {
+    return false;
+  }
+}
+
+function writeSymbolPkl(projectPath, entries) {
+  const pklPath = path.join(projectPath, '.serena', 'cache', 'python', 'document_symbols.pkl');
+  fs.mkdirSync(path.dirname(pklPath), { recursive: true });
+  const script = [
+    'import json, pickle, sys',
+    'entries = json.loads(sys.argv[2])',
+    'data = {key: (value["hash"], {"root_symbols": value["symbols"]}) for key, value in entries.items()}',
+    'pickle.dump({"obj": data}, open(sys.argv[1], "wb"))'
+  ].join('\n');
+  execFileSync('python3', ['-c', script, pklPath, JSON.stringify(entries)]);
+  return pklPath;
+}
+
+// Serves a fixed list of JSON lines in-process and counts the parses, which are slowed down so that
+// the two parse requests of a batch overlap.
+const SERVER_SCRIPT = `
+import io, json, sys, time
+sys.path.insert(0, sys.argv[1])
+import parse_serena_pkl as parser
+
+parses = []
+base_parse = parser.parse_project
+
+def slow_parse(*args, **kwargs):
+    parses.append(args[0])
+    time.sleep(0.3)
+    return base_parse(*args, **kwargs)
+
+parser.parse_project = slow_parse
+output = io.StringIO()
+server = parser.SymbolServer(workers=int(sys.argv[2]), output=output, use_index=False)
+server.serve(io.StringIO(sys.stdin.read()))
+responses = [json.loads(line) for line in output.getvalue().splitlines()]
+print(json.dumps({'parses': len(parses), 'responses': responses}))
+`;
+
+// With a single worker each request waits for the previous one, so responses come back in request order.
+function serve(lines, workers = 1) {
+  const input = lines.map(line => (typeof line === 'string' ? line : JSON.stringify(line))).join('\n') + '\n';
+  const output = execFileSync('python3', ['-c', SERVER_SCRIPT, SCRIPTS_DIR, String(workers)], { input, encoding: 'utf8' });
+  const { parses, responses } = JSON.parse(output);
+  const byId = {};
+  for (const response of responses) {
+    byId[response.id] = response;
+  }
+  return { parses, responses, byId };
+}
+
+function runProtocolTests(projectPath) {
+  const first = serve([
+    { id: 1, op: 'ping' },
+    { id: 2, op: 'parse', project: projectPath },
+    { id: 3, op: 'parse', project: projectPath },
+    'not json',
+    { id: 4, op: 'parse' },
+    { id: 5, op: 'bogus', project: projectPath },
+    { id: 6, op: 'shutdown' },
+    { id: 7, op: 'ping' }
+  ], 4);
+  assert.strictEqual(first.byId[1].result.pid > 0, true);
+
+  // Concurrent requests for the same project share one parse and get the same result.
+  assert.strictEqual(first.parses, 1);
+  assert.strictEqual(first.byId[2].ok, true, first.byId[2].error);
+  assert.strictEqual(first.byId[2].result.fileCount, 2);
+  assert.strictEqual(first.byId[2].result.symbols['a.py'][0].name, 'A');
+  assert.deepStrictEqual(first.byId[3].result, first.byId[2].result);
+
+  // Bad requests get an error response and the server keeps going; nothing is handled after shutdown.
+  assert.strictEqual(first.byId.null.ok, false);
+  assert.ok(first.byId.null.error.includes('无效请求'));
+  assert.strictEqual(first.byId[4].ok, false);
+  assert.ok(first.byId[4].error.includes('project'));
+  assert.strictEqual(first.byId[5].ok, false);
+  assert.ok(first.byId[5].error.includes('bogus'));
+  assert.deepStrictEqual(first.byId[6], { id: 6, ok: true, result: null });
+  assert.strictEqual(first.byId[7], undefined);
+}
+
+function runCacheTests(projectPath) {
+  // Later requests come from memory until the project is invalidated.
+  const result = serve([
+    { id: 1, op: 'parse', project: projectPath },
+    { id: 2, op: 'status', project: projectPath },
+    { id: 3, op: 'parse', project: projectPath },
+    { id: 4, op: 'invalidate', project: projectPath },
+    { id: 5, op: 'invalidate', project: projectPath },
+    { id: 6, op: 'parse', project: projectPath }
+  ]);
+  assert.strictEqual(result.parses, 2);
+  const [, status, , removed, missing] = result.responses.map(response => response.result);
+  assert.deepStrictEqual(result.responses.map(response => response.id), [1, 2, 3, 4, 5, 6]);
+  assert.strictEqual(status.fileCount, 2);
+  assert.strictEqual(status.signature.caches.length, 1);
+  assert.deepStrictEqual(removed, { removed: true });
+  assert.deepStrictEqual(missing, { removed: false });
+}
+
+async function runDaemonTests(projectPath) {
+  const parser = require('../src/server/services/serena-parser');
+  try {
+    const ping = await parser.requestDaemon('ping');
+    assert.ok(ping.pid > 0 && ping.pid !== process.pid);
+
+    // The Node client reuses one daemon for every request.
+    const [left, right] = await Promise.all([
+      parser.parseSerenaCache(projectPath),
+      parser.parseSerenaCache(projectPath)
+    ]);
+    assert.strictEqual(left.fileCount, 2);
+    assert.deepStrictEqual(left.symbols, right.symbols);
+    assert.strictEqual((await parser.requestDaemon('ping')).pid, ping.pid);
+
+    // A rewritten cache changes the signature, so the daemon does not serve the parse it kept in memory.
+    const pklPath = writeSymbolPkl(projectPath, {
+      [path.join(projectPath, 'a.py')]: { hash: 'a2', symbols: [{ name: 'Renamed', kind: 5 }] }
+    });
+    const later = Date.now() / 1000 + 5;
+    fs.utimesSync(pklPath, later, later);
+    const rewritten = await parser.parseSerenaCache(projectPath);
+    assert.strictEqual(rewritten.fileCount, 1);
+    assert.strictEqual(rewritten.symbols['a.py'][0].name, 'Renamed');
+
+    await assert.rejects(parser.requestDaemon('bogus', { project: projectPath }), /bogus/);
+  } finally {
+    parser.stopSerenaParser();
+  }
+}
+
+async function runParserServerTests() {
+  if (!hasPython()) {
+    console.log('serena parser server tests skipped (python3 not available)');
+    return;
+  }
+
+  const projectPath = fs.mkdtempSync(path.join(os.tmpdir(), 'serena-parser-server-'));
+  try {
+    writeSymbolPkl(projectPath, {
+      [path.join(projectPath, 'a.py')]: { hash: 'a1', symbols: [{ name: 'A', kind: 5 }] },
+      [path.join(projectPath, 'b.py')]: { hash: 'b1', symbols: [{ name: 'B', kind: 5 }] }
+    });
+    runProtocolTests(projectPath);
+    runCacheTests(projectPath);
+    await runDaemonTests(projectPath);
+  } finally {
+    fs.rmSync(projectPath, { recursive: true, force: true });
+  }
+  console.log('serena parser server tests passed');
+}
+
+runParserServerTests().catch((error) => {
+  console.error(error);
+  process.exit(1);
+});
@@ -0,0 +1,83 @@
+const assert = require('assert');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const { execFileSync } = require('child_process');
+
+const SCRIPT_PATH = path.join(__dirname, '..', 'scripts', 'parse_serena_pkl.py');
+
+function hasPython() {
+  try {
+    execFileSync('python3', ['--version'], { stdio: 'ignore' });
+    return true;
+  } catch (error) {
+    return false;
+  }
+}
+
+function writeSymbolPkl(projectPath, entries) {
+  const pklPath = path.join(projectPath, '.serena', 'cache', 'python', 'document_symbols.pkl');
+  fs.mkdirSync(path.dirname(pklPath), { recursive: true });
+  const script = [
+    'import json, pickle, sys',
+    'entries = json.loads(sys.argv[2])',
+    'data = {key: (value["hash"], {"root_symbols": value["symbols"]}) for key, value in entries.items()}',
+    'pickle.dump({"obj": data}, open(sys.argv[1], "wb"))'
+  ].join('\n');
+  execFileSync('python3', ['-c', script, pklPath, JSON.stringify(entries)]);
+}
+
+function parse(projectPath, args) {
+  return execFileSync('python3', [SCRIPT_PATH, '--project', projectPath, '--no-index', ...args], { encoding: 'utf8' });
+}
+
+function assertStats(stats, stages) {
+  assert.strictEqual(stats.fileCount, 2);
+  assert.strictEqual(stats.symbolCount, 3);
+  assert.ok(stats.pklBytes > 0);
+  assert.ok(stats.wallMs >= 0 && stats.peakRssKb >= 0);
+  for (const stage of stages) {
+    assert.ok(stats.stages[stage], `missing stage ${stage} in ${Object.keys(stats.stages)}`);
+    assert.ok(stats.stages[stage].calls >= 1 && stats.stages[stage].wallMs >= 0);
+  }
+}
+
+function runProfileTests() {
+  if (!hasPython()) {
+    console.log('serena profile tests skipped (python3 not available)');
+    return;
+  }
+
+  const projectPath = fs.mkdtempSync(path.join(os.tmpdir(), 'serena-profile-'));
+  try {
+    writeSymbolPkl(projectPath, {
+      [path.join(projectPath, 'a.py')]: { hash: 'a1', symbols: [{ name: 'A', kind: 5, children: [{ name: 'run', kind: 6 }] }] },
+      [path.join(projectPath, 'b.py')]: { hash: 'b1', symbols: [{ name: 'B', kind: 5 }] }
+    });
+
+    // Without --profile the output carries no stats block.
+    assert.strictEqual(JSON.parse(parse(projectPath, [])).stats, undefined);
+
+    // The stats block is a regular key of the result object, and its json_encode stage is complete.
+    const plain = JSON.parse(parse(projectPath, ['--profile']));
+    assert.strictEqual(plain.fileCount, 2);
+    assert.deepStrictEqual(Object.keys(plain).slice(-1), ['stats']);
+    assertStats(plain.stats, ['unpickle', 'extract', 'build_tree', 'json_encode']);
+    assert.strictEqual(plain.stats.stages.json_encode.calls, 1);
+
+    const compact = JSON.parse(parse(projectPath, ['--compact', '--profile']));
+    assert.ok(compact.format);
+    assertStats(compact.stats, ['compact_encode', 'json_encode']);
+
+    // In streaming mode the stats ride on the summary trailer.
+    const records = parse(projectPath, ['--stream', '--profile']).trim().split('\n').map(line => JSON.parse(line));
+    const summary = records[records.length - 1];
+    assert.strictEqual(summary.type, 'summary');
+    assertStats(summary.stats, ['unpickle', 'extract']);
+  } finally {
+    fs.rmSync(projectPath, { recursive: true, force: true });
+  }
+  console.log('serena profile tests passed');
+}
+
+runProfileTests();
@@ -0,0 +1,132 @@
+const assert = require('assert');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const { execFileSync } = require('child_process');
+
+const SCRIPTS_DIR = path.join(__dirname, '..', 'scripts');
+const FILES = 80;
+
+function hasPython() {
+  try {
+    execFileSync('python3', ['--version'], { stdio: 'ignore' });
+    return true;
+  } catch (error) {
+    return false;
+  }
+}
+
+// Tokenizes a batch large enough for a process pool and reports which start method the pool used.
+const POOL_SCRIPT = `
+import json, sys
+sys.path.insert(0, sys.argv[1])
+import serena_reference_index as refs
+
+contexts = []
+real_executor = refs.ProcessPoolExecutor
+
+def recording_executor(*args, **kwargs):
+    contexts.append(kwargs['mp_context'].get_start_method())
+    return real_executor(*args, **kwargs)
+
+if __name__ == '__main__':
+    refs.ProcessPoolExecutor = recording_executor
+    result = refs.lookup(sys.argv[2], 'shared_name', limit=5, workers=2)
+    print(json.dumps({'contexts': contexts, 'total': result['total'], 'updated': result['index']['updated']}))
+`;
+
+// Drives SymbolServer.handle directly with a reference build held back by an event, so the order is fixed.
+const SERVER_SCRIPT = `
+import json, sys, threading
+sys.path.insert(0, sys.argv[1])
+import parse_serena_pkl as parser
+import serena_reference_index as refs
+
+project = sys.argv[2]
+release = threading.Event()
+builds = []
+real_update = refs.update
+
+def held_update(project_path, **kwargs):
+    builds.append({'project': project_path, 'pool': kwargs.get('get_pool') is not None})
+    release.wait(10)
+    return real_update(project_path, **kwargs)
+
+refs.update = held_update
+parser.REFERENCE_WAIT_SECONDS = 0.2
+server = parser.SymbolServer(1, use_index=False)
+report = {}
+with parser.shared_cache_pool():
+    try:
+        report['watch'] = server.handle({'op': 'watch', 'project': project})
+        report['building'] = server.handle({'op': 'references', 'project': project, 'symbol': 'shared_name'})
+        release.set()
+        report['prewarm'] = server.reference_builds[project].result()
+        report['ready'] = server.handle({'op': 'references', 'project': project, 'symbol': 'shared_name', 'limit': 2})
+        report['again'] = server.handle({'op': 'references', 'project': project, 'symbol': 'file_7'})
+    finally:
+        server.executor.shutdown(wait=True)
+        server.reference_executor.shutdown(wait=True)
+        server.watcher.stop()
+report['builds'] = builds
+print(json.dumps(report))
+`;
+
+function createProject(root) {
+  const projectPath = path.join(root, 'project');
+  for (let index = 0; index < FILES; index++) {
+    const filePath = path.join(projectPath, 'src', `file_${index}.py`);
+    fs.mkdirSync(path.dirname(filePath), { recursive: true });
+    fs.writeFileSync(filePath, `def file_${index}():\n    return shared_name\n`);
+  }
+  fs.mkdirSync(path.join(projectPath, '.serena', 'cache'), { recursive: true });
+  return projectPath;
+}
+
+function runPoolTests(projectPath) {
+  const report = JSON.parse(execFileSync('python3', ['-c', POOL_SCRIPT, SCRIPTS_DIR, projectPath], { encoding: 'utf8' }));
+  // The tokenizer pool never forks: the server refreshes the index from worker threads.
+  assert.deepStrictEqual(report.contexts, ['spawn']);
+  assert.strictEqual(report.updated, FILES);
+  assert.strictEqual(report.total, FILES);
+}
+
+function runServerTests(projectPath) {
+  fs.rmSync(path.join(projectPath, '.serena', 'cache', 'cctoolbox-index'), { recursive: true, force: true });
+  const report = JSON.parse(execFileSync('python3', ['-c', SERVER_SCRIPT, SCRIPTS_DIR, projectPath], { encoding: 'utf8' }));
+
+  // watch starts the build; a references request that arrives first answers "building" instead of blocking.
+  assert.deepStrictEqual(report.watch, { added: true });
+  assert.deepStrictEqual(report.building, { items: [], total: 0, offset: 0, limit: 200, building: true });
+
+  // The prewarm tokenizes everything on the shared pool but does not count as a scan, so the first lookup
+  // still rescans (with nothing left to tokenize) and only the next one is throttled.
+  assert.strictEqual(report.prewarm.updated, FILES);
+  assert.strictEqual(report.ready.total, FILES);
+  assert.strictEqual(report.ready.items.length, 2);
+  assert.strictEqual(report.ready.building, undefined);
+  assert.deepStrictEqual([report.ready.index.scanned, report.ready.index.updated], [true, 0]);
+  assert.strictEqual(report.again.total, 1);
+  assert.strictEqual(report.again.index.scanned, false);
+  assert.deepStrictEqual(report.builds.map(build => build.pool), [true, true, true]);
+  assert.ok(report.builds.every(build => build.project === projectPath));
+}
+
+function runSerenaReferenceTests() {
+  if (!hasPython()) {
+    console.log('serena references tests skipped (python3 not available)');
+    return;
+  }
+
+  const root = fs.mkdtempSync(path.join(os.tmpdir(), 'cctoolbox-serena-references-'));
+  try {
+    const projectPath = createProject(root);
+    runPoolTests(projectPath);
+    runServerTests(projectPath);
+  } finally {
+    fs.rmSync(root, { recursive: true, force: true });
+  }
+  console.log('serena references tests passed');
+}
+
+runSerenaReferenceTests();
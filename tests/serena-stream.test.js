@@ -0,0 +1,149 @@
+const assert = require('assert');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const { execFileSync } = require('child_process');
+
+const SCRIPTS_DIR = path.join(__dirname, '..', 'scripts');
+const SCRIPT_PATH = path.join(SCRIPTS_DIR, 'parse_serena_pkl.py');
+const FILE_COUNT = 200;
+
+function hasPython() {
+  try {
+    execFileSync('python3', ['--version'], { stdio: 'ignore' });
+    return true;
+  } catch (error) {
+    return false;
+  }
+}
+
+function writeSymbolPkl(projectPath, entries) {
+  const pklPath = path.join(projectPath, '.serena', 'cache', 'python', 'document_symbols.pkl');
+  fs.mkdirSync(path.dirname(pklPath), { recursive: true });
+  const script = [
+    'import json, pickle, sys',
+    'entries = json.loads(sys.argv[2])',
+    'data = {key: (value["hash"], {"root_symbols": value["symbols"]}) for key, value in entries.items()}',
+    'pickle.dump({"obj": data}, open(sys.argv[1], "wb"))'
+  ].join('\n');
+  execFileSync('python3', ['-c', script, pklPath, JSON.stringify(entries)]);
+}
+
+function parse(projectPath, args) {
+  return execFileSync('python3', [SCRIPT_PATH, '--project', projectPath, '--no-index', ...args], {
+    encoding: 'utf8',
+    maxBuffer: 64 * 1024 * 1024
+  });
+}
+
+function readRecords(output) {
+  return output.trim().split('\n').map(line => JSON.parse(line));
+}
+
+// Serves one streamed parse in-process and returns every line the server wrote.
+const SERVER_SCRIPT = `
+import io, json, sys
+sys.path.insert(0, sys.argv[1])
+import parse_serena_pkl as parser
+
+output = io.StringIO()
+request = {'id': 7, 'op': 'parse', 'project': sys.argv[2], 'stream': True}
+parser.SymbolServer(workers=1, output=output, use_index=False).serve(io.StringIO(json.dumps(request) + '\\n'))
+print(output.getvalue(), end='')
+`;
+
+function runOneShotTests(projectPath) {
+  const full = JSON.parse(parse(projectPath, []));
+  const records = readRecords(parse(projectPath, ['--stream']));
+
+  // Every file record comes first, then the tree, then the summary trailer.
+  const types = records.map(record => record.type);
+  assert.strictEqual(types.length, FILE_COUNT + 2);
+  assert.ok(types.slice(0, FILE_COUNT).every(type => type === 'file'));
+  assert.deepStrictEqual(types.slice(FILE_COUNT), ['tree', 'summary']);
+
+  // Reassembled, the stream carries the same result as the single JSON document.
+  const files = records.filter(record => record.type === 'file');
+  const symbols = Object.fromEntries(files.map(record => [record.file, record.symbols]));
+  assert.deepStrictEqual(symbols, full.symbols);
+  assert.ok(files.every(record => record.language === 'python' && record.hash && record.digest));
+  assert.deepStrictEqual(records[FILE_COUNT].files, full.files);
+  const summary = records[FILE_COUNT + 1];
+  assert.strictEqual(summary.fileCount, full.fileCount);
+  assert.strictEqual(summary.version, full.version);
+  assert.strictEqual(summary.contentHash, full.contentHash);
+  assert.strictEqual(summary.treeHash, full.treeHash);
+}
+
+function runServerTests(projectPath) {
+  const lines = readRecords(execFileSync('python3', ['-c', SERVER_SCRIPT, SCRIPTS_DIR, projectPath], {
+    encoding: 'utf8',
+    maxBuffer: 64 * 1024 * 1024
+  }));
+  // The records carry the request id and precede the final response, which holds no symbols.
+  assert.strictEqual(lines.length, FILE_COUNT + 1);
+  assert.ok(lines.every(line => line.id === 7));
+  assert.ok(lines.slice(0, FILE_COUNT).every(line => line.record.type === 'file'));
+  const response = lines[FILE_COUNT];
+  assert.strictEqual(response.ok, true, response.error);
+  assert.strictEqual(response.result.fileCount, FILE_COUNT);
+  assert.strictEqual(response.result.symbols, undefined);
+  assert.ok(Array.isArray(response.result.files));
+}
+
+function runBrokenCacheTests(root) {
+  const projectPath = path.join(root, 'broken');
+  const pklPath = path.join(projectPath, '.serena', 'cache', 'python', 'document_symbols.pkl');
+  fs.mkdirSync(path.dirname(pklPath), { recursive: true });
+  fs.writeFileSync(pklPath, 'not a pickle');
+  // An unreadable cache still ends the stream with a summary, which carries the error.
+  const records = readRecords(parse(projectPath, ['--stream']));
+  assert.deepStrictEqual(records.map(record => record.type), ['tree', 'summary']);
+  assert.strictEqual(records[1].fileCount, 0);
+  assert.ok(records[1].error.startsWith('python:'), records[1].error);
+}
+
+async function runClientTests(projectPath) {
+  const parser = require('../src/server/services/serena-parser');
+  try {
+    const seen = [];
+    const result = await parser.parseSerenaCache(projectPath, { onRecord: record => seen.push(record.type) });
+    assert.strictEqual(result.fileCount, FILE_COUNT);
+    assert.strictEqual(Object.keys(result.symbols).length, FILE_COUNT);
+    assert.ok(Array.isArray(result.files));
+    assert.strictEqual(seen.filter(type => type === 'file').length, FILE_COUNT);
+    assert.strictEqual(seen[seen.length - 1], 'summary');
+  } finally {
+    parser.stopSerenaParser();
+  }
+}
+
+async function runStreamTests() {
+  if (!hasPython()) {
+    console.log('serena stream tests skipped (python3 not available)');
+    return;
+  }
+
+  const root = fs.mkdtempSync(path.join(os.tmpdir(), 'serena-stream-'));
+  const projectPath = path.join(root, 'project');
+  try {
+    const entries = {};
+    for (let index = 0; index < FILE_COUNT; index++) {
+      const file = path.join(projectPath, 'src', `pkg${index % 7}`, `module${index}.py`);
+      entries[file] = { hash: `h${index}`, symbols: [{ name: `Class${index}`, kind: 5, children: [{ name: 'run', kind: 6 }] }] };
+    }
+    writeSymbolPkl(projectPath, entries);
+    runOneShotTests(projectPath);
+    runServerTests(projectPath);
+    runBrokenCacheTests(root);
+    await runClientTests(projectPath);
+  } finally {
+    fs.rmSync(root, { recursive: true, force: true });
+  }
+  console.log('serena stream tests passed');
+}
+
+runStreamTests().catch((error) => {
+  console.error(error);
+  process.exit(1);
+});
@@ -0,0 +1,232 @@
+const assert = require('assert');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const { execFileSync } = require('child_process');
+
+const {
+  applySymbolPatch,
+  getCacheStatus,
+  getFiles,
+  getSymbols,
+  getSymbolsEntry,
+  getSymbolReferences,
+  getSymbolWatchStatus
+} = require('../src/server/services/serena.service');
+const { stopSerenaParser } = require('../src/server/services/serena-parser');
+const { decodeCompactResult } = require('../src/server/services/serena-compact');
+
+const SCRIPT_PATH = path.join(__dirname, '..', 'scripts', 'parse_serena_pkl.py');
+
+function hasPython() {
+  try {
+    execFileSync('python3', ['--version'], { stdio: 'ignore' });
+    return true;
+  } catch (error) {
+    return false;
+  }
+}
+
+function writeSymbolPkl(projectPath, entries, mtimeSeconds, language = 'python') {
+  const pklPath = path.join(projectPath, '.serena', 'cache', language, 'document_symbols.pkl');
+  fs.mkdirSync(path.dirname(pklPath), { recursive: true });
+  const script = [
+    'import json, pickle, sys',
+    'entries = json.loads(sys.argv[2])',
+    'data = {key: (value["hash"], {"root_symbols": value["symbols"]}) for key, value in entries.items()}',
+    'pickle.dump({"obj": data}, open(sys.argv[1], "wb"))'
+  ].join('\n');
+  execFileSync('python3', ['-c', script, pklPath, JSON.stringify(entries)]);
+  fs.utimesSync(pklPath, mtimeSeconds, mtimeSeconds);
+}
+
+function entry(projectPath, name, hash) {
+  return {
+    [path.join(projectPath, 'src', `${name}.py`)]: {
+      hash,
+      symbols: [{ name, kind: 5, children: [{ name: `${name}_method`, kind: 6 }] }]
+    }
+  };
+}
+
+function runPatchTests() {
+  const target = {
+    files: [{ name: 'a.py', path: 'a.py', type: 'file' }],
+    symbols: { 'a.py': [{ name: 'A' }], 'b.py': [{ name: 'B' }] },
+    fileCount: 2,
+    version: 'v1'
+  };
+  const result = applySymbolPatch(target, {
+    patch: { added: { 'c.py': [{ name: 'C' }] }, changed: { 'a.py': [{ name: 'A2' }] }, removed: ['b.py'] },
+    fileCount: 2,
+    version: 'v2'
+  });
+  assert.strictEqual(result, target);
+  assert.deepStrictEqual(Object.keys(target.symbols).sort(), ['a.py', 'c.py']);
+  assert.strictEqual(target.symbols['a.py'][0].name, 'A2');
+  assert.strictEqual(target.files.length, 1);
+  assert.strictEqual(target.version, 'v2');
+}
+
+function runCompactTests() {
+  const projectPath = fs.mkdtempSync(path.join(os.tmpdir(), 'cctoolbox-serena-compact-'));
+  try {
+    const range = (line, character, endLine, endCharacter) => ({
+      start: { line, character },
+      end: { line: endLine, character: endCharacter }
+    });
+    writeSymbolPkl(projectPath, {
+      [path.join(projectPath, 'src', 'pkg', 'mod.py')]: {
+        hash: 'h1',
+        symbols: [
+          {
+            name: 'Outer',
+            kind: 5,
+            detail: 'class Outer',
+            range: range(0, 0, 9, 0),
+            selectionRange: range(0, 6, 0, 11),
+            children: [
+              { name: 'method', kind: 6, detail: 'def method()', range: range(1, 4, 2, 0), children: [{ name: 'inner', kind: 12 }] },
+              { name: 'other', kind: 6, detail: 'def method()' }
+            ]
+          },
+          { name: 'helper', kind: 12, range: { start: { line: 11, character: 0 } } }
+        ]
+      },
+      [path.join(projectPath, 'src', 'top.py')]: { hash: 'h2', symbols: [{ name: 'Outer', kind: 'custom' }] },
+      '/outside/lib/ext.py': { hash: 'h3', symbols: [{ name: 'ext', kind: 12 }] }
+    }, 1700000000);
+    const run = (...args) => JSON.parse(execFileSync('python3', [SCRIPT_PATH, '--project', projectPath, '--no-index', ...args]));
+    const expected = run();
+    const compact = run('--compact');
+    assert.strictEqual(compact.format, 'cctoolbox-compact');
+    assert.strictEqual(compact.strings.filter(value => value === 'def method()').length, 1);
+    const decoded = decodeCompactResult(compact);
+    assert.deepStrictEqual(decoded.files, expected.files);
+    assert.deepStrictEqual(Object.keys(decoded.symbols).sort(), Object.keys(expected.symbols).sort());
+    assert.deepStrictEqual(JSON.parse(JSON.stringify(decoded.symbols)), expected.symbols);
+    decoded.symbols['src/top.py'] = [];
+    assert.deepStrictEqual(decoded.symbols['src/top.py'], []);
+  } finally {
+    fs.rmSync(projectPath, { recursive: true, force: true });
+  }
+}
+
+async function runParserTests() {
+  if (!hasPython()) {
+    console.log('python3 not available, skipping serena parser tests');
+    return;
+  }
+  const projectPath = fs.mkdtempSync(path.join(os.tmpdir(), 'cctoolbox-serena-test-'));
+  try {
+    writeSymbolPkl(projectPath, {
+      ...entry(projectPath, 'alpha', 'h1'),
+      ...entry(projectPath, 'beta', 'h2')
+    }, 1700000000);
+
+    const [tree, sameTree] = await Promise.all([getFiles(projectPath), getFiles(projectPath)]);
+    assert.strictEqual(tree, sameTree);
+    assert.strictEqual(tree[0].name, 'src');
+    assert.strictEqual(tree[0].children.length, 2);
+
+    const shallow = await getSymbols(projectPath, { filePath: 'src/alpha.py', maxDepth: 0 });
+    assert.strictEqual(shallow[0].name, 'alpha');
+    assert.deepStrictEqual(shallow[0].children, []);
+    assert.strictEqual(shallow[0].truncated, true);
+    const deep = await getSymbols(projectPath, { filePath: 'src/alpha.py' });
+    assert.strictEqual(deep[0].children[0].name, 'alpha_method');
+
+    const matches = await getSymbols(projectPath, { query: 'METHOD' });
+    assert.deepStrictEqual(matches.map(item => `${item.file}:${item.container}.${item.name}`), [
+      'src/beta.py:beta.beta_method',
+      'src/alpha.py:alpha.alpha_method'
+    ]);
+    const ranked = await getSymbols(projectPath, { query: 'beta', limit: 1 });
+    assert.deepStrictEqual(ranked.map(item => item.name), ['beta']);
+
+    const initial = await getSymbols(projectPath);
+    assert.deepStrictEqual(Object.keys(initial).sort(), ['src/alpha.py', 'src/beta.py']);
+    const { lastParse } = getCacheStatus(projectPath);
+    assert.strictEqual(lastParse.mode, 'full');
+    assert.strictEqual(lastParse.stats.fileCount, 2);
+    assert.strictEqual(lastParse.stats.symbolCount, 4);
+    assert.strictEqual(typeof lastParse.elapsedMs, 'number');
+    assert.strictEqual(lastParse.nearTimeout, false);
+
+    const hashed = await getSymbolsEntry(projectPath);
+    const fileHashed = await getSymbolsEntry(projectPath, { filePath: 'src/alpha.py', maxDepth: 0 });
+    assert.ok(hashed.hash);
+    assert.ok(fileHashed.hash.endsWith('-0'));
+    writeSymbolPkl(projectPath, {
+      ...entry(projectPath, 'alpha', 'h1'),
+      ...entry(projectPath, 'beta', 'h2')
+    }, 1700000050);
+    const rewritten = await getSymbolsEntry(projectPath);
+    assert.notStrictEqual(getCacheStatus(projectPath).lastParse, lastParse);
+    assert.strictEqual(rewritten.hash, hashed.hash);
+
+    writeSymbolPkl(projectPath, {
+      ...entry(projectPath, 'alpha', 'h1'),
+      ...entry(projectPath, 'gamma', 'h3')
+    }, 1700000100);
+
+    const symbols = await getSymbols(projectPath);
+    assert.deepStrictEqual(Object.keys(symbols).sort(), ['src/alpha.py', 'src/gamma.py']);
+    assert.notStrictEqual((await getSymbolsEntry(projectPath)).hash, hashed.hash);
+    assert.strictEqual(symbols['src/gamma.py'][0].name, 'gamma');
+    assert.strictEqual(getCacheStatus(projectPath).lastParse.mode, 'patch');
+
+    const refreshed = await getFiles(projectPath);
+    assert.deepStrictEqual(refreshed[0].children.map(node => node.name), ['alpha.py', 'gamma.py']);
+
+    writeSymbolPkl(projectPath, {
+      [path.join(projectPath, 'web', 'delta.ts')]: { hash: 'h4', symbols: [{ name: 'delta', kind: 12 }] }
+    }, 1700000200, 'typescript');
+    const merged = await getSymbols(projectPath);
+    assert.deepStrictEqual(Object.keys(merged).sort(), ['src/alpha.py', 'src/gamma.py', 'web/delta.ts']);
+    const status = getCacheStatus(projectPath);
+    assert.deepStrictEqual(status.caches.map(cache => cache.language), ['typescript', 'python']);
+    assert.deepStrictEqual(status.lastParse.caches.map(cache => [cache.language, cache.fileCount]), [
+      ['typescript', 1],
+      ['python', 2]
+    ]);
+    const mergedTree = await getFiles(projectPath);
+    assert.strictEqual(mergedTree.find(node => node.name === 'web').children[0].language, 'typescript');
+    const { projects: watched } = await getSymbolWatchStatus();
+    assert.ok(watched.some(item => item.project === path.resolve(projectPath)));
+    // The watcher dies with the daemon; the next daemon registers the project again.
+    stopSerenaParser();
+    const { projects: rewatched } = await getSymbolWatchStatus();
+    assert.ok(rewatched.some(item => item.project === path.resolve(projectPath)));
+
+    fs.mkdirSync(path.join(projectPath, 'src'), { recursive: true });
+    fs.writeFileSync(path.join(projectPath, 'src', 'alpha.py'), 'def alpha():\n    return alpha_method(alpha)\n');
+    const references = await getSymbolReferences(projectPath, 'alpha', { limit: 1 });
+    assert.strictEqual(references.total, 2);
+    assert.deepStrictEqual(references.items, [{ file: 'src/alpha.py', line: 1, column: 5, preview: 'def alpha():' }]);
+    const nextPage = await getSymbolReferences(projectPath, 'alpha', { offset: 1, limit: 1 });
+    assert.strictEqual(nextPage.items[0].column, 25);
+    const dotted = await getSymbolReferences(projectPath, 'alpha_method(alpha');
+    assert.deepStrictEqual(dotted.items.map(item => `${item.line}:${item.column}`), ['2:12']);
+  } finally {
+    stopSerenaParser();
+    fs.rmSync(projectPath, { recursive: true, force: true });
+  }
+}
+
+async function runTests() {
+  runPatchTests();
+  if (hasPython()) {
+    runCompactTests();
+  }
+  await runParserTests();
+}
+
+runTests()
+  .then(() => {
+    console.log('serena-symbol-cache tests passed');
+  })
+  .catch((error) => {
+    console.error(error);
+    process.exit(1);
+  });
@@ -0,0 +1,127 @@
+const assert = require('assert');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const { execFileSync } = require('child_process');
+
+const SCRIPTS_DIR = path.join(__dirname, '..', 'scripts');
+const SCRIPT_PATH = path.join(SCRIPTS_DIR, 'parse_serena_pkl.py');
+
+function hasPython() {
+  try {
+    execFileSync('python3', ['--version'], { stdio: 'ignore' });
+    return true;
+  } catch (error) {
+    return false;
+  }
+}
+
+// Pickles symbols as instances of a class from a throwaway module, the way Serena pickles its own types.
+// Children point back at their parent, and every symbol carries a body the normalizer never reads.
+const WRITE_SCRIPT = `
+import os, pickle, sys
+sys.path.insert(0, sys.argv[1])
+from serena_fake_types import Symbol
+
+project, pkl_path = sys.argv[2], sys.argv[3]
+data = {}
+for index in range(3):
+    parent = Symbol(f'Class{index}', 5, f'class Class{index}: ...' * 50)
+    for child_index in range(2):
+        child = Symbol(f'method{child_index}', 6, 'pass\\n' * 20)
+        child.parent = parent
+        parent.children.append(child)
+    data[os.path.join(project, 'pkg', f'module{index}.py')] = (f'hash{index}', {'root_symbols': [parent]})
+with open(pkl_path, 'wb') as handle:
+    pickle.dump({'obj': data}, handle)
+`;
+
+const FAKE_MODULE = `
+class Symbol:
+    def __init__(self, name, kind, body):
+        self.name = name
+        self.kind = kind
+        self.body = body
+        self.location = {'uri': 'file:///x', 'range': None}
+        self.range = {'start': {'line': 1, 'character': 0}, 'end': {'line': 9, 'character': 0}}
+        self.children = []
+        self.parent = None
+`;
+
+// Loads the pkl with both placeholder flavours and reports how each one stored the objects.
+const LOAD_SCRIPT = `
+import json, sys
+sys.path.insert(0, sys.argv[1])
+import parse_serena_pkl as parser
+
+report = {}
+for lean in (False, True):
+    parser.SafeUnpickler.resolved_classes.clear()
+    with open(sys.argv[2], 'rb') as handle:
+        data = parser.SafeUnpickler(handle, lean=lean).load()['obj']
+    symbol = next(iter(data.values()))[1]['root_symbols'][0]
+    child = symbol.children[0]
+    report['lean' if lean else 'full'] = {
+        'type': type(symbol).__name__,
+        'hasDict': hasattr(symbol, '__dict__'),
+        'fields': sorted(symbol.__getstate__()),
+        'childFields': sorted(child.__getstate__()),
+        'name': symbol.name,
+        'missingAttribute': not hasattr(symbol, 'no_such_field'),
+        'resolved': {'.'.join(key): value is not None for key, value in parser.SafeUnpickler.resolved_classes.items()},
+    }
+print(json.dumps(report))
+`;
+
+function parse(projectPath, args) {
+  return JSON.parse(execFileSync('python3', [SCRIPT_PATH, '--project', projectPath, '--no-index', ...args], { encoding: 'utf8' }));
+}
+
+function runUnpicklerTests() {
+  if (!hasPython()) {
+    console.log('serena unpickler tests skipped (python3 not available)');
+    return;
+  }
+
+  const root = fs.mkdtempSync(path.join(os.tmpdir(), 'serena-unpickler-'));
+  try {
+    const moduleDir = path.join(root, 'modules');
+    const projectPath = path.join(root, 'project');
+    const pklPath = path.join(projectPath, '.serena', 'cache', 'python', 'document_symbols.pkl');
+    fs.mkdirSync(path.dirname(pklPath), { recursive: true });
+    fs.mkdirSync(moduleDir);
+    fs.writeFileSync(path.join(moduleDir, 'serena_fake_types.py'), FAKE_MODULE);
+    execFileSync('python3', ['-c', WRITE_SCRIPT, moduleDir, projectPath, pklPath]);
+    // The parser never has Serena's own modules on its path.
+    fs.rmSync(moduleDir, { recursive: true, force: true });
+
+    const report = JSON.parse(execFileSync('python3', ['-c', LOAD_SCRIPT, SCRIPTS_DIR, pklPath], { encoding: 'utf8' }));
+    assert.deepStrictEqual(report.full.resolved, { 'serena_fake_types.Symbol': false });
+    assert.strictEqual(report.full.type, 'PlaceholderObject');
+    assert.strictEqual(report.full.hasDict, false);
+    assert.strictEqual(report.full.name, 'Class0');
+    assert.strictEqual(report.full.missingAttribute, true);
+    assert.deepStrictEqual(report.full.fields, ['body', 'children', 'kind', 'location', 'name', 'parent', 'range']);
+
+    // Lean placeholders keep only what the normalizer reads, down through the children.
+    assert.strictEqual(report.lean.type, 'LeanPlaceholderObject');
+    assert.strictEqual(report.lean.hasDict, false);
+    assert.deepStrictEqual(report.lean.fields, ['children', 'kind', 'name', 'range']);
+    assert.deepStrictEqual(report.lean.childFields, ['children', 'kind', 'name', 'range']);
+
+    // Both modes produce the same output.
+    const full = parse(projectPath, []);
+    assert.strictEqual(full.error, undefined, full.error);
+    assert.strictEqual(full.fileCount, 3);
+    const symbol = full.symbols['pkg/module1.py'][0];
+    assert.strictEqual(symbol.name, 'Class1');
+    assert.strictEqual(symbol.kind, 5);
+    assert.deepStrictEqual(symbol.children.map(child => child.name), ['method0', 'method1']);
+    assert.deepStrictEqual(parse(projectPath, ['--lean']), full);
+  } finally {
+    fs.rmSync(root, { recursive: true, force: true });
+  }
+  console.log('serena unpickler tests passed');
+}
+
+runUnpicklerTests();
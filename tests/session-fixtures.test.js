@@ -0,0 +1,185 @@
+const assert = require('assert');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const { execFileSync, spawnSync } = require('child_process');
+
+const FIXTURE_SCRIPT = path.join(__dirname, 'manual', 'session_fixtures.py');
+const SESSIONS = 60;
+const PROJECTS = 5;
+const LARGE_BYTES = 60000;
+const MTIME_DAYS = 30;
+const GENERATE_ARGS = [
+  '--projects', String(PROJECTS), '--sessions', String(SESSIONS), '--messages', '2:12', '--message-bytes', '20:400',
+  '--large-ratio', '0.1', '--large-bytes', String(LARGE_BYTES), '--mtime-days', String(MTIME_DAYS)
+];
+
+function hasPython() {
+  try {
+    execFileSync('python3', ['--version'], { stdio: 'ignore' });
+    return true;
+  } catch (error) {
+    return false;
+  }
+}
+
+function generate(home, args) {
+  const result = spawnSync('python3', [FIXTURE_SCRIPT, '--home', home, ...GENERATE_ARGS, ...args], { encoding: 'utf8' });
+  assert.strictEqual(result.status, 0, result.stderr);
+  return JSON.parse(result.stdout);
+}
+
+function listFiles(dir, suffix) {
+  if (!fs.existsSync(dir)) return [];
+  return fs.readdirSync(dir, { recursive: true })
+    .filter(name => name.endsWith(suffix))
+    .map(name => path.join(dir, name))
+    .sort();
+}
+
+function sessionFiles(home) {
+  return {
+    claude: listFiles(path.join(home, '.claude', 'projects'), '.jsonl'),
+    codex: listFiles(path.join(home, '.codex', 'sessions'), '.jsonl'),
+    gemini: listFiles(path.join(home, '.gemini', 'tmp'), '.json')
+  };
+}
+
+function readJsonl(filePath) {
+  return fs.readFileSync(filePath, 'utf8').trim().split('\n').map(line => JSON.parse(line));
+}
+
+// The session id and message texts of every file; timestamps and paths follow the wall clock, these do not.
+function sessionContents(home) {
+  const files = sessionFiles(home);
+  const contents = {};
+  for (const filePath of files.claude) {
+    const records = readJsonl(filePath);
+    contents[`claude:${records[0].sessionId}`] = [path.basename(path.dirname(filePath)), ...records.map(record => record.message.content)];
+  }
+  for (const filePath of files.codex) {
+    const [meta, ...messages] = readJsonl(filePath);
+    contents[`codex:${meta.payload.id}`] = [meta.payload.cwd, ...messages.map(record => record.payload.content[0].text)];
+  }
+  for (const filePath of files.gemini) {
+    const data = JSON.parse(fs.readFileSync(filePath, 'utf8'));
+    contents[`gemini:${data.sessionId}`] = [data.projectHash, ...data.messages.map(message => message.content)];
+  }
+  return contents;
+}
+
+function runSummaryTests(home, summary) {
+  const files = sessionFiles(home);
+  for (const cli of ['claude', 'codex', 'gemini']) {
+    assert.strictEqual(summary[cli].sessions, SESSIONS, cli);
+    assert.strictEqual(files[cli].length, SESSIONS, cli);
+    assert.strictEqual(summary[cli].bytes, files[cli].reduce((total, file) => total + fs.statSync(file).size, 0), cli);
+    assert.ok(summary[cli].projects >= 1 && summary[cli].projects <= PROJECTS, cli);
+    // A share of the sessions are large transcripts.
+    assert.ok(files[cli].some(file => fs.statSync(file).size >= LARGE_BYTES), cli);
+    // mtimes are spread over the requested window.
+    const now = Date.now();
+    for (const file of files[cli]) {
+      const age = now - fs.statSync(file).mtimeMs;
+      assert.ok(age >= -1000 && age <= MTIME_DAYS * 86400 * 1000 + 60000, file);
+    }
+  }
+  // The Zipf skew puts the most sessions into the first project, which the summary names.
+  const counts = {};
+  for (const file of files.claude) {
+    const project = path.basename(path.dirname(file));
+    counts[project] = (counts[project] || 0) + 1;
+  }
+  const busiest = Object.entries(counts).sort((a, b) => b[1] - a[1])[0][0];
+  assert.strictEqual(summary.claude.largestProject, '-seed-project-0000');
+  assert.strictEqual(busiest, summary.claude.largestProject);
+}
+
+function runFormatTests(home) {
+  const files = sessionFiles(home);
+
+  // Claude records chain by parentUuid and share the session id and cwd.
+  for (const file of files.claude) {
+    const records = readJsonl(file);
+    assert.strictEqual(path.basename(file, '.jsonl'), records[0].sessionId);
+    assert.ok(records[0].message.content.startsWith(`seed ${records[0].sessionId}`));
+    records.forEach((record, index) => {
+      assert.strictEqual(record.type, index % 2 === 0 ? 'user' : 'assistant');
+      assert.strictEqual(record.parentUuid, index === 0 ? null : records[index - 1].uuid);
+      assert.strictEqual(record.sessionId, records[0].sessionId);
+      assert.ok(record.cwd.startsWith('/seed/'));
+    });
+  }
+
+  // The app's own readers accept the Codex and Gemini files.
+  const { parseSessionMeta } = require('../src/server/services/codex-parser');
+  for (const file of files.codex) {
+    const [meta, ...messages] = readJsonl(file);
+    const parsed = parseSessionMeta(file);
+    assert.strictEqual(parsed.meta.sessionId, meta.payload.id);
+    assert.strictEqual(parsed.meta.cwd, meta.payload.cwd);
+    assert.strictEqual(parsed.messageCount, messages.length);
+    assert.ok(parsed.preview.startsWith(`seed ${meta.payload.id}`));
+  }
+
+  const previousHome = process.env.HOME;
+  process.env.HOME = home;
+  try {
+    const gemini = require('../src/server/services/gemini-sessions');
+    const sessions = gemini.getAllSessions();
+    assert.strictEqual(sessions.length, SESSIONS);
+    for (const session of sessions) {
+      const data = JSON.parse(fs.readFileSync(session.filePath, 'utf8'));
+      assert.strictEqual(session.messageCount, data.messages.length);
+      assert.ok(session.firstMessage.startsWith(`seed ${session.sessionId}`));
+    }
+  } finally {
+    process.env.HOME = previousHome;
+  }
+}
+
+function runArgumentTests(home) {
+  for (const args of [['--cli', 'claude,bogus'], ['--messages', '5:2'], ['--message-bytes', '0']]) {
+    const result = spawnSync('python3', [FIXTURE_SCRIPT, '--home', home, ...args], { encoding: 'utf8' });
+    assert.strictEqual(result.status, 2, args.join(' '));
+  }
+  assert.ok(!fs.existsSync(home));
+}
+
+function runSessionFixtureTests() {
+  if (!hasPython()) {
+    console.log('session fixture tests skipped (python3 not available)');
+    return;
+  }
+
+  const root = fs.mkdtempSync(path.join(os.tmpdir(), 'cctoolbox-session-fixtures-'));
+  try {
+    const serial = path.join(root, 'serial');
+    const summary = generate(serial, ['--workers', '1']);
+    runSummaryTests(serial, summary);
+    runFormatTests(serial);
+
+    // Every batch has its own seed, so the worker count does not change what is written.
+    const pooled = path.join(root, 'pooled');
+    generate(pooled, ['--workers', '2']);
+    const expected = sessionContents(serial);
+    assert.strictEqual(Object.keys(expected).length, SESSIONS * 3);
+    assert.deepStrictEqual(sessionContents(pooled), expected);
+
+    // Another seed gives other sessions; another prefix adds an independent set next to the first.
+    const reseeded = path.join(root, 'reseeded');
+    generate(reseeded, ['--workers', '1', '--seed', 'other', '--cli', 'claude']);
+    const reseededIds = Object.keys(sessionContents(reseeded));
+    assert.strictEqual(reseededIds.length, SESSIONS);
+    assert.ok(reseededIds.every(id => !(id in expected)));
+    generate(serial, ['--workers', '1', '--prefix', 'extra', '--cli', 'codex']);
+    assert.strictEqual(sessionFiles(serial).codex.length, SESSIONS * 2);
+
+    runArgumentTests(path.join(root, 'invalid'));
+  } finally {
+    fs.rmSync(root, { recursive: true, force: true });
+  }
+  console.log('session fixture tests passed');
+}
+
+runSessionFixtureTests();
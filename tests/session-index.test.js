@@ -0,0 +1,178 @@
+const assert = require('assert');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const { execFileSync, spawnSync } = require('child_process');
+
+const INDEX_SCRIPT = path.join(__dirname, '..', 'scripts', 'build_session_index.py');
+const FIXTURE_SCRIPT = path.join(__dirname, 'manual', 'session_fixtures.py');
+const MIN_LARGE_FILE_BYTES = 512 * 1024;
+
+function hasPython() {
+  try {
+    execFileSync('python3', ['--version'], { stdio: 'ignore' });
+    return true;
+  } catch (error) {
+    return false;
+  }
+}
+
+function runIndex(home, args = []) {
+  const output = execFileSync('python3', [
+    INDEX_SCRIPT, '--home', home, '--db', path.join(home, 'index.sqlite'), '--workers', '1',
+    '--list', '--limit', '100000', ...args
+  ], { encoding: 'utf8', maxBuffer: 64 * 1024 * 1024 });
+  const result = JSON.parse(output);
+  assert.strictEqual(result.error, undefined, result.error);
+  return result;
+}
+
+function readJsonl(filePath) {
+  return fs.readFileSync(filePath, 'utf8').split('\n').filter(Boolean).map(line => JSON.parse(line));
+}
+
+function textOf(content) {
+  if (typeof content === 'string') return content;
+  return content.map(part => part.text || part.input_text || '').join('\n');
+}
+
+// Exact values straight from the files, with the same rules as src/utils/session.js and codex-parser.js.
+function expectedSession(item) {
+  if (item.cli === 'gemini') {
+    const data = JSON.parse(fs.readFileSync(item.filePath, 'utf8'));
+    return { sessionId: data.sessionId, cwd: null, messageCount: data.messages.length };
+  }
+  const records = readJsonl(item.filePath);
+  if (item.cli === 'claude') {
+    const messages = records.filter(record => record.type === 'user' || record.type === 'assistant');
+    const firstUser = messages.find(record => record.type === 'user');
+    return {
+      sessionId: records[0].sessionId,
+      cwd: records.find(record => record.cwd)?.cwd || null,
+      messageCount: messages.length,
+      firstMessage: firstUser ? textOf(firstUser.message.content).slice(0, 500) : null
+    };
+  }
+  const meta = records.find(record => record.type === 'session_meta').payload;
+  const messages = records.filter(record => record.type === 'response_item');
+  const firstUser = messages.find(record => record.payload.role === 'user');
+  return {
+    sessionId: meta.id,
+    cwd: meta.cwd,
+    messageCount: messages.length,
+    firstMessage: firstUser ? textOf(firstUser.payload.content).trim().slice(0, 500) : null
+  };
+}
+
+function assertMatchesFiles(items) {
+  for (const item of items) {
+    const expected = expectedSession(item);
+    assert.strictEqual(item.sessionId, expected.sessionId, item.filePath);
+    assert.strictEqual(item.cwd, expected.cwd, item.filePath);
+    if (expected.firstMessage !== undefined) {
+      assert.strictEqual(item.firstMessage, expected.firstMessage, item.filePath);
+    }
+    if (item.messageCountExact) {
+      assert.strictEqual(item.messageCount, expected.messageCount, item.filePath);
+    } else {
+      const error = Math.abs(item.messageCount - expected.messageCount) / expected.messageCount;
+      assert.ok(error <= 0.1, `${item.filePath}: estimated ${item.messageCount}, actual ${expected.messageCount}`);
+    }
+  }
+}
+
+function writeLines(filePath, records) {
+  fs.mkdirSync(path.dirname(filePath), { recursive: true });
+  fs.writeFileSync(filePath, records.map(record => JSON.stringify(record)).join('\n') + '\n');
+}
+
+function runGeneratedFixtureTests(home) {
+  // Messages up to 100 KB put some lines past the 64 KB prefix the indexer keeps, with cwd written last;
+  // the large transcripts go above --large-file-bytes and are sampled.
+  execFileSync('python3', [
+    FIXTURE_SCRIPT, '--home', home, '--projects', '3', '--sessions', '30', '--messages', '2:30',
+    '--message-bytes', '40:100000', '--large-ratio', '0.15', '--large-bytes', '1500000', '--workers', '1'
+  ], { stdio: 'ignore' });
+
+  const first = runIndex(home, ['--large-file-bytes', String(MIN_LARGE_FILE_BYTES)]);
+  assert.strictEqual(first.index.files, 90);
+  assert.strictEqual(first.index.updated, 90);
+  assert.strictEqual(first.index.failed, 0);
+  assert.strictEqual(first.total, 90);
+  assert.ok(first.items.some(item => !item.messageCountExact), 'expected sampled transcripts');
+  assert.ok(first.items.some(item => item.cli === 'claude' && item.size > MIN_LARGE_FILE_BYTES));
+  assertMatchesFiles(first.items);
+
+  // An unchanged tree is not rescanned; an append resumes from the last scanned offset.
+  const exact = first.items.find(item => item.cli === 'claude' && item.messageCountExact);
+  const records = readJsonl(exact.filePath);
+  const appended = { ...records[records.length - 1], type: 'assistant', uuid: 'appended', message: { role: 'assistant', content: 'more' } };
+  fs.appendFileSync(exact.filePath, JSON.stringify(appended) + '\n');
+  const second = runIndex(home, ['--large-file-bytes', String(MIN_LARGE_FILE_BYTES)]);
+  assert.strictEqual(second.index.updated, 1);
+  assert.strictEqual(second.index.appended, 1);
+  assertMatchesFiles(second.items);
+}
+
+function runKeyOrderTests(home) {
+  const projectDir = path.join(home, '.claude', 'projects', '-key-order');
+  const huge = 'x'.repeat(300 * 1024);
+  // Metadata after a message far larger than the kept line prefix.
+  const messageFirst = (type, content, index) => ({
+    message: { role: type, content: [{ type: 'text', text: content }] },
+    type,
+    uuid: `uuid-${index}`,
+    timestamp: `2025-01-01T00:00:0${index}.000Z`,
+    sessionId: 'message-first',
+    cwd: '/work/message-first'
+  });
+  writeLines(path.join(projectDir, 'message-first.jsonl'), [
+    messageFirst('user', `first question ${huge}`, 1),
+    messageFirst('assistant', huge, 2),
+    messageFirst('user', 'short follow-up', 3)
+  ]);
+  // A sampled transcript whose first line alone is larger than the head window.
+  writeLines(path.join(projectDir, 'huge-head.jsonl'), [
+    messageFirst('user', `opening ${'y'.repeat(700 * 1024)}`, 1),
+    ...Array.from({ length: 20 }, (_, index) => messageFirst(index % 2 ? 'user' : 'assistant', 'z'.repeat(1024), 2))
+  ].map(record => ({ ...record, sessionId: 'huge-head', cwd: '/work/huge-head' })));
+
+  const result = runIndex(home, ['--cli', 'claude', '--project=-key-order', '--large-file-bytes', String(MIN_LARGE_FILE_BYTES)]);
+  const byId = Object.fromEntries(result.items.map(item => [item.sessionId, item]));
+  assert.deepStrictEqual(Object.keys(byId).sort(), ['huge-head', 'message-first']);
+  assert.strictEqual(byId['message-first'].cwd, '/work/message-first');
+  assert.strictEqual(byId['message-first'].messageCount, 3);
+  assert.ok(byId['message-first'].firstMessage.startsWith('first question xxx'));
+  assert.strictEqual(byId['huge-head'].messageCountExact, false);
+  assert.strictEqual(byId['huge-head'].cwd, '/work/huge-head');
+  assert.strictEqual(byId['huge-head'].messageCount, 21);
+  assertMatchesFiles(result.items);
+}
+
+function runArgumentTests(home) {
+  const result = spawnSync('python3', [INDEX_SCRIPT, '--home', home, '--db', path.join(home, 'x.sqlite'), '--large-file-bytes', '1000'], {
+    encoding: 'utf8'
+  });
+  assert.strictEqual(result.status, 2);
+  assert.ok(result.stderr.includes('--large-file-bytes'), result.stderr);
+  assert.ok(!fs.existsSync(path.join(home, 'x.sqlite')));
+}
+
+function runSessionIndexTests() {
+  if (!hasPython()) {
+    console.log('session index tests skipped (python3 not available)');
+    return;
+  }
+
+  const home = fs.mkdtempSync(path.join(os.tmpdir(), 'cctoolbox-session-index-'));
+  try {
+    runGeneratedFixtureTests(home);
+    runKeyOrderTests(home);
+    runArgumentTests(home);
+  } finally {
+    fs.rmSync(home, { recursive: true, force: true });
+  }
+  console.log('session index tests passed');
+}
+
+runSessionIndexTests();
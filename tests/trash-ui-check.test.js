@@ -0,0 +1,277 @@
+const assert = require('assert');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const { execFileSync } = require('child_process');
+
+const MANUAL_DIR = path.join(__dirname, 'manual');
+
+function hasPython() {
+  try {
+    execFileSync('python3', ['--version'], { stdio: 'ignore' });
+    return true;
+  } catch (error) {
+    return false;
+  }
+}
+
+// Loads tests/manual/trash-ui-check.py (which needs playwright) against a stand-in repo root whose backend answers
+// every path with the HOME it was started with and its session counts, then runs the suite read from stdin.
+const HARNESS_SCRIPT = `
+import importlib.util, json, os, sys, tempfile
+from pathlib import Path
+
+manual_dir, fake_root, real_home = sys.argv[1:4]
+sys.path.insert(0, manual_dir)
+try:
+    spec = importlib.util.spec_from_file_location('trash_ui_check', os.path.join(manual_dir, 'trash-ui-check.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+except ImportError as exc:
+    if getattr(exc, 'name', '') and exc.name.split('.')[0] == 'playwright':
+        print(json.dumps({'skipped': True}))
+        sys.exit(0)
+    raise
+
+os.environ['HOME'] = real_home
+module.REPO_ROOT = Path(fake_root)
+tempfile.tempdir = os.path.join(fake_root, 'tmp')
+exec(sys.stdin.read())
+`;
+
+const FAKE_SERVER = `
+const fs = require('fs');
+const http = require('http');
+const path = require('path');
+
+function countFiles(dir) {
+  if (!fs.existsSync(dir)) return 0;
+  return fs.readdirSync(dir, { recursive: true }).filter(name => /\\.jsonl?$/.test(name)).length;
+}
+
+exports.startServer = (port) => http.createServer((req, res) => {
+  const home = process.env.HOME;
+  res.end(JSON.stringify({
+    home,
+    cctoolboxHome: process.env.CCTOOLBOX_HOME,
+    claude: countFiles(path.join(home, '.claude', 'projects')),
+    codex: countFiles(path.join(home, '.codex', 'sessions')),
+    gemini: countFiles(path.join(home, '.gemini', 'tmp'))
+  }));
+}).listen(port, '127.0.0.1');
+`;
+
+const HELPER_SUITE = `
+summary = module.percentile_summary(list(range(100, 0, -1)))
+report = {
+    'empty': module.percentile_summary([]),
+    'single': module.percentile_summary([7.26]),
+    'hundred': summary,
+    'routes': [
+        module.api_route('http://127.0.0.1:1/api/sessions/-perf100-project-0000?limit=50', {'-perf100-project-0000'}),
+        module.api_route('http://127.0.0.1:1/api/codex/sessions/codex-perf100-0000/0f8fad5b-d9cb-469f-a165-70867728950e',
+                         {'codex-perf100-0000'}),
+        module.api_route('http://127.0.0.1:1/api/trash?cli=claude', set()),
+    ],
+}
+print(json.dumps(report))
+`;
+
+// Seeds and serves each CLI's perf project from its own temp HOME, with a sentinel HOME in the environment.
+const PERF_SUITE = `
+import urllib.request
+
+runs = []
+for cli, size in (('claude', 30), ('codex', 20), ('gemini', 10)):
+    with module.perf_backend(cli, size) as (base_url, project):
+        with urllib.request.urlopen(base_url + '/info', timeout=5) as response:
+            info = json.loads(response.read())
+        runs.append({'cli': cli, 'size': size, 'project': project, 'baseUrl': base_url, 'info': info,
+                     'homeExists': os.path.isdir(info['home'])})
+    runs[-1]['homeRemoved'] = not os.path.exists(runs[-1]['info']['home'])
+
+failure = None
+try:
+    with module.isolated_backend('failing', lambda home: 1 / 0):
+        pass
+except ZeroDivisionError:
+    failure = 'raised'
+
+module.REPO_ROOT = Path(fake_root) / 'unbuilt'
+try:
+    with module.isolated_backend('unbuilt', lambda home: None):
+        unbuilt = None
+except RuntimeError as exc:
+    unbuilt = str(exc)
+print(json.dumps({'runs': runs, 'failure': failure, 'unbuilt': unbuilt, 'leftovers': os.listdir(tempfile.tempdir)}))
+`;
+
+// Builds the shared snapshot under a private SNAPSHOT_ROOT: reuse, rebuild, concurrent builds and a restore.
+const SNAPSHOT_SUITE = `
+import concurrent.futures, shutil, threading, urllib.request
+
+module.SNAPSHOT_ROOT = Path(fake_root) / 'snapshots'
+first = module.build_snapshot()
+first_built = module.load_manifest(first)['builtAt']
+reused = module.build_snapshot()
+reused_built = module.load_manifest(reused)['builtAt']
+rebuilt = module.build_snapshot(rebuild=True)
+rebuilt_built = module.load_manifest(rebuilt)['builtAt']
+
+shutil.rmtree(module.SNAPSHOT_ROOT)
+barrier = threading.Barrier(4)
+
+def build_together(_):
+    barrier.wait()
+    return str(module.build_snapshot())
+
+with concurrent.futures.ThreadPoolExecutor(4) as pool:
+    concurrent_paths = list(pool.map(build_together, range(4)))
+snapshot = Path(concurrent_paths[0])
+
+# Age the snapshot by an hour; a restore moves every mtime forward by that much.
+manifest = module.load_manifest(snapshot)
+manifest['builtAt'] -= 3600
+(snapshot / 'manifest.json').write_text(json.dumps(manifest))
+session_dir = Path('.claude') / 'projects' / manifest['claude']
+
+def mtime(home, session_id):
+    return (home / session_dir / f'{session_id}.jsonl').stat().st_mtime
+
+restored = {}
+
+def prepare(home):
+    module.restore_snapshot(snapshot, home)
+    restored['shift'] = mtime(home, 'session-001') - mtime(snapshot / 'home', 'session-001')
+    restored['oldGap'] = mtime(home, 'session-001') - mtime(home, manifest['oldSessionId'])
+
+with module.isolated_backend('snapshot', prepare) as base_url:
+    with urllib.request.urlopen(base_url + '/info', timeout=5) as response:
+        restored['info'] = json.loads(response.read())
+
+print(json.dumps({
+    'key': module.snapshot_key(),
+    'paths': [str(first), str(reused), str(rebuilt)],
+    'built': [first_built, reused_built, rebuilt_built],
+    'concurrent': concurrent_paths,
+    'entries': os.listdir(module.SNAPSHOT_ROOT),
+    'manifest': manifest,
+    'restored': restored,
+    'leftovers': os.listdir(tempfile.tempdir)
+}))
+`;
+
+function writeFile(filePath, content) {
+  fs.mkdirSync(path.dirname(filePath), { recursive: true });
+  fs.writeFileSync(filePath, content);
+}
+
+function createSandbox() {
+  const root = fs.mkdtempSync(path.join(os.tmpdir(), 'cctoolbox-trash-ui-check-'));
+  const sandbox = { root, fakeRoot: path.join(root, 'repo'), realHome: path.join(root, 'real-home') };
+  writeFile(path.join(sandbox.fakeRoot, 'dist', 'web', 'index.html'), '<html></html>\n');
+  writeFile(path.join(sandbox.fakeRoot, 'src', 'server', 'index.js'), FAKE_SERVER);
+  fs.mkdirSync(path.join(sandbox.fakeRoot, 'tmp'));
+  fs.mkdirSync(sandbox.realHome);
+  return sandbox;
+}
+
+function runSuite(sandbox, suite) {
+  const output = execFileSync('python3', ['-c', HARNESS_SCRIPT, MANUAL_DIR, sandbox.fakeRoot, sandbox.realHome], {
+    input: suite,
+    encoding: 'utf8'
+  });
+  return JSON.parse(output);
+}
+
+function runHelperTests(sandbox) {
+  const report = runSuite(sandbox, HELPER_SUITE);
+  if (report.skipped) return report;
+  assert.strictEqual(report.empty, null);
+  assert.deepStrictEqual(report.single, { count: 1, min: 7.3, max: 7.3, p50: 7.3, p90: 7.3, p95: 7.3, p99: 7.3 });
+  // Nearest-rank: p90 of 1..100 is the 90th value.
+  assert.deepStrictEqual(report.hundred, { count: 100, min: 1, max: 100, p50: 50, p90: 90, p95: 95, p99: 99 });
+  assert.deepStrictEqual(report.routes, ['/api/sessions/:param', '/api/codex/sessions/:param/:param', '/api/trash']);
+  return report;
+}
+
+function runPerfBackendTests(sandbox) {
+  const report = runSuite(sandbox, PERF_SUITE);
+  const ports = new Set();
+  for (const run of report.runs) {
+    // Each run gets a fresh temp HOME holding only its own project, and the HOME is removed afterwards.
+    assert.ok(run.baseUrl.startsWith('http://127.0.0.1:'), run.baseUrl);
+    ports.add(run.baseUrl);
+    assert.ok(run.info.home.startsWith(path.join(sandbox.fakeRoot, 'tmp', `cctoolbox-ui-perf-${run.cli}-${run.size}-`)));
+    assert.strictEqual(run.info.cctoolboxHome, run.info.home);
+    for (const cli of ['claude', 'codex', 'gemini']) {
+      assert.strictEqual(run.info[cli], cli === run.cli ? run.size : 0, `${run.cli} ${cli}`);
+    }
+    assert.strictEqual(run.homeExists, true);
+    assert.strictEqual(run.homeRemoved, true);
+  }
+  assert.deepStrictEqual(report.runs.map(run => run.project), [
+    `-perf30-project-0000`, 'codex-perf20-0000', report.runs[2].project
+  ]);
+  assert.match(report.runs[2].project, /^[0-9a-f]{64}$/);
+  assert.strictEqual(ports.size, 3);
+
+  // A failing prepare still removes its temp HOME; the real HOME is never written.
+  assert.strictEqual(report.failure, 'raised');
+  // Without a web build there is nothing to check, so no HOME is created.
+  assert.ok(report.unbuilt.includes('npm run build:web'), report.unbuilt);
+  assert.deepStrictEqual(report.leftovers, []);
+  assert.deepStrictEqual(fs.readdirSync(sandbox.realHome), []);
+}
+
+function runSnapshotTests(sandbox) {
+  const report = runSuite(sandbox, SNAPSHOT_SUITE);
+  const again = runSuite(sandbox, 'print(json.dumps(module.snapshot_key()))');
+  assert.match(report.key, /^[0-9a-f]{16}$/);
+  assert.strictEqual(again, report.key);
+  const expected = path.join(sandbox.fakeRoot, 'snapshots', report.key);
+
+  // A finished snapshot is reused as is; --rebuild seeds it again in the same place.
+  assert.deepStrictEqual(report.paths, [expected, expected, expected]);
+  assert.strictEqual(report.built[1], report.built[0]);
+  assert.ok(report.built[2] > report.built[0]);
+
+  // Concurrent builds all end up with the one snapshot and leave no staging directories behind.
+  assert.deepStrictEqual(report.concurrent, [expected, expected, expected, expected]);
+  assert.deepStrictEqual(report.entries, [report.key]);
+  assert.deepStrictEqual(fs.readdirSync(expected).sort(), ['home', 'manifest.json']);
+  assert.deepStrictEqual(
+    { claude: report.manifest.claude, codex: report.manifest.codex, gemini: report.manifest.gemini, old: report.manifest.oldSessionId },
+    { claude: 'demo-project', codex: 'codex-demo', gemini: 'b'.repeat(64), old: 'session-old' }
+  );
+
+  // The restored copy is shifted by the snapshot's age and keeps the old session 40 days back.
+  const { restored } = report;
+  assert.ok(Math.abs(restored.shift - 3600) < 5, String(restored.shift));
+  assert.ok(Math.abs(restored.oldGap - 40 * 86400) < 60, String(restored.oldGap));
+  assert.deepStrictEqual([restored.info.claude, restored.info.codex, restored.info.gemini], [111, 1, 1]);
+  assert.deepStrictEqual(report.leftovers, []);
+}
+
+function runTrashUiCheckTests() {
+  if (!hasPython()) {
+    console.log('trash ui check tests skipped (python3 not available)');
+    return;
+  }
+
+  const sandbox = createSandbox();
+  try {
+    const helpers = runHelperTests(sandbox);
+    if (helpers.skipped) {
+      console.log('trash ui check tests skipped (playwright not available)');
+      return;
+    }
+    runPerfBackendTests(sandbox);
+    runSnapshotTests(sandbox);
+  } finally {
+    fs.rmSync(sandbox.root, { recursive: true, force: true });
+  }
+  console.log('trash ui check tests passed');
+}
+
+runTrashUiCheckTests();
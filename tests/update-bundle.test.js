@@ -0,0 +1,173 @@
+const assert = require('assert');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const { execFileSync, spawnSync } = require('child_process');
+
+const UPDATE_SCRIPT = path.join(__dirname, '..', 'update.py');
+
+function hasPython() {
+  try {
+    execFileSync('python3', ['--version'], { stdio: 'ignore' });
+    execFileSync('git', ['--version'], { stdio: 'ignore' });
+    return true;
+  } catch (error) {
+    return false;
+  }
+}
+
+// Runs update.py as __main__ with a /health endpoint standing in for the restarted web UI.
+const RUN_UPDATE_SCRIPT = `
+import json, runpy, sys, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+class Health(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = b'{"uptime": 0}'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+server = ThreadingHTTPServer(('127.0.0.1', 0), Health)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+app_dir = Path(sys.argv[2])
+app_dir.mkdir(parents=True, exist_ok=True)
+(app_dir / 'config.json').write_text(json.dumps({'ports': {'webUI': server.server_port}}))
+sys.argv = [sys.argv[1]] + sys.argv[3:]
+try:
+    runpy.run_path(sys.argv[0], run_name='__main__')
+    code = 0
+except SystemExit as exc:
+    code = exc.code if isinstance(exc.code, int) else 1
+server.shutdown()
+sys.exit(code)
+`;
+
+function writeFile(filePath, content, mode) {
+  fs.mkdirSync(path.dirname(filePath), { recursive: true });
+  fs.writeFileSync(filePath, content, mode ? { mode } : undefined);
+}
+
+function git(cwd, args) {
+  execFileSync('git', ['-c', 'user.name=test', '-c', 'user.email=test@example.com', ...args], { cwd, stdio: 'ignore' });
+}
+
+function createSandbox() {
+  const root = fs.mkdtempSync(path.join(os.tmpdir(), 'cctoolbox-update-bundle-'));
+  const sandbox = {
+    root,
+    home: path.join(root, 'home'),
+    appDir: path.join(root, 'home', '.cctoolbox'),
+    checkout: path.join(root, 'checkout'),
+    bundles: path.join(root, 'bundles'),
+    binDir: path.join(root, 'bin')
+  };
+  // pm2 is not part of the test environment: no registered processes, and reloads succeed.
+  writeFile(path.join(sandbox.binDir, 'pm2'), '#!/bin/sh\nif [ "$1" = "jlist" ]; then echo "[]"; fi\n', 0o755);
+
+  const checkout = sandbox.checkout;
+  writeFile(path.join(checkout, 'package.json'), JSON.stringify({ name: 'cctoolbox', version: '9.9.9', dependencies: {} }));
+  writeFile(path.join(checkout, 'src', 'web', 'package.json'), JSON.stringify({ name: 'web', dependencies: {} }));
+  writeFile(path.join(checkout, 'src', 'web', 'main.js'), 'console.log("web");\n');
+  writeFile(path.join(checkout, '.gitignore'), 'node_modules\ndist\n');
+  fs.copyFileSync(UPDATE_SCRIPT, path.join(checkout, 'update.py'));
+  git(checkout, ['init', '-q']);
+  git(checkout, ['add', '-A']);
+  git(checkout, ['commit', '-q', '-m', 'initial']);
+
+  writeFile(path.join(checkout, 'node_modules', 'tool', 'bin', 'cli.js'), 'console.log("cli");\n', 0o755);
+  fs.mkdirSync(path.join(checkout, 'node_modules', '.bin'));
+  fs.symlinkSync('../tool/bin/cli.js', path.join(checkout, 'node_modules', '.bin', 'cli'));
+  writeFile(path.join(checkout, 'dist', 'web', 'index.html'), '<html></html>\n');
+  return sandbox;
+}
+
+function python(sandbox, args) {
+  return spawnSync('python3', args, {
+    env: { ...process.env, CCTOOLBOX_HOME: sandbox.home, PATH: `${sandbox.binDir}${path.delimiter}${process.env.PATH}` },
+    encoding: 'utf8'
+  });
+}
+
+function recordBuiltState(sandbox) {
+  const script = [
+    'import sys',
+    'from pathlib import Path',
+    'sys.path.insert(0, sys.argv[1])',
+    'import update',
+    'root = Path(sys.argv[1])',
+    "update.save_update_state({'rootDependencies': update.dependency_fingerprint(root), 'webBuild': update.web_build_fingerprint(root)})"
+  ].join('\n');
+  const result = python(sandbox, ['-c', script, sandbox.checkout]);
+  assert.strictEqual(result.status, 0, result.stderr);
+}
+
+function runUpdate(sandbox, scriptPath, args) {
+  return python(sandbox, ['-c', RUN_UPDATE_SCRIPT, scriptPath, sandbox.appDir, ...args]);
+}
+
+function newestManifest(sandbox) {
+  const name = fs.readdirSync(sandbox.bundles).find(item => item.endsWith('.json'));
+  return path.join(sandbox.bundles, name);
+}
+
+function runBundleTests() {
+  if (!hasPython()) {
+    console.log('update bundle tests skipped (python3 or git not available)');
+    return;
+  }
+
+  const sandbox = createSandbox();
+  try {
+    recordBuiltState(sandbox);
+    const built = python(sandbox, [path.join(sandbox.checkout, 'update.py'), '--build-bundle', sandbox.bundles]);
+    assert.strictEqual(built.status, 0, built.stdout + built.stderr);
+    const manifestPath = newestManifest(sandbox);
+    const manifest = JSON.parse(fs.readFileSync(manifestPath, 'utf8'));
+    assert.deepStrictEqual(manifest.links, { 'node_modules/.bin/cli': '../tool/bin/cli.js' });
+    assert.ok(manifest.files['dist/web/index.html']);
+
+    const installed = runUpdate(sandbox, path.join(sandbox.checkout, 'update.py'), ['--bundle', sandbox.bundles]);
+    assert.strictEqual(installed.status, 0, installed.stdout + installed.stderr);
+    const current = fs.realpathSync(path.join(sandbox.appDir, 'current'));
+    assert.strictEqual(path.basename(current), `${manifest.commit.slice(0, 12)}-${manifest.sha256.slice(0, 8)}`);
+    assert.strictEqual(fs.readlinkSync(path.join(current, 'node_modules', '.bin', 'cli')), '../tool/bin/cli.js');
+    const meta = JSON.parse(fs.readFileSync(`${current}.json`, 'utf8'));
+    assert.strictEqual(meta.source, 'bundle');
+
+    // The Web UI runs update.py from the release pm2 serves; a bundle release has no git checkout behind it.
+    const releaseScript = path.join(current, 'update.py');
+    for (const args of [[], ['--staged'], ['--build-bundle', path.join(sandbox.root, 'rebuilt')]]) {
+      const refused = runUpdate(sandbox, releaseScript, args);
+      assert.strictEqual(refused.status, 1, refused.stdout + refused.stderr);
+      assert.ok(!refused.stderr.includes('Traceback'), refused.stderr);
+      assert.ok(/--bundle|发布包/.test(refused.stdout), refused.stdout);
+    }
+    assert.strictEqual(fs.realpathSync(path.join(sandbox.appDir, 'current')), current);
+
+    // Link targets outside the release are rejected before anything is unpacked.
+    for (const [link, target] of [
+      ['node_modules/.bin/evil', '/etc/passwd'],
+      ['node_modules/.bin/evil', '../../../outside'],
+      ['node_modules/.bin/evil', '../tool/../../..'],
+      ['node_modules/.bin/cli/evil', 'x']
+    ]) {
+      const tampered = { ...manifest, createdAt: manifest.createdAt + 1, links: { ...manifest.links, [link]: target } };
+      const tamperedPath = path.join(sandbox.bundles, 'cctoolbox-tampered.json');
+      fs.writeFileSync(tamperedPath, JSON.stringify(tampered));
+      const rejected = runUpdate(sandbox, path.join(sandbox.checkout, 'update.py'), ['--bundle', tamperedPath]);
+      assert.strictEqual(rejected.status, 1, rejected.stdout + rejected.stderr);
+      assert.ok(rejected.stdout.includes('非法路径'), rejected.stdout);
+    }
+  } finally {
+    fs.rmSync(sandbox.root, { recursive: true, force: true });
+  }
+  console.log('update bundle tests passed');
+}
+
+runBundleTests();
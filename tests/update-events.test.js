@@ -0,0 +1,232 @@
+const assert = require('assert');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const { execFileSync, spawnSync } = require('child_process');
+
+const UPDATE_SCRIPT = path.join(__dirname, '..', 'update.py');
+const HISTORY_LIMIT = 100;
+
+function hasPython() {
+  try {
+    execFileSync('python3', ['--version'], { stdio: 'ignore' });
+    execFileSync('git', ['--version'], { stdio: 'ignore' });
+    return true;
+  } catch (error) {
+    return false;
+  }
+}
+
+// Runs update.py as __main__ with a /health endpoint standing in for the restarted web UI.
+const RUN_UPDATE_SCRIPT = `
+import json, runpy, sys, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+class Health(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = b'{"uptime": 0}'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+server = ThreadingHTTPServer(('127.0.0.1', 0), Health)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+app_dir = Path(sys.argv[2])
+app_dir.mkdir(parents=True, exist_ok=True)
+(app_dir / 'config.json').write_text(json.dumps({'ports': {'webUI': server.server_port}}))
+sys.argv = [sys.argv[1]] + sys.argv[3:]
+try:
+    runpy.run_path(sys.argv[0], run_name='__main__')
+    code = 0
+except SystemExit as exc:
+    code = exc.code if isinstance(exc.code, int) else 1
+server.shutdown()
+sys.exit(code)
+`;
+
+// Floods the reporter with log lines and returns the events it wrote.
+const LOG_CHUNK_SCRIPT = `
+import contextlib, io, json, sys, time
+sys.path.insert(0, sys.argv[1])
+import update
+
+# No timed flush lands in the middle of the burst.
+update.LOG_FLUSH_SECONDS = 60
+reporter = update.UpdateReporter()
+reporter.json_events = True
+output = io.StringIO()
+with contextlib.redirect_stdout(output):
+    reporter.line('x' * 5000, 'web')
+    for index in range(450):
+        reporter.line(f'line {index}')
+    reporter.flush_logs()
+print(json.dumps([json.loads(line) for line in output.getvalue().splitlines()]))
+`;
+
+function writeFile(filePath, content, mode) {
+  fs.mkdirSync(path.dirname(filePath), { recursive: true });
+  fs.writeFileSync(filePath, content, mode ? { mode } : undefined);
+}
+
+function git(cwd, args) {
+  execFileSync('git', ['-c', 'user.name=test', '-c', 'user.email=test@example.com', ...args], { cwd, stdio: 'ignore' });
+}
+
+function createSandbox() {
+  const root = fs.mkdtempSync(path.join(os.tmpdir(), 'cctoolbox-update-events-'));
+  const sandbox = {
+    root,
+    home: path.join(root, 'home'),
+    appDir: path.join(root, 'home', '.cctoolbox'),
+    origin: path.join(root, 'origin.git'),
+    author: path.join(root, 'author'),
+    checkout: path.join(root, 'checkout'),
+    binDir: path.join(root, 'bin')
+  };
+  // pm2 has no registered processes; npm prints a line and fails the web build when asked to.
+  writeFile(path.join(sandbox.binDir, 'pm2'), '#!/bin/sh\nif [ "$1" = "jlist" ]; then echo "[]"; fi\n', 0o755);
+  writeFile(path.join(sandbox.binDir, 'npm'), [
+    '#!/bin/sh',
+    'echo "npm $*"',
+    'if [ -n "$FAIL_BUILD" ] && [ "$1" = "run" ]; then exit 1; fi',
+    ''
+  ].join('\n'), 0o755);
+
+  const author = sandbox.author;
+  writeFile(path.join(author, 'package.json'), JSON.stringify({ name: 'cctoolbox', version: '1.0.0', dependencies: {} }));
+  writeFile(path.join(author, 'src', 'web', 'package.json'), JSON.stringify({ name: 'web', dependencies: {} }));
+  writeFile(path.join(author, 'src', 'web', 'main.js'), 'console.log("web");\n');
+  writeFile(path.join(author, '.gitignore'), 'node_modules\ndist\n');
+  fs.copyFileSync(UPDATE_SCRIPT, path.join(author, 'update.py'));
+  git(root, ['init', '-q', '--bare', sandbox.origin]);
+  git(root, ['init', '-q', author]);
+  git(author, ['symbolic-ref', 'HEAD', 'refs/heads/main']);
+  git(author, ['add', '-A']);
+  git(author, ['commit', '-q', '-m', 'initial']);
+  git(author, ['push', '-q', sandbox.origin, 'main']);
+  git(root, ['clone', '-q', '-b', 'main', sandbox.origin, sandbox.checkout]);
+
+  writeFile(path.join(sandbox.checkout, 'node_modules', 'dep', 'index.js'), 'module.exports = 1;\n');
+  writeFile(path.join(sandbox.checkout, 'src', 'web', 'node_modules', 'vite', 'index.js'), 'module.exports = 2;\n');
+  writeFile(path.join(sandbox.checkout, 'dist', 'web', 'index.html'), '<html></html>\n');
+  return sandbox;
+}
+
+function runUpdate(sandbox, args, env = {}) {
+  return spawnSync('python3', ['-c', RUN_UPDATE_SCRIPT, path.join(sandbox.checkout, 'update.py'), sandbox.appDir, ...args], {
+    env: {
+      ...process.env,
+      ...env,
+      CCTOOLBOX_HOME: sandbox.home,
+      PATH: `${sandbox.binDir}${path.delimiter}${process.env.PATH}`
+    },
+    encoding: 'utf8'
+  });
+}
+
+function readHistory(sandbox) {
+  const historyPath = path.join(sandbox.appDir, 'update-history.jsonl');
+  return fs.readFileSync(historyPath, 'utf8').trim().split('\n').map(line => JSON.parse(line));
+}
+
+function runEventTests(sandbox) {
+  const result = runUpdate(sandbox, ['--json-events', '--force']);
+  assert.strictEqual(result.status, 0, result.stdout + result.stderr);
+  // Every stdout line is an event.
+  const events = result.stdout.trim().split('\n').map(line => JSON.parse(line));
+  assert.ok(events.every(event => typeof event.event === 'string' && typeof event.ts === 'number'));
+
+  const starts = events.filter(event => event.event === 'step' && event.phase === 'start').map(event => event.step);
+  const ends = events.filter(event => event.event === 'step' && event.phase === 'end');
+  assert.deepStrictEqual(starts, [1, 2, 3, 4, 5, 6]);
+  assert.deepStrictEqual(ends.map(event => event.step).sort(), [1, 2, 3, 4, 5, 6]);
+  assert.ok(ends.every(event => event.status === 'completed' && event.durationMs >= 0));
+  assert.ok(events.filter(event => event.event === 'step' && [3, 4].includes(event.step)).every(event => event.phase !== 'start' || event.parallel));
+
+  const commands = events.filter(event => event.event === 'command');
+  assert.ok(commands.some(event => event.command === 'git pull origin main' && event.exitCode === 0));
+  assert.ok(commands.some(event => event.command === 'npm install --production' && event.source === 'root'));
+  assert.ok(commands.some(event => event.command === 'npm run build' && event.source === 'web'));
+  const logLines = events.filter(event => event.event === 'log').flatMap(event => event.lines);
+  assert.ok(logLines.some(line => line.text === 'npm run build' && line.source === 'web'));
+  assert.ok(logLines.some(line => line.text.includes('更新完成')));
+  assert.ok(events.some(event => event.event === 'readiness' && event.results.webUI));
+
+  const end = events[events.length - 1];
+  assert.strictEqual(end.event, 'end');
+  assert.strictEqual(end.success, true);
+  assert.strictEqual(end.exitCode, 0);
+  assert.strictEqual(end.mode, 'in-place');
+  assert.strictEqual(end.fromVersion, '1.0.0');
+  assert.strictEqual(end.toVersion, '1.0.0');
+  assert.strictEqual(end.steps.length, 6);
+
+  // The same summary is appended to the history file.
+  const history = readHistory(sandbox);
+  assert.strictEqual(history.length, 1);
+  const { event, ts, ...summary } = end;
+  assert.deepStrictEqual(history[0], summary);
+}
+
+function runFailureTests(sandbox) {
+  // Text mode also records history; a failed run is kept with its failed step and exit code.
+  const result = runUpdate(sandbox, ['--force'], { FAIL_BUILD: '1' });
+  assert.strictEqual(result.status, 1, result.stdout + result.stderr);
+  assert.ok(result.stdout.includes('[3/6] [parallel]'), result.stdout);
+  const history = readHistory(sandbox);
+  assert.strictEqual(history.length, 2);
+  const failed = history[1];
+  assert.strictEqual(failed.success, false);
+  assert.strictEqual(failed.exitCode, 1);
+  assert.strictEqual(failed.steps.find(step => step.step === 4).status, 'failed');
+  assert.ok(failed.commands.some(command => command.command === 'npm run build' && command.exitCode === 1));
+  assert.strictEqual(failed.readiness, undefined);
+}
+
+function runHistoryLimitTests(sandbox) {
+  const historyPath = path.join(sandbox.appDir, 'update-history.jsonl');
+  const old = Array.from({ length: HISTORY_LIMIT + 20 }, (_, index) => JSON.stringify({ old: index }));
+  fs.writeFileSync(historyPath, old.join('\n') + '\n\n');
+  const result = runUpdate(sandbox, []);
+  assert.strictEqual(result.status, 0, result.stdout + result.stderr);
+  const history = readHistory(sandbox);
+  assert.strictEqual(history.length, HISTORY_LIMIT);
+  assert.deepStrictEqual(history[0], { old: 21 });
+  assert.strictEqual(history[HISTORY_LIMIT - 1].success, true);
+}
+
+function runLogChunkTests() {
+  const events = JSON.parse(execFileSync('python3', ['-c', LOG_CHUNK_SCRIPT, path.dirname(UPDATE_SCRIPT)], { encoding: 'utf8' }));
+  assert.ok(events.every(event => event.event === 'log' && event.lines.length <= 50));
+  const lines = events.flatMap(event => event.lines);
+  // The first line goes out at once, truncated; then the buffer keeps the newest 200 lines and counts the rest.
+  assert.deepStrictEqual(lines[0], { text: 'x'.repeat(1000), source: 'web' });
+  assert.strictEqual(lines.length, 201);
+  assert.strictEqual(lines[lines.length - 1].text, 'line 449');
+  assert.strictEqual(events.reduce((total, event) => total + (event.dropped || 0), 0), 250);
+}
+
+function runUpdateEventTests() {
+  if (!hasPython()) {
+    console.log('update events tests skipped (python3 or git not available)');
+    return;
+  }
+
+  const sandbox = createSandbox();
+  try {
+    runLogChunkTests();
+    runEventTests(sandbox);
+    runFailureTests(sandbox);
+    runHistoryLimitTests(sandbox);
+  } finally {
+    fs.rmSync(sandbox.root, { recursive: true, force: true });
+  }
+  console.log('update events tests passed');
+}
+
+runUpdateEventTests();
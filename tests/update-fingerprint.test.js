@@ -0,0 +1,267 @@
+const assert = require('assert');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const { execFileSync, spawnSync } = require('child_process');
+
+const UPDATE_SCRIPT = path.join(__dirname, '..', 'update.py');
+
+function hasPython() {
+  try {
+    execFileSync('python3', ['--version'], { stdio: 'ignore' });
+    execFileSync('git', ['--version'], { stdio: 'ignore' });
+    return true;
+  } catch (error) {
+    return false;
+  }
+}
+
+// Runs update.py as __main__ with a /health endpoint standing in for the restarted web UI.
+const RUN_UPDATE_SCRIPT = `
+import json, runpy, sys, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+class Health(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = b'{"uptime": 0}'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+server = ThreadingHTTPServer(('127.0.0.1', 0), Health)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+app_dir = Path(sys.argv[2])
+app_dir.mkdir(parents=True, exist_ok=True)
+(app_dir / 'config.json').write_text(json.dumps({'ports': {'webUI': server.server_port}}))
+sys.argv = [sys.argv[1]] + sys.argv[3:]
+try:
+    runpy.run_path(sys.argv[0], run_name='__main__')
+    code = 0
+except SystemExit as exc:
+    code = exc.code if isinstance(exc.code, int) else 1
+server.shutdown()
+sys.exit(code)
+`;
+
+// Fingerprints of a package directory and a web checkout, before and after each kind of change.
+const FINGERPRINT_SCRIPT = `
+import json, subprocess, sys
+from pathlib import Path
+sys.path.insert(0, sys.argv[1])
+import update
+
+root = Path(sys.argv[2])
+package_dir = root / 'package'
+package_dir.mkdir()
+package_json = package_dir / 'package.json'
+
+def write_package(**fields):
+    package_json.write_text(json.dumps(dict({'name': 'app', 'version': '1.0.0', 'dependencies': {'a': '^1.0.0'}}, **fields)))
+    return update.dependency_fingerprint(package_dir)
+
+base = write_package()
+report = {
+    'versionOnly': write_package(version='2.0.0') == base,
+    'scriptsOnly': write_package(scripts={'start': 'node .'}) == base,
+    'dependencyChange': write_package(dependencies={'a': '^2.0.0'}) != base,
+    'devDependencyChange': write_package(devDependencies={'b': '1'}) != base,
+}
+write_package()
+(package_dir / 'package-lock.json').write_text('{"lockfileVersion": 3}')
+locked = update.dependency_fingerprint(package_dir)
+(package_dir / 'package-lock.json').write_text('{"lockfileVersion": 3, "packages": {}}')
+report['lockfileAdded'] = locked != base
+report['lockfileChange'] = update.dependency_fingerprint(package_dir) != locked
+package_json.write_text('{not json')
+report['malformed'] = isinstance(update.dependency_fingerprint(package_dir), str)
+
+checkout = root / 'checkout'
+(checkout / 'src' / 'web').mkdir(parents=True)
+(checkout / 'src' / 'web' / 'package.json').write_text('{"dependencies": {}}')
+(checkout / 'src' / 'web' / 'main.js').write_text('1')
+report['outsideGit'] = update.web_build_fingerprint(checkout)
+git = ['git', '-c', 'user.name=test', '-c', 'user.email=test@example.com']
+subprocess.run(git + ['init', '-q'], cwd=checkout, check=True)
+subprocess.run(git + ['add', '-A'], cwd=checkout, check=True)
+subprocess.run(git + ['commit', '-q', '-m', 'one'], cwd=checkout, check=True)
+first = update.web_build_fingerprint(checkout)
+(checkout / 'README.md').write_text('outside src/web')
+subprocess.run(git + ['add', '-A'], cwd=checkout, check=True)
+subprocess.run(git + ['commit', '-q', '-m', 'two'], cwd=checkout, check=True)
+report['unrelatedCommit'] = update.web_build_fingerprint(checkout) == first
+(checkout / 'src' / 'web' / 'main.js').write_text('2')
+subprocess.run(git + ['commit', '-q', '-am', 'three'], cwd=checkout, check=True)
+report['webSourceChange'] = update.web_build_fingerprint(checkout) != first
+
+state = {'webBuild': first}
+report['missingOutput'] = update.is_unchanged(state, 'webBuild', first, checkout / 'dist' / 'web' / 'index.html')
+report['emptyFingerprint'] = update.is_unchanged({'webBuild': None}, 'webBuild', None, checkout)
+report['present'] = update.is_unchanged(state, 'webBuild', first, checkout)
+print(json.dumps(report))
+`;
+
+function writeFile(filePath, content, mode) {
+  fs.mkdirSync(path.dirname(filePath), { recursive: true });
+  fs.writeFileSync(filePath, content, mode ? { mode } : undefined);
+}
+
+function git(cwd, args) {
+  execFileSync('git', ['-c', 'user.name=test', '-c', 'user.email=test@example.com', ...args], { cwd, stdio: 'ignore' });
+}
+
+function createSandbox() {
+  const root = fs.mkdtempSync(path.join(os.tmpdir(), 'cctoolbox-update-fingerprint-'));
+  const sandbox = {
+    root,
+    home: path.join(root, 'home'),
+    appDir: path.join(root, 'home', '.cctoolbox'),
+    origin: path.join(root, 'origin.git'),
+    author: path.join(root, 'author'),
+    checkout: path.join(root, 'checkout'),
+    binDir: path.join(root, 'bin'),
+    npmLog: path.join(root, 'npm.log')
+  };
+  // pm2 has no registered processes; npm only records where and how it was called.
+  writeFile(path.join(sandbox.binDir, 'pm2'), '#!/bin/sh\nif [ "$1" = "jlist" ]; then echo "[]"; fi\n', 0o755);
+  writeFile(path.join(sandbox.binDir, 'npm'), `#!/bin/sh\necho "$(basename "$PWD") $*" >> "${sandbox.npmLog}"\n`, 0o755);
+
+  const author = sandbox.author;
+  writeFile(path.join(author, 'package.json'), JSON.stringify({ name: 'cctoolbox', version: '1.0.0', dependencies: {} }));
+  writeFile(path.join(author, 'src', 'web', 'package.json'), JSON.stringify({ name: 'web', dependencies: {} }));
+  writeFile(path.join(author, 'src', 'web', 'main.js'), 'console.log("web");\n');
+  writeFile(path.join(author, '.gitignore'), 'node_modules\ndist\n');
+  fs.copyFileSync(UPDATE_SCRIPT, path.join(author, 'update.py'));
+  git(root, ['init', '-q', '--bare', sandbox.origin]);
+  git(root, ['init', '-q', author]);
+  git(author, ['symbolic-ref', 'HEAD', 'refs/heads/main']);
+  git(author, ['add', '-A']);
+  git(author, ['commit', '-q', '-m', 'initial']);
+  git(author, ['push', '-q', sandbox.origin, 'main']);
+  git(root, ['clone', '-q', '-b', 'main', sandbox.origin, sandbox.checkout]);
+
+  writeFile(path.join(sandbox.checkout, 'node_modules', 'dep', 'index.js'), 'module.exports = 1;\n');
+  writeFile(path.join(sandbox.checkout, 'src', 'web', 'node_modules', 'vite', 'index.js'), 'module.exports = 2;\n');
+  writeFile(path.join(sandbox.checkout, 'dist', 'web', 'index.html'), '<html></html>\n');
+  return sandbox;
+}
+
+function python(sandbox, args) {
+  return spawnSync('python3', args, {
+    env: { ...process.env, CCTOOLBOX_HOME: sandbox.home, PATH: `${sandbox.binDir}${path.delimiter}${process.env.PATH}` },
+    encoding: 'utf8'
+  });
+}
+
+function recordBuiltState(sandbox) {
+  const script = [
+    'import sys',
+    'from pathlib import Path',
+    'sys.path.insert(0, sys.argv[1])',
+    'import update',
+    'root = Path(sys.argv[1])',
+    'update.save_update_state({',
+    "    'rootDependencies': update.dependency_fingerprint(root),",
+    "    'webDependencies': update.dependency_fingerprint(root / 'src' / 'web'),",
+    "    'webBuild': update.web_build_fingerprint(root)",
+    '})'
+  ].join('\n');
+  const result = python(sandbox, ['-c', script, sandbox.checkout]);
+  assert.strictEqual(result.status, 0, result.stderr);
+}
+
+function push(sandbox, relative, content) {
+  writeFile(path.join(sandbox.author, relative), content);
+  git(sandbox.author, ['add', '-A']);
+  git(sandbox.author, ['commit', '-q', '-m', `change ${relative}`]);
+  git(sandbox.author, ['push', '-q', sandbox.origin, 'main']);
+}
+
+// Runs an in-place update and returns the npm invocations it made.
+function runUpdate(sandbox, args = []) {
+  fs.rmSync(sandbox.npmLog, { force: true });
+  const result = python(sandbox, ['-c', RUN_UPDATE_SCRIPT, path.join(sandbox.checkout, 'update.py'), sandbox.appDir, ...args]);
+  assert.strictEqual(result.status, 0, result.stdout + result.stderr);
+  const calls = fs.existsSync(sandbox.npmLog) ? fs.readFileSync(sandbox.npmLog, 'utf8').trim().split('\n') : [];
+  return { stdout: result.stdout, calls: calls.sort() };
+}
+
+function readState(sandbox) {
+  return JSON.parse(fs.readFileSync(path.join(sandbox.appDir, 'update-state.json'), 'utf8'));
+}
+
+function runFingerprintUnitTests(root) {
+  const report = JSON.parse(execFileSync('python3', ['-c', FINGERPRINT_SCRIPT, path.dirname(UPDATE_SCRIPT), root], { encoding: 'utf8' }));
+  assert.deepStrictEqual(report, {
+    versionOnly: true,
+    scriptsOnly: true,
+    dependencyChange: true,
+    devDependencyChange: true,
+    lockfileAdded: true,
+    lockfileChange: true,
+    malformed: true,
+    outsideGit: null,
+    unrelatedCommit: true,
+    webSourceChange: true,
+    missingOutput: false,
+    emptyFingerprint: false,
+    present: true
+  });
+}
+
+function runSkipTests(sandbox) {
+  recordBuiltState(sandbox);
+
+  // Nothing the install or build steps depend on changed: npm is never run.
+  push(sandbox, 'README.md', 'docs only\n');
+  const unchanged = runUpdate(sandbox);
+  assert.deepStrictEqual(unchanged.calls, []);
+  assert.ok(unchanged.stdout.includes('[3/6] [skip]'), unchanged.stdout);
+  assert.ok(unchanged.stdout.includes('[4/6] [skip]'), unchanged.stdout);
+
+  // A web source change rebuilds the frontend without reinstalling either dependency tree.
+  push(sandbox, 'src/web/main.js', 'console.log("web 2");\n');
+  const rebuilt = runUpdate(sandbox);
+  assert.deepStrictEqual(rebuilt.calls, ['web run build']);
+  assert.ok(rebuilt.stdout.includes('[3/6] [skip]'), rebuilt.stdout);
+  assert.ok(rebuilt.stdout.includes('前端依赖未变化'), rebuilt.stdout);
+  const state = readState(sandbox);
+  assert.strictEqual(state.webBuild.split(':')[1], execFileSync('git', ['rev-parse', 'HEAD:src/web'], {
+    cwd: sandbox.checkout, encoding: 'utf8'
+  }).trim());
+
+  // A version bump alone reinstalls nothing; a new dependency reinstalls the root tree only.
+  push(sandbox, 'package.json', JSON.stringify({ name: 'cctoolbox', version: '1.1.0', dependencies: {} }));
+  assert.deepStrictEqual(runUpdate(sandbox).calls, []);
+  push(sandbox, 'package.json', JSON.stringify({ name: 'cctoolbox', version: '1.1.0', dependencies: { dep: '1' } }));
+  assert.deepStrictEqual(runUpdate(sandbox).calls, ['checkout install --production']);
+  assert.deepStrictEqual(runUpdate(sandbox).calls, []);
+
+  // A missing output reruns its step even with a matching fingerprint; --force reruns everything.
+  fs.rmSync(path.join(sandbox.checkout, 'dist'), { recursive: true });
+  assert.deepStrictEqual(runUpdate(sandbox).calls, ['web run build']);
+  writeFile(path.join(sandbox.checkout, 'dist', 'web', 'index.html'), '<html></html>\n');
+  assert.deepStrictEqual(runUpdate(sandbox, ['--force']).calls, ['checkout install --production', 'web install', 'web run build']);
+}
+
+function runFingerprintTests() {
+  if (!hasPython()) {
+    console.log('update fingerprint tests skipped (python3 or git not available)');
+    return;
+  }
+
+  const sandbox = createSandbox();
+  try {
+    runFingerprintUnitTests(fs.mkdtempSync(path.join(sandbox.root, 'unit-')));
+    runSkipTests(sandbox);
+  } finally {
+    fs.rmSync(sandbox.root, { recursive: true, force: true });
+  }
+  console.log('update fingerprint tests passed');
+}
+
+runFingerprintTests();
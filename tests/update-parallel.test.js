@@ -0,0 +1,165 @@
+const assert = require('assert');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const { execFileSync, spawnSync } = require('child_process');
+
+const REPO_ROOT = path.join(__dirname, '..');
+
+function hasPython() {
+  try {
+    execFileSync('python3', ['--version'], { stdio: 'ignore' });
+    return true;
+  } catch (error) {
+    return false;
+  }
+}
+
+// Calls install_and_build on a checkout with nothing recorded, so both branches have work to do.
+const INSTALL_SCRIPT = `
+import json, sys
+from pathlib import Path
+sys.path.insert(0, sys.argv[1])
+import update
+
+state = {}
+saved = []
+try:
+    update.install_and_build(Path(sys.argv[2]), state, save=lambda value: saved.append(dict(value)))
+    error = None
+except RuntimeError as exc:
+    error = str(exc)
+print('RESULT ' + json.dumps({'error': error, 'state': state, 'saved': len(saved)}), flush=True)
+`;
+
+// Each task records when it starts and ends; run_parallel must let every task finish before re-raising.
+const RUN_PARALLEL_SCRIPT = `
+import json, sys, threading, time
+sys.path.insert(0, sys.argv[1])
+import update
+
+events = []
+lock = threading.Lock()
+
+def task(name, delay, error=None):
+    def run():
+        with lock:
+            events.append(f'start {name}')
+        time.sleep(delay)
+        with lock:
+            events.append(f'end {name}')
+        if error:
+            raise error(name)
+    return run
+
+try:
+    update.run_parallel([task('a', 0.1, ValueError), task('b', 0.4), task('c', 0.2, KeyError)])
+    raised = None
+except Exception as exc:
+    raised = [type(exc).__name__, str(exc)]
+print(json.dumps({'raised': raised, 'events': events}))
+`;
+
+function writeFile(filePath, content, mode) {
+  fs.mkdirSync(path.dirname(filePath), { recursive: true });
+  fs.writeFileSync(filePath, content, mode ? { mode } : undefined);
+}
+
+function createSandbox() {
+  const root = fs.mkdtempSync(path.join(os.tmpdir(), 'cctoolbox-update-parallel-'));
+  const sandbox = {
+    root,
+    checkout: path.join(root, 'checkout'),
+    binDir: path.join(root, 'bin'),
+    npmLog: path.join(root, 'npm.log')
+  };
+  // npm logs when each call starts and ends, prints a line of output, and fails in $FAIL_IN.
+  writeFile(path.join(sandbox.binDir, 'npm'), [
+    '#!/bin/sh',
+    'name="$(basename "$PWD") $*"',
+    `echo "start $name" >> "${sandbox.npmLog}"`,
+    'echo "output of $*"',
+    'sleep 0.5',
+    `echo "end $name" >> "${sandbox.npmLog}"`,
+    'if [ "$(basename "$PWD")" = "$FAIL_IN" ]; then exit 1; fi',
+    ''
+  ].join('\n'), 0o755);
+  writeFile(path.join(sandbox.checkout, 'package.json'), JSON.stringify({ name: 'cctoolbox', dependencies: {} }));
+  writeFile(path.join(sandbox.checkout, 'src', 'web', 'package.json'), JSON.stringify({ name: 'web', dependencies: {} }));
+  return sandbox;
+}
+
+function installAndBuild(sandbox, failIn = '') {
+  fs.rmSync(sandbox.npmLog, { force: true });
+  const result = spawnSync('python3', ['-c', INSTALL_SCRIPT, REPO_ROOT, sandbox.checkout], {
+    env: {
+      ...process.env,
+      CCTOOLBOX_HOME: path.join(sandbox.root, 'home'),
+      FAIL_IN: failIn,
+      PATH: `${sandbox.binDir}${path.delimiter}${process.env.PATH}`
+    },
+    encoding: 'utf8'
+  });
+  assert.strictEqual(result.status, 0, result.stderr);
+  const lines = result.stdout.trim().split('\n');
+  const resultLine = lines.pop();
+  assert.ok(resultLine.startsWith('RESULT '), result.stdout);
+  return {
+    lines,
+    result: JSON.parse(resultLine.slice('RESULT '.length)),
+    npm: fs.readFileSync(sandbox.npmLog, 'utf8').trim().split('\n')
+  };
+}
+
+function runInstallTests(sandbox) {
+  const { lines, result, npm } = installAndBuild(sandbox);
+  assert.strictEqual(result.error, null);
+  assert.deepStrictEqual(Object.keys(result.state).sort(), ['rootDependencies', 'webDependencies']);
+
+  // The root install overlaps the web install; the web build follows the web install.
+  assert.deepStrictEqual(npm.slice(0, 2).sort(), ['start checkout install --production', 'start web install']);
+  assert.ok(npm.indexOf('end checkout install --production') > npm.indexOf('start web install'));
+  assert.ok(npm.indexOf('start web run build') > npm.indexOf('end web install'));
+
+  // Both steps start with the parallel marker and finish on their own; output carries the branch prefix.
+  assert.deepStrictEqual(lines.slice(0, 2), ['[3/6] [parallel] 安装依赖', '[4/6] [parallel] 构建前端资源']);
+  assert.ok(lines.includes('[root] output of install --production'), lines.join('\n'));
+  assert.ok(lines.includes('[web] output of install'), lines.join('\n'));
+  assert.ok(lines.includes('[web] output of run build'), lines.join('\n'));
+  assert.ok(lines.includes('[3/6] [done] 安装依赖完成'));
+  assert.ok(lines.includes('[4/6] [done] 构建前端资源完成'));
+
+  // A failing branch does not cut the other one short, and only finished work is recorded.
+  const failed = installAndBuild(sandbox, 'checkout');
+  assert.ok(failed.result.error.includes('npm install --production'), failed.result.error);
+  assert.ok(failed.npm.includes('end web run build'), failed.npm.join('\n'));
+  assert.strictEqual(failed.result.state.rootDependencies, undefined);
+  assert.ok(failed.result.state.webDependencies);
+  assert.ok(!failed.lines.includes('[3/6] [done] 安装依赖完成'));
+  assert.ok(failed.lines.includes('[4/6] [done] 构建前端资源完成'));
+}
+
+function runParallelTests() {
+  const report = JSON.parse(execFileSync('python3', ['-c', RUN_PARALLEL_SCRIPT, REPO_ROOT], { encoding: 'utf8' }));
+  assert.deepStrictEqual(report.raised, ['ValueError', 'a']);
+  assert.deepStrictEqual(report.events.slice(0, 3).sort(), ['start a', 'start b', 'start c']);
+  assert.strictEqual(report.events[report.events.length - 1], 'end b');
+}
+
+function runUpdateParallelTests() {
+  if (!hasPython()) {
+    console.log('update parallel tests skipped (python3 not available)');
+    return;
+  }
+
+  const sandbox = createSandbox();
+  try {
+    runParallelTests();
+    runInstallTests(sandbox);
+  } finally {
+    fs.rmSync(sandbox.root, { recursive: true, force: true });
+  }
+  console.log('update parallel tests passed');
+}
+
+runUpdateParallelTests();
@@ -0,0 +1,100 @@
+const assert = require('assert');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const { execFileSync } = require('child_process');
+
+const REPO_ROOT = path.join(__dirname, '..');
+
+function hasPython() {
+  try {
+    execFileSync('python3', ['--version'], { stdio: 'ignore' });
+    return true;
+  } catch (error) {
+    return false;
+  }
+}
+
+// Serves /health with the given uptime on a free port, points config.json at it and runs the readiness gate.
+const READINESS_SCRIPT = `
+import json, sys, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.insert(0, sys.argv[1])
+import update
+
+uptime = float(sys.argv[2])
+
+class Health(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = json.dumps({'uptime': uptime}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+server = ThreadingHTTPServer(('127.0.0.1', 0), Health)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+update.get_app_dir().mkdir(parents=True, exist_ok=True)
+(update.get_app_dir() / 'config.json').write_text(json.dumps({'ports': {'webUI': server.server_port}}))
+targets = update.readiness_targets(update.get_repo_root())
+result = {'targets': [target['name'] for target in targets]}
+try:
+    result['ready'] = sorted(update.wait_until_ready(targets, time.time(), deadline=float(sys.argv[3])))
+except RuntimeError as exc:
+    result['error'] = str(exc)
+server.shutdown()
+print(json.dumps(result))
+`;
+
+function createSandbox() {
+  const root = fs.mkdtempSync(path.join(os.tmpdir(), 'cctoolbox-update-readiness-'));
+  const binDir = path.join(root, 'bin');
+  fs.mkdirSync(binDir);
+  // pm2 is not part of the test environment; an empty process list keeps the gate on the web UI.
+  fs.writeFileSync(path.join(binDir, 'pm2'), '#!/bin/sh\necho "[]"\n', { mode: 0o755 });
+  const appDir = path.join(root, '.cctoolbox');
+  fs.mkdirSync(appDir);
+  return { root, binDir, appDir };
+}
+
+function runReadiness(sandbox, uptime, deadline) {
+  const output = execFileSync('python3', ['-c', READINESS_SCRIPT, REPO_ROOT, String(uptime), String(deadline)], {
+    env: { ...process.env, CCTOOLBOX_HOME: sandbox.root, PATH: `${sandbox.binDir}${path.delimiter}${process.env.PATH}` },
+    encoding: 'utf8'
+  });
+  return JSON.parse(output);
+}
+
+function runReadinessTests() {
+  if (!hasPython()) {
+    console.log('update readiness tests skipped (python3 not available)');
+    return;
+  }
+
+  const sandbox = createSandbox();
+  try {
+    // Applying a channel writes its state file even when no proxy is running.
+    for (const name of ['active-channel.json', 'codex-active-channel.json', 'gemini-active-channel.json']) {
+      fs.writeFileSync(path.join(sandbox.appDir, name), JSON.stringify({ id: 'channel-1' }));
+    }
+
+    const fresh = runReadiness(sandbox, 0, 5);
+    assert.deepStrictEqual(fresh.targets, ['webUI'], 'proxy state files must not add readiness targets');
+    assert.deepStrictEqual(fresh.ready, ['webUI']);
+    assert.strictEqual(fresh.error, undefined);
+
+    // An answer from the process that was running before the reload does not count as ready.
+    const stale = runReadiness(sandbox, 3600, 1);
+    assert.deepStrictEqual(stale.targets, ['webUI']);
+    assert.ok(stale.error && stale.error.includes('webUI'), `expected a readiness timeout, got ${JSON.stringify(stale)}`);
+  } finally {
+    fs.rmSync(sandbox.root, { recursive: true, force: true });
+  }
+  console.log('update readiness tests passed');
+}
+
+runReadinessTests();
@@ -0,0 +1,236 @@
+const assert = require('assert');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const { execFileSync, spawnSync } = require('child_process');
+
+const UPDATE_SCRIPT = path.join(__dirname, '..', 'update.py');
+
+function hasPython() {
+  try {
+    execFileSync('python3', ['--version'], { stdio: 'ignore' });
+    execFileSync('git', ['--version'], { stdio: 'ignore' });
+    return true;
+  } catch (error) {
+    return false;
+  }
+}
+
+// Runs update.py as __main__ with a /health endpoint standing in for the restarted web UI.
+const RUN_UPDATE_SCRIPT = `
+import json, runpy, sys, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+class Health(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = b'{"uptime": 0}'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+server = ThreadingHTTPServer(('127.0.0.1', 0), Health)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+app_dir = Path(sys.argv[2])
+app_dir.mkdir(parents=True, exist_ok=True)
+(app_dir / 'config.json').write_text(json.dumps({'ports': {'webUI': server.server_port}}))
+sys.argv = [sys.argv[1]] + sys.argv[3:]
+try:
+    runpy.run_path(sys.argv[0], run_name='__main__')
+    code = 0
+except SystemExit as exc:
+    code = exc.code if isinstance(exc.code, int) else 1
+server.shutdown()
+sys.exit(code)
+`;
+
+function writeFile(filePath, content) {
+  fs.mkdirSync(path.dirname(filePath), { recursive: true });
+  fs.writeFileSync(filePath, content);
+}
+
+function git(cwd, args) {
+  execFileSync('git', ['-c', 'user.name=test', '-c', 'user.email=test@example.com', ...args], { cwd, stdio: 'ignore' });
+}
+
+function inode(filePath) {
+  return fs.statSync(filePath).ino;
+}
+
+function createSandbox() {
+  const root = fs.mkdtempSync(path.join(os.tmpdir(), 'cctoolbox-update-staged-'));
+  const sandbox = {
+    root,
+    home: path.join(root, 'home'),
+    appDir: path.join(root, 'home', '.cctoolbox'),
+    origin: path.join(root, 'origin.git'),
+    author: path.join(root, 'author'),
+    checkout: path.join(root, 'checkout'),
+    binDir: path.join(root, 'bin'),
+    pm2Log: path.join(root, 'pm2.log'),
+    pm2List: path.join(root, 'pm2.json')
+  };
+  // Neither pm2 nor npm is part of the test environment; unchanged fingerprints mean npm is never needed.
+  // pm2 logs every call and lists the processes in pm2.json, if there is one.
+  writeFile(path.join(sandbox.binDir, 'pm2'), [
+    '#!/bin/sh',
+    `echo "$* env=$APP_FLAG" >> "${path.join(root, 'pm2.log')}"`,
+    `if [ "$1" = "jlist" ]; then cat "${path.join(root, 'pm2.json')}" 2>/dev/null || echo "[]"; fi`,
+    ''
+  ].join('\n'));
+  writeFile(path.join(sandbox.binDir, 'npm'), '#!/bin/sh\necho "npm $*" >&2\nexit 1\n');
+  fs.chmodSync(path.join(sandbox.binDir, 'pm2'), 0o755);
+  fs.chmodSync(path.join(sandbox.binDir, 'npm'), 0o755);
+
+  const author = sandbox.author;
+  writeFile(path.join(author, 'package.json'), JSON.stringify({ name: 'cctoolbox', version: '1.0.0', dependencies: {} }));
+  writeFile(path.join(author, 'src', 'web', 'package.json'), JSON.stringify({ name: 'web', dependencies: {} }));
+  writeFile(path.join(author, 'src', 'web', 'main.js'), 'console.log("web");\n');
+  writeFile(path.join(author, '.gitignore'), 'node_modules\ndist\n');
+  fs.copyFileSync(UPDATE_SCRIPT, path.join(author, 'update.py'));
+  git(root, ['init', '-q', '--bare', sandbox.origin]);
+  git(root, ['init', '-q', author]);
+  git(author, ['symbolic-ref', 'HEAD', 'refs/heads/main']);
+  git(author, ['add', '-A']);
+  git(author, ['commit', '-q', '-m', 'initial']);
+  git(author, ['push', '-q', sandbox.origin, 'main']);
+  git(root, ['clone', '-q', '-b', 'main', sandbox.origin, sandbox.checkout]);
+
+  writeFile(path.join(sandbox.checkout, 'node_modules', 'dep', 'index.js'), 'module.exports = 1;\n');
+  writeFile(path.join(sandbox.checkout, 'node_modules', '.vite', 'deps', '_metadata.json'), '{}\n');
+  writeFile(path.join(sandbox.checkout, 'src', 'web', 'node_modules', 'vite', 'index.js'), 'module.exports = 2;\n');
+  writeFile(path.join(sandbox.checkout, 'src', 'web', 'node_modules', '.vite-temp', 'config.mjs'), 'export {};\n');
+  writeFile(path.join(sandbox.checkout, 'dist', 'web', 'index.html'), '<html></html>\n');
+  return sandbox;
+}
+
+function python(sandbox, args) {
+  return spawnSync('python3', args, {
+    env: { ...process.env, CCTOOLBOX_HOME: sandbox.home, PATH: `${sandbox.binDir}${path.delimiter}${process.env.PATH}` },
+    encoding: 'utf8'
+  });
+}
+
+function recordBuiltState(sandbox) {
+  const script = [
+    'import sys',
+    'from pathlib import Path',
+    'sys.path.insert(0, sys.argv[1])',
+    'import update',
+    'root = Path(sys.argv[1])',
+    'update.save_update_state({',
+    "    'rootDependencies': update.dependency_fingerprint(root),",
+    "    'webDependencies': update.dependency_fingerprint(root / 'src' / 'web'),",
+    "    'webBuild': update.web_build_fingerprint(root)",
+    '})'
+  ].join('\n');
+  const result = python(sandbox, ['-c', script, sandbox.checkout]);
+  assert.strictEqual(result.status, 0, result.stderr);
+}
+
+function readPm2Log(sandbox) {
+  if (!fs.existsSync(sandbox.pm2Log)) return [];
+  return fs.readFileSync(sandbox.pm2Log, 'utf8').trim().split('\n');
+}
+
+function runUpdate(sandbox, args) {
+  const result = python(sandbox, ['-c', RUN_UPDATE_SCRIPT, path.join(sandbox.checkout, 'update.py'), sandbox.appDir, ...args]);
+  assert.strictEqual(result.status, 0, result.stdout + result.stderr);
+  return fs.realpathSync(path.join(sandbox.appDir, 'current'));
+}
+
+// A process still started from the checkout is re-registered under the current symlink.
+function runRepointTests(sandbox, release) {
+  fs.writeFileSync(sandbox.pm2List, JSON.stringify([{
+    name: 'cctoolbox-ui',
+    pm_id: 3,
+    pm2_env: {
+      pm_exec_path: path.join(sandbox.checkout, 'src', 'web', 'main.js'),
+      exec_interpreter: 'node',
+      args: ['--port', '1'],
+      env: { APP_FLAG: 'kept' },
+      pm_out_log_path: path.join(sandbox.root, 'out.log')
+    }
+  }]));
+  fs.rmSync(sandbox.pm2Log, { force: true });
+  const link = path.join(sandbox.appDir, 'current');
+  const script = [
+    'import sys',
+    'from pathlib import Path',
+    'sys.path.insert(0, sys.argv[1])',
+    'import update',
+    'update.repoint_pm2(Path(sys.argv[2]))'
+  ].join('\n');
+  const result = python(sandbox, ['-c', script, release, link]);
+  assert.strictEqual(result.status, 0, result.stdout + result.stderr);
+
+  // The new registration is started before the old one is deleted: pm2 kills the old process tree, which
+  // includes this updater when the web UI runs it.
+  const calls = readPm2Log(sandbox).filter(line => !line.startsWith('jlist'));
+  assert.deepStrictEqual(calls, [
+    `start ${path.join(link, 'src', 'web', 'main.js')} --name cctoolbox-ui --cwd ${link} --interpreter node --merge-logs ` +
+      `--output ${path.join(sandbox.root, 'out.log')} -- --port 1 env=kept`,
+    'delete 3 env='
+  ]);
+}
+
+function runStagedTests() {
+  if (!hasPython()) {
+    console.log('update staged tests skipped (python3 or git not available)');
+    return;
+  }
+
+  const sandbox = createSandbox();
+  try {
+    recordBuiltState(sandbox);
+    const first = runUpdate(sandbox, ['--staged']);
+    assert.strictEqual(path.dirname(first), fs.realpathSync(path.join(sandbox.appDir, 'releases')));
+
+    // Installed packages are shared with the live tree; build caches and dist are private copies.
+    const seeded = [
+      ['node_modules/dep/index.js', true],
+      ['src/web/node_modules/vite/index.js', true],
+      ['node_modules/.vite/deps/_metadata.json', false],
+      ['src/web/node_modules/.vite-temp/config.mjs', false],
+      ['dist/web/index.html', false]
+    ];
+    for (const [relative, shared] of seeded) {
+      const same = inode(path.join(first, relative)) === inode(path.join(sandbox.checkout, relative));
+      assert.strictEqual(same, shared, `${relative} should ${shared ? '' : 'not '}be hardlinked`);
+    }
+    fs.writeFileSync(path.join(first, 'dist', 'web', 'index.html'), '<html>rebuilt</html>\n');
+    fs.writeFileSync(path.join(first, 'node_modules', '.vite', 'deps', '_metadata.json'), '{"rebuilt":true}\n');
+    assert.strictEqual(fs.readFileSync(path.join(sandbox.checkout, 'dist', 'web', 'index.html'), 'utf8'), '<html></html>\n');
+    assert.strictEqual(fs.readFileSync(path.join(sandbox.checkout, 'node_modules', '.vite', 'deps', '_metadata.json'), 'utf8'), '{}\n');
+
+    // Once the current symlink exists, a plain run is staged and seeds from the live release.
+    writeFile(path.join(sandbox.author, 'README.md'), 'next\n');
+    git(sandbox.author, ['add', '-A']);
+    git(sandbox.author, ['commit', '-q', '-m', 'next']);
+    git(sandbox.author, ['push', '-q', sandbox.origin, 'main']);
+    const second = runUpdate(sandbox, []);
+    assert.notStrictEqual(second, first);
+    assert.ok(fs.existsSync(path.join(second, 'README.md')));
+    assert.strictEqual(inode(path.join(second, 'node_modules', 'dep', 'index.js')), inode(path.join(first, 'node_modules', 'dep', 'index.js')));
+    const meta = JSON.parse(fs.readFileSync(`${second}.json`, 'utf8'));
+    assert.strictEqual(meta.previous, first);
+
+    // With nothing new upstream the live release is kept, and the services are not restarted.
+    fs.rmSync(sandbox.pm2Log, { force: true });
+    assert.strictEqual(runUpdate(sandbox, []), second);
+    assert.ok(!readPm2Log(sandbox).some(line => line.startsWith('reload')), readPm2Log(sandbox).join('\n'));
+    assert.strictEqual(JSON.parse(fs.readFileSync(`${second}.json`, 'utf8')).previous, first);
+
+    assert.strictEqual(runUpdate(sandbox, ['--rollback']), first);
+    runRepointTests(sandbox, first);
+  } finally {
+    fs.rmSync(sandbox.root, { recursive: true, force: true });
+  }
+  console.log('update staged tests passed');
+}
+
+runStagedTests();
@@ -1,22 +1,224 @@
 #!/usr/bin/env python3
+import argparse
+import hashlib
 import json
 import os
+import shutil
 import subprocess
 import sys
+import tarfile
+import threading
 import time
-from pathlib import Path
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
 
 TOTAL_STEPS = 6
+STATE_FILE_NAME = 'update-state.json'
+SKIP_MARKER = '[skip]'
+PARALLEL_MARKER = '[parallel]'
+DONE_MARKER = '[done]'
+RELEASES_DIR_NAME = 'releases'
+CURRENT_LINK_NAME = 'current'
+DEFAULT_KEEP_RELEASES = 3
+PM2_APP_NAMES = ('cctoolbox-ui', 'cctoolbox')
+DEFAULT_PORTS = {'webUI': 10099, 'proxy': 10088, 'codexProxy': 10089, 'geminiProxy': 10090}
+READY_DEADLINE_SECONDS = 60
+READY_INITIAL_DELAY_SECONDS = 0.1
+READY_MAX_DELAY_SECONDS = 2.0
+PROBE_TIMEOUT_SECONDS = 2
+HISTORY_FILE_NAME = 'update-history.jsonl'
+HISTORY_LIMIT = 100
+LOG_FLUSH_SECONDS = 0.25
+LOG_CHUNK_LINES = 50
+LOG_BUFFER_LINES = 200
+LOG_LINE_MAX_CHARS = 1000
+BUNDLE_FORMAT = 1
+BUNDLE_PREFIX = 'cctoolbox'
+# Installed production dependencies and the Vite output (vite.config.js builds src/web into dist/web).
+BUNDLE_ARTIFACT_DIRS = ('node_modules', 'dist')
+BUNDLE_COMPRESS_LEVEL = 6
+HASH_BLOCK_SIZE = 1024 * 1024
+# Written in place by builds (Vite's dep optimizer and config bundler); never shared with the live release.
+BUILD_CACHE_DIRS = ('.vite', '.vite-temp', '.cache')
+DEPENDENCY_FIELDS = ('dependencies', 'devDependencies', 'optionalDependencies', 'peerDependencies', 'overrides')
 
 
-def emit_step(step, message):
-    print(f"[{step}/{TOTAL_STEPS}] {message}", flush=True)
+OUTPUT_LOCK = threading.Lock()
+STATE_LOCK = threading.Lock()
 
 
-def run_command(command, cwd=None, allow_failure=False):
+class UpdateReporter:
+    """Times every step and command for the history file. With --json-events it writes one JSON object
+    per line instead of the ``[step/total]`` text protocol, and batches log output into bounded chunks."""
+
+    def __init__(self):
+        self.json_events = False
+        self.started = time.time()
+        self.steps = {}
+        self.commands = []
+        self.context = {}
+        self.readiness = None
+        self.log_buffer = []
+        self.log_dropped = 0
+        self.last_flush = 0.0
+        self.flush_timer = None
+
+    def _write(self, event):
+        event.setdefault('ts', round(time.time(), 3))
+        sys.stdout.write(json.dumps(event, ensure_ascii=False) + '\n')
+        sys.stdout.flush()
+
+    def _flush_logs(self):
+        if self.flush_timer is not None:
+            self.flush_timer.cancel()
+            self.flush_timer = None
+        while self.log_buffer:
+            chunk, self.log_buffer = self.log_buffer[:LOG_CHUNK_LINES], self.log_buffer[LOG_CHUNK_LINES:]
+            event = {'event': 'log', 'lines': chunk}
+            if self.log_dropped:
+                event['dropped'] = self.log_dropped
+                self.log_dropped = 0
+            self._write(event)
+        self.last_flush = time.time()
+
+    def flush_logs(self):
+        with OUTPUT_LOCK:
+            self._flush_logs()
+
+    def event(self, name, **fields):
+        if not self.json_events:
+            return
+        with OUTPUT_LOCK:
+            self._flush_logs()
+            self._write({'event': name, **fields})
+
+    def line(self, text, source=''):
+        with OUTPUT_LOCK:
+            if not self.json_events:
+                print(f'[{source}] {text}' if source else text, flush=True)
+                return
+            if len(self.log_buffer) >= LOG_BUFFER_LINES:
+                self.log_buffer.pop(0)
+                self.log_dropped += 1
+            entry = {'text': text[:LOG_LINE_MAX_CHARS]}
+            if source:
+                entry['source'] = source
+            self.log_buffer.append(entry)
+            wait = self.last_flush + LOG_FLUSH_SECONDS - time.time()
+            if wait <= 0:
+                self._flush_logs()
+            elif self.flush_timer is None:
+                self.flush_timer = threading.Timer(wait, self.flush_logs)
+                self.flush_timer.daemon = True
+                self.flush_timer.start()
+
+    def _end_step(self, step, status, now):
+        record = self.steps[step]
+        record['status'] = status
+        record['durationMs'] = round((now - record.pop('startedAt')) * 1000)
+        if self.json_events:
+            self._flush_logs()
+            self._write({'event': 'step', 'phase': 'end', 'step': step, 'status': status,
+                         'durationMs': record['durationMs']})
+
+    def step(self, step, message, skipped=False, parallel=False, done=False):
+        now = time.time()
+        with OUTPUT_LOCK:
+            if not self.json_events:
+                marker = SKIP_MARKER if skipped else PARALLEL_MARKER if parallel else DONE_MARKER if done else ''
+                print(f"[{step}/{TOTAL_STEPS}] {marker + ' ' if marker else ''}{message}", flush=True)
+            if done:
+                if self.steps.get(step, {}).get('status') == 'in_progress':
+                    self._end_step(step, 'completed', now)
+                return
+            # A sequential step starts only after the earlier ones have finished.
+            for number, record in self.steps.items():
+                if record['status'] == 'in_progress' and not (parallel and record['parallel']):
+                    self._end_step(number, 'completed', now)
+            self.steps[step] = {'message': message, 'status': 'in_progress', 'parallel': parallel, 'startedAt': now}
+            if self.json_events:
+                self._flush_logs()
+                self._write({'event': 'step', 'phase': 'start', 'step': step, 'total': TOTAL_STEPS,
+                             'message': message, 'parallel': parallel, 'skipped': skipped})
+            if skipped:
+                self._end_step(step, 'skipped', now)
+
+    def command(self, command, exit_code, duration, source=''):
+        record = {'command': ' '.join(command), 'exitCode': exit_code, 'durationMs': round(duration * 1000)}
+        if source:
+            record['source'] = source
+        with OUTPUT_LOCK:
+            self.commands.append(record)
+        self.event('command', **record)
+
+    def close_steps(self, status):
+        now = time.time()
+        with OUTPUT_LOCK:
+            for number, record in self.steps.items():
+                if record['status'] == 'in_progress':
+                    self._end_step(number, status, now)
+
+    def finish(self, exit_code):
+        """Close open steps, emit the end event and append this run to the timing history."""
+        self.close_steps('completed' if exit_code == 0 else 'failed')
+        now = time.time()
+        with OUTPUT_LOCK:
+            if self.flush_timer is not None:
+                self._flush_logs()
+        summary = {
+            'startedAt': round(self.started, 3),
+            'durationMs': round((now - self.started) * 1000),
+            'success': exit_code == 0,
+            'exitCode': exit_code,
+            **self.context,
+            'steps': [{'step': number, **record} for number, record in sorted(self.steps.items())],
+            'commands': self.commands
+        }
+        if self.readiness is not None:
+            summary['readiness'] = self.readiness
+        self.event('end', **summary)
+        append_update_history(summary)
+
+
+REPORTER = UpdateReporter()
+
+
+def emit(line, source=''):
+    REPORTER.line(line, source)
+
+
+def emit_step(step, message, skipped=False, parallel=False, done=False):
+    """Report a step; the markers (or JSON fields) tell api/update.js about skipped, concurrent and finished steps."""
+    REPORTER.step(step, message, skipped=skipped, parallel=parallel, done=done)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Update CCToolbox from git')
+    parser.add_argument('--force', action='store_true', help='Run every install and build step even if inputs are unchanged')
+    parser.add_argument('--staged', action='store_true',
+                        help='Build into ~/.cctoolbox/releases/<commit> and switch the current symlink atomically '
+                             '(implied once the symlink exists)')
+    parser.add_argument('--keep', type=int, default=DEFAULT_KEEP_RELEASES,
+                        help='Number of built releases to retain in staged mode (minimum 2)')
+    parser.add_argument('--json-events', action='store_true',
+                        help='Write JSON-lines progress events (steps, durations, exit codes, log chunks) to stdout')
+    parser.add_argument('--rollback', action='store_true',
+                        help='Staged mode only: switch back to the previously active release without rebuilding')
+    parser.add_argument('--build-bundle', metavar='DIR',
+                        help='Package the built checkout (tracked files, production node_modules, dist) into DIR')
+    parser.add_argument('--bundle', metavar='PATH',
+                        help='Install a prebuilt bundle from a directory (newest manifest) or a manifest file, '
+                             'as a release under ~/.cctoolbox/releases')
+    return parser.parse_args()
+
+
+def run_command(command, cwd=None, allow_failure=False, prefix='', env=None):
+    started = time.time()
     process = subprocess.Popen(
         command,
         cwd=cwd,
+        env=env,
         stdout=subprocess.PIPE,
         stderr=subprocess.STDOUT,
         text=True
@@ -29,9 +231,10 @@ def run_command(command, cwd=None, allow_failure=False):
             break
         if line:
             output_lines.append(line.rstrip())
-            print(line.rstrip(), flush=True)
+            emit(line.rstrip(), prefix)
 
     return_code = process.wait()
+    REPORTER.command(command, return_code, time.time() - started, prefix)
     if return_code != 0 and not allow_failure:
         raise RuntimeError(f"命令执行失败: {' '.join(command)}")
     return output_lines
@@ -41,22 +244,126 @@ def get_repo_root():
     return Path(__file__).resolve().parent
 
 
-def load_config_port():
-    config_path = Path.home() / '.claude' / 'cctoolbox' / 'config.json'
-    if not config_path.exists():
-        return 9999
+def get_app_dir():
+    return Path(os.environ.get('CCTOOLBOX_HOME') or Path.home()) / '.cctoolbox'
+
+
+def load_update_state():
+    try:
+        data = json.loads((get_app_dir() / STATE_FILE_NAME).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def save_update_state(state):
+    state_path = get_app_dir() / STATE_FILE_NAME
     try:
-        data = json.loads(config_path.read_text(encoding='utf-8'))
-        return int(data.get('ports', {}).get('webUI', 9999))
-    except Exception:
-        return 9999
+        state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = state_path.with_name(f'{STATE_FILE_NAME}.{os.getpid()}.tmp')
+        tmp_path.write_text(json.dumps(state, ensure_ascii=False, indent=2), encoding='utf-8')
+        os.replace(tmp_path, state_path)
+    except OSError as exc:
+        emit(f'⚠️ 无法保存更新状态: {exc}')
+
+
+def clear_update_state():
+    try:
+        (get_app_dir() / STATE_FILE_NAME).unlink()
+    except OSError:
+        pass
+
+
+def append_update_history(entry):
+    """Append one run to update-history.jsonl, keeping the newest HISTORY_LIMIT runs."""
+    history_path = get_app_dir() / HISTORY_FILE_NAME
+    try:
+        lines = history_path.read_text(encoding='utf-8').splitlines() if history_path.exists() else []
+        lines = [line for line in lines if line.strip()][-(HISTORY_LIMIT - 1):]
+        lines.append(json.dumps(entry, ensure_ascii=False))
+        history_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = history_path.with_name(f'{HISTORY_FILE_NAME}.{os.getpid()}.tmp')
+        tmp_path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+        os.replace(tmp_path, history_path)
+    except OSError as exc:
+        emit(f'⚠️ 无法写入更新耗时记录: {exc}')
+
+
+def record_state(state, key, value, save=save_update_state):
+    with STATE_LOCK:
+        state[key] = value
+        save(state)
+
+
+def run_parallel(tasks):
+    """Run independent step callables concurrently and re-raise the first failure once all have finished."""
+    with ThreadPoolExecutor(max_workers=len(tasks)) as pool:
+        futures = [pool.submit(task) for task in tasks]
+    errors = [future.exception() for future in futures if future.exception() is not None]
+    if errors:
+        raise errors[0]
+
+
+def dependency_fingerprint(package_dir):
+    """Hash the lockfile plus the dependency sections of package.json (the version field changes every release)."""
+    hasher = hashlib.sha256()
+    for name in ('package-lock.json', 'pnpm-lock.yaml'):
+        lock_path = package_dir / name
+        if lock_path.exists():
+            hasher.update(name.encode('utf-8'))
+            hasher.update(lock_path.read_bytes())
+    try:
+        package = json.loads((package_dir / 'package.json').read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        package = {}
+    sections = {field: package.get(field) for field in DEPENDENCY_FIELDS}
+    hasher.update(json.dumps(sections, sort_keys=True).encode('utf-8'))
+    return hasher.hexdigest()
+
+
+def source_fingerprint(root_dir, relative_dir):
+    """Git tree hash of a tracked directory; the repo is clean at this point, so it covers every source file."""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', f'HEAD:{relative_dir}'], cwd=root_dir, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def web_build_fingerprint(root_dir):
+    web_source = source_fingerprint(root_dir, 'src/web')
+    return f"{dependency_fingerprint(root_dir / 'src' / 'web')}:{web_source}" if web_source else None
+
+
+def is_unchanged(state, key, fingerprint, output_path):
+    return bool(fingerprint) and state.get(key) == fingerprint and output_path.exists()
+
+
+def load_config_ports(root_dir):
+    """Ports from the same config.json src/config/loader.js would pick, then the legacy location."""
+    candidates = (get_app_dir() / 'config.json', root_dir / 'config.json',
+                  Path.home() / '.claude' / 'cctoolbox' / 'config.json')
+    for config_path in candidates:
+        try:
+            ports = json.loads(config_path.read_text(encoding='utf-8')).get('ports') or {}
+        except (OSError, ValueError, AttributeError):
+            continue
+        merged = dict(DEFAULT_PORTS)
+        for key, value in ports.items():
+            try:
+                merged[key] = int(value)
+            except (TypeError, ValueError):
+                pass
+        return merged
+    return dict(DEFAULT_PORTS)
 
 
 def ensure_clean_repo(root_dir):
     status = subprocess.check_output(['git', 'status', '--porcelain'], cwd=root_dir, text=True).strip()
     if status:
-        print('更新前检测到本地修改，请先处理后再更新。', flush=True)
-        print(status, flush=True)
+        emit('更新前检测到本地修改，请先处理后再更新。')
+        emit(status)
         sys.exit(1)
 
 
@@ -69,7 +376,9 @@ def read_package_version(root_dir):
 
 
 def rollback(root_dir, prev_commit):
-    print('更新失败，正在回滚到上一个版本...', flush=True)
+    emit('更新失败，正在回滚到上一个版本...')
+    # node_modules and dist are rebuilt for the old commit below, so recorded fingerprints no longer apply.
+    clear_update_state()
     subprocess.run(['git', 'reset', '--hard', prev_commit], cwd=root_dir, check=False)
     run_command(['npm', 'install', '--production'], cwd=root_dir, allow_failure=True)
     run_command(['npm', 'run', 'build:web'], cwd=root_dir, allow_failure=True)
@@ -87,19 +396,721 @@ def reload_pm2(root_dir, allow_failure=False):
         except Exception:
             if not allow_failure:
                 raise
-            print(f"⚠️ PM2 重启失败: {' '.join(command)}", flush=True)
+            emit(f"⚠️ PM2 重启失败: {' '.join(command)}")
+
+
+def readiness_targets(root_dir):
+    # The proxies run inside cctoolbox-ui and are not restarted with it (autoRestoreProxies is disabled
+    # in src/server/index.js), so only the web UI port and the pm2 processes gate the update.
+    ports = load_config_ports(root_dir)
+    targets = [{'name': 'webUI', 'kind': 'http', 'port': ports['webUI']}]
+    for proc in pm2_processes():
+        if proc.get('name') in PM2_APP_NAMES:
+            targets.append({'name': proc['name'], 'kind': 'pm2'})
+    return targets
+
+
+def probe_target(target, reload_started):
+    """Return the probe latency in seconds once target is served by the restarted process, else None."""
+    started = time.time()
+    if target['kind'] == 'http':
+        url = f"http://127.0.0.1:{target['port']}/health"
+        with urllib.request.urlopen(url, timeout=PROBE_TIMEOUT_SECONDS) as response:
+            body = json.loads(response.read().decode('utf-8') or '{}')
+        # /health reports process uptime; an answer from the old process during the reload does not count.
+        uptime = body.get('uptime') if isinstance(body, dict) else None
+        if isinstance(uptime, (int, float)) and uptime > started - reload_started + 1:
+            return None
+    else:
+        proc = next((item for item in pm2_processes() if item.get('name') == target['name']), None)
+        env = (proc or {}).get('pm2_env') or {}
+        if env.get('status') != 'online' or (env.get('pm_uptime') or 0) / 1000 < reload_started - 1:
+            return None
+    return time.time() - started
+
+
+def wait_until_ready(targets, reload_started, deadline=READY_DEADLINE_SECONDS):
+    """Poll every target with exponential backoff until all are ready or the deadline passes.
+    Returns {name: {readyMs, latencyMs, port?}} measured from reload_started."""
+    pending = list(targets)
+    results = {}
+    delay = READY_INITIAL_DELAY_SECONDS
+    while True:
+        for target in list(pending):
+            try:
+                latency = probe_target(target, reload_started)
+            except (OSError, ValueError):
+                latency = None
+            if latency is None:
+                continue
+            pending.remove(target)
+            results[target['name']] = {
+                'kind': target['kind'],
+                'port': target.get('port'),
+                'readyMs': round((time.time() - reload_started) * 1000),
+                'latencyMs': round(latency * 1000)
+            }
+        if not pending:
+            return results
+        remaining = reload_started + deadline - time.time()
+        if remaining <= 0:
+            names = ', '.join(target['name'] for target in pending)
+            raise RuntimeError(f'服务在 {deadline}s 内未就绪: {names}')
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, READY_MAX_DELAY_SECONDS)
+
+
+def report_readiness(results):
+    for name, result in results.items():
+        if result['kind'] == 'pm2':
+            emit(f"就绪: pm2 {name} 在线，耗时 {result['readyMs'] / 1000:.2f}s")
+            continue
+        emit(f"就绪: {name}:{result['port']} 耗时 {result['readyMs'] / 1000:.2f}s (首次响应 {result['latencyMs']}ms)")
+
+
+def health_check(root_dir, reload_started):
+    """Wait for the web UI and the pm2 processes to come back after a reload."""
+    results = wait_until_ready(readiness_targets(root_dir), reload_started)
+    REPORTER.readiness = results
+    REPORTER.event('readiness', results=results)
+    report_readiness(results)
+    return results
+
+
+def install_and_build(root_dir, state, save=save_update_state):
+    """Steps 3 and 4. The root install and the web install/build touch separate node_modules,
+    so when both have to run they run side by side with prefixed output."""
+    web_dir = root_dir / 'src' / 'web'
+    root_deps = dependency_fingerprint(root_dir)
+    root_unchanged = is_unchanged(state, 'rootDependencies', root_deps, root_dir / 'node_modules')
+    web_deps = dependency_fingerprint(web_dir)
+    web_build = web_build_fingerprint(root_dir)
+    web_deps_unchanged = is_unchanged(state, 'webDependencies', web_deps, web_dir / 'node_modules')
+    web_unchanged = web_deps_unchanged and is_unchanged(
+        state, 'webBuild', web_build, root_dir / 'dist' / 'web' / 'index.html'
+    )
+    parallel = not root_unchanged and not web_unchanged
+
+    def install_root():
+        run_command(['npm', 'install', '--production'], cwd=root_dir, prefix='root' if parallel else '')
+        record_state(state, 'rootDependencies', root_deps, save)
+        if parallel:
+            emit_step(3, '安装依赖完成', done=True)
+
+    def build_web():
+        prefix = 'web' if parallel else ''
+        if web_deps_unchanged:
+            emit('前端依赖未变化，跳过 npm install', prefix)
+        else:
+            run_command(['npm', 'install'], cwd=web_dir, prefix=prefix)
+            record_state(state, 'webDependencies', web_deps, save)
+        run_command(['npm', 'run', 'build'], cwd=web_dir, prefix=prefix)
+        if web_build:
+            record_state(state, 'webBuild', web_build, save)
+        if parallel:
+            emit_step(4, '构建前端资源完成', done=True)
+
+    if parallel:
+        emit_step(3, '安装依赖', parallel=True)
+        emit_step(4, '构建前端资源', parallel=True)
+        run_parallel([install_root, build_web])
+        return
+    if root_unchanged:
+        emit_step(3, '安装依赖: 依赖未变化', skipped=True)
+    else:
+        emit_step(3, '安装依赖')
+        install_root()
+    if web_unchanged:
+        emit_step(4, '构建前端资源: 前端源码与依赖均未变化', skipped=True)
+    else:
+        emit_step(4, '构建前端资源')
+        build_web()
+
+
+def get_releases_dir():
+    return get_app_dir() / RELEASES_DIR_NAME
+
+
+def get_current_link():
+    return get_app_dir() / CURRENT_LINK_NAME
+
+
+def release_meta_path(release_dir):
+    # Kept beside the worktree rather than inside it, so ensure_clean_repo still passes when update.py runs from a release.
+    return release_dir.with_name(f'{release_dir.name}.json')
+
+
+def release_files_path(release_dir):
+    """File list of a release installed from a bundle; the next bundle install diffs against it."""
+    return release_dir.with_name(f'{release_dir.name}.files.json')
+
+
+def load_release_meta(release_dir):
+    try:
+        data = json.loads(release_meta_path(release_dir).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def save_release_meta(release_dir, meta):
+    meta_path = release_meta_path(release_dir)
+    tmp_path = meta_path.with_name(f'{meta_path.name}.{os.getpid()}.tmp')
+    tmp_path.write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding='utf-8')
+    os.replace(tmp_path, meta_path)
+
+
+def is_release(path):
+    return path is not None and path.parent == get_releases_dir().resolve()
+
+
+def is_bundle_release(path):
+    """Releases installed from a bundle are plain directories: no git metadata to fetch into or build from."""
+    return is_release(path) and load_release_meta(path).get('source') == 'bundle'
+
 
+def active_release():
+    link = get_current_link()
+    if not link.is_symlink():
+        return None
+    target = link.resolve()
+    return target if target.is_dir() else None
 
-def health_check(port):
-    url = f'http://localhost:{port}/health'
-    subprocess.run(['curl', '-f', url], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def list_releases():
+    """Built releases under the releases dir, most recently activated (or built) first."""
+    releases_dir = get_releases_dir()
+    if not releases_dir.is_dir():
+        return []
+    built = []
+    for path in releases_dir.iterdir():
+        meta = load_release_meta(path) if path.is_dir() else {}
+        if meta.get('builtAt'):
+            built.append((meta.get('activatedAt') or meta['builtAt'], path.resolve()))
+    return [path for _, path in sorted(built, key=lambda item: item[0], reverse=True)]
+
+
+def switch_release(target_dir, previous=None):
+    """Point the current symlink at target_dir through a rename, so the link is never missing or half-written."""
+    link = get_current_link()
+    link.parent.mkdir(parents=True, exist_ok=True)
+    tmp_link = link.with_name(f'{CURRENT_LINK_NAME}.{os.getpid()}.tmp')
+    if tmp_link.is_symlink():
+        tmp_link.unlink()
+    os.symlink(target_dir, tmp_link, target_is_directory=True)
+    os.replace(tmp_link, link)
+    if is_release(target_dir):
+        meta = load_release_meta(target_dir)
+        meta['activatedAt'] = time.time()
+        if previous is not None:
+            meta['previous'] = str(previous)
+        save_release_meta(target_dir, meta)
+
+
+def remove_release(repo_dir, release_dir):
+    if release_dir.exists():
+        # Releases installed from a bundle are plain directories, not worktrees.
+        if (release_dir / '.git').exists():
+            run_command(['git', 'worktree', 'remove', '--force', str(release_dir)], cwd=repo_dir, allow_failure=True)
+        shutil.rmtree(release_dir, ignore_errors=True)
+        subprocess.run(['git', 'worktree', 'prune'], cwd=repo_dir, check=False,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for path in (release_meta_path(release_dir), release_files_path(release_dir)):
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+def create_release(repo_dir, commit, force=False):
+    """Check commit out into releases/<commit> as a detached worktree. Returns (path, already_built)."""
+    release_dir = get_releases_dir().resolve() / commit[:12]
+    # The running release is never rebuilt in place, even with --force.
+    reusable = not force or release_dir == active_release()
+    if reusable and release_dir.is_dir() and load_release_meta(release_dir).get('builtAt'):
+        return release_dir, True
+    remove_release(repo_dir, release_dir)
+    release_dir.parent.mkdir(parents=True, exist_ok=True)
+    run_command(['git', 'worktree', 'add', '--detach', '--force', str(release_dir), commit], cwd=repo_dir)
+    return release_dir, False
+
+
+def seed_dependencies(source_dir, source_state, release_dir, state):
+    """Seed node_modules and the built dist from the running release when their recorded fingerprints match,
+    so an unchanged lockfile or web source costs a directory copy instead of an install or build.
+
+    A seeded node_modules is never installed into (its fingerprint matched), so it is hardlinked except for
+    the BUILD_CACHE_DIRS a web build rewrites; those and dist are real copies, keeping the live release's
+    files untouched by anything that runs in the new one.
+    """
+    seeds = (
+        ('rootDependencies', dependency_fingerprint(release_dir), 'node_modules', True),
+        ('webDependencies', dependency_fingerprint(release_dir / 'src' / 'web'), 'src/web/node_modules', True),
+        ('webBuild', web_build_fingerprint(release_dir), 'dist', False)
+    )
+    for key, fingerprint, relative, hardlink in seeds:
+        source_path = source_dir / relative
+        target_path = release_dir / relative
+        if not fingerprint or source_state.get(key) != fingerprint or not source_path.is_dir() or target_path.exists():
+            continue
+        if hardlink and os.name != 'posix':
+            continue
+        try:
+            if hardlink:
+                subprocess.run(['cp', '-al', str(source_path), str(target_path)], check=True,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                for name in BUILD_CACHE_DIRS:
+                    cache_path = target_path / name
+                    if cache_path.is_dir() and not cache_path.is_symlink():
+                        shutil.rmtree(cache_path)
+                        shutil.copytree(source_path / name, cache_path, symlinks=True)
+            else:
+                shutil.copytree(source_path, target_path, symlinks=True)
+        except (OSError, subprocess.CalledProcessError):
+            shutil.rmtree(target_path, ignore_errors=True)
+            continue
+        state[key] = fingerprint
+
+
+def prune_releases(repo_dir, keep, protected):
+    """Remove built releases beyond the newest ``keep``; protected ones (current and previous) always stay."""
+    limit = keep - len([path for path in protected if is_release(path)])
+    kept = 0
+    for release_dir in list_releases():
+        if release_dir in protected:
+            continue
+        kept += 1
+        if kept > limit:
+            emit(f'清理旧发布: {release_dir.name}')
+            remove_release(repo_dir, release_dir)
+
+
+def pm2_processes():
+    try:
+        output = subprocess.check_output(['pm2', 'jlist'], text=True, stderr=subprocess.DEVNULL)
+        return json.loads(output[output.index('['):])
+    except (OSError, subprocess.CalledProcessError, ValueError):
+        return []
+
+
+def repoint_pm2(link, allow_failure=False):
+    """pm2 reload keeps the script path a process was started with. Processes still running from a plain
+    checkout are re-registered once under the current symlink; from then on a reload follows the link."""
+    for proc in pm2_processes():
+        env = proc.get('pm2_env') or {}
+        exec_path = env.get('pm_exec_path')
+        if proc.get('name') not in PM2_APP_NAMES or not exec_path or exec_path.startswith(f'{link}{os.sep}'):
+            continue
+        try:
+            top_level = subprocess.check_output(['git', 'rev-parse', '--show-toplevel'], cwd=Path(exec_path).parent,
+                                                text=True, stderr=subprocess.DEVNULL).strip()
+            script = link / Path(exec_path).resolve().relative_to(Path(top_level).resolve())
+        except (OSError, ValueError, subprocess.CalledProcessError):
+            emit(f"⚠️ {proc['name']} 不是从 git 检出目录启动的，无法切换到 {link}")
+            continue
+        # Start the new registration before deleting the old one: update.py runs as a child of cctoolbox-ui and
+        # pm2 kills the whole process tree on delete, so deleting first could stop the updater with nothing
+        # started in its place. pm2 starts a second process under the same name when the script path differs,
+        # and the old one is then deleted by id. The new process may not bind its port until the old one is
+        # gone; pm2 restarts it, and the reload and health check that follow wait for it.
+        command = ['pm2', 'start', str(script), '--name', proc['name'], '--cwd', str(link),
+                   '--interpreter', env.get('exec_interpreter') or 'node', '--merge-logs']
+        for flag, key in (('--output', 'pm_out_log_path'), ('--error', 'pm_err_log_path')):
+            if env.get(key):
+                command += [flag, env[key]]
+        if env.get('args'):
+            command += ['--', *env['args']]
+        run_command(command, cwd=link, allow_failure=allow_failure, env={**os.environ, **(env.get('env') or {})})
+        run_command(['pm2', 'delete', str(proc['pm_id'])], allow_failure=allow_failure)
+
+
+def activate_release(target_dir, previous=None, allow_failure=False):
+    link = get_current_link()
+    switch_release(target_dir, previous)
+    repoint_pm2(link, allow_failure=allow_failure)
+    reload_pm2(link, allow_failure=allow_failure)
+
+
+def rollback_release():
+    """--rollback: switch current back to the release it replaced. Nothing is rebuilt."""
+    current = active_release()
+    previous = load_release_meta(current).get('previous') if is_release(current) else None
+    REPORTER.context.update({'mode': 'rollback', 'fromVersion': read_package_version(current or get_repo_root())})
+    if not previous or not Path(previous).is_dir():
+        emit('没有可回滚的发布。')
+        sys.exit(1)
+    emit(f'切换到发布 {Path(previous).name} ...')
+    reload_started = time.time()
+    activate_release(Path(previous), previous=current)
+    health_check(Path(previous), reload_started)
+    REPORTER.context['toVersion'] = read_package_version(Path(previous))
+    emit('✅ 已回滚到上一个发布。')
+
+
+def main_staged(args, root_dir):
+    """Build in releases/<commit>, then swap the current symlink. The live release is untouched until
+    the swap, and a failed update only swaps back."""
+    previous = active_release() or root_dir
+    previous_state = load_release_meta(previous) if is_release(previous) else load_update_state()
+    REPORTER.context.update({'mode': 'staged', 'fromVersion': read_package_version(previous)})
+    release_dir = None
+    built = activated = False
+    try:
+        emit_step(1, '检查本地修改')
+        ensure_clean_repo(root_dir)
+
+        emit_step(2, f'拉取最新代码到发布目录 (当前版本 {read_package_version(previous)})')
+        run_command(['git', 'fetch', 'origin', 'main'], cwd=root_dir)
+        commit = subprocess.check_output(['git', 'rev-parse', 'FETCH_HEAD'], cwd=root_dir, text=True).strip()
+        release_dir, built = create_release(root_dir, commit, force=args.force)
+        if built and release_dir == previous:
+            emit_step(3, f'安装依赖: 发布 {release_dir.name} 已构建', skipped=True)
+            emit_step(4, f'构建前端资源: 发布 {release_dir.name} 已构建', skipped=True)
+            emit('✅ 当前已是最新发布，无需更新。')
+            REPORTER.context.update({'toVersion': read_package_version(release_dir), 'release': release_dir.name})
+            return
+
+        if built:
+            emit_step(3, f'安装依赖: 发布 {release_dir.name} 已构建', skipped=True)
+            emit_step(4, f'构建前端资源: 发布 {release_dir.name} 已构建', skipped=True)
+        else:
+            state = {'commit': commit}
+            if not args.force:
+                seed_dependencies(previous, previous_state, release_dir, state)
+            install_and_build(release_dir, state, save=lambda data: save_release_meta(release_dir, data))
+            state.update({'version': read_package_version(release_dir), 'builtAt': time.time()})
+            save_release_meta(release_dir, state)
+            built = True
+
+        emit_step(5, f'切换到发布 {release_dir.name} 并重启服务')
+        activated = True
+        reload_started = time.time()
+        activate_release(release_dir, previous=previous)
+
+        emit_step(6, '健康检查')
+        health_check(release_dir, reload_started)
+
+        REPORTER.context.update({'toVersion': read_package_version(release_dir), 'release': release_dir.name})
+        prune_releases(root_dir, max(args.keep, 2), {release_dir, previous})
+        emit('✅ 更新完成，服务已重启。')
+    except Exception as exc:
+        emit(f'❌ 更新失败: {exc}')
+        REPORTER.close_steps('failed')
+        if activated:
+            emit(f'正在切换回 {previous} ...')
+            activate_release(previous, allow_failure=True)
+        elif release_dir is not None and not built:
+            remove_release(root_dir, release_dir)
+        sys.exit(1)
+
+
+def file_sha256(path):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(HASH_BLOCK_SIZE), b''):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def write_json_atomic(path, data):
+    tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    tmp_path.write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8')
+    os.replace(tmp_path, path)
+
+
+def is_safe_relative(relative):
+    path = PurePosixPath(relative)
+    return bool(path.parts) and not path.is_absolute() and '..' not in path.parts
+
+
+def is_safe_link(relative, link_target):
+    """A link may climb out of its own directory (node_modules/.bin points at ../<pkg>/...) but not above the
+    release, and may not climb again after descending, since a descended component can itself be a link."""
+    target = PurePosixPath(link_target)
+    ups = next((index for index, part in enumerate(target.parts) if part != '..'), len(target.parts))
+    return (bool(target.parts) and not target.is_absolute() and ups < len(PurePosixPath(relative).parts)
+            and '..' not in target.parts[ups:])
+
+
+def bundle_source_files(source_dir):
+    """Tracked files plus everything under the artifact dirs, as sorted POSIX paths relative to source_dir."""
+    tracked = subprocess.check_output(['git', 'ls-files', '-z'], cwd=source_dir, text=True).split('\0')
+    paths = {path for path in tracked if path}
+    for relative in BUNDLE_ARTIFACT_DIRS:
+        for root, dirs, files in os.walk(source_dir / relative):
+            # os.walk does not descend into directory symlinks (node_modules/.bin, workspaces) but lists them.
+            for name in files + [name for name in dirs if os.path.islink(os.path.join(root, name))]:
+                paths.add(Path(root, name).relative_to(source_dir).as_posix())
+    return sorted(paths)
+
+
+def reset_owner(tarinfo):
+    tarinfo.uid = tarinfo.gid = 0
+    tarinfo.uname = tarinfo.gname = ''
+    return tarinfo
+
+
+def build_bundle(output_dir):
+    """--build-bundle: archive the live checkout with its installed artifacts, plus a checksum manifest.
+    The artifacts must match the recorded fingerprints, so every host gets exactly what was built here."""
+    source_dir = active_release() or get_repo_root()
+    REPORTER.context.update({'mode': 'build-bundle', 'fromVersion': read_package_version(source_dir)})
+    if is_bundle_release(source_dir):
+        raise RuntimeError(f'{source_dir} 由发布包安装，不是 git 检出目录，请在构建机的检出目录中打包')
+    ensure_clean_repo(source_dir)
+    state = load_release_meta(source_dir) if is_release(source_dir) else load_update_state()
+    expected = (
+        ('rootDependencies', dependency_fingerprint(source_dir), 'node_modules'),
+        ('webBuild', web_build_fingerprint(source_dir), 'dist/web')
+    )
+    stale = [label for key, fingerprint, label in expected if not fingerprint or state.get(key) != fingerprint]
+    if stale or not (source_dir / 'dist' / 'web' / 'index.html').exists():
+        raise RuntimeError(f"{', '.join(stale) or 'dist/web'} 与当前代码不一致，请先运行 python3 update.py --force 完成安装与构建")
+
+    commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=source_dir, text=True).strip()
+    version = read_package_version(source_dir)
+    bundle_id = f'{version}-{commit[:12]}'
+    name = f'{BUNDLE_PREFIX}-{bundle_id}'
+    output_dir.mkdir(parents=True, exist_ok=True)
+    tarball = output_dir / f'{name}.tar.gz'
+    tmp_tarball = tarball.with_name(f'{tarball.name}.{os.getpid()}.tmp')
+    files = {}
+    links = {}
+    emit(f'打包 {source_dir} -> {tarball}')
+    try:
+        with tarfile.open(tmp_tarball, 'w:gz', compresslevel=BUNDLE_COMPRESS_LEVEL) as archive:
+            for relative in bundle_source_files(source_dir):
+                path = source_dir / relative
+                if path.is_symlink():
+                    links[relative] = os.readlink(path)
+                elif path.is_file():
+                    stat = path.stat()
+                    files[relative] = [file_sha256(path), stat.st_size, stat.st_mode & 0o777]
+                    archive.add(path, arcname=relative, recursive=False, filter=reset_owner)
+        manifest = {
+            'format': BUNDLE_FORMAT,
+            'id': bundle_id,
+            'version': version,
+            'commit': commit,
+            'createdAt': time.time(),
+            'tarball': tarball.name,
+            'size': tmp_tarball.stat().st_size,
+            'sha256': file_sha256(tmp_tarball),
+            'files': files,
+            'links': links
+        }
+        os.replace(tmp_tarball, tarball)
+    finally:
+        if tmp_tarball.exists():
+            tmp_tarball.unlink()
+    # The manifest is written last: a bundle is only picked up once it is complete.
+    write_json_atomic(output_dir / f'{name}.json', manifest)
+    REPORTER.context['toVersion'] = version
+    emit(f"✅ 发布包已生成: {tarball.name} ({len(files)} 个文件, {manifest['size'] / 1024 / 1024:.1f} MB)")
+
+
+def find_bundle_manifest(location):
+    """The manifest at ``location``, or the newest one in that directory."""
+    location = Path(location)
+    candidates = [location] if location.is_file() else sorted(location.glob(f'{BUNDLE_PREFIX}-*.json'))
+    manifests = []
+    for candidate in candidates:
+        try:
+            data = json.loads(candidate.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            continue
+        if isinstance(data, dict) and data.get('format') == BUNDLE_FORMAT:
+            manifests.append((data.get('createdAt') or 0, candidate, data))
+    if not manifests:
+        raise RuntimeError(f'未找到发布包清单: {location}')
+    _, manifest_path, manifest = max(manifests, key=lambda item: item[0])
+    return manifest_path, manifest
+
+
+def verify_bundle(manifest_path, manifest):
+    tarball = manifest_path.parent / manifest['tarball']
+    if not tarball.is_file() or tarball.stat().st_size != manifest['size']:
+        raise RuntimeError(f'发布包不完整: {tarball}')
+    if file_sha256(tarball) != manifest['sha256']:
+        raise RuntimeError(f'发布包校验失败: {tarball}')
+    unsafe = [path for path in list(manifest['files']) + list(manifest['links']) if not is_safe_relative(path)]
+    # A link inside a linked directory would be created wherever that link points.
+    unsafe += [path for path, link_target in manifest['links'].items()
+               if not is_safe_link(path, link_target)
+               or any(parent.as_posix() in manifest['links'] for parent in PurePosixPath(path).parents)]
+    if unsafe:
+        raise RuntimeError(f'发布包包含非法路径: {unsafe[0]}')
+    return tarball
+
+
+def plan_bundle_files(previous, manifest):
+    """Split the bundle's files into those the previous bundle release already has (same checksum and size)
+    and those to unpack. Releases not installed from a bundle have no file list, so everything is unpacked."""
+    try:
+        previous_files = json.loads(release_files_path(previous).read_text(encoding='utf-8'))['files']
+    except (OSError, ValueError, KeyError, TypeError):
+        previous_files = {}
+    reuse = []
+    extract = []
+    for relative, (sha256, size, _) in manifest['files'].items():
+        known = previous_files.get(relative)
+        path = previous / relative
+        if known and known[0] == sha256 and not path.is_symlink() and path.is_file() and path.stat().st_size == size:
+            reuse.append(relative)
+        else:
+            extract.append(relative)
+    return reuse, extract
+
+
+def install_bundle_files(tarball, manifest, previous, release_dir, reuse, extract):
+    """Hardlink unchanged files from the previous release and stream only the changed ones out of the
+    tarball, verifying each against the manifest as it is written."""
+    release_dir.mkdir(parents=True)
+    pending = set(extract)
+    for relative in reuse:
+        target = release_dir / relative
+        target.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(previous / relative, target)
+        except OSError:
+            pending.add(relative)  # e.g. the releases dir is on another filesystem
+    unpacked = len(pending)
+    if pending:
+        with tarfile.open(tarball, 'r:gz') as archive:
+            for member in archive:
+                if member.name not in pending or not member.isfile():
+                    continue
+                sha256, _, mode = manifest['files'][member.name]
+                target = release_dir / member.name
+                target.parent.mkdir(parents=True, exist_ok=True)
+                source = archive.extractfile(member)
+                hasher = hashlib.sha256()
+                with open(target, 'wb') as handle:
+                    for block in iter(lambda: source.read(HASH_BLOCK_SIZE), b''):
+                        hasher.update(block)
+                        handle.write(block)
+                if hasher.hexdigest() != sha256:
+                    raise RuntimeError(f'文件校验失败: {member.name}')
+                os.chmod(target, mode)
+                os.utime(target, (member.mtime, member.mtime))
+                pending.discard(member.name)
+    if pending:
+        raise RuntimeError(f'发布包缺少 {len(pending)} 个文件，例如 {sorted(pending)[0]}')
+    for relative, link_target in manifest['links'].items():
+        target = release_dir / relative
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.symlink(link_target, target)
+    return unpacked
+
+
+def main_bundle(args, root_dir):
+    """--bundle: install a prebuilt bundle as a release, then switch to it like staged mode. Nothing is
+    installed or built on this host, and a failed update only swaps back."""
+    previous = active_release() or root_dir
+    REPORTER.context.update({'mode': 'bundle', 'fromVersion': read_package_version(previous)})
+    release_dir = None
+    built = activated = False
+    try:
+        emit_step(1, '校验发布包')
+        manifest_path, manifest = find_bundle_manifest(args.bundle)
+        tarball = verify_bundle(manifest_path, manifest)
+        emit(f"发布包 {manifest['id']} 校验通过 ({len(manifest['files'])} 个文件)")
+
+        # Named by content, so reinstalling the same bundle reuses its release and a rebuilt bundle of the
+        # same commit never collides with the running one.
+        release_dir = get_releases_dir().resolve() / f"{manifest['commit'][:12]}-{manifest['sha256'][:8]}"
+        built = release_dir.is_dir() and load_release_meta(release_dir).get('bundle') == manifest['sha256']
+        if built and release_dir == previous:
+            emit_step(2, '比较文件清单: 已是当前发布', skipped=True)
+            emit('✅ 当前已运行该发布包，无需更新。')
+            REPORTER.context['toVersion'] = manifest['version']
+            return
+        if built:
+            emit_step(2, f'比较文件清单: 发布 {release_dir.name} 已安装', skipped=True)
+            emit_step(3, f'解包: 发布 {release_dir.name} 已安装', skipped=True)
+        else:
+            emit_step(2, '比较文件清单')
+            remove_release(root_dir, release_dir)
+            reuse, extract = plan_bundle_files(previous, manifest)
+            emit(f'{len(reuse)} 个文件未变化，{len(extract)} 个文件需要解包')
+            emit_step(3, '解包变化的文件')
+            unpacked = install_bundle_files(tarball, manifest, previous, release_dir, reuse, extract)
+            write_json_atomic(release_files_path(release_dir), {'files': manifest['files'], 'links': manifest['links']})
+            save_release_meta(release_dir, {
+                'commit': manifest['commit'],
+                'version': manifest['version'],
+                'source': 'bundle',
+                'bundle': manifest['sha256'],
+                'unpacked': unpacked,
+                'builtAt': time.time()
+            })
+            built = True
+        emit_step(4, '构建前端资源: 发布包已包含构建产物', skipped=True)
+
+        emit_step(5, f'切换到发布 {release_dir.name} 并重启服务')
+        activated = True
+        reload_started = time.time()
+        activate_release(release_dir, previous=previous)
+
+        emit_step(6, '健康检查')
+        health_check(release_dir, reload_started)
+
+        REPORTER.context.update({'toVersion': manifest['version'], 'release': release_dir.name})
+        prune_releases(root_dir, max(args.keep, 2), {release_dir, previous})
+        emit('✅ 更新完成，服务已重启。')
+    except Exception as exc:
+        emit(f'❌ 更新失败: {exc}')
+        REPORTER.close_steps('failed')
+        if activated:
+            emit(f'正在切换回 {previous} ...')
+            activate_release(previous, allow_failure=True)
+        elif release_dir is not None and not built:
+            remove_release(root_dir, release_dir)
+        sys.exit(1)
 
 
 def main():
+    args = parse_args()
+    REPORTER.json_events = args.json_events
+    exit_code = 1
+    try:
+        run_update(args)
+        exit_code = 0
+    except SystemExit as exc:
+        exit_code = exc.code if isinstance(exc.code, int) else 1
+        raise
+    finally:
+        REPORTER.finish(exit_code)
+
+
+def run_update(args):
     root_dir = get_repo_root()
+    if args.rollback:
+        rollback_release()
+        return
+    if args.build_bundle:
+        try:
+            build_bundle(Path(args.build_bundle).resolve())
+        except (OSError, RuntimeError, subprocess.CalledProcessError) as exc:
+            emit(f'❌ 打包失败: {exc}')
+            sys.exit(1)
+        return
+    if args.bundle:
+        main_bundle(args, root_dir)
+        return
+    if is_bundle_release(root_dir):
+        # The Web UI runs update.py from the release pm2 serves, which has no git checkout to pull into.
+        REPORTER.context.update({'mode': 'bundle', 'fromVersion': read_package_version(root_dir)})
+        emit('当前版本由离线发布包安装，无法通过 git 更新。请使用 python3 update.py --bundle <发布包目录> 安装新的发布包。')
+        sys.exit(1)
+    if args.staged or get_current_link().is_symlink():
+        main_staged(args, root_dir)
+        return
+    state = {} if args.force else load_update_state()
 
     prev_commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=root_dir, text=True).strip()
     prev_version = read_package_version(root_dir)
+    REPORTER.context.update({'mode': 'in-place', 'fromVersion': prev_version})
 
     try:
         emit_step(1, '检查本地修改')
@@ -108,24 +1119,20 @@ def main():
         emit_step(2, f'拉取最新代码 (当前版本 {prev_version})')
         run_command(['git', 'pull', 'origin', 'main'], cwd=root_dir)
 
-        emit_step(3, '安装依赖')
-        run_command(['npm', 'install', '--production'], cwd=root_dir)
-
-        emit_step(4, '构建前端资源')
-        run_command(['npm', 'install'], cwd=root_dir / 'src' / 'web')
-        run_command(['npm', 'run', 'build'], cwd=root_dir / 'src' / 'web')
+        install_and_build(root_dir, state)
 
         emit_step(5, '重启服务')
+        reload_started = time.time()
         reload_pm2(root_dir)
-        time.sleep(5)
 
         emit_step(6, '健康检查')
-        port = load_config_port()
-        health_check(port)
+        health_check(root_dir, reload_started)
 
-        print('✅ 更新完成，服务已重启。', flush=True)
+        REPORTER.context['toVersion'] = read_package_version(root_dir)
+        emit('✅ 更新完成，服务已重启。')
     except Exception as exc:
-        print(f'❌ 更新失败: {exc}', flush=True)
+        emit(f'❌ 更新失败: {exc}')
+        REPORTER.close_steps('failed')
         rollback(root_dir, prev_commit)
         sys.exit(1)
 